@@ -0,0 +1,226 @@
+# App/backup_utils.py
+import gzip
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+from datetime import datetime
+
+import db_connection
+import read_cache
+
+BACKUP_PAGES_PER_STEP = 1024     # pages copied per backup step (4 MiB with 4 KiB pages)
+BACKUP_STEP_SLEEP = 0.005        # seconds to yield between steps so reviews can write
+DEFAULT_KEEP_SNAPSHOTS = 5
+SNAPSHOT_TIME_FORMAT = "%Y%m%d-%H%M%S-%f"
+COPY_CHUNK_SIZE = 1024 * 1024
+MAX_BACKUP_RESTARTS = 3          # incremental passes restarted by other writers before finishing in one step
+
+
+class _BackupRestarted(Exception):
+    """Raised from the progress callback to abandon a stepwise copy that keeps restarting."""
+
+
+def _copy_database(source: sqlite3.Connection, target: sqlite3.Connection, pages: int, progress=None):
+    """
+    Copies source into target with the backup API in steps of `pages` pages.
+
+    SQLite restarts a stepwise backup whenever another connection writes to
+    the source. If that happens more than MAX_BACKUP_RESTARTS times (a busy
+    reviewer on a large database), the rest is copied in a single step, which
+    in WAL mode still does not block writers.
+    """
+    state = {"remaining": None, "restarts": 0}
+
+    def on_progress(status, remaining, total):
+        if state["remaining"] is not None and remaining > state["remaining"]:
+            state["restarts"] += 1
+            if state["restarts"] > MAX_BACKUP_RESTARTS:
+                raise _BackupRestarted()
+        state["remaining"] = remaining
+        if progress:
+            progress(status, remaining, total)
+
+    try:
+        source.backup(target, pages=pages, progress=on_progress, sleep=BACKUP_STEP_SLEEP)
+    except _BackupRestarted:
+        source.backup(target, pages=-1, progress=progress)
+
+
+def get_backup_dir(user_deck_db_path: str) -> str:
+    """Returns the default snapshot directory (database/backups/)."""
+    return os.path.join(os.path.dirname(os.path.abspath(user_deck_db_path)), "backups")
+
+
+def _snapshot_prefix(user_deck_db_path: str) -> str:
+    return os.path.splitext(os.path.basename(user_deck_db_path))[0] + "-"
+
+
+def list_snapshots(user_deck_db_path: str, backup_dir: str | None = None) -> list:
+    """
+    Lists the snapshots taken of a deck database, newest first.
+
+    Returns:
+        A list of snapshot file paths.
+    """
+    backup_dir = backup_dir or get_backup_dir(user_deck_db_path)
+    prefix = _snapshot_prefix(user_deck_db_path)
+    if not os.path.isdir(backup_dir):
+        return []
+    names = [name for name in os.listdir(backup_dir)
+             if name.startswith(prefix) and (name.endswith(".db") or name.endswith(".db.gz"))]
+    # The timestamp is fixed-width, so name order is chronological
+    return [os.path.join(backup_dir, name) for name in sorted(names, reverse=True)]
+
+
+def rotate_snapshots(user_deck_db_path: str, backup_dir: str | None = None,
+                     keep: int = DEFAULT_KEEP_SNAPSHOTS) -> list:
+    """
+    Deletes all but the newest `keep` snapshots.
+
+    Returns:
+        The list of removed snapshot paths.
+    """
+    removed = []
+    for snapshot_path in list_snapshots(user_deck_db_path, backup_dir)[keep:]:
+        try:
+            os.remove(snapshot_path)
+            removed.append(snapshot_path)
+        except OSError as e:
+            print(f"Backup Error: Could not remove old snapshot {snapshot_path}: {e}")
+    return removed
+
+
+def _gzip_file(source_path: str, target_path: str, compresslevel: int):
+    with open(source_path, "rb") as src, gzip.open(target_path, "wb", compresslevel=compresslevel) as dst:
+        shutil.copyfileobj(src, dst, COPY_CHUNK_SIZE)
+
+
+def _gunzip_file(source_path: str, target_path: str):
+    with gzip.open(source_path, "rb") as src, open(target_path, "wb") as dst:
+        shutil.copyfileobj(src, dst, COPY_CHUNK_SIZE)
+
+
+def create_snapshot(user_deck_db_path: str, backup_dir: str | None = None, compress: bool = False,
+                    keep: int = DEFAULT_KEEP_SNAPSHOTS, pages: int = BACKUP_PAGES_PER_STEP,
+                    compresslevel: int = 6, progress=None) -> str | None:
+    """
+    Takes an online snapshot of a whole deck database with the SQLite backup API.
+
+    The copy runs in steps of `pages` pages and sleeps briefly between steps,
+    so the source is only read-locked for one step at a time and reviews can
+    keep writing while a large database is being copied.
+
+    Args:
+        user_deck_db_path: Path to the user's deck database.
+        backup_dir: Where to write the snapshot (defaults to database/backups/).
+        compress: If True, the snapshot is stored gzip-compressed.
+        keep: How many snapshots of this database to retain (0 keeps all).
+        pages: Pages copied per backup step.
+        compresslevel: gzip level used when compress is True.
+        progress: Optional callable(status, remaining, total) from sqlite3.Connection.backup.
+
+    Returns:
+        The path of the new snapshot, or None if an error occurred.
+    """
+    backup_dir = backup_dir or get_backup_dir(user_deck_db_path)
+    timestamp = datetime.now().strftime(SNAPSHOT_TIME_FORMAT)
+    snapshot_path = os.path.join(backup_dir, f"{_snapshot_prefix(user_deck_db_path)}{timestamp}.db")
+    tmp_path = None
+    try:
+        os.makedirs(backup_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=backup_dir, suffix=".tmp")
+        os.close(fd)
+
+        source = db_connection.connect_read_only(user_deck_db_path)
+        target = sqlite3.connect(tmp_path)
+        try:
+            _copy_database(source, target, pages, progress)
+        finally:
+            target.close()
+            source.close()
+
+        if compress:
+            snapshot_path += ".gz"
+            _gzip_file(tmp_path, tmp_path + ".gz", compresslevel)
+            os.remove(tmp_path)
+            tmp_path += ".gz"
+        os.replace(tmp_path, snapshot_path)
+        tmp_path = None
+    except (OSError, sqlite3.Error) as e:
+        print(f"Backup Error: Could not snapshot {user_deck_db_path}: {e}")
+        return None
+    finally:
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    if keep:
+        rotate_snapshots(user_deck_db_path, backup_dir, keep)
+    print(f"Snapshot of {user_deck_db_path} written to {snapshot_path}.")
+    return snapshot_path
+
+
+def restore_snapshot(snapshot_path: str, user_deck_db_path: str,
+                     pages: int = BACKUP_PAGES_PER_STEP, progress=None) -> bool:
+    """
+    Restores a snapshot (plain or .gz) over a deck database.
+
+    The snapshot is integrity-checked first, then copied into the live
+    database through the backup API, so open connections see a consistent
+    switch instead of a file being replaced underneath them.
+
+    Returns:
+        True if successful, False otherwise.
+    """
+    tmp_path = None
+    try:
+        source_path = snapshot_path
+        if snapshot_path.endswith(".gz"):
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(user_deck_db_path)), suffix=".tmp")
+            os.close(fd)
+            _gunzip_file(snapshot_path, tmp_path)
+            source_path = tmp_path
+
+        source = db_connection.connect_read_only(source_path)
+        try:
+            check = source.execute("PRAGMA quick_check").fetchone()[0]
+            if check != "ok":
+                print(f"Backup Error: Snapshot {snapshot_path} failed integrity check: {check}")
+                return False
+            target = sqlite3.connect(user_deck_db_path)
+            try:
+                _copy_database(source, target, pages, progress)
+            finally:
+                target.close()
+                read_cache.bump_generation(user_deck_db_path)
+        finally:
+            source.close()
+    except (OSError, sqlite3.Error) as e:
+        print(f"Backup Error: Could not restore {snapshot_path}: {e}")
+        return False
+    finally:
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    print(f"Restored {user_deck_db_path} from {snapshot_path}.")
+    return True
+
+
+def start_background_snapshot(user_deck_db_path: str, on_done=None, **snapshot_kwargs) -> threading.Thread:
+    """
+    Runs create_snapshot on a daemon thread.
+
+    Args:
+        on_done: Optional callable(snapshot_path_or_None), invoked on the worker thread.
+
+    Returns:
+        The started thread.
+    """
+    def worker():
+        snapshot_path = create_snapshot(user_deck_db_path, **snapshot_kwargs)
+        if on_done:
+            on_done(snapshot_path)
+
+    thread = threading.Thread(target=worker, name="deck-snapshot", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,91 @@
+# App/benchmarks/bench_backup.py
+"""
+Measures online snapshot throughput at several database sizes, and the
+worst-case latency a concurrent reviewer sees while a snapshot is running.
+
+Usage:
+    python benchmarks/bench_backup.py [size_mb ...] [--compress]
+
+Example (multi-GB):
+    python benchmarks/bench_backup.py 256 1024 4096
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import backup_utils  # noqa: E402
+import deck_manager  # noqa: E402
+
+CARD_TEXT_BYTES = 900  # roughly four cards per 4 KiB page
+
+
+def build_database(db_path: str, size_mb: int):
+    deck_manager.init_user_decks_database(db_path)
+    num_cards = size_mb * 2**20 // (CARD_TEXT_BYTES + 100)
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("INSERT INTO decks (name) VALUES ('Bench')")
+        conn.execute(f"""
+            WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < {num_cards})
+            INSERT INTO cards (deck_id, due_date, interval, ease_factor, repetitions)
+            SELECT 1, '2026-01-01 00:00:00', 1, 2.5, 0 FROM seq""")
+        conn.execute(f"""
+            INSERT INTO card_content (card_id, front, back)
+            SELECT id, hex(randomblob({CARD_TEXT_BYTES // 4})), hex(randomblob({CARD_TEXT_BYTES // 4})) FROM cards""")
+        conn.commit()
+    return num_cards
+
+
+def reviewer(db_path: str, num_cards: int, stop: threading.Event, latencies: list):
+    """Grades one card every 50 ms, like a fast user, and records how long each write took."""
+    card_id = 1
+    while not stop.is_set():
+        start = time.perf_counter()
+        with sqlite3.connect(db_path, timeout=30) as conn:
+            conn.execute("UPDATE cards SET repetitions = repetitions + 1 WHERE id = ?", (card_id,))
+            conn.commit()
+        latencies.append(time.perf_counter() - start)
+        card_id = card_id % num_cards + 1
+        time.sleep(0.05)
+
+
+def bench(size_mb: int, compress: bool):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "bench_decks.db")
+        start = time.perf_counter()
+        num_cards = build_database(db_path, size_mb)
+        build_time = time.perf_counter() - start
+        db_mb = os.path.getsize(db_path) / 2**20
+
+        stop = threading.Event()
+        latencies = []
+        thread = threading.Thread(target=reviewer, args=(db_path, num_cards, stop, latencies))
+        thread.start()
+        start = time.perf_counter()
+        snapshot_path = backup_utils.create_snapshot(
+            db_path, backup_dir=os.path.join(tmp_dir, "backups"), compress=compress, keep=0)
+        elapsed = time.perf_counter() - start
+        stop.set()
+        thread.join()
+
+        snap_mb = os.path.getsize(snapshot_path) / 2**20 if snapshot_path else 0
+        worst = max(latencies) * 1000 if latencies else 0
+        print(f"{db_mb:9.1f} MiB  build {build_time:6.1f}s  snapshot {elapsed:7.2f}s "
+              f"({db_mb / elapsed:7.1f} MiB/s)  file {snap_mb:9.1f} MiB  "
+              f"reviews during backup {len(latencies):5d}, worst write {worst:7.1f} ms")
+
+
+def main():
+    compress = "--compress" in sys.argv
+    sizes = [int(arg) for arg in sys.argv[1:] if not arg.startswith("--")] or [64, 256, 1024]
+    print(f"Online snapshot benchmark (compress={compress})")
+    for size_mb in sizes:
+        bench(size_mb, compress)
+
+
+if __name__ == "__main__":
+    main()
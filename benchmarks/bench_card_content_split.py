@@ -0,0 +1,94 @@
+# App/benchmarks/bench_card_content_split.py
+"""
+Compares the deck database with the card text inside the cards table
+(schema version 6) against the text moved out into card_content
+(version 7): pages in the cards table, building the due snapshot (a due
+scan) and grading cards, including the WAL bytes each grade writes.
+
+Usage:
+    python benchmarks/bench_card_content_split.py [num_cards] [text_bytes]
+"""
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db_connection  # noqa: E402
+import deck_manager  # noqa: E402
+
+NUM_GRADES = 2000
+
+
+def build_database(db_path: str, schema_version: int, num_cards: int, text_bytes: int):
+    current_version = deck_manager.SCHEMA_VERSION
+    deck_manager.SCHEMA_VERSION = schema_version
+    try:
+        deck_manager.init_user_decks_database(db_path)
+    finally:
+        deck_manager.SCHEMA_VERSION = current_version
+    cards_sql = f"""
+        WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < {num_cards})
+        INSERT INTO cards (deck_id, {{text_columns}} due_date, interval)
+        SELECT 1 + n % 10, {{text_values}} datetime('now', (n % 400 - 100) || ' days'), n % 60 FROM seq"""
+    front = f"hex(randomblob({text_bytes // 8}))"  # hex doubles the bytes: a quarter of the text on the front
+    back = f"hex(randomblob({text_bytes * 3 // 8}))"
+    with sqlite3.connect(db_path) as conn:
+        conn.executemany("INSERT INTO decks (name) VALUES (?)", ((f"Deck {i}",) for i in range(10)))
+        if schema_version < 7:
+            conn.execute(cards_sql.format(text_columns="front, back,", text_values=f"{front}, {back},"))
+        else:
+            conn.execute(cards_sql.format(text_columns="", text_values=""))
+            conn.execute(f"INSERT INTO card_content (card_id, front, back) SELECT id, {front}, {back} FROM cards")
+        conn.commit()
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+def table_pages(db_path: str, table: str) -> int:
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute("SELECT COUNT(*) FROM dbstat WHERE name = ?", (table,)).fetchone()[0]
+
+
+def measure(label: str, db_path: str, num_cards: int):
+    start = time.perf_counter()
+    deck_manager.refresh_due_snapshot(db_path, force=True)
+    scan_ms = (time.perf_counter() - start) * 1000
+
+    # The same statements as deck_manager.grade_card, on one connection with
+    # automatic checkpoints off, so the WAL grows by exactly what was written
+    card_ids = random.Random(1).choices(range(1, num_cards + 1), k=NUM_GRADES)
+    wal_path = db_path + "-wal"
+    with db_connection.connect(db_path, isolation_level=None) as conn:
+        conn.execute("PRAGMA wal_autocheckpoint = 0")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        cursor = conn.cursor()
+        start = time.perf_counter()
+        for i, card_id in enumerate(card_ids):
+            db_connection.begin_write(conn)
+            due_date = f"2027-01-{1 + i % 28:02d} 00:00:00"
+            deck_manager._save_srs_update(cursor, card_id, due_date, 10 + i % 30, 2.5, 3, 4)
+            conn.execute("COMMIT")
+        grade_ms = (time.perf_counter() - start) / NUM_GRADES * 1000
+        wal_bytes = os.path.getsize(wal_path)
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    print(f"  {label:<26} {table_pages(db_path, 'cards'):>9,} {scan_ms:>11.1f} {grade_ms:>9.2f} "
+          f"{wal_bytes / NUM_GRADES / 1024:>10.1f}")
+
+
+def main():
+    num_cards = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    text_bytes = int(sys.argv[2]) if len(sys.argv) > 2 else 800
+    print(f"{num_cards:,} cards, ~{text_bytes} bytes of text each, {NUM_GRADES:,} grades")
+    print(f"  {'':<26} {'cards pages':>9} {'due scan ms':>11} {'grade ms':>9} {'WAL KiB/grade':>10}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for label, version in (("text in cards (v6)", 6), ("text in card_content (v7)", 7)):
+            db_path = os.path.join(tmp_dir, f"v{version}_decks.db")
+            build_database(db_path, version, num_cards, text_bytes)
+            measure(label, db_path, num_cards)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# App/benchmarks/bench_card_records.py
+"""
+Compares the memory held by a due-card queue built as a list of dicts
+(the old get_due_cards path) against the array-backed CardQueue.
+
+Usage:
+    python benchmarks/bench_card_records.py [num_cards]
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.card import CardQueue  # noqa: E402
+
+DUE_QUERY = "SELECT id, front, back, repetitions, ease_factor, interval FROM cards"
+
+
+def build_database(db_path: str, num_cards: int):
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("""
+            CREATE TABLE cards (
+                id INTEGER PRIMARY KEY, front TEXT, back TEXT,
+                repetitions INTEGER, ease_factor REAL, interval INTEGER)""")
+        conn.executemany(
+            "INSERT INTO cards VALUES (?, ?, ?, ?, ?, ?)",
+            ((i, f"Question {i}", f"Answer {i}", i % 7, 2.5 - (i % 5) * 0.1, 1 + i % 30)
+             for i in range(1, num_cards + 1)))
+        conn.commit()
+
+
+def measure(db_path: str, build) -> tuple:
+    with sqlite3.connect(db_path) as conn:
+        conn.row_factory = sqlite3.Row
+        cursor = conn.execute(DUE_QUERY)
+        tracemalloc.start()
+        start = time.perf_counter()
+        queue = build(cursor)
+        elapsed = time.perf_counter() - start
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return len(queue), current, peak, elapsed
+
+
+def main():
+    num_cards = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "bench.db")
+        build_database(db_path, num_cards)
+
+        results = {
+            "list[dict]": measure(db_path, lambda cur: [dict(row) for row in cur]),
+            "CardQueue": measure(db_path, CardQueue.from_rows),
+        }
+
+    print(f"{num_cards:,} due cards")
+    for name, (count, current, peak, elapsed) in results.items():
+        print(f"  {name:<12} retained {current / 2**20:8.1f} MiB  peak {peak / 2**20:8.1f} MiB  "
+              f"build {elapsed:6.2f}s  ({current / count:.0f} B/card)")
+    baseline = results["list[dict]"][1]
+    compact = results["CardQueue"][1]
+    print(f"  reduction: {100 * (1 - compact / baseline):.1f}%")
+
+
+if __name__ == "__main__":
+    main()
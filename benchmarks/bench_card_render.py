@@ -0,0 +1,81 @@
+# App/benchmarks/bench_card_render.py
+"""
+Times rendering card markup (Markdown, HTML, LaTeX-lite) uncached, from
+the render cache, and across a review session where the next cards are
+pre-rendered while the current one is shown.
+
+Usage:
+    python benchmarks/bench_card_render.py [num_cards] [paragraphs_per_card]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import card_render  # noqa: E402
+
+PRERENDER_AHEAD = 3
+
+
+def make_card(n: int, paragraphs: int) -> tuple:
+    body = "\n\n".join(
+        f"## Section {p}\n"
+        f"**Term {n}.{p}** is *defined* by $\\frac{{\\alpha_{{{p}}} + x^{{2}}}}{{\\sqrt{{\\beta_i}}}} \\le \\infty$, "
+        f"see [notes](https://example.com/{n}/{p}) and `code_{p}()`.\n"
+        f"- first <b>point</b> with ~~old~~ text\n- second point $a \\times b = c$\n"
+        f"1. step one\n2. step two"
+        for p in range(paragraphs))
+    return f"Card {n}: what is $E = mc^2$?", body + f"\n\n$$\\sum_{{i=1}}^{{{n}}} i = \\frac{{n(n+1)}}{{2}}$$"
+
+
+def per_card(label: str, seconds: float, count: int):
+    print(f"  {label:<44} {seconds / count * 1e6:9.1f} us per card")
+
+
+def main():
+    num_cards = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    paragraphs = int(sys.argv[2]) if len(sys.argv) > 2 else 6
+    cards = [make_card(n, paragraphs) for n in range(num_cards)]
+    size = sum(len(front) + len(back) for front, back in cards) / num_cards
+    print(f"{num_cards} cards, {size:,.0f} characters each")
+
+    start = time.perf_counter()
+    for front, back in cards:
+        card_render.render_markup(front)
+        card_render.render_markup(back)
+    per_card("uncached (render_markup)", time.perf_counter() - start, num_cards)
+
+    cached = cards[:card_render.MAX_ENTRIES // 2]  # both sides of these fit in the cache
+    card_render.clear_cache()
+    for front, back in cached:
+        card_render.render(front)
+        card_render.render(back)
+    start = time.perf_counter()
+    for front, back in cached:
+        card_render.render(front)
+        card_render.render(back)
+    per_card("cache hit (render)", time.perf_counter() - start, len(cached))
+
+    # A session: the time that matters is what showing the front and then the answer costs;
+    # pre-rendering happens after the card is painted, while the learner reads it
+    for label, ahead in (("session, no pre-rendering", 0), (f"session, {PRERENDER_AHEAD} cards pre-rendered", PRERENDER_AHEAD)):
+        card_render.clear_cache()
+        shown = idle = 0.0
+        for index, (front, back) in enumerate(cards):
+            start = time.perf_counter()
+            card_render.render_card(front)
+            card_render.render_card(front, back)
+            shown += time.perf_counter() - start
+            if ahead:
+                start = time.perf_counter()
+                card_render.prerender(text for card in cards[index + 1:index + 1 + ahead] for text in card)
+                idle += time.perf_counter() - start
+        per_card(f"{label} (on screen)", shown, num_cards)
+        if ahead:
+            per_card(f"{label} (idle)", idle, num_cards)
+    print(f"  {card_render.cache_stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# App/benchmarks/bench_collection_archive.py
+"""
+Times exporting a generated collection to an archive with one worker and
+with one worker per core, for each compression, and importing it back.
+Reports the archive size against the database file's.
+
+Usage:
+    python benchmarks/bench_collection_archive.py [decks] [cards_per_deck]
+"""
+import contextlib
+import io
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import collection_archive  # noqa: E402
+import deck_manager  # noqa: E402
+
+
+def build_database(db_path: str, num_decks: int, cards_per_deck: int):
+    deck_manager.init_user_decks_database(db_path)
+    total = num_decks * cards_per_deck
+    with sqlite3.connect(db_path) as conn:
+        conn.executemany("INSERT INTO decks (name) VALUES (?)", ((f"Deck {i}",) for i in range(num_decks)))
+        conn.execute(f"""
+            WITH RECURSIVE seq(n) AS (SELECT 0 UNION ALL SELECT n + 1 FROM seq WHERE n < {total - 1})
+            INSERT INTO cards (deck_id, due_date, interval, repetitions)
+            SELECT 1 + n / {cards_per_deck}, datetime('now', '+' || (n % 30) || ' days'), n % 60, n % 5
+            FROM seq""")
+        conn.execute("""
+            INSERT INTO card_content (card_id, front, back)
+            SELECT id, 'What is the meaning of term ' || id || '?', 'Term ' || id || ' means ' || hex(randomblob(8))
+            FROM cards""")
+        conn.execute("""
+            INSERT INTO review_log (card_id, deck_id, reviewed_at, quality, repetitions, ease_factor, interval)
+            SELECT id, deck_id, datetime('now', '-' || (id % 90) || ' days'), 3 + id % 3, id % 5, 2.5, id % 60
+            FROM cards WHERE id % 2 = 0""")
+        conn.commit()
+
+
+def main():
+    num_decks = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    cards_per_deck = int(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+    cores = os.cpu_count() or 1
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "bench_decks.db")
+        with contextlib.redirect_stdout(io.StringIO()):
+            build_database(db_path, num_decks, cards_per_deck)
+        db_size = os.path.getsize(db_path)
+        print(f"{num_decks} decks x {cards_per_deck:,} cards, database {db_size / 1e6:.1f} MB, {cores} core(s)")
+        print(f"  {'compression':<12} {'workers':>7} {'export s':>9} {'MB':>7} {'of db':>6}")
+        archive_path = os.path.join(tmp_dir, "collection.tar")
+        for compression in collection_archive.COMPRESSIONS:
+            for workers in sorted({1, cores}):
+                with contextlib.redirect_stdout(io.StringIO()):
+                    result = collection_archive.export_collection(db_path, archive_path, compression, workers=workers)
+                print(f"  {compression:<12} {workers:>7} {result['seconds']:9.2f} {result['bytes'] / 1e6:7.1f} "
+                      f"{result['bytes'] / db_size:6.0%}")
+            target_path = os.path.join(tmp_dir, f"import_{compression}_decks.db")
+            with contextlib.redirect_stdout(io.StringIO()):
+                deck_manager.init_user_decks_database(target_path)
+                start = time.perf_counter()
+                imported = collection_archive.import_collection(target_path, archive_path)
+            print(f"  {compression:<12} {'import':>7} {time.perf_counter() - start:9.2f}  "
+                  f"({imported['cards']:,} cards, {imported['reviews']:,} reviews)")
+
+
+if __name__ == "__main__":
+    main()
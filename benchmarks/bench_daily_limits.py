@@ -0,0 +1,74 @@
+# App/benchmarks/bench_daily_limits.py
+"""
+Times starting a review session on a freshly imported deck (every card
+new) and on a deck with a large overdue backlog, with the default daily
+limits and without limits, at several deck sizes. With limits the cost
+should stay flat as the deck grows.
+
+Usage:
+    python benchmarks/bench_daily_limits.py [sizes]
+
+    sizes   comma-separated cards per deck (default 10000,50000,200000)
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import deck_manager  # noqa: E402
+
+REPEATS = 5
+
+
+def build_database(db_path: str, cards_per_deck: int):
+    """Deck 1 was just imported (no card reviewed yet); deck 2's cards are all overdue."""
+    deck_manager.init_user_decks_database(db_path)
+    with sqlite3.connect(db_path) as conn:
+        conn.executemany("INSERT INTO decks (name) VALUES (?)", (("Fresh import",), ("Backlog",)))
+        conn.execute(f"""
+            WITH RECURSIVE seq(n) AS (SELECT 0 UNION ALL SELECT n + 1 FROM seq WHERE n < {2 * cards_per_deck - 1})
+            INSERT INTO cards (deck_id, due_date, interval, repetitions)
+            SELECT 1 + n / {cards_per_deck},
+                   CASE WHEN n < {cards_per_deck} THEN NULL
+                        ELSE datetime('now', '-' || (1 + n % 365) || ' days', '+' || (n % 86400) || ' seconds') END,
+                   n % 60, CASE WHEN n < {cards_per_deck} THEN 0 ELSE 1 + n % 5 END
+            FROM seq""")
+        conn.execute("INSERT INTO card_content (card_id, front, back) SELECT id, 'Q' || id, 'A' || id FROM cards")
+        conn.commit()
+
+
+def time_session(db_path: str, deck_id: int, now_str: str) -> tuple:
+    best, size = None, 0
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        queue = deck_manager.get_due_cards(db_path, deck_id, now_str)
+        if queue:
+            queue[0]  # the first card shown, loaded with the rest of its page
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+        size = len(queue)
+    return best * 1000, size
+
+
+def main():
+    sizes = [int(size) for size in (sys.argv[1] if len(sys.argv) > 1 else "10000,50000,200000").split(",")]
+    now_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    print(f"{'cards/deck':>10}  {'deck':<14} {'limits':<10} {'session':>8} {'start ms':>9}")
+    for cards_per_deck in sizes:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db_path = os.path.join(tmp_dir, "bench_decks.db")
+            build_database(db_path, cards_per_deck)
+            for deck_id, deck_label in ((1, "fresh import"), (2, "backlog")):
+                for limits_label, limits in (("default", None), ("none", (None, None))):
+                    if limits:
+                        deck_manager.set_daily_limits(db_path, deck_id, *limits)
+                    ms, size = time_session(db_path, deck_id, now_str)
+                    print(f"{cards_per_deck:>10,}  {deck_label:<14} {limits_label:<10} {size:>8,} {ms:9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# App/benchmarks/bench_due_balancing.py
+"""
+Shows what load-balanced due dates do to the daily review count, and how
+cheap the per-grade load lookup is.
+
+1. Simulates importing a large deck and learning it at a fixed number of
+   new cards a day, grading with exact SM-2 intervals and with intervals
+   balanced by srs_logic.pick_least_loaded_interval, and prints the daily
+   workload for both.
+2. Times deck_manager.get_due_load against counting the same days from the
+   cards table, on a collection with a million cards.
+
+Usage:
+    python benchmarks/bench_due_balancing.py [num_cards] [new_per_day] [days]
+"""
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import deck_manager  # noqa: E402
+from utils import srs_logic  # noqa: E402
+
+RECALL_PROBABILITY = 0.9
+LOOKUP_CARDS = 1_000_000
+
+
+def simulate(num_cards: int, new_per_day: int, days: int, balance: bool) -> list:
+    """Returns the number of reviews done on each simulated day."""
+    rng = random.Random(1)
+    due = Counter()     # day -> cards due that day (the histogram)
+    cards_by_day = {}   # day -> list of card states due that day
+    workload = []
+    next_new = 0
+    for day in range(days):
+        todays = cards_by_day.pop(day, [])
+        due.pop(day, None)
+        learn = min(new_per_day, num_cards - next_new)
+        todays += [[0, 2.5, 1] for _ in range(learn)]
+        next_new += learn
+        workload.append(len(todays))
+        for card in todays:
+            quality = rng.choice((4, 5)) if rng.random() < RECALL_PROBABILITY else 3
+            card[0], card[1], interval = srs_logic.calculate_srs_update(quality, *card)
+            if balance:
+                earliest, latest = srs_logic.fuzz_range(interval)
+                loads = [due[day + i] for i in range(earliest, latest + 1)]
+                interval = srs_logic.pick_least_loaded_interval(interval, earliest, loads)
+            card[2] = interval
+            due[day + interval] += 1
+            cards_by_day.setdefault(day + interval, []).append(card)
+    return workload
+
+
+def bench_lookup():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "bench_decks.db")
+        deck_manager.init_user_decks_database(db_path)
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("INSERT INTO decks (name) VALUES ('Bench')")
+            conn.execute(f"""
+                WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < {LOOKUP_CARDS})
+                INSERT INTO cards (deck_id, due_date)
+                SELECT 1, datetime('2026-01-01', '+' || (abs(random()) % 730) || ' days') FROM seq""")
+            conn.execute("INSERT INTO card_content (card_id, front, back) SELECT id, 'Q' || id, 'A' || id FROM cards")
+            conn.commit()
+        first_day = "2026-06-01"
+        window = 15
+        repeats = 200
+        start = time.perf_counter()
+        for _ in range(repeats):
+            loads = deck_manager.get_due_load(db_path, first_day, window)
+        histogram_ms = (time.perf_counter() - start) / repeats * 1000
+
+        last_day = (datetime.strptime(first_day, "%Y-%m-%d") + timedelta(days=window)).strftime("%Y-%m-%d")
+        start = time.perf_counter()
+        for _ in range(repeats):
+            with sqlite3.connect(db_path) as conn:
+                counted = dict(conn.execute("""
+                    SELECT date(due_date), COUNT(*) FROM cards
+                    WHERE due_date >= ? AND due_date < ? GROUP BY date(due_date)""", (first_day, last_day)).fetchall())
+        count_ms = (time.perf_counter() - start) / repeats * 1000
+        assert sorted(counted.values()) == sorted(c for c in loads if c)
+        print(f"Load lookup for a {window}-day window, {LOOKUP_CARDS:,} cards: "
+              f"histogram {histogram_ms:.2f} ms, counting cards {count_ms:.2f} ms")
+
+
+def main():
+    num_cards = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    new_per_day = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    days = int(sys.argv[3]) if len(sys.argv) > 3 else 365
+    print(f"{num_cards:,} imported cards, {new_per_day} new a day, {days} days")
+    for balance in (False, True):
+        workload = simulate(num_cards, new_per_day, days, balance)
+        steady = workload[num_cards // new_per_day + 40:]  # once all cards have been introduced
+        print(f"  {'balanced' if balance else 'exact   '}  reviews/day afterwards: "
+              f"mean {statistics.mean(steady):7.1f}  stdev {statistics.pstdev(steady):7.1f}  "
+              f"peak {max(steady):6d}  total {sum(workload):,}")
+    bench_lookup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# App/benchmarks/bench_due_snapshot.py
+"""
+Times the dashboard due counts and the start of a review session against a
+large backlog, computed from the cards table (the old way) and read from
+the daily due snapshot, plus what building the snapshot and grading with
+it in place cost.
+
+Usage:
+    python benchmarks/bench_due_snapshot.py [num_cards] [num_decks] [due_percent]
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import deck_manager  # noqa: E402
+
+
+def build_database(db_path: str, num_cards: int, num_decks: int, due_percent: int):
+    deck_manager.init_user_decks_database(db_path)
+    with sqlite3.connect(db_path) as conn:
+        conn.executemany("INSERT INTO decks (name) VALUES (?)", ((f"Deck {i}",) for i in range(num_decks)))
+        # due_percent of the cards are overdue by up to a year, the rest due within two years
+        conn.execute(f"""
+            WITH RECURSIVE seq(n) AS (SELECT 0 UNION ALL SELECT n + 1 FROM seq WHERE n < {num_cards - 1})
+            INSERT INTO cards (deck_id, due_date, interval)
+            SELECT 1 + n % {num_decks},
+                   CASE WHEN abs(random()) % 100 < {due_percent}
+                        THEN datetime('now', '-' || (abs(random()) % 365) || ' days')
+                        ELSE datetime('now', '+' || (1 + abs(random()) % 730) || ' days') END,
+                   n % 60
+            FROM seq""")
+        conn.execute("INSERT INTO card_content (card_id, front, back) SELECT id, 'Q' || id, 'A' || id FROM cards")
+        conn.commit()
+
+
+def timed(label: str, func, repeats: int = 10):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = func()
+    print(f"  {label:<44} {(time.perf_counter() - start) / repeats * 1000:9.2f} ms")
+    return result
+
+
+def main():
+    num_cards = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    num_decks = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    due_percent = int(sys.argv[3]) if len(sys.argv) > 3 else 30
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "bench_decks.db")
+        build_database(db_path, num_cards, num_decks, due_percent)
+        now_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        conn = sqlite3.connect(db_path)
+        print(f"{num_cards:,} cards in {num_decks} decks, ~{due_percent}% due")
+
+        def count_from_cards():
+            return dict(conn.execute("""
+                SELECT deck_id, COUNT(*) FROM cards WHERE due_date IS NULL OR due_date <= ? GROUP BY deck_id
+            """, (now_str,)).fetchall())
+
+        def session_from_cards():
+            return conn.execute("""
+                SELECT c.id, cc.front, cc.back, c.repetitions, c.ease_factor, c.interval
+                FROM cards c JOIN card_content cc ON cc.card_id = c.id
+                WHERE (c.due_date IS NULL OR c.due_date <= ?) AND c.deck_id = 1 ORDER BY c.due_date ASC, RANDOM()
+            """, (now_str,)).fetchall()
+
+        start = time.perf_counter()
+        deck_manager.refresh_due_snapshot(db_path, force=True)
+        print(f"  {'build snapshot (once a day)':<44} {(time.perf_counter() - start) * 1000:9.2f} ms")
+
+        old_counts = timed("due counts per deck, counting cards", count_from_cards)
+        new_counts = timed("due counts per deck, from snapshot", lambda: deck_manager.get_due_counts(db_path))
+        old_session = timed("start session (deck 1), querying cards", session_from_cards)
+
+        def session_from_index():
+            queue = deck_manager.get_due_cards(db_path, 1, now_str)
+            queue[0]  # the first card shown, loaded with the rest of its page
+            return queue
+
+        deck_manager.set_daily_limits(db_path, 1, None, None)  # the whole backlog, like the old query
+        new_session = timed("start session (deck 1), get_due_cards", session_from_index)
+        assert sum(new_counts.values()) >= sum(old_counts.values()) and len(new_session) >= len(old_session)
+
+        card_ids = [new_session[i]["id"] for i in range(min(200, len(new_session)))]
+        start = time.perf_counter()
+        for card_id in card_ids:
+            deck_manager.grade_card(db_path, card_id, 5)
+        print(f"  {'grade a card (snapshot kept by triggers)':<44} "
+              f"{(time.perf_counter() - start) / len(card_ids) * 1000:9.2f} ms")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
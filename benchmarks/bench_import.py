@@ -0,0 +1,102 @@
+# App/benchmarks/bench_import.py
+"""
+Imports a large TSV file and a large Anki package, and reports the time
+taken and the peak Python memory used, streamed in batches and, for
+comparison, loaded into a list first and inserted one card at a time.
+Each import goes into a database that already holds the earlier ones.
+
+Usage:
+    python benchmarks/bench_import.py [num_notes]
+"""
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+import zipfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import deck_manager  # noqa: E402
+import import_utils  # noqa: E402
+
+
+def write_tsv(path: str, num_notes: int):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("front\tback\ttags\n")
+        for i in range(num_notes):
+            f.write(f"Question {i} {'lorem ipsum ' * 4}\tAnswer {i} {'dolor sit amet ' * 4}\t{'' if i % 3 else 'tag' + str(i % 50)}\n")
+
+
+def write_apkg(path: str, tmp_dir: str, num_notes: int):
+    """A minimal Anki collection: one review card and one reversed new card per note."""
+    collection_path = os.path.join(tmp_dir, "collection.anki2")
+    with sqlite3.connect(collection_path) as conn:
+        conn.executescript("""
+            CREATE TABLE col (id INTEGER PRIMARY KEY, crt INTEGER, decks TEXT);
+            CREATE TABLE notes (id INTEGER PRIMARY KEY, mid INTEGER, flds TEXT, tags TEXT);
+            CREATE TABLE cards (id INTEGER PRIMARY KEY, nid INTEGER, did INTEGER, ord INTEGER, type INTEGER,
+                                queue INTEGER, due INTEGER, ivl INTEGER, factor INTEGER, reps INTEGER, lapses INTEGER);
+        """)
+        conn.execute("INSERT INTO col VALUES (1, ?, ?)",
+                     (int(time.time()) - 400 * 86400, json.dumps({"2": {"name": "Bench"}})))
+        conn.executemany("INSERT INTO notes VALUES (?, 1, ?, ?)",
+                         ((i, f"<b>Word {i}</b>\x1fMeaning {i}<br>example sentence", " bench " if i % 4 == 0 else "")
+                          for i in range(1, num_notes + 1)))
+        conn.executemany("INSERT INTO cards VALUES (?, ?, 2, ?, ?, ?, ?, ?, 2500, ?, 0)",
+                         ((2 * i + ord_, i, ord_, 2 - 2 * ord_, 2 - 2 * ord_, 380 + i % 60 if ord_ == 0 else i,
+                           1 + i % 90 if ord_ == 0 else 0, 5 if ord_ == 0 else 0)
+                          for i in range(1, num_notes + 1) for ord_ in (0, 1)))
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as package:
+        package.write(collection_path, "collection.anki2")
+        package.writestr("media", "{}")
+    os.remove(collection_path)
+
+
+def import_file(db_path: str, file_path: str, deck_name: str, materialize: bool, options) -> int:
+    with import_utils.open_deck_file(file_path, **(options or {})) as (_, cards):
+        if materialize:
+            cards = list(cards)
+        return deck_manager.import_deck_and_cards(db_path, deck_name, cards)
+
+
+def run(label: str, db_path: str, file_path: str, deck_name: str, materialize: bool, options=None):
+    """Times one import, then repeats it under tracemalloc (which slows Python down) for the peak memory."""
+    start = time.perf_counter()
+    imported = import_file(db_path, file_path, deck_name, materialize, options)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    import_file(db_path, file_path, deck_name + " (traced)", materialize, options)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"  {label:<40} {imported:9,} cards {elapsed:7.2f} s  {imported / elapsed:9,.0f}/s  peak {peak / 2**20:7.1f} MiB")
+
+
+def main():
+    num_notes = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tsv_path = os.path.join(tmp_dir, "notes.tsv")
+        apkg_path = os.path.join(tmp_dir, "notes.apkg")
+        write_tsv(tsv_path, num_notes)
+        write_apkg(apkg_path, tmp_dir, num_notes)
+        db_path = os.path.join(tmp_dir, "bench_decks.db")
+        deck_manager.init_user_decks_database(db_path)
+        print(f"{num_notes:,} notes")
+
+        tsv_options = {"front": "front", "back": "back", "tags": "tags"}
+        run("TSV, streamed in batches", db_path, tsv_path, "tsv stream", False, tsv_options)
+        run("Anki package, streamed in batches", db_path, apkg_path, "apkg stream", False)
+
+        batch_size = deck_manager.IMPORT_BATCH_SIZE
+        deck_manager.IMPORT_BATCH_SIZE = 1
+        try:
+            run("TSV, loaded whole, one insert per card", db_path, tsv_path, "tsv list", True, tsv_options)
+            run("Anki package, loaded whole, one per card", db_path, apkg_path, "apkg list", True)
+        finally:
+            deck_manager.IMPORT_BATCH_SIZE = batch_size
+
+
+if __name__ == "__main__":
+    main()
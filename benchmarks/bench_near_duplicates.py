@@ -0,0 +1,80 @@
+# App/benchmarks/bench_near_duplicates.py
+"""
+Times near-duplicate detection on generated collections of several sizes
+and checks it finds the planted duplicates: every 20th card is a copy of
+the card before it, upper-cased, re-punctuated and with a word added.
+Reports the time, peak memory and how many planted pairs were found.
+
+Usage:
+    python benchmarks/bench_near_duplicates.py [sizes]
+
+    sizes   comma-separated card counts (default 10000,100000,1000000)
+"""
+import contextlib
+import io
+import os
+import resource
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import deck_manager  # noqa: E402
+from utils import near_duplicates  # noqa: E402
+
+DUPLICATE_EVERY = 20
+NUM_WORDS = 20_000
+
+
+def random_words(count: int) -> str:
+    return " || ' ' || ".join(["'w' || (abs(random()) % {})".format(NUM_WORDS)] * count)
+
+
+def build_database(db_path: str, num_cards: int):
+    deck_manager.init_user_decks_database(db_path)
+    with sqlite3.connect(db_path) as conn:
+        conn.executemany("INSERT INTO decks (name) VALUES (?)", (("Deck A",), ("Deck B",)))
+        conn.execute(f"""
+            WITH RECURSIVE seq(n) AS (SELECT 0 UNION ALL SELECT n + 1 FROM seq WHERE n < {num_cards - 1})
+            INSERT INTO cards (deck_id) SELECT 1 + n % 2 FROM seq""")
+        conn.execute(f"INSERT INTO card_content (card_id, front, back) SELECT id, {random_words(6)}, {random_words(4)} FROM cards")
+        conn.execute(f"""
+            UPDATE card_content SET
+                front = (SELECT upper(replace(p.front, ' ', ', ')) || '?' FROM card_content p WHERE p.card_id = card_content.card_id - 1),
+                back = (SELECT p.back || ' extra' FROM card_content p WHERE p.card_id = card_content.card_id - 1)
+            WHERE card_id % {DUPLICATE_EVERY} = 1 AND card_id > 1""")
+        conn.commit()
+
+
+def run_size(num_cards: int) -> str:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "bench_decks.db")
+        with contextlib.redirect_stdout(io.StringIO()):
+            build_database(db_path, num_cards)
+        start = time.perf_counter()
+        clusters = near_duplicates.find_near_duplicates(db_path)
+        elapsed = time.perf_counter() - start
+    planted = len(range(DUPLICATE_EVERY + 1, num_cards + 1, DUPLICATE_EVERY))
+    found = sum(1 for cluster in clusters
+                if sorted(card["id"] for card in cluster["cards"])[1] % DUPLICATE_EVERY == 1)
+    extra = sum(len(cluster["cards"]) - 1 for cluster in clusters) - found
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return (f"{num_cards:>10,} {elapsed:9.2f} {peak:9.0f} {found:>8,}/{planted:<8,} {extra:>6,}")
+
+
+def main():
+    if len(sys.argv) > 2 and sys.argv[1] == "--child":
+        print(run_size(int(sys.argv[2])))
+        return
+    sizes = (sys.argv[1] if len(sys.argv) > 1 else "10000,100000,1000000").split(",")
+    print(f"{'cards':>10} {'seconds':>9} {'peak MiB':>9} {'planted found':>17} {'other':>6}")
+    for size in sizes:
+        # One process per size, so the peak memory is that size's alone
+        subprocess.run([sys.executable, os.path.abspath(__file__), "--child", size], check=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# App/benchmarks/bench_read_cache.py
+"""
+Times the queries behind the My Decks and Statistics pages with a cold
+cache, a warm cache, and right after a review (which invalidates it).
+
+Usage:
+    python benchmarks/bench_read_cache.py [num_decks] [cards_per_deck]
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import deck_manager  # noqa: E402
+import read_cache  # noqa: E402
+
+
+def build_database(db_path: str, num_decks: int, cards_per_deck: int):
+    deck_manager.init_user_decks_database(db_path)
+    with sqlite3.connect(db_path) as conn:
+        conn.executemany("INSERT INTO decks (name) VALUES (?)", ((f"Deck {i}",) for i in range(num_decks)))
+        conn.execute(f"""
+            WITH RECURSIVE seq(n) AS (SELECT 0 UNION ALL SELECT n + 1 FROM seq WHERE n < {num_decks * cards_per_deck - 1})
+            INSERT INTO cards (deck_id, due_date, interval)
+            SELECT 1 + n % {num_decks}, datetime('2026-01-01', '+' || (n % 400) || ' days'), n % 60
+            FROM seq""")
+        conn.execute("INSERT INTO card_content (card_id, front, back) SELECT id, 'Q' || id, 'A' || id FROM cards")
+        conn.commit()
+
+
+def visit_pages(db_path: str):
+    """What showing My Decks and then Statistics reads."""
+    for deck in deck_manager.get_all_decks(db_path):
+        deck_manager.get_deck_statistics(db_path, deck["id"])
+    deck_manager.get_global_statistics(db_path)
+
+
+def timed(label: str, db_path: str, repeats: int = 20):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        visit_pages(db_path)
+    print(f"  {label:<28} {(time.perf_counter() - start) / repeats * 1000:8.2f} ms per visit")
+
+
+def main():
+    num_decks = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    cards_per_deck = int(sys.argv[2]) if len(sys.argv) > 2 else 4000
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "bench_decks.db")
+        build_database(db_path, num_decks, cards_per_deck)
+        print(f"{num_decks} decks x {cards_per_deck:,} cards")
+
+        start = time.perf_counter()
+        visit_pages(db_path)
+        print(f"  {'cold cache':<28} {(time.perf_counter() - start) * 1000:8.2f} ms per visit")
+        timed("warm cache", db_path)
+
+        start = time.perf_counter()
+        repeats = 20
+        for i in range(repeats):
+            deck_manager.update_card_srs_details(db_path, i + 1, "2026-12-01 00:00:00", 5, 2.5, 1)
+            visit_pages(db_path)
+        print(f"  {'review, then visit':<28} {(time.perf_counter() - start) / repeats * 1000:8.2f} ms per visit")
+        print(f"  {read_cache.cache_stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# App/benchmarks/bench_relearning_queue.py
+"""
+Compares two ways of handling the cards failed during a review session:
+writing every grade to the database as it is given (one transaction per
+grade, relearning re-shows included), and keeping the failed cards in the
+in-memory RelearningQueue until the end of the session, then saving them
+with one deck_manager.grade_cards call.
+
+Usage:
+    python benchmarks/bench_relearning_queue.py [cards] [failure_rate]
+"""
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import deck_manager  # noqa: E402
+from models.card import Card, RelearningQueue  # noqa: E402
+from utils import srs_logic  # noqa: E402
+
+SEED = 7
+
+
+def build_database(db_path: str, num_cards: int) -> list:
+    with contextlib.redirect_stdout(io.StringIO()):
+        deck_manager.init_user_decks_database(db_path)
+        deck_manager.create_new_deck(db_path, "Bench")
+    with deck_manager.db_connection.connect_for_write(db_path) as conn:
+        conn.executemany("INSERT INTO cards (deck_id, due_date) VALUES (1, datetime('now'))",
+                         ([] for _ in range(num_cards)))
+        conn.commit()
+        return [row[0] for row in conn.execute("SELECT id FROM cards ORDER BY id")]
+
+
+def session_grades(card_ids: list, failure_rate: float) -> list:
+    """(card_id, quality) in the order a session shows them: each failed card is re-shown once per step."""
+    rng = random.Random(SEED)
+    grades = []
+    for card_id in card_ids:
+        if rng.random() < failure_rate:
+            grades.append((card_id, 3))
+            grades += [(card_id, 5)] * len(srs_logic.RELEARNING_STEPS_MINUTES)
+        else:
+            grades.append((card_id, 5))
+    return grades
+
+
+def run_per_grade(db_path: str, grades: list) -> float:
+    start = time.perf_counter()
+    for card_id, quality in grades:
+        deck_manager.grade_card(db_path, card_id, quality)
+    return time.perf_counter() - start
+
+
+def run_relearning_queue(db_path: str, grades: list) -> tuple:
+    """Returns (total seconds, seconds spent in the final batched write, write transactions)."""
+    start = time.perf_counter()
+    transactions = 1
+    relearning = RelearningQueue(srs_logic.RELEARNING_STEPS_MINUTES)
+    clock = 0.0
+    for card_id, quality in grades:
+        card = Card(id=card_id)
+        if card_id in relearning:
+            relearning.pop(clock, ahead=True)
+            relearning.regrade(card, quality >= srs_logic.PASSING_QUALITY, clock)
+        elif quality < srs_logic.PASSING_QUALITY:
+            relearning.lapse(card, quality, None, clock)
+        else:
+            deck_manager.grade_card(db_path, card_id, quality)
+            transactions += 1
+        clock += 10.0
+    flush_start = time.perf_counter()
+    deck_manager.grade_cards(db_path, relearning.take_all())
+    end = time.perf_counter()
+    return end - start, end - flush_start, transactions
+
+
+def main():
+    num_cards = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000
+    failure_rate = float(sys.argv[2]) if len(sys.argv) > 2 else 0.2
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        results = {}
+        for name in ("per_grade", "relearning_queue"):
+            db_path = os.path.join(tmp_dir, f"{name}.db")
+            grades = session_grades(build_database(db_path, num_cards), failure_rate)
+            if name == "per_grade":
+                results[name] = (run_per_grade(db_path, grades), len(grades))
+            else:
+                elapsed, flush, transactions = run_relearning_queue(db_path, grades)
+                results[name] = (elapsed, transactions)
+                print(f"  {'batched write of failed cards':<34} {flush * 1000:9.2f} ms")
+        print(f"  {num_cards:,} cards, {failure_rate:.0%} failed, steps {srs_logic.RELEARNING_STEPS_MINUTES} min")
+        for name, (elapsed, transactions) in results.items():
+            print(f"  {name:<34} {elapsed:9.3f} s  {transactions:7,} write transactions  "
+                  f"{elapsed / len(grades) * 1e6:8.1f} us per grade")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# App/benchmarks/bench_report.py
+"""
+Times the cross-user report over many user databases with 1, 2, 4, ...
+worker processes, up to the number of cores (at least 2, so the process
+pool is always measured against the single-process run).
+
+Usage:
+    python benchmarks/bench_report.py [num_users] [cards_per_user]
+"""
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import deck_manager  # noqa: E402
+import reports  # noqa: E402
+
+
+def build_template(db_path: str, num_cards: int):
+    """One learner's database: a deck of cards and a review for each."""
+    deck_manager.init_user_decks_database(db_path)
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("INSERT INTO decks (name) VALUES ('Deck')")
+        conn.execute(f"""
+            WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < {num_cards})
+            INSERT INTO cards (deck_id, due_date, interval)
+            SELECT 1, datetime('now', (n % 60 - 20) || ' days'), n % 40 FROM seq""")
+        conn.execute("INSERT INTO card_content (card_id, front, back) SELECT id, 'Q' || id, 'A' || id FROM cards")
+        conn.execute("""
+            INSERT INTO review_log (card_id, deck_id, reviewed_at, quality, repetitions, ease_factor, interval)
+            SELECT id, 1, datetime('now', '-' || (id % 45) || ' days'), 2 + id % 4, 1, 2.5, interval FROM cards""")
+        conn.commit()
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+def main():
+    num_users = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    cards_per_user = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    with tempfile.TemporaryDirectory() as database_dir:
+        template = os.path.join(database_dir, "template.db")
+        build_template(template, cards_per_user)
+        with sqlite3.connect(os.path.join(database_dir, "user.db")) as conn:
+            conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, username TEXT UNIQUE, password_hash TEXT)")
+            conn.executemany("INSERT INTO users (username, password_hash) VALUES (?, '')",
+                             ((f"learner{i:05d}",) for i in range(num_users)))
+        for i in range(num_users):
+            shutil.copyfile(template, os.path.join(database_dir, f"learner{i:05d}_decks.db"))
+        os.remove(template)
+        cores = os.cpu_count() or 1
+        print(f"{num_users:,} user databases x {cards_per_user:,} cards, {cores} core(s)")
+
+        max_workers = max(cores, 2)
+        baseline = None
+        workers = 1
+        while True:
+            start = time.perf_counter()
+            report = reports.build_report(database_dir, workers=workers)
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            assert report["totals"]["users"] == num_users and not report["errors"]
+            print(f"  {workers:3d} worker(s)  {elapsed:7.2f} s  {num_users / elapsed:8,.0f} users/s  "
+                  f"speedup {baseline / elapsed:4.1f}x")
+            if workers >= max_workers:
+                break
+            workers = min(workers * 2, max_workers)
+        totals = report["totals"]
+        print(f"  totals: {totals['cards']:,} cards, {totals['due_today']:,} due, "
+              f"retention {reports.retention(totals):.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# App/benchmarks/bench_review_telemetry.py
+"""
+Measures what review session telemetry costs: the per-card overhead of
+timing a card (card_shown, answer_shown, card_graded), writing a full
+buffer to the database, and reading the session summaries and rolling
+throughput for the Statistics page from a long history.
+
+Usage:
+    python benchmarks/bench_review_telemetry.py [cards] [history_sessions]
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import deck_manager  # noqa: E402
+import review_telemetry  # noqa: E402
+
+REPEATS = 5
+
+
+def time_card_overhead(num_cards: int) -> float:
+    """Best per-card time (us) of the three timer calls, flushes excluded."""
+    best = None
+    for _ in range(REPEATS):
+        timer = review_telemetry.SessionTimer(1, capacity=num_cards)
+        start = time.perf_counter()
+        for card_id in range(num_cards):
+            timer.card_shown()
+            timer.answer_shown()
+            timer.card_graded(card_id, 4)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / num_cards * 1e6
+
+
+def main():
+    num_cards = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    history = int(sys.argv[2]) if len(sys.argv) > 2 else 2_000
+    print(f"  {'timing one card':<40} {time_card_overhead(num_cards):9.2f} us")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "bench_decks.db")
+        with contextlib.redirect_stdout(io.StringIO()):
+            deck_manager.init_user_decks_database(db_path)
+            deck_manager.create_new_deck(db_path, "Bench")
+        capacity = review_telemetry.BUFFER_CAPACITY
+        flushes = []
+        for _ in range(history):
+            timer = review_telemetry.SessionTimer(1)
+            for card_id in range(capacity):
+                timer.card_shown()
+                timer.answer_shown()
+                timer.card_graded(card_id, 4)
+            start = time.perf_counter()
+            review_telemetry.save_session(db_path, timer)
+            flushes.append(time.perf_counter() - start)
+        flushes.sort()
+        median = flushes[len(flushes) // 2]
+        print(f"  {f'flushing {capacity} cards':<40} {median * 1000:9.2f} ms ({median / capacity * 1e6:.2f} us per card)")
+
+        for label, read in (("last session summary", lambda: review_telemetry.get_session_summaries(db_path, 1)),
+                            ("10 session summaries", lambda: review_telemetry.get_session_summaries(db_path)),
+                            ("rolling throughput", lambda: review_telemetry.get_throughput(db_path))):
+            best = min(timed(read) for _ in range(REPEATS))
+            print(f"  {f'{label} ({history:,} sessions)':<40} {best * 1000:9.2f} ms")
+
+
+def timed(func) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# App/benchmarks/bench_shared_decks.py
+"""
+Gives many users the same course, once as a private copy per user
+(import_deck_and_cards) and once from the shared library
+(add_shared_deck), and compares the disk used and the time to read
+review cards through the attached library.
+
+Usage:
+    python benchmarks/bench_shared_decks.py [num_users] [num_cards]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import deck_manager  # noqa: E402
+import shared_decks  # noqa: E402
+
+PAGES_READ = 20  # review cards read per session: PAGES_READ pages of LazyCardQueue.PAGE_SIZE
+
+
+def course(num_cards: int):
+    for i in range(num_cards):
+        yield {"front": f"Question {i}: {'what does this sentence mean? ' * 4}",
+               "back": f"Answer {i}: {'an explanation with an example sentence. ' * 6}"}
+
+
+def directory_size(path: str, suffix: str) -> int:
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path) if name.endswith(suffix))
+
+
+def read_sessions(db_paths: list) -> float:
+    """Starts a review session for each user and reads PAGES_READ pages of it; returns ms per session."""
+    now_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    start = time.perf_counter()
+    for db_path in db_paths:
+        queue = deck_manager.get_due_cards(db_path, None, now_str)
+        for page in range(PAGES_READ):
+            queue[page * queue.PAGE_SIZE]
+    return (time.perf_counter() - start) / len(db_paths) * 1000
+
+
+def main():
+    num_users = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    num_cards = int(sys.argv[2]) if len(sys.argv) > 2 else 10_000
+    print(f"{num_users} users x {num_cards:,}-card course")
+    with tempfile.TemporaryDirectory() as private_dir, tempfile.TemporaryDirectory() as shared_dir:
+        private_paths = [os.path.join(private_dir, f"user{i}_decks.db") for i in range(num_users)]
+        shared_paths = [os.path.join(shared_dir, f"user{i}_decks.db") for i in range(num_users)]
+
+        start = time.perf_counter()
+        for db_path in private_paths:
+            deck_manager.init_user_decks_database(db_path)
+            deck_manager.import_deck_and_cards(db_path, "Course", course(num_cards))
+        private_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        shared_deck_id, _ = shared_decks.publish_deck(shared_decks.get_library_path(shared_paths[0]),
+                                                      "Course", course(num_cards))
+        for db_path in shared_paths:
+            deck_manager.init_user_decks_database(db_path)
+            deck_manager.add_shared_deck(db_path, shared_deck_id)
+        shared_seconds = time.perf_counter() - start
+
+        for paths in (private_paths, shared_paths):
+            for db_path in paths:
+                deck_manager.refresh_due_snapshot(db_path)
+        private_read = read_sessions(private_paths)
+        shared_read = read_sessions(shared_paths)
+
+        private_size = directory_size(private_dir, ".db")
+        user_size = directory_size(shared_dir, "_decks.db")
+        library_size = os.path.getsize(shared_decks.get_library_path(shared_paths[0]))
+        print(f"  {'':<22} {'set-up':>9} {'disk':>11} {'per user':>10} {'session':>9}")
+        print(f"  {'private copies':<22} {private_seconds:8.2f}s {private_size / 2**20:9.1f}MB "
+              f"{private_size / num_users / 2**20:8.2f}MB {private_read:7.1f}ms")
+        print(f"  {'shared library':<22} {shared_seconds:8.2f}s {(user_size + library_size) / 2**20:9.1f}MB "
+              f"{user_size / num_users / 2**20:8.2f}MB {shared_read:7.1f}ms")
+        print(f"  (library {library_size / 2**20:.1f} MB; session = start + {PAGES_READ} pages of cards)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+# App/benchmarks/bench_srs_optimizer.py
+"""
+Times the scheduler parameter optimizer on a synthetic review history.
+
+A simulated user forgets according to a "true" parameter set while being
+scheduled with the SM-2 defaults (and reviewing up to a few days late).
+The fit should land closer to the true parameters than the defaults and
+lower the log loss.
+
+Usage:
+    python benchmarks/bench_srs_optimizer.py [num_cards] [reviews_per_card]
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import deck_manager  # noqa: E402
+from utils import srs_optimizer  # noqa: E402
+from utils.srs_logic import SrsParameters, DEFAULT_SRS_PARAMETERS  # noqa: E402
+
+TRUE_PARAMETERS = SrsParameters(min_ease=1.5, first_interval=2.0, second_interval=4.0,
+                                ease_bonus=0.05, ease_penalty_linear=0.12, ease_penalty_quadratic=0.03)
+START_DAY = 2461000.0  # julian day, mid-2026
+HISTORY_DAYS = 3650
+
+
+def _step(params, passed, quality, reps, ease, interval):
+    new_reps = np.where(passed, reps + 1, 0)
+    interval = np.where(~passed, 1.0, np.where(new_reps == 1, params.first_interval,
+                                               np.where(new_reps == 2, params.second_interval, interval * ease)))
+    d = 5 - quality
+    ease = np.maximum(ease + params.ease_bonus - d * (params.ease_penalty_linear + d * params.ease_penalty_quadratic),
+                      params.min_ease)
+    return new_reps, ease, interval
+
+
+def simulate(num_cards: int, reviews_per_card: int, rng):
+    """Returns review_log rows (card_id, reviewed_at, quality, repetitions, ease_factor, interval)."""
+    reps, ease, interval = np.zeros(num_cards), np.full(num_cards, 2.5), np.ones(num_cards)
+    true_reps, true_ease, true_interval = reps.copy(), ease.copy(), interval.copy()
+    day = np.full(num_cards, START_DAY)
+    columns = []
+    for k in range(reviews_per_card):
+        if k > 0:
+            day = day + np.ceil(interval) + rng.integers(0, 4, num_cards)  # scheduled, sometimes late
+            p = 0.9 ** ((day - last_day) / true_interval)
+            recalled = rng.random(num_cards) < p
+        else:
+            recalled = rng.random(num_cards) < 0.7
+        quality = np.where(recalled, rng.choice([4, 5], num_cards, p=[0.6, 0.4]), 3).astype(np.float64)
+        columns.append((np.arange(1, num_cards + 1), day.copy(), quality, reps.copy(), ease.copy(), interval.copy()))
+        reps, ease, interval = _step(DEFAULT_SRS_PARAMETERS, recalled, quality, reps, ease, interval)
+        true_reps, true_ease, true_interval = _step(TRUE_PARAMETERS, recalled, quality, true_reps, true_ease, true_interval)
+        last_day = day
+    # Order by card, then time, and only keep ten years of history
+    rows = [np.stack(parts, axis=1).ravel() for parts in zip(*columns)]
+    kept = rows[1] < START_DAY + HISTORY_DAYS
+    return [column[kept] for column in rows]
+
+
+def fill_review_log(db_path: str, card_ids, days, quality, reps, ease, interval):
+    deck_manager.init_user_decks_database(db_path)
+    with sqlite3.connect(db_path) as conn:
+        conn.executemany("""
+            INSERT INTO review_log (card_id, deck_id, reviewed_at, quality, repetitions, ease_factor, interval)
+            VALUES (?, 1, datetime(?), ?, ?, ?, ?)""",
+            zip(card_ids.tolist(), days.tolist(), quality.astype(int).tolist(), reps.astype(int).tolist(),
+                ease.tolist(), np.ceil(interval).astype(int).tolist()))
+        conn.commit()
+
+
+def main():
+    num_cards = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    reviews_per_card = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    rng = np.random.default_rng(7)
+    rows = simulate(num_cards, reviews_per_card, rng)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "bench_decks.db")
+        start = time.perf_counter()
+        fill_review_log(db_path, *rows)
+        print(f"{len(rows[0]):,} reviews of {num_cards:,} cards logged in {time.perf_counter() - start:.1f}s")
+
+        start = time.perf_counter()
+        history = srs_optimizer.load_review_history(db_path)
+        load_time = time.perf_counter() - start
+        start = time.perf_counter()
+        loss = srs_optimizer.replay_loss(history, DEFAULT_SRS_PARAMETERS)
+        eval_time = time.perf_counter() - start
+        start = time.perf_counter()
+        result = srs_optimizer.fit_srs_parameters(history)
+        fit_time = time.perf_counter() - start
+
+    print(f"  load {load_time:.2f}s, one loss evaluation {eval_time * 1000:.0f} ms, "
+          f"fit {fit_time:.2f}s ({result.evaluations} evaluations)")
+    print(f"  log loss: defaults {loss:.4f} -> fitted {result.loss:.4f} "
+          f"(true parameters {srs_optimizer.replay_loss(history, TRUE_PARAMETERS):.4f})")
+    for field in SrsParameters._fields:
+        print(f"  {field:<24} default {getattr(DEFAULT_SRS_PARAMETERS, field):6.3f}  "
+              f"fitted {getattr(result.params, field):6.3f}  true {getattr(TRUE_PARAMETERS, field):6.3f}")
+
+
+if __name__ == "__main__":
+    main()
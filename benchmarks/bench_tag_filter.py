@@ -0,0 +1,67 @@
+# App/benchmarks/bench_tag_filter.py
+"""
+Times tag-filtered due queries on a large generated collection.
+
+Usage:
+    python benchmarks/bench_tag_filter.py [num_cards] [num_assignments]
+"""
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import deck_manager  # noqa: E402
+from utils.tag_query import parse_tag_query  # noqa: E402
+
+NUM_DECKS = 20
+NUM_TAGS = 200
+QUERIES = ["tag0", "tag1 tag2", "tag3|tag4|tag5", "tag6 -tag7", "tag8|tag9 -tag10", "-tag11"]
+
+
+def build_database(db_path: str, num_cards: int, num_assignments: int):
+    deck_manager.init_user_decks_database(db_path)
+    rng = random.Random(42)
+    with sqlite3.connect(db_path) as conn:
+        conn.executemany("INSERT INTO decks (name) VALUES (?)", ((f"Deck {i}",) for i in range(NUM_DECKS)))
+        conn.executemany(
+            "INSERT INTO cards (deck_id, due_date) VALUES (?, ?)",
+            ((1 + i % NUM_DECKS, f"2026-{1 + rng.randrange(12):02d}-{1 + rng.randrange(28):02d} 00:00:00")
+             for i in range(num_cards)))
+        conn.execute("INSERT INTO card_content (card_id, front, back) SELECT id, 'Q' || id, 'A' || id FROM cards")
+        conn.executemany("INSERT INTO tags (name) VALUES (?)", ((f"tag{i}",) for i in range(NUM_TAGS)))
+        # Skewed tag popularity, like real collections
+        conn.executemany(
+            "INSERT OR IGNORE INTO card_tags (tag_id, card_id) VALUES (?, ?)",
+            ((1 + min(int(rng.expovariate(0.05)), NUM_TAGS - 1), 1 + rng.randrange(num_cards))
+             for _ in range(num_assignments)))
+        conn.commit()
+        conn.execute("ANALYZE")
+
+
+def main():
+    num_cards = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    num_assignments = int(sys.argv[2]) if len(sys.argv) > 2 else 50_000
+    now_str = datetime(2026, 7, 1).strftime("%Y-%m-%d %H:%M:%S")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "bench_decks.db")
+        start = time.perf_counter()
+        build_database(db_path, num_cards, num_assignments)
+        print(f"{num_cards:,} cards, {num_assignments:,} tag assignments (built in {time.perf_counter() - start:.1f}s)")
+
+        for deck_id in (None, 1):
+            scope = "all decks" if deck_id is None else f"deck {deck_id}"
+            for query in QUERIES:
+                tag_filter = parse_tag_query(query)
+                start = time.perf_counter()
+                queue = deck_manager.get_due_cards(db_path, deck_id, now_str, tag_filter)
+                elapsed = (time.perf_counter() - start) * 1000
+                print(f"  {scope:<10} {query:<20} {len(queue):8,} due  {elapsed:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+# App/benchmarks/bench_ui_pages.py
+"""
+Times the UI paths that grow with the collection (My Decks, a deck's card
+list, loading review cards, the Statistics page) on a headless Qt
+(QT_QPA_PLATFORM=offscreen) against generated databases of several sizes.
+
+Each size runs in its own process, so the peak memory reported (maximum
+resident set size, Qt's C++ side included) belongs to that size alone.
+Every timing covers the handler plus the event processing that lays out
+and paints the page, i.e. what the user waits for.
+
+Usage:
+    python benchmarks/bench_ui_pages.py [sizes] [--repeats N] [--json OUT] [--compare BASELINE]
+
+    sizes       comma-separated DECKSxCARDS_PER_DECK (default 10x100,50x400,200x1000)
+    --json      writes the results, to be used as a later --compare baseline
+    --compare   flags steps more than TIME_TOLERANCE slower (or MEMORY_TOLERANCE
+                bigger) than the baseline and exits with status 1 if there are any
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import resource
+import runpy
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+DEFAULT_SIZES = "10x100,50x400,200x1000"
+REVIEW_CARDS = 50           # review cards loaded per repeat (front, then answer)
+TAGS_PER_CARD = 2
+NUM_TAGS = 20
+TIME_TOLERANCE = 1.5
+MEMORY_TOLERANCE = 1.25
+RESULT_PREFIX = "RESULT "   # marks the child's result lines among whatever the app prints
+
+STEPS = ("my_decks", "card_list", "review_card", "statistics")
+
+
+def parse_size(size: str) -> tuple:
+    decks, cards = size.lower().split("x")
+    return int(decks), int(cards)
+
+
+def build_database(db_path: str, num_decks: int, cards_per_deck: int):
+    import deck_manager
+    deck_manager.init_user_decks_database(db_path)
+    total = num_decks * cards_per_deck
+    with sqlite3.connect(db_path) as conn:
+        conn.executemany("INSERT INTO decks (name) VALUES (?)", ((f"Deck {i}",) for i in range(num_decks)))
+        conn.execute(f"""
+            WITH RECURSIVE seq(n) AS (SELECT 0 UNION ALL SELECT n + 1 FROM seq WHERE n < {total - 1})
+            INSERT INTO cards (deck_id, due_date, interval, repetitions)
+            SELECT 1 + n / {cards_per_deck},
+                   CASE WHEN n % 3 = 0 THEN NULL ELSE datetime('now', '-1 days', '+' || (n % 30) || ' days') END,
+                   n % 60, n % 5
+            FROM seq""")
+        conn.execute("""
+            INSERT INTO card_content (card_id, front, back)
+            SELECT id, 'What is **term ' || id || '**?',
+                   'It is *defined* as $x^2 + y_' || id || '$.' || char(10) || '- see `note ' || id || '`'
+            FROM cards""")
+        conn.executemany("INSERT INTO tags (name) VALUES (?)", ((f"tag{i}",) for i in range(NUM_TAGS)))
+        conn.execute(f"""
+            INSERT OR IGNORE INTO card_tags (tag_id, card_id)
+            SELECT 1 + (c.id * (k.k + 7)) % {NUM_TAGS}, c.id
+            FROM cards c, (SELECT 0 AS k UNION ALL SELECT 1) k
+            WHERE k.k < {TAGS_PER_CARD}""")
+        conn.commit()
+
+
+def peak_rss_mib() -> float:
+    """This process's maximum resident set size so far (ru_maxrss is KiB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def settle(app):
+    """Runs pending layout and paint events, and deletes the widgets the page handlers deleteLater()ed
+    (outside app.exec() that only happens when DeferredDelete events are sent explicitly)."""
+    from PyQt6.QtCore import QEvent
+    app.processEvents()
+    app.sendPostedEvents(None, QEvent.Type.DeferredDelete.value)
+
+
+def run_size(size: str, repeats: int) -> list:
+    """Builds a database of the given size and times each step on a headless MainWindow. Runs in a child process."""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt6.QtWidgets import QApplication
+    import deck_manager
+    import read_cache
+    from handlers import review_handler
+    from models import user as user_model
+    from utils import card_render
+
+    num_decks, cards_per_deck = parse_size(size)
+    app = QApplication.instance() or QApplication([])
+    # Loaded the way `python main.py` loads it: handlers import `main` themselves for the dialogs,
+    # so importing it as a module here would be circular
+    main_window_class = runpy.run_path(os.path.join(APP_DIR, "main.py"), run_name="bench")["MainWindow"]
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir, contextlib.redirect_stdout(io.StringIO()):
+        db_path = os.path.join(tmp_dir, "bench_decks.db")
+        build_database(db_path, num_decks, cards_per_deck)
+        # Keep the window's user.db in the temp dir; the real database/user.db is left alone
+        main_window_class._init_user_database = lambda window: user_model.init_user_database(tmp_dir)
+        window = main_window_class()
+        window.show()
+        window.user_deck_db_path = db_path
+        deck_manager.refresh_due_snapshot(db_path)
+        settle(app)
+        baseline_rss = peak_rss_mib()
+
+        def show_review_cards():
+            window.review_cards_list = deck_manager.get_due_cards(db_path, None, time.strftime("%Y-%m-%d %H:%M:%S"))
+            window._navigate_to_page(window.review_page)
+            for index in range(min(REVIEW_CARDS, len(window.review_cards_list))):
+                window.current_review_card_index = index
+                for showing_answer in (False, True):
+                    window.showing_answer = showing_answer
+                    review_handler.load_review_card(window)
+                    settle(app)
+            return min(REVIEW_CARDS, len(window.review_cards_list))
+
+        def open_largest_deck():
+            window.handle_open_deck(num_decks, f"Deck {num_decks - 1}")
+
+        steps = {
+            "my_decks": window.show_myDecks_page,
+            "card_list": open_largest_deck,
+            "review_card": show_review_cards,
+            "statistics": window.show_statistics_page,
+        }
+        for step in STEPS:
+            # Cold: nothing cached, as on the first visit after login
+            read_cache.clear_cache()
+            card_render.clear_cache()
+            start = time.perf_counter()
+            count = steps[step]()
+            settle(app)
+            cold = time.perf_counter() - start
+            timings = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                count = steps[step]()
+                settle(app)
+                timings.append(time.perf_counter() - start)
+            timings.sort()
+            per = count if step == "review_card" and count else 1
+            results.append({
+                "size": size, "step": step,
+                "cold_ms": cold * 1000 / per,
+                "median_ms": timings[len(timings) // 2] * 1000 / per if timings else None,
+                "peak_rss_mib": peak_rss_mib(),
+                "baseline_rss_mib": baseline_rss,
+            })
+        window.close()
+        user_model.close_connections()
+    return results
+
+
+def run_in_child(size: str, repeats: int) -> list:
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    completed = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", size, "--repeats", str(repeats)],
+                               env=env, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"Benchmark for {size} failed:\n{completed.stderr}")
+    return [json.loads(line[len(RESULT_PREFIX):]) for line in completed.stdout.splitlines()
+            if line.startswith(RESULT_PREFIX)]
+
+
+def compare(results: list, baseline: list) -> list:
+    """Lists the results that regressed against a baseline run of the same size and step."""
+    previous = {(r["size"], r["step"]): r for r in baseline}
+    regressions = []
+    for result in results:
+        before = previous.get((result["size"], result["step"]))
+        if before is None:
+            continue
+        if result["median_ms"] and before["median_ms"] and result["median_ms"] > before["median_ms"] * TIME_TOLERANCE:
+            regressions.append(f"{result['size']} {result['step']}: "
+                               f"{before['median_ms']:.2f} -> {result['median_ms']:.2f} ms")
+        if result["peak_rss_mib"] > before["peak_rss_mib"] * MEMORY_TOLERANCE:
+            regressions.append(f"{result['size']} {result['step']}: "
+                               f"peak {before['peak_rss_mib']:.0f} -> {result['peak_rss_mib']:.0f} MiB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("sizes", nargs="?", default=DEFAULT_SIZES)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--json", dest="json_path")
+    parser.add_argument("--compare", dest="baseline_path")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        for result in run_size(args.child, args.repeats):
+            print(RESULT_PREFIX + json.dumps(result))
+        return 0
+
+    results = []
+    print(f"{'size':<12} {'step':<12} {'cold ms':>10} {'median ms':>10} {'peak MiB':>9}  (review_card: per card)")
+    for size in args.sizes.split(","):
+        parse_size(size)
+        for result in run_in_child(size, args.repeats):
+            results.append(result)
+            median = f"{result['median_ms']:10.2f}" if result["median_ms"] is not None else f"{'-':>10}"
+            print(f"{size:<12} {result['step']:<12} {result['cold_ms']:10.2f} {median} {result['peak_rss_mib']:9.1f}")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline_path:
+        with open(args.baseline_path, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f))
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
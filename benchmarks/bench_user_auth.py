@@ -0,0 +1,66 @@
+# App/benchmarks/bench_user_auth.py
+"""
+Measures account provisioning and login: registering thousands of users
+with models.user.register_users (process-pool hashing, one transaction,
+template copies of the deck database) against one register_user call per
+user, and a first login (PBKDF2) against a returning one (credential cache).
+
+Usage:
+    python benchmarks/bench_user_auth.py [num_users] [iterations]
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import user as user_model  # noqa: E402
+
+SEQUENTIAL_SAMPLE = 100  # register_user calls timed, then scaled up to num_users
+
+
+def main():
+    num_users = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 10_000
+    cores = os.cpu_count() or 1
+    users = [(f"learner{i:05d}", f"password-{i}") for i in range(num_users)]
+    print(f"{num_users:,} users, {iterations:,} PBKDF2 rounds, {cores} core(s)")
+
+    with tempfile.TemporaryDirectory() as database_dir, contextlib.redirect_stdout(io.StringIO()):
+        sample = min(SEQUENTIAL_SAMPLE, num_users)
+        start = time.perf_counter()
+        for username, password in users[:sample]:
+            user_model.register_user(username, password, database_dir, iterations)
+        per_user = (time.perf_counter() - start) / sample
+
+        user_model.register_user("returning", "secret", database_dir)  # at the default cost
+        start = time.perf_counter()
+        token = user_model.authenticate_user("returning", "secret", database_dir)
+        first = time.perf_counter() - start
+        start = time.perf_counter()
+        user_model.authenticate_user("returning", "secret", database_dir)
+        returning = time.perf_counter() - start
+        assert user_model.get_session_user(token) == "returning"
+        user_model.close_connections()
+    print(f"  {'register_user, one at a time':<36} {per_user * num_users:8.2f} s  "
+          f"{1 / per_user:8,.0f} users/s  (from {sample} users)")
+
+    for workers in sorted({1, cores}):
+        with tempfile.TemporaryDirectory() as database_dir:
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                result = user_model.register_users(users, database_dir, iterations, workers=workers)
+                elapsed = time.perf_counter() - start
+            assert result["registered"] == num_users
+            print(f"  {f'register_users, {workers} worker(s)':<36} {elapsed:8.2f} s  {num_users / elapsed:8,.0f} users/s")
+            user_model.close_connections()
+
+    print(f"  {f'first login ({user_model.HASH_ITERATIONS:,} rounds)':<36} {first * 1000:8.2f} ms")
+    print(f"  {'returning login (cached)':<36} {returning * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
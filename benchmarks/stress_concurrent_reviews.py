@@ -0,0 +1,91 @@
+# App/benchmarks/stress_concurrent_reviews.py
+"""
+Runs several processes grading cards in the same deck database at once and
+checks that no grade was lost or failed with "database is locked".
+
+Every worker grades every card the same number of times through
+deck_manager.grade_card, so at the end each card must have exactly
+workers x grades_per_card reviews in review_log and, because every grade
+passes, exactly that many repetitions.
+
+Usage:
+    python benchmarks/stress_concurrent_reviews.py [workers] [cards] [grades_per_card]
+"""
+import multiprocessing
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import deck_manager  # noqa: E402
+
+MAX_INTERVAL_DAYS = 365
+
+
+def build_database(db_path: str, num_cards: int):
+    deck_manager.init_user_decks_database(db_path)
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("INSERT INTO decks (name) VALUES ('Stress')")
+        conn.executemany("INSERT INTO cards (deck_id) VALUES (1)", (() for _ in range(num_cards)))
+        conn.execute("INSERT INTO card_content (card_id, front, back) SELECT id, 'Q' || id, 'A' || id FROM cards")
+        conn.commit()
+
+
+def cap_interval(interval_days: int) -> int:
+    """Keeps hundreds of passing grades in a row from pushing due dates past year 9999."""
+    return min(interval_days, MAX_INTERVAL_DAYS)
+
+
+def worker(db_path: str, num_cards: int, grades_per_card: int, seed: int) -> tuple:
+    """Grades every card grades_per_card times in random order; returns (grades, errors, seconds)."""
+    order = [card_id for card_id in range(1, num_cards + 1) for _ in range(grades_per_card)]
+    random.Random(seed).shuffle(order)
+    errors = 0
+    start = time.perf_counter()
+    for card_id in order:
+        try:
+            deck_manager.grade_card(db_path, card_id, 5, balance=cap_interval)
+        except sqlite3.Error:
+            errors += 1
+    return len(order), errors, time.perf_counter() - start
+
+
+def main():
+    num_workers = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    num_cards = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    grades_per_card = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+    expected = num_workers * grades_per_card
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "stress_decks.db")
+        build_database(db_path, num_cards)
+        print(f"{num_workers} processes x {num_cards} cards x {grades_per_card} grades each")
+
+        start = time.perf_counter()
+        with multiprocessing.Pool(num_workers) as pool:
+            results = pool.starmap(worker, [(db_path, num_cards, grades_per_card, seed) for seed in range(num_workers)])
+        elapsed = time.perf_counter() - start
+
+        total_grades = sum(r[0] for r in results)
+        total_errors = sum(r[1] for r in results)
+        with sqlite3.connect(db_path) as conn:
+            journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+            logged = dict(conn.execute("SELECT card_id, COUNT(*) FROM review_log GROUP BY card_id").fetchall())
+            repetitions = dict(conn.execute("SELECT id, repetitions FROM cards").fetchall())
+
+        lost_logs = sum(expected - logged.get(card_id, 0) for card_id in repetitions)
+        lost_reps = sum(expected - reps for reps in repetitions.values())
+        print(f"  journal mode {journal_mode}; {total_grades:,} grades in {elapsed:.2f} s "
+              f"({total_grades / elapsed:,.0f}/s)")
+        print(f"  failed writes: {total_errors}, lost review_log rows: {lost_logs}, lost repetitions: {lost_reps}")
+        if total_errors or lost_logs or lost_reps:
+            sys.exit(1)
+        print("  OK: every grade was applied exactly once")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,539 @@
+# App/cli.py
+"""
+Command-line maintenance tools for MemorEase databases.
+
+Usage:
+    python cli.py backup <user|db_path> [--compress] [--keep N] [--dest DIR]
+    python cli.py restore <snapshot> <user|db_path>
+    python cli.py snapshots <user|db_path> [--dest DIR]
+    python cli.py sync <user|db_path> <other_db_path>
+    python cli.py optimize <user|db_path> [--deck ID] [--min-reviews N] [--dry-run]
+    python cli.py import <user|db_path> <file> [--columns SPEC] [--delimiter C] [--deck-name NAME]
+    python cli.py report [--workers N] [--days N] [--csv FILE] [--database-dir DIR]
+    python cli.py publish <file> [--columns SPEC] [--delimiter C] [--deck-name NAME] [--library PATH]
+    python cli.py shared [--library PATH]
+    python cli.py add-shared <user|db_path> <shared_deck_id> [--deck-name NAME]
+    python cli.py maintain <user|db_path> [--tasks LIST] [--log N]
+    python cli.py limits <user|db_path> <deck_id> [--new N|none] [--reviews N|none]
+    python cli.py archive <user|db_path> <file> [--compression gzip|lzma] [--level N] [--workers N]
+    python cli.py unarchive <file> <user|db_path>
+    python cli.py duplicates <user|db_path> [--threshold T] [--deck ID] [--show N] [--merge [--yes]]
+    python cli.py add-users <csv_file> [--iterations N] [--workers N] [--database-dir DIR]
+"""
+import argparse
+import csv
+import os
+import sqlite3
+import sys
+import tarfile
+import time
+
+import backup_utils
+import collection_archive
+import deck_manager
+import import_utils
+import maintenance
+import reports
+import shared_decks
+import sync_manager
+from models import user as user_model
+from utils import near_duplicates, srs_optimizer
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+DATABASE_DIR = os.path.join(APP_DIR, "database")
+
+
+def resolve_deck_db_path(user_or_path: str) -> str:
+    """Accepts either a username or a path to a *_decks.db file."""
+    if user_or_path.endswith(".db") or os.path.sep in user_or_path:
+        return os.path.abspath(user_or_path)
+    return os.path.join(DATABASE_DIR, f"{user_or_path}_decks.db")
+
+
+def _require_db(db_path: str) -> bool:
+    if not os.path.exists(db_path):
+        print(f"Error: deck database not found: {db_path}")
+        return False
+    return True
+
+
+def cmd_backup(args) -> int:
+    db_path = resolve_deck_db_path(args.user)
+    if not _require_db(db_path):
+        return 1
+    start = time.perf_counter()
+    snapshot_path = backup_utils.create_snapshot(db_path, backup_dir=args.dest, compress=args.compress, keep=args.keep)
+    if not snapshot_path:
+        return 1
+    print(f"Done in {time.perf_counter() - start:.2f}s ({os.path.getsize(snapshot_path) / 2**20:.1f} MiB).")
+    return 0
+
+
+def cmd_restore(args) -> int:
+    db_path = resolve_deck_db_path(args.user)
+    if not os.path.exists(args.snapshot):
+        print(f"Error: snapshot not found: {args.snapshot}")
+        return 1
+    return 0 if backup_utils.restore_snapshot(args.snapshot, db_path) else 1
+
+
+def cmd_snapshots(args) -> int:
+    db_path = resolve_deck_db_path(args.user)
+    for snapshot_path in backup_utils.list_snapshots(db_path, args.dest):
+        print(f"{snapshot_path}\t{os.path.getsize(snapshot_path) / 2**20:.1f} MiB")
+    return 0
+
+
+def cmd_sync(args) -> int:
+    db_path = resolve_deck_db_path(args.user)
+    other_db_path = resolve_deck_db_path(args.other)
+    if not _require_db(db_path) or not _require_db(other_db_path):
+        return 1
+    start = time.perf_counter()
+    result = sync_manager.sync_databases(db_path, other_db_path)
+    if result is None:
+        return 1
+    print(f"Sent {result['sent']} change(s), received {result['received']} in {time.perf_counter() - start:.2f}s.")
+    print(f"  applied here:  {result['applied_local']}")
+    print(f"  applied there: {result['applied_remote']}")
+    return 0
+
+
+def cmd_optimize(args) -> int:
+    db_path = resolve_deck_db_path(args.user)
+    if not _require_db(db_path):
+        return 1
+    start = time.perf_counter()
+    result = srs_optimizer.optimize_user_parameters(db_path, args.deck, min_reviews=args.min_reviews,
+                                                    save=not args.dry_run)
+    if result is None:
+        return 1
+    scope = f"deck {args.deck}" if args.deck is not None else "all decks"
+    print(f"Fitted {scope} to {result.num_reviews} review(s) in {time.perf_counter() - start:.2f}s "
+          f"({result.evaluations} evaluations).")
+    print(f"  log loss: {result.default_loss:.4f} with SM-2 defaults, {result.loss:.4f} fitted")
+    for field, value in result.params._asdict().items():
+        print(f"  {field:<24} {value:.3f}")
+    if args.dry_run:
+        print("Dry run: parameters not saved.")
+    return 0
+
+
+def _delimited_options(args) -> dict:
+    """
+    open_deck_file options from --columns/--delimiter, for CSV/TSV files.
+
+    Raises:
+        ValueError: If the column spec is invalid.
+    """
+    options = {}
+    if args.file.lower().endswith(import_utils.DELIMITED_EXTENSIONS):
+        options = import_utils.parse_column_spec(args.columns)
+        if args.delimiter:
+            options["delimiter"] = "\t" if args.delimiter in ("tab", "\\t") else args.delimiter
+    return options
+
+
+def _print_progress(count):
+    print(f"\r  {count:,} cards", end="", flush=True)
+
+
+def cmd_import(args) -> int:
+    db_path = resolve_deck_db_path(args.user)
+    if not deck_manager.init_user_decks_database(db_path):
+        return 1
+    try:
+        options = _delimited_options(args)
+    except ValueError as e:
+        print(e)
+        return 1
+    start = time.perf_counter()
+    try:
+        with import_utils.open_deck_file(args.file, **options) as (deck_name, cards):
+            deck_name = args.deck_name or deck_name
+            imported = deck_manager.import_deck_and_cards(db_path, deck_name, cards, progress=_print_progress)
+    except ValueError as e:
+        print(e)
+        return 1
+    except OSError as e:
+        print(f"Error: {e}")
+        return 1
+    except sqlite3.IntegrityError:
+        print(f"Error: a deck named '{deck_name}' already exists (use --deck-name).")
+        return 1
+    except sqlite3.Error:
+        return 1
+    print(f"\rImported {imported:,} cards into '{deck_name}' in {time.perf_counter() - start:.2f}s.")
+    return 0
+
+
+def cmd_publish(args) -> int:
+    try:
+        options = _delimited_options(args)
+    except ValueError as e:
+        print(e)
+        return 1
+    start = time.perf_counter()
+    try:
+        with import_utils.open_deck_file(args.file, **options) as (deck_name, cards):
+            deck_name = args.deck_name or deck_name
+            shared_deck_id, published = shared_decks.publish_deck(args.library, deck_name, cards,
+                                                                  progress=_print_progress)
+    except ValueError as e:
+        print(e)
+        return 1
+    except OSError as e:
+        print(f"Error: {e}")
+        return 1
+    except sqlite3.Error:
+        return 1
+    print(f"\rPublished {published:,} cards to shared deck {shared_deck_id} '{deck_name}' "
+          f"in {time.perf_counter() - start:.2f}s.")
+    return 0
+
+
+def cmd_shared(args) -> int:
+    decks = shared_decks.list_shared_decks(args.library)
+    if not decks:
+        print(f"No shared decks in {args.library}.")
+    for deck in decks:
+        print(f"{deck['id']:>6}  {deck['name']}  ({deck['card_count']:,} cards)")
+    return 0
+
+
+def cmd_add_shared(args) -> int:
+    db_path = resolve_deck_db_path(args.user)
+    if not deck_manager.init_user_decks_database(db_path):
+        return 1
+    try:
+        deck_id, added = deck_manager.add_shared_deck(db_path, args.shared_deck_id, args.deck_name)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
+    except sqlite3.IntegrityError:
+        print("Error: a deck with that name already exists (use --deck-name).")
+        return 1
+    except sqlite3.Error:
+        return 1
+    print(f"Added {added:,} shared cards to deck {deck_id}.")
+    return 0
+
+
+def _format_retention(stats: dict) -> str:
+    value = reports.retention(stats)
+    return f"{value:.1%}" if value is not None else "-"
+
+
+def cmd_report(args) -> int:
+    try:
+        report = reports.build_report(args.database_dir, workers=args.workers, retention_days=args.days)
+    except sqlite3.Error as e:
+        print(f"Error: could not read the user list in {args.database_dir}: {e}")
+        return 1
+    header = ("user", "decks", "cards", "learned", "due", f"reviews/{args.days}d", "retention")
+    rows = [(stats["user"], stats["decks"], stats["cards"], stats["learned"], stats["due_today"],
+             stats["reviews"], _format_retention(stats)) for stats in report["users"]]
+    totals = report["totals"]
+    total_row = (f"TOTAL ({totals['users']} users)", totals["decks"], totals["cards"], totals["learned"],
+                 totals["due_today"], totals["reviews"], _format_retention(totals))
+
+    if args.csv:
+        with open(args.csv, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            writer.writerows(rows)
+            writer.writerow(total_row)
+        print(f"Wrote {len(rows)} user(s) to {args.csv}.")
+    else:
+        width = max([len(header[0]), len(total_row[0])] + [len(row[0]) for row in rows])
+        line = f"{{:<{width}}}" + " {:>8}" * 4 + " {:>12} {:>10}"
+        print(line.format(*header))
+        for row in rows:
+            print(line.format(*row))
+        print(line.format(*total_row))
+    for failure in report["errors"]:
+        print(f"Skipped {failure['user']}: {failure['error']}")
+    print(f"Read {totals['users'] + len(report['errors'])} database(s) in {report['seconds']:.2f}s.")
+    return 0
+
+
+def cmd_maintain(args) -> int:
+    db_path = resolve_deck_db_path(args.user)
+    if not _require_db(db_path):
+        return 1
+    if args.log:
+        for entry in reversed(maintenance.get_maintenance_log(db_path, args.log)):
+            status = "ok" if entry["ok"] else "FAILED"
+            print(f"{entry['ran_at']}  {entry['task']:<10} {status:<6} {entry['seconds']:8.3f}s  {entry['detail']}")
+        return 0
+    tasks = [task.strip() for task in args.tasks.split(",") if task.strip()]
+    unknown = set(tasks) - set(maintenance.MAINTENANCE_TASKS)
+    if unknown:
+        print(f"Error: unknown task(s) {', '.join(sorted(unknown))}; "
+              f"choose from {', '.join(maintenance.MAINTENANCE_TASKS)}")
+        return 1
+    if not deck_manager.init_user_decks_database(db_path):  # brings the schema up to date, as logging in does
+        return 1
+    start = time.perf_counter()
+    results = maintenance.run_maintenance(db_path, tasks)
+    failed = [r["task"] for r in results if not r["ok"]]
+    print(f"Done in {time.perf_counter() - start:.2f}s" + (f"; failed: {', '.join(failed)}." if failed else "."))
+    return 1 if failed else 0
+
+
+def _daily_limit(value: str) -> int | None:
+    """argparse type for a daily limit: a count, or 'none' for no limit."""
+    if value.lower() == "none":
+        return None
+    count = int(value)
+    if count < 0:
+        raise argparse.ArgumentTypeError("a daily limit can't be negative")
+    return count
+
+
+def cmd_limits(args) -> int:
+    db_path = resolve_deck_db_path(args.user)
+    if not _require_db(db_path):
+        return 1
+    limits = deck_manager.get_daily_limits(db_path, args.deck_id)
+    changes = {field: vars(args)[option] for field, option in (("new_per_day", "new"), ("reviews_per_day", "reviews"))
+               if option in vars(args)}
+    if changes:
+        limits.update(changes)
+        if not deck_manager.set_daily_limits(db_path, args.deck_id, limits["new_per_day"], limits["reviews_per_day"]):
+            return 1
+    for field, label in (("new_per_day", "new cards per day"), ("reviews_per_day", "reviews per day")):
+        value = limits[field]
+        print(f"  {label:<18} {'no limit' if value is None else value}")
+    return 0
+
+
+def cmd_archive(args) -> int:
+    db_path = resolve_deck_db_path(args.user)
+    if not _require_db(db_path) or not deck_manager.init_user_decks_database(db_path):
+        return 1
+    result = collection_archive.export_collection(db_path, args.file, args.compression, args.level, args.workers,
+                                                  progress=_print_progress)
+    if result is None:
+        return 1
+    print(f"\rArchived {result['cards']:,} cards, {result['reviews']:,} reviews and {result['media']:,} media files "
+          f"from {result['decks']} deck(s) in {result['seconds']:.2f}s ({result['bytes'] / 1e6:.1f} MB).")
+    return 0
+
+
+def cmd_unarchive(args) -> int:
+    db_path = resolve_deck_db_path(args.user)
+    if not deck_manager.init_user_decks_database(db_path):
+        return 1
+    start = time.perf_counter()
+    try:
+        result = collection_archive.import_collection(db_path, args.file, progress=_print_progress)
+    except ValueError as e:
+        print(e)
+        return 1
+    except (OSError, tarfile.TarError) as e:
+        print(f"Error: {e}")
+        return 1
+    except sqlite3.Error:
+        return 1
+    print(f"\rImported {result['cards']:,} cards and {result['reviews']:,} reviews in {result['decks']} deck(s) "
+          f"in {time.perf_counter() - start:.2f}s.")
+    return 0
+
+
+def _card_summary(card: dict, width: int = 70) -> str:
+    text = f"{card['front']} | {card['back']}".replace("\n", " ")
+    return text if len(text) <= width else text[:width - 3] + "..."
+
+
+def cmd_duplicates(args) -> int:
+    db_path = resolve_deck_db_path(args.user)
+    if not _require_db(db_path):
+        return 1
+    start = time.perf_counter()
+    clusters = near_duplicates.find_near_duplicates(db_path, args.threshold, args.deck, progress=_print_progress)
+    if clusters is None:
+        return 1
+    duplicates = sum(len(cluster["cards"]) - 1 for cluster in clusters)
+    print(f"\rFound {len(clusters):,} group(s) of near-duplicates ({duplicates:,} redundant cards) "
+          f"in {time.perf_counter() - start:.2f}s.")
+    for cluster in clusters[:args.show]:
+        print(f"\n  {len(cluster['cards'])} cards, at least {cluster['similarity']:.0%} similar to the kept card:")
+        for index, card in enumerate(cluster["cards"]):
+            marker = "keep" if index == 0 else f"{card['similarity']:4.0%}"
+            print(f"    {marker} #{card['id']:<8} [{card['deck_name']}] {_card_summary(card)}")
+    if len(clusters) > args.show:
+        print(f"\n  ... and {len(clusters) - args.show:,} more group(s) (--show N)")
+    if args.merge and clusters:
+        if not args.yes:
+            answer = input(f"\nDelete {duplicates:,} card(s), merging each group into its 'keep' card? [y/N] ")
+            if answer.strip().lower() not in ("y", "yes"):
+                print("Nothing merged.")
+                return 0
+        try:
+            removed = deck_manager.merge_duplicate_cards(
+                db_path, [(cluster["cards"][0]["id"], [card["id"] for card in cluster["cards"][1:]])
+                          for cluster in clusters])
+        except sqlite3.Error:
+            return 1
+        print(f"Merged {len(clusters):,} group(s); removed {removed:,} card(s).")
+    return 0
+
+
+def cmd_add_users(args) -> int:
+    try:
+        with open(args.file, newline="", encoding="utf-8") as f:
+            users = [(row[0].strip(), row[1]) for row in csv.reader(f) if len(row) >= 2 and row[0].strip()]
+    except OSError as e:
+        print(f"Error: could not read {args.file}: {e}")
+        return 1
+    if users and users[0] == ("username", "password"):
+        users = users[1:]
+    start = time.perf_counter()
+    try:
+        result = user_model.register_users(users, args.database_dir, iterations=args.iterations,
+                                           workers=args.workers,
+                                           progress=lambda count: print(f"\r  {count:,} users", end="", flush=True))
+    except sqlite3.Error:
+        return 1
+    print(f"\rRegistered {result['registered']:,} user(s) in {time.perf_counter() - start:.2f}s; "
+          f"skipped {result['skipped']:,} existing or repeated username(s).")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="cli.py", description="MemorEase database tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    backup_parser = subparsers.add_parser("backup", help="take an online snapshot of a user's deck database")
+    backup_parser.add_argument("user", help="username or path to a *_decks.db file")
+    backup_parser.add_argument("--compress", action="store_true", help="gzip the snapshot")
+    backup_parser.add_argument("--keep", type=int, default=backup_utils.DEFAULT_KEEP_SNAPSHOTS,
+                               help="number of snapshots to retain (0 keeps all)")
+    backup_parser.add_argument("--dest", default=None, help="snapshot directory (default: database/backups)")
+    backup_parser.set_defaults(func=cmd_backup)
+
+    restore_parser = subparsers.add_parser("restore", help="restore a snapshot over a user's deck database")
+    restore_parser.add_argument("snapshot", help="path to a .db or .db.gz snapshot")
+    restore_parser.add_argument("user", help="username or path to a *_decks.db file")
+    restore_parser.set_defaults(func=cmd_restore)
+
+    list_parser = subparsers.add_parser("snapshots", help="list snapshots of a user's deck database")
+    list_parser.add_argument("user", help="username or path to a *_decks.db file")
+    list_parser.add_argument("--dest", default=None, help="snapshot directory (default: database/backups)")
+    list_parser.set_defaults(func=cmd_snapshots)
+
+    sync_parser = subparsers.add_parser("sync", help="exchange changes with another copy of a deck database")
+    sync_parser.add_argument("user", help="username or path to a *_decks.db file")
+    sync_parser.add_argument("other", help="path to the other copy")
+    sync_parser.set_defaults(func=cmd_sync)
+
+    optimize_parser = subparsers.add_parser("optimize", help="fit scheduler parameters to the review history")
+    optimize_parser.add_argument("user", help="username or path to a *_decks.db file")
+    optimize_parser.add_argument("--deck", type=int, default=None, help="fit one deck (default: all decks)")
+    optimize_parser.add_argument("--min-reviews", type=int, default=srs_optimizer.MIN_REVIEWS,
+                                 help="refuse to fit fewer reviews than this")
+    optimize_parser.add_argument("--dry-run", action="store_true", help="print the fit without saving it")
+    optimize_parser.set_defaults(func=cmd_optimize)
+
+    import_parser = subparsers.add_parser("import", help="import a JSON, CSV/TSV or Anki .apkg file as a new deck")
+    import_parser.add_argument("user", help="username or path to a *_decks.db file")
+    import_parser.add_argument("file", help="the file to import")
+    import_parser.add_argument("--columns", default="1,2",
+                               help="CSV/TSV front,back[,tags] columns, by number or header name (default: 1,2)")
+    import_parser.add_argument("--delimiter", default=None, help="CSV/TSV field separator (default: guessed)")
+    import_parser.add_argument("--deck-name", default=None, help="name for the new deck (default: from the file)")
+    import_parser.set_defaults(func=cmd_import)
+
+    report_parser = subparsers.add_parser("report", help="statistics for every user listed in user.db")
+    report_parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per core)")
+    report_parser.add_argument("--days", type=int, default=reports.RETENTION_WINDOW_DAYS,
+                               help="reviews from this many days count towards retention")
+    report_parser.add_argument("--csv", default=None, help="write the report to a CSV file instead")
+    report_parser.add_argument("--database-dir", default=DATABASE_DIR, help="directory holding user.db")
+    report_parser.set_defaults(func=cmd_report)
+
+    library_path = os.path.join(DATABASE_DIR, shared_decks.LIBRARY_FILENAME)
+    publish_parser = subparsers.add_parser("publish", help="publish a deck file to the shared library")
+    publish_parser.add_argument("file", help="a JSON, CSV/TSV or Anki .apkg file")
+    publish_parser.add_argument("--columns", default="1,2",
+                                help="CSV/TSV front,back columns, by number or header name (default: 1,2)")
+    publish_parser.add_argument("--delimiter", default=None, help="CSV/TSV field separator (default: guessed)")
+    publish_parser.add_argument("--deck-name", default=None,
+                                help="shared deck to create or append to (default: from the file)")
+    publish_parser.add_argument("--library", default=library_path, help="shared library database")
+    publish_parser.set_defaults(func=cmd_publish)
+
+    shared_parser = subparsers.add_parser("shared", help="list the decks in the shared library")
+    shared_parser.add_argument("--library", default=library_path, help="shared library database")
+    shared_parser.set_defaults(func=cmd_shared)
+
+    add_shared_parser = subparsers.add_parser("add-shared",
+                                              help="add a shared deck to a user, or fetch its new cards")
+    add_shared_parser.add_argument("user", help="username or path to a *_decks.db file")
+    add_shared_parser.add_argument("shared_deck_id", type=int, help="id from `cli.py shared`")
+    add_shared_parser.add_argument("--deck-name", default=None, help="local name (default: the shared name)")
+    add_shared_parser.set_defaults(func=cmd_add_shared)
+
+    maintain_parser = subparsers.add_parser("maintain",
+                                            help="check integrity, refresh planner statistics, vacuum, checkpoint")
+    maintain_parser.add_argument("user", help="username or path to a *_decks.db file")
+    maintain_parser.add_argument("--tasks", default=",".join(maintenance.MAINTENANCE_TASKS),
+                                 help=f"comma-separated subset of {','.join(maintenance.MAINTENANCE_TASKS)}")
+    maintain_parser.add_argument("--log", type=int, default=0, metavar="N",
+                                 help="show the last N maintenance log entries instead of running")
+    maintain_parser.set_defaults(func=cmd_maintain)
+
+    limits_parser = subparsers.add_parser("limits", help="show or set a deck's daily new card and review limits")
+    limits_parser.add_argument("user", help="username or path to a *_decks.db file")
+    limits_parser.add_argument("deck_id", type=int, help="the deck to show or change")
+    limits_parser.add_argument("--new", type=_daily_limit, default=argparse.SUPPRESS, metavar="N|none",
+                               help="new cards per day")
+    limits_parser.add_argument("--reviews", type=_daily_limit, default=argparse.SUPPRESS, metavar="N|none",
+                               help="reviews per day")
+    limits_parser.set_defaults(func=cmd_limits)
+
+    archive_parser = subparsers.add_parser("archive", help="export all of a user's decks to one archive file")
+    archive_parser.add_argument("user", help="username or path to a *_decks.db file")
+    archive_parser.add_argument("file", help="the archive to write (.tar)")
+    archive_parser.add_argument("--compression", choices=sorted(collection_archive.COMPRESSIONS),
+                                default=collection_archive.DEFAULT_COMPRESSION,
+                                help="gzip is faster, lzma smaller (default: gzip)")
+    archive_parser.add_argument("--level", type=int, default=None, help="compression level, 0-9 (default: 6)")
+    archive_parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per core)")
+    archive_parser.set_defaults(func=cmd_archive)
+
+    unarchive_parser = subparsers.add_parser("unarchive", help="add the decks in a collection archive to a user")
+    unarchive_parser.add_argument("file", help="an archive written by `cli.py archive`")
+    unarchive_parser.add_argument("user", help="username or path to a *_decks.db file")
+    unarchive_parser.set_defaults(func=cmd_unarchive)
+
+    duplicates_parser = subparsers.add_parser("duplicates", help="find (and merge) near-duplicate cards across decks")
+    duplicates_parser.add_argument("user", help="username or path to a *_decks.db file")
+    duplicates_parser.add_argument("--threshold", type=float, default=near_duplicates.DEFAULT_THRESHOLD,
+                                   help="minimum similarity, 0-1 (default: %(default)s)")
+    duplicates_parser.add_argument("--deck", type=int, default=None, help="look within one deck (default: all decks)")
+    duplicates_parser.add_argument("--show", type=int, default=20, metavar="N", help="groups to print (default: 20)")
+    duplicates_parser.add_argument("--merge", action="store_true",
+                                   help="merge each group into its first card (the most reviewed)")
+    duplicates_parser.add_argument("--yes", action="store_true", help="merge without asking for confirmation")
+    duplicates_parser.set_defaults(func=cmd_duplicates)
+
+    add_users_parser = subparsers.add_parser("add-users", help="register many users at once from a CSV file")
+    add_users_parser.add_argument("file", help="CSV file of username,password rows")
+    add_users_parser.add_argument("--iterations", type=int, default=user_model.HASH_ITERATIONS,
+                                  help="password hashing rounds (default: %(default)s)")
+    add_users_parser.add_argument("--workers", type=int, default=None, help="hashing processes (default: one per core)")
+    add_users_parser.add_argument("--database-dir", default=DATABASE_DIR, help="directory holding user.db")
+    add_users_parser.set_defaults(func=cmd_add_users)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+# App/db_connection.py
+"""
+Connections to a user's deck database.
+
+Several processes may use one deck database at once (two app windows, the
+app and cli.py, a sync script), so:
+
+- the database runs in WAL mode (set by enable_wal from
+  init_user_decks_database): readers never block the writer and the
+  writer never blocks readers;
+- every connection waits up to BUSY_TIMEOUT_SECONDS for a lock instead
+  of failing with "database is locked" straight away;
+- writers take the write lock up front with BEGIN IMMEDIATE (see
+  connect_for_write), retried with exponential backoff. Once a
+  transaction holds the lock nothing in it can hit SQLITE_BUSY, and
+  because no read snapshot is taken before the lock, a writer never
+  works from data another process has changed since (no lost updates).
+"""
+import os
+import random
+import sqlite3
+import time
+from urllib.request import pathname2url
+
+BUSY_TIMEOUT_SECONDS = 5
+WRITE_LOCK_ATTEMPTS = 4       # BEGIN IMMEDIATE attempts, each waiting up to the busy timeout
+RETRY_BASE_DELAY = 0.05       # seconds; doubled per attempt, with jitter
+
+
+def connect(user_deck_db_path: str, **kwargs) -> sqlite3.Connection:
+    """
+    Opens a connection to a user's deck database.
+
+    SQLite enforces foreign keys (and so ON DELETE CASCADE) only on
+    connections that ask for it, so every connection to a deck database
+    should come from here.
+
+    Args:
+        user_deck_db_path: Path to the user's deck database.
+        **kwargs: Passed on to sqlite3.connect (e.g. isolation_level).
+    """
+    kwargs.setdefault("timeout", BUSY_TIMEOUT_SECONDS)
+    conn = sqlite3.connect(user_deck_db_path, **kwargs)
+    conn.execute("PRAGMA foreign_keys = ON")
+    return conn
+
+
+def read_only_uri(db_path: str) -> str:
+    """A mode=ro URI for db_path, for sqlite3.connect(..., uri=True)."""
+    return "file:" + pathname2url(os.path.abspath(db_path)) + "?mode=ro"
+
+
+def connect_read_only(db_path: str, **kwargs) -> sqlite3.Connection:
+    """
+    Opens a database for reading only. Nothing done through the connection
+    can change the file, and a missing file is an error instead of being
+    created.
+    """
+    kwargs.setdefault("timeout", BUSY_TIMEOUT_SECONDS)
+    return sqlite3.connect(read_only_uri(db_path), uri=True, **kwargs)
+
+
+def is_busy_error(error: Exception) -> bool:
+    """True for the errors SQLite raises when another connection holds a lock."""
+    if not isinstance(error, sqlite3.OperationalError):
+        return False
+    message = str(error).lower()
+    return "locked" in message or "busy" in message
+
+
+def begin_write(conn: sqlite3.Connection) -> None:
+    """
+    Starts a write transaction (BEGIN IMMEDIATE) on conn.
+
+    Raises:
+        sqlite3.OperationalError: If the lock is still held by another
+            connection after WRITE_LOCK_ATTEMPTS attempts.
+    """
+    for attempt in range(WRITE_LOCK_ATTEMPTS):
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            return
+        except sqlite3.OperationalError as e:
+            if not is_busy_error(e) or attempt == WRITE_LOCK_ATTEMPTS - 1:
+                raise
+            print(f"Database busy, retrying write ({attempt + 1}/{WRITE_LOCK_ATTEMPTS - 1})...")
+            time.sleep(RETRY_BASE_DELAY * 2 ** attempt * (1 + random.random()))
+
+
+def connect_for_write(user_deck_db_path: str, **kwargs) -> sqlite3.Connection:
+    """
+    Opens a connection that already holds the write lock.
+
+    Use it as `with connect_for_write(path) as conn:`, the same way as
+    connect(): leaving the block commits, an exception rolls back.
+    """
+    conn = connect(user_deck_db_path, **kwargs)
+    try:
+        begin_write(conn)
+    except sqlite3.Error:
+        conn.close()
+        raise
+    return conn
+
+
+def enable_wal(conn: sqlite3.Connection) -> bool:
+    """
+    Switches a database to WAL journaling. The setting is stored in the
+    database file, so it only has to be done once.
+
+    Returns:
+        True if the database is in WAL mode afterwards.
+    """
+    return conn.execute("PRAGMA journal_mode = WAL").fetchone()[0].lower() == "wal"
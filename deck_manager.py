@@ -1,11 +1,25 @@
 # App/deck_manager.py
 import sqlite3
 import os
-from datetime import datetime
+import base64
+import json
+import random
+from datetime import datetime, timedelta
+from models.card import Card, CardQueue, LazyCardQueue
+from utils.tag_query import TagFilter, split_tags
+from utils.srs_logic import SrsParameters, DEFAULT_SRS_PARAMETERS, calculate_srs_update
+import db_connection
+import media_store
+import read_cache
+import shared_decks
 
 APP_DIR = os.path.dirname(os.path.abspath(__file__))
 DATABASE_DIR = os.path.join(APP_DIR, "database")
 FINISHED_INTERVAL_THRESHOLD = 21  
+DUE_COUNT_CACHE_SECONDS = 60  # cached 'due today' counts may lag the clock by this much
+IMPORT_BATCH_SIZE = 1000  # cards per executemany batch when importing
+DEFAULT_NEW_CARDS_PER_DAY = 20     # daily limits of a deck without a deck_limits row
+DEFAULT_REVIEWS_PER_DAY = 200
 
 SQL_CREATE_DECKS_TABLE = """
 CREATE TABLE IF NOT EXISTS decks (
@@ -24,10 +38,369 @@ CREATE TABLE IF NOT EXISTS cards (
     repetitions INTEGER DEFAULT 0,
     FOREIGN KEY(deck_id) REFERENCES decks(id) ON DELETE CASCADE
 )"""
+SQL_CREATE_MEDIA_TABLE = """
+CREATE TABLE IF NOT EXISTS media (
+    sha256 TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    ref_count INTEGER NOT NULL DEFAULT 0
+)"""
+SQL_CREATE_CARD_MEDIA_TABLE = """
+CREATE TABLE IF NOT EXISTS card_media (
+    card_id INTEGER NOT NULL,
+    side TEXT NOT NULL DEFAULT 'front' CHECK (side IN ('front', 'back')),
+    sha256 TEXT NOT NULL,
+    PRIMARY KEY (card_id, side, sha256),
+    FOREIGN KEY(card_id) REFERENCES cards(id) ON DELETE CASCADE,
+    FOREIGN KEY(sha256) REFERENCES media(sha256)
+) WITHOUT ROWID"""
+# Reference counts are maintained by triggers so every write path (single
+# deletes, imports, cascades) keeps them right without extra bookkeeping.
+SQL_CREATE_MEDIA_TRIGGERS = (
+    """CREATE TRIGGER IF NOT EXISTS card_media_ref_inc AFTER INSERT ON card_media BEGIN
+        UPDATE media SET ref_count = ref_count + 1 WHERE sha256 = NEW.sha256;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS card_media_ref_dec AFTER DELETE ON card_media BEGIN
+        UPDATE media SET ref_count = ref_count - 1 WHERE sha256 = OLD.sha256;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS cards_unlink_media AFTER DELETE ON cards BEGIN
+        DELETE FROM card_media WHERE card_id = OLD.id;
+    END""",
+)
+
+# Schema version stored in PRAGMA user_version. Version 0 is the original
+# decks/cards layout; each later version is applied by one migration step.
+SCHEMA_VERSION = 13
+SQL_NOW_MS = "CAST((julianday('now') - 2440587.5) * 86400000 AS INTEGER)"
+
+# Version 1: change tracking for sync. Every deck and card gets a global
+# uuid, an updated_at timestamp (ms since epoch) and a change_seq taken from
+# a per-database counter; deletions leave tombstones. Triggers do the
+# bookkeeping, so every write path is tracked.
+SQL_CREATE_SYNC_META_TABLE = """
+CREATE TABLE IF NOT EXISTS sync_meta (
+    key TEXT PRIMARY KEY,
+    value
+)"""
+SQL_CREATE_TOMBSTONES_TABLE = """
+CREATE TABLE IF NOT EXISTS tombstones (
+    uuid TEXT PRIMARY KEY,
+    kind TEXT NOT NULL CHECK (kind IN ('deck', 'card')),
+    deleted_at INTEGER NOT NULL,
+    change_seq INTEGER NOT NULL
+)"""
+SQL_CREATE_SYNC_PEERS_TABLE = """
+CREATE TABLE IF NOT EXISTS sync_peers (
+    peer_device_id TEXT PRIMARY KEY,
+    sent_seq INTEGER NOT NULL DEFAULT 0,
+    last_sync TEXT
+)"""
+SQL_NEXT_CHANGE_SEQ = "UPDATE sync_meta SET value = value + 1 WHERE key = 'change_seq'"
+SQL_CURRENT_CHANGE_SEQ = "(SELECT value FROM sync_meta WHERE key = 'change_seq')"
+SQL_CREATE_CHANGE_TRACKING_TRIGGERS = tuple(
+    sql.format(now=SQL_NOW_MS, next_seq=SQL_NEXT_CHANGE_SEQ, seq=SQL_CURRENT_CHANGE_SEQ,
+               table=table, kind=kind, columns=columns)
+    for table, kind, columns in (
+        ("decks", "deck", "name"),
+        ("cards", "card", "deck_id, front, back, due_date, interval, ease_factor, repetitions"),
+    )
+    for sql in (
+        """CREATE TRIGGER IF NOT EXISTS {table}_track_insert AFTER INSERT ON {table} BEGIN
+            {next_seq};
+            UPDATE {table} SET
+                uuid = COALESCE(NEW.uuid, lower(hex(randomblob(16)))),
+                updated_at = CASE WHEN NEW.updated_at > 0 THEN NEW.updated_at ELSE {now} END,
+                change_seq = {seq}
+            WHERE id = NEW.id;
+        END""",
+        # A sync that writes a remote row sets updated_at itself; local edits get "now"
+        """CREATE TRIGGER IF NOT EXISTS {table}_track_update AFTER UPDATE OF {columns} ON {table} BEGIN
+            {next_seq};
+            UPDATE {table} SET
+                updated_at = CASE WHEN NEW.updated_at <> OLD.updated_at THEN NEW.updated_at ELSE {now} END,
+                change_seq = {seq}
+            WHERE id = NEW.id;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS {table}_track_delete AFTER DELETE ON {table} BEGIN
+            {next_seq};
+            INSERT OR REPLACE INTO tombstones (uuid, kind, deleted_at, change_seq)
+            VALUES (OLD.uuid, '{kind}', {now}, {seq});
+        END""",
+    )
+)
+
+# Version 2: tags. card_tags is keyed (tag_id, card_id) so tag filters are
+# index range scans; the (card_id, tag_id) index serves per-card lookups.
+# The deck/due index lets due queries avoid scanning the whole table.
+SQL_CREATE_TAGS_TABLE = """
+CREATE TABLE IF NOT EXISTS tags (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL UNIQUE COLLATE NOCASE
+)"""
+SQL_CREATE_CARD_TAGS_TABLE = """
+CREATE TABLE IF NOT EXISTS card_tags (
+    tag_id INTEGER NOT NULL,
+    card_id INTEGER NOT NULL,
+    PRIMARY KEY (tag_id, card_id),
+    FOREIGN KEY(tag_id) REFERENCES tags(id) ON DELETE CASCADE,
+    FOREIGN KEY(card_id) REFERENCES cards(id) ON DELETE CASCADE
+) WITHOUT ROWID"""
+SQL_CREATE_TAG_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_card_tags_card ON card_tags(card_id, tag_id)",
+    "CREATE INDEX IF NOT EXISTS idx_cards_deck_due ON cards(deck_id, due_date)",
+    "CREATE INDEX IF NOT EXISTS idx_cards_due ON cards(due_date)",
+)
+SQL_CREATE_TAG_TRIGGERS = (
+    """CREATE TRIGGER IF NOT EXISTS cards_untag AFTER DELETE ON cards BEGIN
+        DELETE FROM card_tags WHERE card_id = OLD.id;
+    END""",
+)
+
+# Version 3: review history and fitted scheduler parameters. Each review_log
+# row keeps the card's state *before* the review, so the scheduler can be
+# replayed over the history (see utils.srs_optimizer). Version 12 adds
+# was_new: whether the card was still unscheduled, which is what counts
+# against the daily new-card limit.
+SQL_CREATE_REVIEW_LOG_TABLE = """
+CREATE TABLE IF NOT EXISTS review_log (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    card_id INTEGER NOT NULL,
+    deck_id INTEGER NOT NULL,
+    reviewed_at TEXT NOT NULL,
+    quality INTEGER NOT NULL,
+    repetitions INTEGER NOT NULL,
+    ease_factor REAL NOT NULL,
+    interval INTEGER NOT NULL
+)"""
+# deck_id 0 holds the parameters fitted over all decks
+SQL_CREATE_SRS_PARAMS_TABLE = """
+CREATE TABLE IF NOT EXISTS srs_params (
+    deck_id INTEGER PRIMARY KEY,
+    params TEXT NOT NULL,
+    num_reviews INTEGER NOT NULL,
+    loss REAL,
+    fitted_at TEXT NOT NULL
+)"""
+
+# Version 4: how many cards fall due on each calendar day, kept up to date by
+# triggers so the scheduler can look up the load of a few days by primary
+# key instead of counting cards. Cards without a due date aren't counted.
+SQL_CREATE_DUE_HISTOGRAM_TABLE = """
+CREATE TABLE IF NOT EXISTS due_histogram (
+    day TEXT PRIMARY KEY,
+    count INTEGER NOT NULL
+) WITHOUT ROWID"""
+SQL_DUE_HISTOGRAM_ADD = """
+    INSERT INTO due_histogram (day, count) VALUES (date({card}.due_date), {delta})
+    ON CONFLICT(day) DO UPDATE SET count = count + {delta};"""
+SQL_CREATE_DUE_HISTOGRAM_TRIGGERS = (
+    f"""CREATE TRIGGER IF NOT EXISTS cards_due_insert AFTER INSERT ON cards
+        WHEN NEW.due_date IS NOT NULL BEGIN {SQL_DUE_HISTOGRAM_ADD.format(card="NEW", delta=1)}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS cards_due_delete AFTER DELETE ON cards
+        WHEN OLD.due_date IS NOT NULL BEGIN {SQL_DUE_HISTOGRAM_ADD.format(card="OLD", delta=-1)}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS cards_due_update_old AFTER UPDATE OF due_date ON cards
+        WHEN OLD.due_date IS NOT NULL AND date(OLD.due_date) IS NOT date(NEW.due_date) BEGIN
+        {SQL_DUE_HISTOGRAM_ADD.format(card="OLD", delta=-1)}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS cards_due_update_new AFTER UPDATE OF due_date ON cards
+        WHEN NEW.due_date IS NOT NULL AND date(OLD.due_date) IS NOT date(NEW.due_date) BEGIN
+        {SQL_DUE_HISTOGRAM_ADD.format(card="NEW", delta=1)}
+    END""",
+)
+
+# Version 5: the cards due on one day ("today"), computed once that day and
+# then kept current by triggers, so due counts are read rather than
+# recomputed (review sessions come from get_due_cards, which applies the
+# version 9 daily limits). A card is in the snapshot if it
+# has no due date or falls due before the end of the snapshot day;
+# due_snapshot is only a membership table (version 11 dropped the unused
+# queue position) and due_snapshot_counts holds the per-deck totals. All triggers are off while
+# due_snapshot_info is empty, i.e. before the first build and during a rebuild.
+SQL_CREATE_DUE_SNAPSHOT_TABLES = (
+    """CREATE TABLE IF NOT EXISTS due_snapshot_info (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        day TEXT NOT NULL,
+        day_end TEXT NOT NULL,
+        built_at TEXT NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS due_snapshot (
+        card_id INTEGER PRIMARY KEY,
+        deck_id INTEGER NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS due_snapshot_counts (
+        deck_id INTEGER PRIMARY KEY,
+        due_count INTEGER NOT NULL
+    )""",
+)
+SQL_DUE_IN_SNAPSHOT = "({card}.due_date IS NULL OR {card}.due_date < (SELECT day_end FROM due_snapshot_info))"
+SQL_DUE_SNAPSHOT_ADD = """
+    INSERT OR IGNORE INTO due_snapshot (card_id, deck_id)
+    SELECT NEW.id, NEW.deck_id
+    WHERE {due};""".format(due=SQL_DUE_IN_SNAPSHOT.format(card="NEW"))
+SQL_DUE_SNAPSHOT_COUNT_ADD = """
+    INSERT INTO due_snapshot_counts (deck_id, due_count) VALUES ({row}.deck_id, {delta})
+    ON CONFLICT(deck_id) DO UPDATE SET due_count = due_count + {delta};"""
+SQL_CREATE_DUE_SNAPSHOT_TRIGGERS = (
+    f"""CREATE TRIGGER IF NOT EXISTS cards_snapshot_insert AFTER INSERT ON cards
+        WHEN EXISTS (SELECT 1 FROM due_snapshot_info) BEGIN {SQL_DUE_SNAPSHOT_ADD}
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS cards_snapshot_delete AFTER DELETE ON cards BEGIN
+        DELETE FROM due_snapshot WHERE card_id = OLD.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS cards_snapshot_update AFTER UPDATE OF due_date, deck_id ON cards
+        WHEN EXISTS (SELECT 1 FROM due_snapshot_info) BEGIN
+        DELETE FROM due_snapshot WHERE card_id = NEW.id AND NOT {SQL_DUE_IN_SNAPSHOT.format(card="NEW")};
+        UPDATE due_snapshot SET deck_id = NEW.deck_id WHERE card_id = NEW.id AND deck_id != NEW.deck_id;
+        {SQL_DUE_SNAPSHOT_ADD}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS due_snapshot_count_insert AFTER INSERT ON due_snapshot
+        WHEN EXISTS (SELECT 1 FROM due_snapshot_info) BEGIN
+        {SQL_DUE_SNAPSHOT_COUNT_ADD.format(row="NEW", delta=1)}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS due_snapshot_count_delete AFTER DELETE ON due_snapshot
+        WHEN EXISTS (SELECT 1 FROM due_snapshot_info) BEGIN
+        {SQL_DUE_SNAPSHOT_COUNT_ADD.format(row="OLD", delta=-1)}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS due_snapshot_count_move AFTER UPDATE OF deck_id ON due_snapshot
+        WHEN EXISTS (SELECT 1 FROM due_snapshot_info) BEGIN
+        {SQL_DUE_SNAPSHOT_COUNT_ADD.format(row="OLD", delta=-1)}
+        {SQL_DUE_SNAPSHOT_COUNT_ADD.format(row="NEW", delta=1)}
+    END""",
+)
+
+# Version 6: cards of decks added from the shared library (see shared_decks).
+# Such a card has no text of its own and points at its shared card;
+# shared_deck_links remembers which library deck a local deck follows and
+# the last shared card taken from it, so adding the deck again only brings
+# in cards published since.
+SQL_CREATE_SHARED_DECK_LINKS_TABLE = """
+CREATE TABLE IF NOT EXISTS shared_deck_links (
+    deck_id INTEGER PRIMARY KEY,
+    shared_deck_id INTEGER NOT NULL UNIQUE,
+    last_shared_card_id INTEGER NOT NULL DEFAULT 0,
+    FOREIGN KEY(deck_id) REFERENCES decks(id) ON DELETE CASCADE
+)"""
+
+# Version 7: card text moves out of cards into card_content, so cards holds
+# only the small, often rewritten scheduling state. A grade rewrites a
+# short row instead of one carrying the text, and due scans read far fewer
+# pages. Cards of shared decks have no card_content row. Editing the text
+# still counts as a change to the card for sync.
+SQL_CREATE_CARD_CONTENT_TABLE = """
+CREATE TABLE IF NOT EXISTS card_content (
+    card_id INTEGER PRIMARY KEY,
+    front TEXT NOT NULL,
+    back TEXT NOT NULL,
+    FOREIGN KEY(card_id) REFERENCES cards(id) ON DELETE CASCADE
+)"""
+SQL_CREATE_CARD_CONTENT_TRIGGERS = (
+    # The version 1 trigger, without the columns that moved to card_content
+    f"""CREATE TRIGGER IF NOT EXISTS cards_track_update
+        AFTER UPDATE OF deck_id, due_date, interval, ease_factor, repetitions ON cards BEGIN
+        {SQL_NEXT_CHANGE_SEQ};
+        UPDATE cards SET
+            updated_at = CASE WHEN NEW.updated_at <> OLD.updated_at THEN NEW.updated_at ELSE {SQL_NOW_MS} END,
+            change_seq = {SQL_CURRENT_CHANGE_SEQ}
+        WHERE id = NEW.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS card_content_track_update AFTER UPDATE OF front, back ON card_content BEGIN
+        {SQL_NEXT_CHANGE_SEQ};
+        UPDATE cards SET updated_at = {SQL_NOW_MS}, change_seq = {SQL_CURRENT_CHANGE_SEQ} WHERE id = NEW.card_id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS cards_drop_content AFTER DELETE ON cards BEGIN
+        DELETE FROM card_content WHERE card_id = OLD.id;
+    END""",
+)
+
+# Version 8: what each maintenance run did (see maintenance.run_maintenance);
+# the newest run also tells the idle scheduler when maintenance is next due.
+SQL_CREATE_MAINTENANCE_LOG_TABLE = """
+CREATE TABLE IF NOT EXISTS maintenance_log (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ran_at TEXT NOT NULL,
+    task TEXT NOT NULL,
+    ok INTEGER NOT NULL,
+    seconds REAL NOT NULL,
+    detail TEXT NOT NULL
+)"""
+
+# Version 9: per-deck daily limits on new cards and reviews (see
+# get_due_cards). A NULL limit means unlimited; decks without a row use
+# DEFAULT_NEW_CARDS_PER_DAY and DEFAULT_REVIEWS_PER_DAY. The review_log
+# index finds a deck's reviews of the day, which count against the limits.
+SQL_CREATE_DECK_LIMITS_TABLE = """
+CREATE TABLE IF NOT EXISTS deck_limits (
+    deck_id INTEGER PRIMARY KEY,
+    new_per_day INTEGER,
+    reviews_per_day INTEGER,
+    FOREIGN KEY(deck_id) REFERENCES decks(id) ON DELETE CASCADE
+)"""
+
+# Version 10: review session telemetry (see review_telemetry). One row per
+# session with running totals, and the per-card timings it was built from:
+# think_ms is the time before Show Answer, answer_ms the time to grade.
+SQL_CREATE_REVIEW_SESSIONS_TABLE = """
+CREATE TABLE IF NOT EXISTS review_sessions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    deck_id INTEGER,
+    started_at TEXT NOT NULL,
+    ended_at TEXT NOT NULL,
+    cards INTEGER NOT NULL,
+    think_ms INTEGER NOT NULL,
+    answer_ms INTEGER NOT NULL,
+    active_ms INTEGER NOT NULL
+)"""
+SQL_CREATE_REVIEW_TIMINGS_TABLE = """
+CREATE TABLE IF NOT EXISTS review_timings (
+    session_id INTEGER NOT NULL,
+    card_id INTEGER NOT NULL,
+    quality INTEGER NOT NULL,
+    shown_ms INTEGER NOT NULL,
+    think_ms INTEGER NOT NULL,
+    answer_ms INTEGER NOT NULL,
+    FOREIGN KEY(session_id) REFERENCES review_sessions(id) ON DELETE CASCADE
+)"""
+SQL_CREATE_REVIEW_TELEMETRY_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_review_sessions_started ON review_sessions(started_at)",
+    "CREATE INDEX IF NOT EXISTS idx_review_timings_session ON review_timings(session_id, think_ms)",
+)
+
+# Version 13: sync carries tags, media links and review history. Tagging or
+# attaching media counts as a change to the card, like editing its text;
+# review_log rows get a change_seq of their own (bulk inserts may set one
+# for the whole batch instead, see collection_archive).
+SQL_STAMP_CARD = f"""
+    {SQL_NEXT_CHANGE_SEQ};
+    UPDATE cards SET updated_at = {SQL_NOW_MS}, change_seq = {SQL_CURRENT_CHANGE_SEQ} WHERE id = {{row}}.card_id;"""
+SQL_CREATE_CARD_LINK_TRIGGERS = tuple(
+    f"""CREATE TRIGGER IF NOT EXISTS {table}_track_{event.lower()} AFTER {event} ON {table} BEGIN
+        {SQL_STAMP_CARD.format(row=row)}
+    END"""
+    for table in ("card_tags", "card_media")
+    for event, row in (("INSERT", "NEW"), ("DELETE", "OLD"))
+)
+SQL_CREATE_REVIEW_LOG_TRACKING_TRIGGER = f"""
+CREATE TRIGGER IF NOT EXISTS review_log_track_insert AFTER INSERT ON review_log
+    WHEN NEW.change_seq = 0 BEGIN
+    {SQL_NEXT_CHANGE_SEQ};
+    UPDATE review_log SET change_seq = {SQL_CURRENT_CHANGE_SEQ} WHERE id = NEW.id;
+END"""
+
+# Card text, from card_content or from the shared card; needs
+# shared_decks.connect and SQL_JOIN_CARD_CONTENT on cards aliased as c
+SQL_CARD_FRONT = "COALESCE(cc.front, sc.front, '')"
+SQL_CARD_BACK = "COALESCE(cc.back, sc.back, '')"
+SQL_JOIN_CARD_CONTENT = """LEFT JOIN card_content cc ON cc.card_id = c.id
+    LEFT JOIN shared.shared_cards sc ON sc.id = c.shared_card_id"""
+
 SQL_INSERT_CARD_TEMPLATE = """
-INSERT INTO cards (deck_id, front, back, due_date, interval, ease_factor, repetitions)
-VALUES (?, ?, ?, ?, ?, ?, ?)"""
+INSERT INTO cards (deck_id, due_date, interval, ease_factor, repetitions)
+VALUES (?, ?, ?, ?, ?)"""
+SQL_INSERT_CARD_CONTENT = "INSERT INTO card_content (card_id, front, back) VALUES (?, ?, ?)"
 
+@read_cache.invalidates
 def init_user_decks_database(user_deck_db_path: str) -> bool:
     """
     Initializes a new SQLite database for the user's decks and cards.
@@ -40,11 +413,13 @@ def init_user_decks_database(user_deck_db_path: str) -> bool:
     """
     try:
         os.makedirs(os.path.dirname(user_deck_db_path), exist_ok=True)
-        with sqlite3.connect(user_deck_db_path) as conn:
+        with db_connection.connect(user_deck_db_path) as conn:
             cursor = conn.cursor()
 
-            # Step 1: Enable foreign keys
-            cursor.execute("PRAGMA foreign_keys = ON")
+            # Step 1: Let freed pages be returned to disk in small steps (only
+            # takes effect on a new, empty database; older ones are converted by
+            # the maintenance vacuum task, off the GUI thread)
+            cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
 
             # Step 2: Create 'decks' table and commit it
             cursor.execute(SQL_CREATE_DECKS_TABLE)
@@ -52,34 +427,241 @@ def init_user_decks_database(user_deck_db_path: str) -> bool:
             # Step 3: Create 'cards' table
             cursor.execute(SQL_CREATE_CARDS_TABLE)
 
+            # Step 4: Create the media tables and their reference-count triggers
+            cursor.execute(SQL_CREATE_MEDIA_TABLE)
+            cursor.execute(SQL_CREATE_CARD_MEDIA_TABLE)
+            for trigger_sql in SQL_CREATE_MEDIA_TRIGGERS:
+                cursor.execute(trigger_sql)
             conn.commit()
+
+            # Step 5: Bring older databases up to the current schema version
+            _migrate_schema(conn)
+
+            # Step 6: Use write-ahead logging so other processes can read while we write
+            if not db_connection.enable_wal(conn):
+                print(f"Database Warning: Could not switch {user_deck_db_path} to WAL mode.")
         print(f"Successfully initialized user decks database at {user_deck_db_path}.")
         return True
     except sqlite3.Error as e:
         print(f"Database Error: Could not initialize user decks database: {e}")
         return False
-def import_deck_and_cards(user_deck_db_path: str, deck_name: str, cards_data: list):
+
+def _migrate_to_v1_change_tracking(cursor: sqlite3.Cursor):
+    """Adds uuid/updated_at/change_seq to decks and cards, plus the sync bookkeeping tables."""
+    for table in ("decks", "cards"):
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN uuid TEXT")
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN updated_at INTEGER NOT NULL DEFAULT 0")
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN change_seq INTEGER NOT NULL DEFAULT 0")
+        cursor.execute(f"UPDATE {table} SET uuid = lower(hex(randomblob(16))), updated_at = {SQL_NOW_MS}, change_seq = 1")
+        cursor.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS idx_{table}_uuid ON {table}(uuid)")
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_change_seq ON {table}(change_seq)")
+    cursor.execute(SQL_CREATE_SYNC_META_TABLE)
+    cursor.execute(SQL_CREATE_TOMBSTONES_TABLE)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_tombstones_change_seq ON tombstones(change_seq)")
+    cursor.execute(SQL_CREATE_SYNC_PEERS_TABLE)
+    cursor.execute("INSERT OR IGNORE INTO sync_meta (key, value) VALUES ('device_id', lower(hex(randomblob(16))))")
+    cursor.execute("INSERT OR IGNORE INTO sync_meta (key, value) VALUES ('change_seq', 1)")
+    for trigger_sql in SQL_CREATE_CHANGE_TRACKING_TRIGGERS:
+        cursor.execute(trigger_sql)
+
+def _migrate_to_v2_tags(cursor: sqlite3.Cursor):
+    """Adds the tags/card_tags tables and the due-date indexes."""
+    cursor.execute(SQL_CREATE_TAGS_TABLE)
+    cursor.execute(SQL_CREATE_CARD_TAGS_TABLE)
+    for sql in SQL_CREATE_TAG_INDEXES + SQL_CREATE_TAG_TRIGGERS:
+        cursor.execute(sql)
+
+def _migrate_to_v3_review_log(cursor: sqlite3.Cursor):
+    """Adds the review_log and srs_params tables."""
+    cursor.execute(SQL_CREATE_REVIEW_LOG_TABLE)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_review_log_card ON review_log(card_id, reviewed_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_review_log_deck ON review_log(deck_id)")
+    cursor.execute(SQL_CREATE_SRS_PARAMS_TABLE)
+
+def _migrate_to_v4_due_histogram(cursor: sqlite3.Cursor):
+    """Adds the per-day due-count histogram and fills it from the cards table."""
+    cursor.execute(SQL_CREATE_DUE_HISTOGRAM_TABLE)
+    cursor.execute("""
+        INSERT INTO due_histogram (day, count)
+        SELECT date(due_date), COUNT(*) FROM cards
+        WHERE due_date IS NOT NULL GROUP BY date(due_date)
+    """)
+    for trigger_sql in SQL_CREATE_DUE_HISTOGRAM_TRIGGERS:
+        cursor.execute(trigger_sql)
+
+def _migrate_to_v5_due_snapshot(cursor: sqlite3.Cursor):
+    """Adds the daily due snapshot tables and their triggers; the snapshot itself is built on first use."""
+    for sql in SQL_CREATE_DUE_SNAPSHOT_TABLES + SQL_CREATE_DUE_SNAPSHOT_TRIGGERS:
+        cursor.execute(sql)
+
+def _migrate_to_v6_shared_decks(cursor: sqlite3.Cursor):
+    """Lets cards point at shared library content and adds the shared deck links."""
+    cursor.execute("ALTER TABLE cards ADD COLUMN shared_card_id INTEGER")
+    cursor.execute("""CREATE UNIQUE INDEX IF NOT EXISTS idx_cards_shared ON cards(deck_id, shared_card_id)
+                      WHERE shared_card_id IS NOT NULL""")
+    cursor.execute(SQL_CREATE_SHARED_DECK_LINKS_TABLE)
+
+def _migrate_to_v7_card_content(cursor: sqlite3.Cursor):
+    """Moves front/back out of cards into card_content."""
+    cursor.execute(SQL_CREATE_CARD_CONTENT_TABLE)
+    cursor.execute("""
+        INSERT INTO card_content (card_id, front, back)
+        SELECT id, front, back FROM cards WHERE shared_card_id IS NULL
+    """)
+    cursor.execute("DROP TRIGGER IF EXISTS cards_track_update")  # names front and back, which blocks dropping them
+    cursor.execute("ALTER TABLE cards DROP COLUMN front")
+    cursor.execute("ALTER TABLE cards DROP COLUMN back")
+    for trigger_sql in SQL_CREATE_CARD_CONTENT_TRIGGERS:
+        cursor.execute(trigger_sql)
+
+def _migrate_to_v8_maintenance_log(cursor: sqlite3.Cursor):
+    """Adds the maintenance_log table."""
+    cursor.execute(SQL_CREATE_MAINTENANCE_LOG_TABLE)
+
+def _migrate_to_v9_daily_limits(cursor: sqlite3.Cursor):
+    """Adds the deck_limits table and the per-deck review_log time index."""
+    cursor.execute(SQL_CREATE_DECK_LIMITS_TABLE)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_review_log_deck_time ON review_log(deck_id, reviewed_at)")
+
+def _migrate_to_v10_review_telemetry(cursor: sqlite3.Cursor):
+    """Adds the review_sessions and review_timings tables."""
+    cursor.execute(SQL_CREATE_REVIEW_SESSIONS_TABLE)
+    cursor.execute(SQL_CREATE_REVIEW_TIMINGS_TABLE)
+    for index_sql in SQL_CREATE_REVIEW_TELEMETRY_INDEXES:
+        cursor.execute(index_sql)
+
+def _migrate_to_v11_due_snapshot_membership(cursor: sqlite3.Cursor):
     """
-    Imports a new deck and its cards into the database.
-    
+    Drops due_snapshot.position and its indexes: sessions come from
+    get_due_cards, so the order was kept up on every insert and grade
+    without being read.
+    """
+    for trigger_name in ("cards_snapshot_insert", "cards_snapshot_update"):  # they write position
+        cursor.execute(f"DROP TRIGGER IF EXISTS {trigger_name}")
+    cursor.execute("DROP INDEX IF EXISTS idx_due_snapshot_deck")
+    cursor.execute("DROP INDEX IF EXISTS idx_due_snapshot_position")
+    if any(column[1] == "position" for column in cursor.execute("PRAGMA table_info(due_snapshot)")):
+        cursor.execute("ALTER TABLE due_snapshot DROP COLUMN position")
+    for trigger_sql in SQL_CREATE_DUE_SNAPSHOT_TRIGGERS:
+        cursor.execute(trigger_sql)
+
+def _migrate_to_v12_review_log_was_new(cursor: sqlite3.Cursor):
+    """
+    Adds review_log.was_new. Existing rows can only be inferred from the
+    history: each card's first logged review counts as its new one.
+    """
+    cursor.execute("ALTER TABLE review_log ADD COLUMN was_new INTEGER NOT NULL DEFAULT 0")
+    cursor.execute("UPDATE review_log SET was_new = 1 WHERE id IN (SELECT MIN(id) FROM review_log GROUP BY card_id)")
+
+def _migrate_to_v13_sync_links_and_reviews(cursor: sqlite3.Cursor):
+    """
+    Tracks tag and media link changes on their card and gives review_log a
+    change_seq. Existing reviews and cards with tags or media are marked
+    changed once, so the next sync sends them to peers that never got them.
+    """
+    for trigger_sql in SQL_CREATE_CARD_LINK_TRIGGERS:
+        cursor.execute(trigger_sql)
+    cursor.execute("ALTER TABLE review_log ADD COLUMN change_seq INTEGER NOT NULL DEFAULT 0")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_review_log_change_seq ON review_log(change_seq)")
+    cursor.execute(SQL_CREATE_REVIEW_LOG_TRACKING_TRIGGER)
+    cursor.execute(SQL_NEXT_CHANGE_SEQ)
+    cursor.execute(f"UPDATE review_log SET change_seq = {SQL_CURRENT_CHANGE_SEQ}")
+    cursor.execute(f"""
+        UPDATE cards SET change_seq = {SQL_CURRENT_CHANGE_SEQ}
+        WHERE id IN (SELECT card_id FROM card_tags UNION SELECT card_id FROM card_media)""")
+
+_SCHEMA_MIGRATIONS = {
+    1: _migrate_to_v1_change_tracking,
+    2: _migrate_to_v2_tags,
+    3: _migrate_to_v3_review_log,
+    4: _migrate_to_v4_due_histogram,
+    5: _migrate_to_v5_due_snapshot,
+    6: _migrate_to_v6_shared_decks,
+    7: _migrate_to_v7_card_content,
+    8: _migrate_to_v8_maintenance_log,
+    9: _migrate_to_v9_daily_limits,
+    10: _migrate_to_v10_review_telemetry,
+    11: _migrate_to_v11_due_snapshot_membership,
+    12: _migrate_to_v12_review_log_was_new,
+    13: _migrate_to_v13_sync_links_and_reviews,
+}
+
+def _migrate_schema(conn: sqlite3.Connection):
+    """
+    Applies pending schema migrations, one transaction per version.
+
+    Raises:
+        sqlite3.Error: If a migration fails; that version is rolled back.
+    """
+    cursor = conn.cursor()
+    version = cursor.execute("PRAGMA user_version").fetchone()[0]
+    for target_version in range(version + 1, SCHEMA_VERSION + 1):
+        db_connection.begin_write(conn)
+        if cursor.execute("PRAGMA user_version").fetchone()[0] >= target_version:
+            conn.rollback()  # another process migrated it while we waited for the lock
+            continue
+        try:
+            _SCHEMA_MIGRATIONS[target_version](cursor)
+            cursor.execute(f"PRAGMA user_version = {target_version}")
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+        print(f"Migrated deck database schema to version {target_version}.")
+
+@read_cache.invalidates
+def import_deck_and_cards(user_deck_db_path: str, deck_name: str, cards_data, progress=None) -> int:
+    """
+    Imports a new deck and its cards into the database, in one transaction.
+
+    cards_data is consumed once, front to back, and written in batches of
+    IMPORT_BATCH_SIZE, so a generator (see import_utils.open_deck_file)
+    can feed in a file of any size without holding it in memory.
+
     Args:
         deck_name: The name of the deck.
-        cards_data: A list of card dictionaries.
+        cards_data: An iterable of card dictionaries with 'front' and 'back',
+            and optionally 'due_date', 'interval', 'ease_factor',
+            'repetitions' and 'tags' (a list or a space-separated string).
+            A card may carry a 'media' list of {"sha256", "filename", "side"}
+            entries; entries with a base64 'data' field are written to the
+            media store, bare references are linked if the blob is already
+            in the store.
+        progress: Optional callable(cards_imported), called after each batch.
 
     Returns:
-        True if successful.
+        The number of cards imported.
         
     Raises:
         sqlite3.IntegrityError: If the deck name already exists.
         sqlite3.Error: For other database errors.
     """
     try:
-        with sqlite3.connect(user_deck_db_path) as conn:
+        with db_connection.connect_for_write(user_deck_db_path) as conn:
             cursor = conn.cursor()
             
             cursor.execute("INSERT INTO decks (name) VALUES (?)", (deck_name,))
             deck_id = cursor.lastrowid
 
+            batch = []  # (row, content, tags)
+            tag_ids_by_name = {}
+            imported = 0
+
+            def flush():
+                # The cards table is AUTOINCREMENT and we hold the write lock,
+                # so the batch gets consecutive ids after the current sequence
+                first_id = cursor.execute(
+                    "SELECT COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'cards'), 0) + 1").fetchone()[0]
+                cursor.executemany(SQL_INSERT_CARD_TEMPLATE, (row for row, _, _ in batch))
+                cursor.executemany(SQL_INSERT_CARD_CONTENT,
+                                   ((first_id + offset,) + content for offset, (_, content, _) in enumerate(batch)))
+                cursor.executemany("INSERT OR IGNORE INTO card_tags (tag_id, card_id) VALUES (?, ?)",
+                                   [pair for offset, (_, _, tags) in enumerate(batch) if tags
+                                    for pair in _import_tag_pairs(cursor, first_id + offset, tags, tag_ids_by_name)])
+                batch.clear()
+                if progress:
+                    progress(imported)
+
             for card_item in cards_data:
                 # Basic validation, import_utils should have done more thorough checks
                 if not (isinstance(card_item, dict) and 
@@ -87,37 +669,84 @@ def import_deck_and_cards(user_deck_db_path: str, deck_name: str, cards_data: li
                     print(f"Skipping invalid card data during DB import: {card_item}")
                     continue 
                 
-                front = card_item.get("front", "")
-                back = card_item.get("back", "")
-                due_date = card_item.get("due_date") 
-                interval = card_item.get("interval", 1)
-                ease_factor = card_item.get("ease_factor", 2.5)
-                repetitions = card_item.get("repetitions", 0)
-                
-                cursor.execute(SQL_INSERT_CARD_TEMPLATE, 
-                               (deck_id, front, back, due_date, interval, ease_factor, repetitions))
+                row = (deck_id, card_item.get("due_date"), card_item.get("interval", 1),
+                       card_item.get("ease_factor", 2.5), card_item.get("repetitions", 0))
+                content = (card_item.get("front", ""), card_item.get("back", ""))
+                imported += 1
+                if not card_item.get("media"):
+                    batch.append((row, content, card_item.get("tags")))
+                    if len(batch) >= IMPORT_BATCH_SIZE:
+                        flush()
+                    continue
+
+                # Cards with media are inserted one at a time, linking each file as it is stored
+                if batch:
+                    flush()
+                cursor.execute(SQL_INSERT_CARD_TEMPLATE, row)
+                card_id = cursor.lastrowid
+                cursor.execute(SQL_INSERT_CARD_CONTENT, (card_id,) + content)
+                for media_item in card_item["media"]:
+                    _import_card_media(user_deck_db_path, cursor, card_id, media_item)
+                if card_item.get("tags"):
+                    cursor.executemany("INSERT OR IGNORE INTO card_tags (tag_id, card_id) VALUES (?, ?)",
+                                       _import_tag_pairs(cursor, card_id, card_item["tags"], tag_ids_by_name))
+            if batch:
+                flush()
             conn.commit()
-        return True
+        return imported
     except sqlite3.IntegrityError:
         raise # Let the caller handle this
     except sqlite3.Error as e: 
         print(f"Database error importing deck data for '{deck_name}': {e}")
         raise
 
-def get_deck_for_export(user_deck_db_path: str, deck_id: int) -> dict | None:
+def _import_tag_pairs(cursor: sqlite3.Cursor, card_id: int, tags, tag_ids_by_name: dict) -> list:
+    """Returns the (tag_id, card_id) rows tagging an imported card; tag_ids_by_name caches ids across the import."""
+    tag_names = split_tags(tags if isinstance(tags, str) else " ".join(tags))
+    missing = [name for name in tag_names if name not in tag_ids_by_name]
+    if missing:
+        tag_ids_by_name.update(zip(missing, _get_or_create_tag_ids(cursor, missing)))
+    return [(tag_ids_by_name[name], card_id) for name in tag_names]
+
+def _import_card_media(user_deck_db_path: str, cursor: sqlite3.Cursor, card_id: int, media_item: dict):
+    """Stores (if bundled) and links one media entry of an imported card."""
+    if not isinstance(media_item, dict):
+        print(f"Skipping invalid media entry during DB import: {media_item}")
+        return
+    sha256 = media_item.get("sha256")
+    filename = media_item.get("filename") or sha256 or "media"
+    side = media_item.get("side", "front")
+    if media_item.get("data") is not None:
+        data = base64.b64decode(media_item["data"])
+        stored_sha256, size = media_store.write_media_bytes(user_deck_db_path, data)
+        if sha256 and sha256 != stored_sha256:
+            print(f"Warning: media '{filename}' does not match its recorded hash; using the content hash.")
+        sha256 = stored_sha256
+    else:
+        media_path = media_store.get_media_path(user_deck_db_path, sha256) if sha256 else None
+        if not media_path or not os.path.exists(media_path):
+            print(f"Skipping missing referenced media '{filename}' for card_id {card_id}")
+            return
+        size = os.path.getsize(media_path)
+    media_store.register_media(cursor, sha256, filename, size)
+    media_store.link_media(cursor, card_id, sha256, side)
+
+def get_deck_for_export(user_deck_db_path: str, deck_id: int, media: str = "none") -> dict | None:
     """
     Fetches a deck's name and all its card data for exporting.
 
     Args:
         user_deck_db_path: Path to the user's deck database.
         deck_id: ID of the deck to export.
+        media: 'none' to export text only, 'reference' to list each card's
+            media by SHA-256, or 'bundle' to also embed the files as base64.
 
     Returns:
         A dictionary structured for export, or None if the deck is not found.
     """
     export_data = {}
     try:
-        with sqlite3.connect(user_deck_db_path) as conn:
+        with shared_decks.connect(user_deck_db_path) as conn:
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
 
@@ -133,16 +762,59 @@ def get_deck_for_export(user_deck_db_path: str, deck_id: int) -> dict | None:
 
             # Next, get all cards for that deck
             # We only export front and back to keep the format clean
-            cursor.execute("SELECT front, back FROM cards WHERE deck_id = ?", (deck_id,))
-            cards = [{"front": row["front"], "back": row["back"]} for row in cursor.fetchall()]
+            cursor.execute(f"""
+                SELECT c.id, {SQL_CARD_FRONT} AS front, {SQL_CARD_BACK} AS back
+                FROM cards c {SQL_JOIN_CARD_CONTENT} WHERE c.deck_id = ?
+            """, (deck_id,))
+            card_rows = cursor.fetchall()
+            cards = [{"front": row["front"], "back": row["back"]} for row in card_rows]
+
+            if media != "none":
+                cursor.execute("""
+                    SELECT cm.card_id, cm.side, m.sha256, m.filename
+                    FROM card_media cm
+                    JOIN cards c ON c.id = cm.card_id
+                    JOIN media m ON m.sha256 = cm.sha256
+                    WHERE c.deck_id = ?
+                """, (deck_id,))
+                media_by_card = {}
+                for row in cursor.fetchall():
+                    entry = {"sha256": row["sha256"], "filename": row["filename"], "side": row["side"]}
+                    if media == "bundle":
+                        media_path = media_store.get_media_path(user_deck_db_path, row["sha256"])
+                        with open(media_path, "rb") as f:
+                            entry["data"] = base64.b64encode(f.read()).decode("ascii")
+                    media_by_card.setdefault(row["card_id"], []).append(entry)
+                for card, row in zip(cards, card_rows):
+                    if row["id"] in media_by_card:
+                        card["media"] = media_by_card[row["id"]]
             export_data['cards'] = cards
             
+    except OSError as e:
+        print(f"Media Error: Could not bundle media for export (deck_id {deck_id}): {e}")
+        return None
     except sqlite3.Error as e:
         print(f"Database Error: Could not get deck for export (deck_id {deck_id}): {e}")
         return None
         
     return export_data
 
+def deck_has_media(user_deck_db_path: str, deck_id: int) -> bool:
+    """Returns True if any card in the deck has media attached."""
+    try:
+        with db_connection.connect(user_deck_db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT EXISTS (
+                    SELECT 1 FROM card_media cm JOIN cards c ON c.id = cm.card_id
+                    WHERE c.deck_id = ?)
+            """, (deck_id,))
+            return bool(cursor.fetchone()[0])
+    except sqlite3.Error as e:
+        print(f"Database Error: Could not check media for deck_id {deck_id}: {e}")
+        return False
+
+@read_cache.cached()
 def get_all_decks(user_deck_db_path: str) -> list:
     """
     Retrieves all decks for the authenticated user.
@@ -155,7 +827,7 @@ def get_all_decks(user_deck_db_path: str) -> list:
     """
     decks = []
     try:
-        with sqlite3.connect(user_deck_db_path) as conn:
+        with db_connection.connect(user_deck_db_path) as conn:
             conn.row_factory = sqlite3.Row  # Access columns by name
             cursor = conn.cursor()
             cursor.execute("SELECT id, name FROM decks ORDER BY name ASC")
@@ -164,6 +836,7 @@ def get_all_decks(user_deck_db_path: str) -> list:
         print(f"Database Error: Could not load decks from {user_deck_db_path}: {e}")
     return decks
 
+@read_cache.invalidates
 def create_new_deck(user_deck_db_path: str, deck_name: str) -> bool:
     """
     Creates a new deck in the user's deck database.
@@ -176,7 +849,7 @@ def create_new_deck(user_deck_db_path: str, deck_name: str) -> bool:
         True if successful, False otherwise.
     """
     try:
-        with sqlite3.connect(user_deck_db_path) as conn:
+        with db_connection.connect_for_write(user_deck_db_path) as conn:
             cursor = conn.cursor()
             cursor.execute("INSERT INTO decks (name) VALUES (?)", (deck_name,))
             conn.commit()
@@ -188,6 +861,88 @@ def create_new_deck(user_deck_db_path: str, deck_name: str) -> bool:
         print(f"Database Error: Could not create deck '{deck_name}' in {user_deck_db_path}: {e}")
         return False
 
+@read_cache.invalidates
+def delete_deck(user_deck_db_path: str, deck_id: int) -> int:
+    """
+    Deletes a deck and everything that belongs to it, in one transaction.
+
+    The deck's cards go through ON DELETE CASCADE; their tags, media links,
+    due-date counts and sync tombstones follow through the foreign keys and
+    triggers on cards. The deck's review history and fitted scheduler
+    parameters are removed here.
+
+    Returns:
+        The number of cards deleted with the deck.
+
+    Raises:
+        sqlite3.Error: If the deletion fails; nothing is changed.
+    """
+    try:
+        with db_connection.connect_for_write(user_deck_db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT COUNT(*) FROM cards WHERE deck_id = ?", (deck_id,))
+            num_cards = cursor.fetchone()[0]
+            cursor.execute("DELETE FROM review_log WHERE deck_id = ?", (deck_id,))
+            cursor.execute("DELETE FROM srs_params WHERE deck_id = ?", (deck_id,))
+            cursor.execute("DELETE FROM decks WHERE id = ?", (deck_id,))
+            conn.commit()
+        return num_cards
+    except sqlite3.Error as e:
+        print(f"Database Error: Could not delete deck_id {deck_id} in {user_deck_db_path}: {e}")
+        raise
+
+@read_cache.invalidates
+def add_shared_deck(user_deck_db_path: str, shared_deck_id: int, deck_name: str | None = None) -> tuple:
+    """
+    Adds a deck from the shared library, or brings a deck added earlier up
+    to date with the cards published to it since.
+
+    Only a narrow scheduling row per card is written (no text), in one
+    INSERT ... SELECT from the attached library.
+
+    Args:
+        shared_deck_id: The deck's id in the library.
+        deck_name: Local name for a newly added deck (default: the shared name).
+
+    Returns:
+        (deck_id, cards_added).
+
+    Raises:
+        ValueError: If the library has no such deck.
+        sqlite3.IntegrityError: If a different deck already has the name.
+        sqlite3.Error: For other database errors; nothing is changed.
+    """
+    try:
+        with shared_decks.connect(user_deck_db_path) as conn:
+            db_connection.begin_write(conn)
+            cursor = conn.cursor()
+            shared_row = cursor.execute("SELECT name FROM shared.shared_decks WHERE id = ?", (shared_deck_id,)).fetchone()
+            if shared_row is None:
+                raise ValueError(f"The shared library has no deck with id {shared_deck_id}.")
+            link = cursor.execute("SELECT deck_id, last_shared_card_id FROM shared_deck_links WHERE shared_deck_id = ?",
+                                  (shared_deck_id,)).fetchone()
+            if link:
+                deck_id, last_shared_card_id = link
+            else:
+                cursor.execute("INSERT INTO decks (name) VALUES (?)", (deck_name or shared_row[0],))
+                deck_id, last_shared_card_id = cursor.lastrowid, 0
+            cursor.execute("""
+                INSERT INTO cards (deck_id, shared_card_id)
+                SELECT ?, id FROM shared.shared_cards WHERE deck_id = ? AND id > ? ORDER BY id
+            """, (deck_id, shared_deck_id, last_shared_card_id))
+            added = cursor.rowcount
+            cursor.execute("""
+                INSERT OR REPLACE INTO shared_deck_links (deck_id, shared_deck_id, last_shared_card_id)
+                SELECT ?, ?, COALESCE(MAX(id), ?) FROM shared.shared_cards WHERE deck_id = ?
+            """, (deck_id, shared_deck_id, last_shared_card_id, shared_deck_id))
+            conn.commit()
+        return deck_id, added
+    except sqlite3.IntegrityError:
+        raise  # Let the caller handle this
+    except sqlite3.Error as e:
+        print(f"Database Error: Could not add shared deck {shared_deck_id} to {user_deck_db_path}: {e}")
+        raise
+
 def get_cards_for_deck(user_deck_db_path: str, deck_id: int) -> list:
     """
     Fetches all cards for a given deck ID in the user's deck database.
@@ -197,19 +952,22 @@ def get_cards_for_deck(user_deck_db_path: str, deck_id: int) -> list:
         deck_id: ID of the deck.
 
     Returns:
-        A list of cards.
+        A list of Card records (dict-style access: card['front']).
     """
     cards = []
     try:
-        with sqlite3.connect(user_deck_db_path) as conn:
-            conn.row_factory = sqlite3.Row  # Access columns by name
+        with shared_decks.connect(user_deck_db_path) as conn:
             cursor = conn.cursor()
-            cursor.execute("SELECT id, front, back FROM cards WHERE deck_id = ? ORDER BY id ASC", (deck_id,))
-            cards = [{"id": row["id"], "front": row["front"], "back": row["back"]} for row in cursor.fetchall()]
+            cursor.execute(f"""
+                SELECT c.id, {SQL_CARD_FRONT}, {SQL_CARD_BACK} FROM cards c {SQL_JOIN_CARD_CONTENT}
+                WHERE c.deck_id = ? ORDER BY c.id ASC
+            """, (deck_id,))
+            cards = [Card(id=card_id, front=front, back=back) for card_id, front, back in cursor]
     except sqlite3.Error as e:
         print(f"Database Error: Could not load cards for deck_id {deck_id} in {user_deck_db_path}: {e}")
     return cards
 
+@read_cache.invalidates
 def add_card(user_deck_db_path: str, deck_id: int, front: str, back: str) -> bool:
     """
     Adds a new card to the specified deck in the user's deck database.
@@ -221,18 +979,21 @@ def add_card(user_deck_db_path: str, deck_id: int, front: str, back: str) -> boo
         back: Back text of the card.
 
     Returns:
-        True if successful, False otherwise.
+        The new card's id if successful, False otherwise.
     """
     try:
-        with sqlite3.connect(user_deck_db_path) as conn:
+        with db_connection.connect_for_write(user_deck_db_path) as conn:
             cursor = conn.cursor()
-            cursor.execute("INSERT INTO cards (deck_id, front, back) VALUES (?, ?, ?)", (deck_id, front, back))
+            cursor.execute("INSERT INTO cards (deck_id) VALUES (?)", (deck_id,))
+            card_id = cursor.lastrowid
+            cursor.execute(SQL_INSERT_CARD_CONTENT, (card_id, front, back))
             conn.commit()
-        return True
+        return card_id
     except sqlite3.Error as e:
         print(f"Database Error: Could not add card to deck_id {deck_id} in {user_deck_db_path}: {e}")
         return False
 
+@read_cache.invalidates
 def delete_card_by_id(user_deck_db_path: str, card_id: int) -> bool:
     """
     Deletes a card by its ID in the user's deck database.
@@ -245,7 +1006,7 @@ def delete_card_by_id(user_deck_db_path: str, card_id: int) -> bool:
         True if successful, False otherwise.
     """
     try:
-        with sqlite3.connect(user_deck_db_path) as conn:
+        with db_connection.connect_for_write(user_deck_db_path) as conn:
             cursor = conn.cursor()
             cursor.execute("DELETE FROM cards WHERE id = ?", (card_id,))
             conn.commit()
@@ -254,54 +1015,737 @@ def delete_card_by_id(user_deck_db_path: str, card_id: int) -> bool:
         print(f"Database Error: Could not delete card_id {card_id} in {user_deck_db_path}: {e}")
         return False
     
+@read_cache.invalidates
 def update_card_content(user_deck_db_path: str, card_id: int, front: str, back: str):
-    """Updates the front and back text of an existing card."""
+    """Updates the front and back text of an existing card. Cards of shared decks are read-only and left as they are."""
     try:
-        with sqlite3.connect(user_deck_db_path) as conn:
+        with db_connection.connect_for_write(user_deck_db_path) as conn:
             cursor = conn.cursor()
-            cursor.execute("UPDATE cards SET front = ?, back = ? WHERE id = ?", 
+            cursor.execute("UPDATE card_content SET front = ?, back = ? WHERE card_id = ?", 
                            (front, back, card_id))
             conn.commit()
             return conn.total_changes > 0 # True if a row was updated
     except sqlite3.Error as e:
         print(f"Database Error: Could not update card_id {card_id}: {e}")
         raise # Or return False
-def get_due_cards(user_deck_db_path:str, deck_id: int, current_date_str: str):
-    """Fetches cards due for review for a given deck_id up to the current_date_str."""
-    cards = []
+def _tag_filter_clause(cursor: sqlite3.Cursor, tag_filter: TagFilter, id_column: str = "c.id") -> tuple | None:
+    """
+    Turns a TagFilter into a WHERE fragment over a card id column (c.id by default).
+
+    Each term becomes an IN (...) subquery over card_tags, which SQLite
+    answers from the (tag_id, card_id) primary key.
+
+    Returns:
+        (sql, params), or None if the filter can never match (e.g. an
+        unknown tag is required).
+    """
+    names = set(tag_filter.all_of) | set(tag_filter.any_of) | set(tag_filter.none_of)
+    tag_ids = {}
+    if names:
+        placeholders = ",".join("?" * len(names))
+        cursor.execute(f"SELECT id, name FROM tags WHERE name IN ({placeholders})", tuple(names))
+        tag_ids = {name.lower(): tag_id for tag_id, name in cursor.fetchall()}
+
+    clauses, params = [], []
+    for name in tag_filter.all_of:
+        if name.lower() not in tag_ids:
+            return None
+        clauses.append(f"{id_column} IN (SELECT card_id FROM card_tags WHERE tag_id = ?)")
+        params.append(tag_ids[name.lower()])
+    if tag_filter.any_of:
+        any_ids = [tag_ids[name.lower()] for name in tag_filter.any_of if name.lower() in tag_ids]
+        if not any_ids:
+            return None
+        clauses.append(f"{id_column} IN (SELECT card_id FROM card_tags WHERE tag_id IN ({','.join('?' * len(any_ids))}))")
+        params.extend(any_ids)
+    none_ids = [tag_ids[name.lower()] for name in tag_filter.none_of if name.lower() in tag_ids]
+    if none_ids:
+        clauses.append(f"{id_column} NOT IN (SELECT card_id FROM card_tags WHERE tag_id IN ({','.join('?' * len(none_ids))}))")
+        params.extend(none_ids)
+    return " AND ".join(clauses) or "1", params
+
+def _load_review_cards(user_deck_db_path: str, card_ids: list) -> list:
+    """Reads (id, front, back, repetitions, ease_factor, interval) rows for a page of a LazyCardQueue."""
     try:
-        with sqlite3.connect(user_deck_db_path) as conn:
-            conn.row_factory = sqlite3.Row
+        with shared_decks.connect(user_deck_db_path) as conn:
+            return conn.execute(f"""
+                SELECT c.id, {SQL_CARD_FRONT}, {SQL_CARD_BACK}, c.repetitions, c.ease_factor, c.interval
+                FROM cards c {SQL_JOIN_CARD_CONTENT}
+                WHERE c.id IN ({",".join("?" * len(card_ids))})
+            """, card_ids).fetchall()
+    except sqlite3.Error as e:
+        print(f"Database Error: Could not load {len(card_ids)} review cards from {user_deck_db_path}: {e}")
+        return []
+
+def get_daily_limits(user_deck_db_path: str, deck_id: int) -> dict:
+    """
+    Returns a deck's daily limits as {"new_per_day", "reviews_per_day"};
+    None means unlimited.
+    """
+    limits = {"new_per_day": DEFAULT_NEW_CARDS_PER_DAY, "reviews_per_day": DEFAULT_REVIEWS_PER_DAY}
+    try:
+        with db_connection.connect(user_deck_db_path) as conn:
+            row = conn.execute("SELECT new_per_day, reviews_per_day FROM deck_limits WHERE deck_id = ?",
+                               (deck_id,)).fetchone()
+        if row:
+            limits = {"new_per_day": row[0], "reviews_per_day": row[1]}
+    except sqlite3.Error as e:
+        print(f"Database Error: Could not read the daily limits of deck {deck_id}: {e}")
+    return limits
+
+@read_cache.invalidates
+def set_daily_limits(user_deck_db_path: str, deck_id: int, new_per_day: int | None,
+                     reviews_per_day: int | None) -> bool:
+    """
+    Sets how many new cards and reviews a deck's sessions offer per day.
+
+    Args:
+        new_per_day: Never-reviewed cards per day, or None for no limit.
+        reviews_per_day: Reviews of due cards per day, or None for no limit.
+
+    Returns:
+        True if successful, False otherwise.
+    """
+    for value in (new_per_day, reviews_per_day):
+        if value is not None and value < 0:
+            raise ValueError("Daily limits can't be negative.")
+    try:
+        with db_connection.connect_for_write(user_deck_db_path) as conn:
+            conn.execute("""
+                INSERT INTO deck_limits (deck_id, new_per_day, reviews_per_day) VALUES (?, ?, ?)
+                ON CONFLICT(deck_id) DO UPDATE SET new_per_day = excluded.new_per_day,
+                                                   reviews_per_day = excluded.reviews_per_day
+            """, (deck_id, new_per_day, reviews_per_day))
+        return True
+    except sqlite3.Error as e:
+        print(f"Database Error: Could not set the daily limits of deck {deck_id}: {e}")
+        return False
+
+def _studied_today(cursor: sqlite3.Cursor, deck_id: int, day_start: str) -> tuple:
+    """
+    Returns (new_cards, reviews) graded in a deck since day_start; a review
+    counts as a new card when the card had never been scheduled when it
+    was graded (review_log.was_new).
+    """
+    new_done, total = cursor.execute("""
+        SELECT COALESCE(SUM(was_new), 0), COUNT(*)
+        FROM review_log WHERE deck_id = ? AND reviewed_at >= ?
+    """, (deck_id, day_start)).fetchone()
+    return new_done, total - new_done
+
+def _select_session_cards(cursor: sqlite3.Cursor, deck_id: int, day_str: str, tag_where: str,
+                          tag_params: list) -> list:
+    """
+    Picks the ids a deck contributes to today's session: the earliest-due
+    reviews and the oldest new cards, each up to what is left of the
+    deck's daily limit. Both are LIMIT queries along idx_cards_deck_due,
+    so the cost follows the limits, not the deck's size.
+    """
+    row = cursor.execute("SELECT new_per_day, reviews_per_day FROM deck_limits WHERE deck_id = ?",
+                         (deck_id,)).fetchone()
+    new_limit, review_limit = row if row else (DEFAULT_NEW_CARDS_PER_DAY, DEFAULT_REVIEWS_PER_DAY)
+    new_done, reviews_done = _studied_today(cursor, deck_id, day_str)
+    # LIMIT -1 is no limit
+    new_left = -1 if new_limit is None else max(0, new_limit - new_done)
+    reviews_left = -1 if review_limit is None else max(0, review_limit - reviews_done)
+
+    card_ids = []
+    if reviews_left:
+        card_ids += [row[0] for row in cursor.execute(f"""
+            SELECT c.id FROM cards c
+            WHERE c.deck_id = ? AND c.due_date < date(?, '+1 day'){tag_where}
+            ORDER BY c.due_date LIMIT ?
+        """, [deck_id, day_str] + tag_params + [reviews_left])]
+    if new_left:
+        card_ids += [row[0] for row in cursor.execute(f"""
+            SELECT c.id FROM cards c
+            WHERE c.deck_id = ? AND c.due_date IS NULL{tag_where}
+            ORDER BY c.id LIMIT ?
+        """, [deck_id] + tag_params + [new_left])]
+    return card_ids
+
+def get_due_cards(user_deck_db_path:str, deck_id: int | None, current_date_str: str,
+                  tag_filter: TagFilter | None = None):
+    """
+    Builds the review session for the day of current_date_str.
+
+    Each deck contributes its cards due that day (earliest due first) and
+    its never-reviewed cards (oldest first), each up to what is left of
+    the deck's daily limits (see set_daily_limits) after the cards already
+    graded that day. The chosen ids are then shuffled with a seed taken
+    from the day and the deck, so the session keeps its order when it is
+    restarted during the day. Only the ids are read here; the cards are
+    loaded a page at a time as the session reaches them.
+
+    Args:
+        deck_id: ID of the deck, or None to review across all decks.
+        current_date_str: The current time, as 'YYYY-MM-DD HH:MM:SS'.
+        tag_filter: Optional TagFilter restricting the session to tagged cards.
+
+    Returns:
+        A LazyCardQueue; indexing it yields dict-like Card records.
+    """
+    cards = CardQueue()
+    day_str = current_date_str[:10]
+    try:
+        with db_connection.connect(user_deck_db_path) as conn:
             cursor = conn.cursor()
-            # Fetch cards where due_date is today or in the past, or never reviewed (NULL due_date)
-            cursor.execute("""
-                SELECT id, front, back, repetitions, ease_factor, interval 
-                FROM cards 
-                WHERE deck_id = ? AND (due_date IS NULL OR due_date <= ?)
-                ORDER BY due_date ASC, RANDOM()
-            """, (deck_id, current_date_str))
-            cards = [dict(row) for row in cursor.fetchall()]
+            tag_where, tag_params = "", []
+            if tag_filter is not None and not tag_filter.is_empty():
+                tag_clause = _tag_filter_clause(cursor, tag_filter, "c.id")
+                if tag_clause is None:
+                    return cards
+                tag_where, tag_params = " AND " + tag_clause[0], list(tag_clause[1])
+            if deck_id is not None:
+                deck_ids = [deck_id]
+            else:
+                deck_ids = [row[0] for row in cursor.execute("SELECT id FROM decks ORDER BY id")]
+
+            card_ids = []
+            for session_deck_id in deck_ids:
+                card_ids += _select_session_cards(cursor, session_deck_id, day_str, tag_where, tag_params)
+            random.Random(f"{day_str}:{deck_id}").shuffle(card_ids)
+            cards = LazyCardQueue(card_ids, lambda card_ids: _load_review_cards(user_deck_db_path, card_ids))
     except sqlite3.Error as e:
         print(f"Database Error (get_due_cards for deck_id {deck_id}): {e}")
     return cards
 
+def _save_srs_update(cursor: sqlite3.Cursor, card_id: int, new_due_date_str: str, new_interval: int,
+                     new_ease_factor: float, new_repetitions: int, quality: int | None,
+                     reviewed_at: str | None = None):
+    """
+    Writes a card's new SRS state, logging the review (and the state it
+    replaces, including whether the card was still new) when quality is
+    given. reviewed_at defaults to now.
+    """
+    if quality is not None:
+        cursor.execute("""
+            INSERT INTO review_log (card_id, deck_id, reviewed_at, quality, repetitions, ease_factor, interval, was_new)
+            SELECT id, deck_id, ?, ?, COALESCE(repetitions, 0), COALESCE(ease_factor, 2.5), COALESCE(interval, 1),
+                   due_date IS NULL
+            FROM cards WHERE id = ?
+        """, (reviewed_at or datetime.now().strftime("%Y-%m-%d %H:%M:%S"), quality, card_id))
+    cursor.execute("""
+        UPDATE cards 
+        SET due_date = ?, interval = ?, ease_factor = ?, repetitions = ? 
+        WHERE id = ?
+    """, (new_due_date_str, new_interval, new_ease_factor, new_repetitions, card_id))
+
+@read_cache.invalidates
 def update_card_srs_details(user_deck_db_path: str, card_id: int, new_due_date_str: str, 
-                            new_interval: int, new_ease_factor: float, new_repetitions: int):
-    """Updates the SRS details and due date of an existing card."""
+                            new_interval: int, new_ease_factor: float, new_repetitions: int,
+                            quality: int | None = None):
+    """
+    Updates the SRS details and due date of an existing card.
+
+    When quality is given, the review and the card's previous state are
+    appended to review_log in the same transaction.
+    """
     try:
-        with sqlite3.connect(user_deck_db_path) as conn:
+        with db_connection.connect_for_write(user_deck_db_path) as conn:
             cursor = conn.cursor()
-            cursor.execute("""
-                UPDATE cards 
-                SET due_date = ?, interval = ?, ease_factor = ?, repetitions = ? 
-                WHERE id = ?
-            """, (new_due_date_str, new_interval, new_ease_factor, new_repetitions, card_id))
+            _save_srs_update(cursor, card_id, new_due_date_str, new_interval, new_ease_factor, new_repetitions, quality)
             conn.commit()
             return conn.total_changes > 0
     except sqlite3.Error as e:
         print(f"Database Error (update_card_srs_details for card_id {card_id}): {e}")
         raise   
 
+@read_cache.invalidates
+def grade_card(user_deck_db_path: str, card_id: int, quality: int,
+               params: SrsParameters = DEFAULT_SRS_PARAMETERS, balance=None) -> tuple | None:
+    """
+    Grades a card from its state as stored, not as it was when the review
+    session loaded it.
+
+    The card is read, rescheduled and saved under one write lock, so when
+    another process (a second app window, a script) grades the same card,
+    the later grade builds on the earlier one instead of overwriting it.
+
+    Args:
+        quality: The grade given, 0-5.
+        params: Scheduler parameters for srs_logic.calculate_srs_update.
+        balance: Optional callable(interval_days) -> interval_days applied
+            to the new interval, e.g. to spread out due dates.
+
+    Returns:
+        The saved (repetitions, ease_factor, interval_days), or None if the
+        card no longer exists.
+
+    Raises:
+        sqlite3.Error: If the card could not be read or saved.
+    """
+    try:
+        with db_connection.connect_for_write(user_deck_db_path) as conn:
+            new_srs = _grade_stored_card(conn.cursor(), card_id, quality, params, balance)
+            conn.commit()
+        return new_srs
+    except sqlite3.Error as e:
+        print(f"Database Error (grade_card for card_id {card_id}): {e}")
+        raise
+
+@read_cache.invalidates
+def grade_cards(user_deck_db_path: str, grades, params: SrsParameters = DEFAULT_SRS_PARAMETERS,
+                balance=None) -> dict:
+    """
+    Grades several cards in one transaction, each as grade_card would.
+    Used to persist the cards a review session kept in memory while they
+    were being relearned.
+
+    Args:
+        grades: (card_id, quality, reviewed_at) tuples; reviewed_at is the
+            review_log timestamp ("%Y-%m-%d %H:%M:%S"), or None for now.
+        params, balance: As for grade_card.
+
+    Returns:
+        A dict mapping each card id that still exists to its saved
+        (repetitions, ease_factor, interval_days).
+
+    Raises:
+        sqlite3.Error: If the cards could not be read or saved; none are saved then.
+    """
+    saved = {}
+    try:
+        with db_connection.connect_for_write(user_deck_db_path) as conn:
+            cursor = conn.cursor()
+            for card_id, quality, reviewed_at in grades:
+                new_srs = _grade_stored_card(cursor, card_id, quality, params, balance, reviewed_at)
+                if new_srs is not None:
+                    saved[card_id] = new_srs
+            conn.commit()
+        return saved
+    except sqlite3.Error as e:
+        print(f"Database Error: Could not save graded cards: {e}")
+        raise
+
+def _grade_stored_card(cursor: sqlite3.Cursor, card_id: int, quality: int, params: SrsParameters,
+                       balance=None, reviewed_at: str | None = None) -> tuple | None:
+    """Reschedules one card from its stored state; returns the saved SRS tuple, or None if the card is gone."""
+    row = cursor.execute("""
+        SELECT COALESCE(repetitions, 0), COALESCE(ease_factor, 2.5), COALESCE(interval, 1)
+        FROM cards WHERE id = ?
+    """, (card_id,)).fetchone()
+    if row is None:
+        return None
+    new_reps, new_ef, new_interval_days = calculate_srs_update(quality, *row, params)
+    if balance is not None:
+        new_interval_days = balance(new_interval_days)
+    new_due_date_str = (datetime.now() + timedelta(days=new_interval_days)).strftime("%Y-%m-%d %H:%M:%S")
+    _save_srs_update(cursor, card_id, new_due_date_str, new_interval_days, new_ef, new_reps, quality, reviewed_at)
+    return new_reps, new_ef, new_interval_days
+
+def _stage_card_ids(cursor: sqlite3.Cursor, card_ids) -> None:
+    """Loads card ids into a temp table so bulk statements can join against it."""
+    cursor.execute("CREATE TEMP TABLE IF NOT EXISTS bulk_card_ids (id INTEGER PRIMARY KEY)")
+    cursor.execute("DELETE FROM temp.bulk_card_ids")
+    cursor.executemany("INSERT OR IGNORE INTO temp.bulk_card_ids (id) VALUES (?)", ((card_id,) for card_id in card_ids))
+
+@read_cache.invalidates
+def _run_bulk_card_statement(user_deck_db_path: str, card_ids, sql: str, params: tuple, action: str) -> int:
+    """
+    Runs one set-based statement over the given cards in a single transaction.
+
+    Returns:
+        The number of cards changed.
+
+    Raises:
+        sqlite3.Error: If the statement fails; nothing is changed.
+    """
+    card_ids = list(card_ids)
+    if not card_ids:
+        return 0
+    try:
+        with db_connection.connect_for_write(user_deck_db_path) as conn:
+            cursor = conn.cursor()
+            _stage_card_ids(cursor, card_ids)
+            cursor.execute(sql, params)
+            affected = cursor.rowcount
+            conn.commit()
+        return affected
+    except sqlite3.Error as e:
+        print(f"Database Error: Could not {action} {len(card_ids)} cards in {user_deck_db_path}: {e}")
+        raise
+
+def move_cards(user_deck_db_path: str, card_ids, target_deck_id: int) -> int:
+    """Moves the given cards into another deck. Returns the number of cards moved."""
+    return _run_bulk_card_statement(
+        user_deck_db_path, card_ids,
+        "UPDATE cards SET deck_id = ? WHERE deck_id <> ? AND id IN (SELECT id FROM temp.bulk_card_ids)",
+        (target_deck_id, target_deck_id), "move")
+
+def delete_cards(user_deck_db_path: str, card_ids) -> int:
+    """Deletes the given cards. Returns the number of cards deleted."""
+    return _run_bulk_card_statement(
+        user_deck_db_path, card_ids,
+        "DELETE FROM cards WHERE id IN (SELECT id FROM temp.bulk_card_ids)",
+        (), "delete")
+
+def reset_cards_scheduling(user_deck_db_path: str, card_ids) -> int:
+    """Returns the given cards to the new-card state (due now, interval 1, ease 2.5, 0 repetitions)."""
+    return _run_bulk_card_statement(
+        user_deck_db_path, card_ids,
+        """UPDATE cards SET due_date = NULL, interval = 1, ease_factor = 2.5, repetitions = 0
+           WHERE id IN (SELECT id FROM temp.bulk_card_ids)""",
+        (), "reset")
+
+def shift_due_dates(user_deck_db_path: str, card_ids, days: int) -> int:
+    """
+    Moves the due dates of the given cards by a number of days (negative = earlier).
+    Cards that were never reviewed (NULL due date) are left alone.
+    """
+    return _run_bulk_card_statement(
+        user_deck_db_path, card_ids,
+        """UPDATE cards SET due_date = datetime(due_date, ?)
+           WHERE due_date IS NOT NULL AND id IN (SELECT id FROM temp.bulk_card_ids)""",
+        (f"{int(days):+d} days",), "shift due dates of")
+
+def find_replace_in_cards(user_deck_db_path: str, card_ids, find: str, replace: str) -> int:
+    """
+    Replaces every occurrence of `find` with `replace` in the front and back of the given cards.
+    The match is case-sensitive. Only cards that contain the text are rewritten; cards of
+    shared decks have no text of their own and are never changed.
+    """
+    if not find:
+        return 0
+    return _run_bulk_card_statement(
+        user_deck_db_path, card_ids,
+        """UPDATE card_content SET front = replace(front, ?1, ?2), back = replace(back, ?1, ?2)
+           WHERE (instr(front, ?1) > 0 OR instr(back, ?1) > 0)
+             AND card_id IN (SELECT id FROM temp.bulk_card_ids)""",
+        (find, replace), "find/replace in")
+
+@read_cache.invalidates
+def merge_duplicate_cards(user_deck_db_path: str, merges) -> int:
+    """
+    Merges duplicate cards into the card kept from each group, in one transaction.
+
+    The kept card keeps its text and scheduling, and gains the duplicates'
+    tags, media and review history; the duplicates are then deleted.
+
+    Args:
+        merges: (keep_card_id, duplicate_card_ids) pairs, e.g. from
+            utils.near_duplicates.find_near_duplicates.
+
+    Returns:
+        The number of duplicate cards removed.
+
+    Raises:
+        sqlite3.Error: If the merge fails; nothing is changed.
+    """
+    rows = [(card_id, keep_id) for keep_id, duplicate_ids in merges for card_id in duplicate_ids if card_id != keep_id]
+    if not rows:
+        return 0
+    try:
+        with db_connection.connect_for_write(user_deck_db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("CREATE TEMP TABLE IF NOT EXISTS merge_card_ids (id INTEGER PRIMARY KEY, keep_id INTEGER NOT NULL)")
+            cursor.execute("DELETE FROM temp.merge_card_ids")
+            cursor.executemany("INSERT OR IGNORE INTO temp.merge_card_ids (id, keep_id) VALUES (?, ?)", rows)
+            # A card can't be both kept and merged away
+            cursor.execute("DELETE FROM temp.merge_card_ids WHERE id IN (SELECT keep_id FROM temp.merge_card_ids)")
+            cursor.execute("""
+                INSERT OR IGNORE INTO card_tags (tag_id, card_id)
+                SELECT ct.tag_id, m.keep_id FROM temp.merge_card_ids m JOIN card_tags ct ON ct.card_id = m.id""")
+            cursor.execute("""
+                INSERT OR IGNORE INTO card_media (card_id, side, sha256)
+                SELECT m.keep_id, cm.side, cm.sha256 FROM temp.merge_card_ids m JOIN card_media cm ON cm.card_id = m.id""")
+            cursor.execute("""
+                UPDATE review_log SET card_id = (SELECT keep_id FROM temp.merge_card_ids WHERE id = review_log.card_id)
+                WHERE card_id IN (SELECT id FROM temp.merge_card_ids)""")
+            cursor.execute("DELETE FROM cards WHERE id IN (SELECT id FROM temp.merge_card_ids)")
+            removed = cursor.rowcount
+            conn.commit()
+        return removed
+    except sqlite3.Error as e:
+        print(f"Database Error: Could not merge {len(rows)} duplicate cards in {user_deck_db_path}: {e}")
+        raise
+
+def _get_or_create_tag_ids(cursor: sqlite3.Cursor, tag_names) -> list:
+    cursor.executemany("INSERT OR IGNORE INTO tags (name) VALUES (?)", ((name,) for name in tag_names))
+    tag_ids = []
+    for name in tag_names:
+        cursor.execute("SELECT id FROM tags WHERE name = ?", (name,))
+        tag_ids.append(cursor.fetchone()[0])
+    return tag_ids
+
+@read_cache.cached()
+def get_all_tags(user_deck_db_path: str) -> list:
+    """
+    Lists every tag with the number of cards carrying it.
+
+    Returns:
+        A list of dicts with 'id', 'name' and 'card_count', ordered by name.
+    """
+    tags = []
+    try:
+        with db_connection.connect(user_deck_db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT t.id, t.name, COUNT(ct.card_id)
+                FROM tags t LEFT JOIN card_tags ct ON ct.tag_id = t.id
+                GROUP BY t.id ORDER BY t.name COLLATE NOCASE
+            """)
+            tags = [{"id": tag_id, "name": name, "card_count": count} for tag_id, name, count in cursor.fetchall()]
+    except sqlite3.Error as e:
+        print(f"Database Error: Could not load tags from {user_deck_db_path}: {e}")
+    return tags
+
+def get_card_tags(user_deck_db_path: str, card_id: int) -> list:
+    """Returns the names of the tags on a card, sorted."""
+    try:
+        with db_connection.connect(user_deck_db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT t.name FROM card_tags ct JOIN tags t ON t.id = ct.tag_id
+                WHERE ct.card_id = ? ORDER BY t.name COLLATE NOCASE
+            """, (card_id,))
+            return [row[0] for row in cursor.fetchall()]
+    except sqlite3.Error as e:
+        print(f"Database Error: Could not load tags for card_id {card_id}: {e}")
+        return []
+
+def get_tags_for_deck(user_deck_db_path: str, deck_id: int) -> dict:
+    """Returns {card_id: [tag names]} for every tagged card in a deck, in one query."""
+    tags_by_card = {}
+    try:
+        with db_connection.connect(user_deck_db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT ct.card_id, t.name
+                FROM cards c
+                JOIN card_tags ct ON ct.card_id = c.id
+                JOIN tags t ON t.id = ct.tag_id
+                WHERE c.deck_id = ? ORDER BY t.name COLLATE NOCASE
+            """, (deck_id,))
+            for card_id, name in cursor:
+                tags_by_card.setdefault(card_id, []).append(name)
+    except sqlite3.Error as e:
+        print(f"Database Error: Could not load tags for deck_id {deck_id}: {e}")
+    return tags_by_card
+
+@read_cache.invalidates
+def set_card_tags(user_deck_db_path: str, card_id: int, tag_names) -> bool:
+    """
+    Replaces the tags on a card. Unknown tags are created.
+
+    Returns:
+        True if successful, False otherwise.
+    """
+    tag_names = split_tags(" ".join(tag_names))
+    try:
+        with db_connection.connect_for_write(user_deck_db_path) as conn:
+            cursor = conn.cursor()
+            tag_ids = _get_or_create_tag_ids(cursor, tag_names)
+            cursor.execute("DELETE FROM card_tags WHERE card_id = ?", (card_id,))
+            cursor.executemany("INSERT INTO card_tags (tag_id, card_id) VALUES (?, ?)",
+                               ((tag_id, card_id) for tag_id in tag_ids))
+            conn.commit()
+        return True
+    except sqlite3.Error as e:
+        print(f"Database Error: Could not set tags for card_id {card_id}: {e}")
+        return False
+
+@read_cache.invalidates
+def add_tags_to_cards(user_deck_db_path: str, card_ids, tag_names) -> int:
+    """
+    Adds tags to many cards in one transaction.
+
+    Returns:
+        The number of new card/tag assignments.
+
+    Raises:
+        sqlite3.Error: If the update fails; nothing is changed.
+    """
+    tag_names = split_tags(" ".join(tag_names))
+    card_ids = list(card_ids)
+    if not tag_names or not card_ids:
+        return 0
+    try:
+        with db_connection.connect_for_write(user_deck_db_path) as conn:
+            cursor = conn.cursor()
+            tag_ids = _get_or_create_tag_ids(cursor, tag_names)
+            _stage_card_ids(cursor, card_ids)
+            added = 0
+            for tag_id in tag_ids:
+                cursor.execute("""
+                    INSERT OR IGNORE INTO card_tags (tag_id, card_id)
+                    SELECT ?, b.id FROM temp.bulk_card_ids b JOIN cards c ON c.id = b.id
+                """, (tag_id,))
+                added += cursor.rowcount
+            conn.commit()
+        return added
+    except sqlite3.Error as e:
+        print(f"Database Error: Could not tag {len(card_ids)} cards: {e}")
+        raise
+
+def remove_tags_from_cards(user_deck_db_path: str, card_ids, tag_names) -> int:
+    """Removes tags from many cards in one statement. Returns the number of assignments removed."""
+    tag_names = split_tags(" ".join(tag_names))
+    if not tag_names:
+        return 0
+    placeholders = ",".join("?" * len(tag_names))
+    return _run_bulk_card_statement(
+        user_deck_db_path, card_ids,
+        f"""DELETE FROM card_tags
+            WHERE tag_id IN (SELECT id FROM tags WHERE name IN ({placeholders}))
+              AND card_id IN (SELECT id FROM temp.bulk_card_ids)""",
+        tuple(tag_names), "untag")
+
+def get_due_load(user_deck_db_path: str, first_day_str: str, num_days: int) -> list:
+    """
+    Reads how many cards (across all decks) fall due on each of num_days
+    consecutive days, from the trigger-maintained due_histogram.
+
+    Args:
+        first_day_str: The first day, as 'YYYY-MM-DD'.
+
+    Returns:
+        A list of num_days counts; all zeros if the histogram can't be read.
+    """
+    loads = [0] * num_days
+    try:
+        with db_connection.connect(user_deck_db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT CAST(julianday(day) - julianday(?) AS INTEGER), count FROM due_histogram
+                WHERE day >= ? AND day < date(?, ?)
+            """, (first_day_str, first_day_str, first_day_str, f"+{num_days} days"))
+            for offset, count in cursor.fetchall():
+                loads[offset] = count
+    except sqlite3.Error as e:
+        print(f"Database Error: Could not read the due-date histogram from {user_deck_db_path}: {e}")
+    return loads
+
+def _due_snapshot_day(cursor: sqlite3.Cursor) -> str | None:
+    row = cursor.execute("SELECT day FROM due_snapshot_info WHERE id = 1").fetchone()
+    return row[0] if row else None
+
+def _build_due_snapshot(cursor: sqlite3.Cursor, day_str: str):
+    """Recomputes the due snapshot for day_str."""
+    cursor.execute("DELETE FROM due_snapshot_info")  # switches the snapshot triggers off
+    cursor.execute("DELETE FROM due_snapshot")
+    cursor.execute("DELETE FROM due_snapshot_counts")
+    cursor.execute("""
+        INSERT INTO due_snapshot (card_id, deck_id)
+        SELECT id, deck_id FROM cards
+        WHERE due_date IS NULL OR due_date < date(?, '+1 day')
+    """, (day_str,))
+    cursor.execute("""
+        INSERT INTO due_snapshot_counts (deck_id, due_count)
+        SELECT deck_id, COUNT(*) FROM due_snapshot GROUP BY deck_id
+    """)
+    cursor.execute("INSERT INTO due_snapshot_info (id, day, day_end, built_at) VALUES (1, ?, date(?, '+1 day'), ?)",
+                   (day_str, day_str, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+
+def _ensure_due_snapshot(conn: sqlite3.Connection, user_deck_db_path: str, day_str: str, force: bool = False) -> bool:
+    """
+    Rebuilds the due snapshot unless it is already for day_str.
+
+    Returns:
+        True if it was rebuilt.
+
+    Raises:
+        sqlite3.Error: If the rebuild failed; the old snapshot is kept.
+    """
+    cursor = conn.cursor()
+    if not force and _due_snapshot_day(cursor) == day_str:
+        return False
+    db_connection.begin_write(conn)
+    try:
+        # Another process may have built it while we waited for the lock
+        if not force and _due_snapshot_day(cursor) == day_str:
+            conn.rollback()
+            return False
+        _build_due_snapshot(cursor, day_str)
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    read_cache.bump_generation(user_deck_db_path)
+    print(f"Built the due snapshot for {day_str} in {user_deck_db_path}.")
+    return True
+
+def refresh_due_snapshot(user_deck_db_path: str, force: bool = False) -> bool:
+    """
+    Builds today's due snapshot if it hasn't been built yet today.
+
+    Called at login so that the first launch of the day pays for the scan;
+    after that, grades and edits keep the snapshot current through triggers.
+
+    Args:
+        force: Rebuild even if the snapshot is already for today.
+
+    Returns:
+        True if successful, False if an error occurred.
+    """
+    try:
+        with db_connection.connect(user_deck_db_path) as conn:
+            _ensure_due_snapshot(conn, user_deck_db_path, datetime.now().strftime("%Y-%m-%d"), force)
+        return True
+    except sqlite3.Error as e:
+        print(f"Database Error: Could not build the due snapshot for {user_deck_db_path}: {e}")
+        return False
+
+def get_due_counts(user_deck_db_path: str) -> dict:
+    """
+    Returns how many cards are due today in each deck, as {deck_id: count},
+    from the due snapshot (built first if the day has changed). Decks with
+    nothing due are left out.
+    """
+    counts = {}
+    try:
+        with db_connection.connect(user_deck_db_path) as conn:
+            _ensure_due_snapshot(conn, user_deck_db_path, datetime.now().strftime("%Y-%m-%d"))
+            counts = dict(conn.execute("SELECT deck_id, due_count FROM due_snapshot_counts WHERE due_count > 0").fetchall())
+    except sqlite3.Error as e:
+        print(f"Database Error: Could not read due counts from {user_deck_db_path}: {e}")
+    return counts
+
+def get_srs_parameters(user_deck_db_path: str, deck_id: int | None = None) -> SrsParameters:
+    """
+    Returns the scheduler parameters to use for a deck.
+
+    A deck's own fitted parameters win over the ones fitted across all
+    decks; without either, the SM-2 defaults are used.
+    """
+    try:
+        with db_connection.connect(user_deck_db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT params FROM srs_params WHERE deck_id IN (?, 0)
+                ORDER BY deck_id DESC LIMIT 1
+            """, (deck_id or 0,))
+            row = cursor.fetchone()
+            if row:
+                stored = json.loads(row[0])
+                return SrsParameters(**{k: v for k, v in stored.items() if k in SrsParameters._fields})
+    except (sqlite3.Error, ValueError, TypeError) as e:
+        print(f"Database Error: Could not load scheduler parameters for deck_id {deck_id}: {e}")
+    return DEFAULT_SRS_PARAMETERS
+
+@read_cache.invalidates
+def save_srs_parameters(user_deck_db_path: str, deck_id: int | None, params: SrsParameters,
+                        num_reviews: int, loss: float | None = None) -> bool:
+    """
+    Stores fitted scheduler parameters for a deck, or for all decks when deck_id is None.
+
+    Returns:
+        True if successful, False otherwise.
+    """
+    try:
+        with db_connection.connect_for_write(user_deck_db_path) as conn:
+            conn.execute("""
+                INSERT OR REPLACE INTO srs_params (deck_id, params, num_reviews, loss, fitted_at)
+                VALUES (?, ?, ?, ?, ?)
+            """, (deck_id or 0, json.dumps(params._asdict()), num_reviews, loss,
+                  datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+            conn.commit()
+        return True
+    except sqlite3.Error as e:
+        print(f"Database Error: Could not save scheduler parameters for deck_id {deck_id}: {e}")
+        return False
+
+@read_cache.cached()
 def get_deck_statistics(user_deck_db_path: str, deck_id: int) -> dict:
     """
     Calculates statistics for a given deck, including total and finished cards.
@@ -315,7 +1759,7 @@ def get_deck_statistics(user_deck_db_path: str, deck_id: int) -> dict:
     """
     stats = {'total_cards': 0, 'finished_cards': 0}
     try:
-        with sqlite3.connect(user_deck_db_path) as conn:
+        with db_connection.connect(user_deck_db_path) as conn:
             cursor = conn.cursor()
             # Get the total number of cards in the deck
             cursor.execute("SELECT COUNT(id) FROM cards WHERE deck_id = ?", (deck_id,))
@@ -335,6 +1779,7 @@ def get_deck_statistics(user_deck_db_path: str, deck_id: int) -> dict:
     return stats
 
 
+@read_cache.cached(ttl=DUE_COUNT_CACHE_SECONDS)
 def get_global_statistics(user_deck_db_path: str) -> dict:
     """
     Calculates statistics for the entire database.
@@ -355,7 +1800,7 @@ def get_global_statistics(user_deck_db_path: str) -> dict:
         return stats
         
     try:
-        with sqlite3.connect(user_deck_db_path) as conn:
+        with db_connection.connect(user_deck_db_path) as conn:
             cursor = conn.cursor()
             
             # Get total decks
@@ -373,12 +1818,9 @@ def get_global_statistics(user_deck_db_path: str) -> dict:
             )
             stats['finished_cards'] = cursor.fetchone()[0]
             
-            # Get cards due for review today
-            today_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            cursor.execute(
-                "SELECT COUNT(id) FROM cards WHERE due_date IS NULL OR due_date <= ?",
-                (today_str,)
-            )
+            # Get cards due for review today, from the due snapshot
+            _ensure_due_snapshot(conn, user_deck_db_path, datetime.now().strftime("%Y-%m-%d"))
+            cursor.execute("SELECT COALESCE(SUM(due_count), 0) FROM due_snapshot_counts")
             stats['due_today'] = cursor.fetchone()[0]
             
     except sqlite3.Error as e:
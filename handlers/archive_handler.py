@@ -0,0 +1,92 @@
+# App/handlers/archive_handler.py
+import os
+import tarfile
+import threading
+from PyQt6.QtCore import QObject, pyqtSignal # type: ignore
+from PyQt6.QtWidgets import QMessageBox, QFileDialog # type: ignore
+import collection_archive
+
+ARCHIVE_FILE_FILTER = "Collection Archives (*.tar);;All Files (*)"
+
+
+class _ArchiveSignals(QObject):
+    """Carries worker-thread results back to the GUI thread (queued connection)."""
+    export_finished = pyqtSignal(object)
+    import_finished = pyqtSignal(object)
+
+
+def _set_archive_buttons_enabled(main_window, enabled: bool):
+    for btn_name in ('dashboard_exportCollection_button', 'dashboard_importCollection_button'):
+        if hasattr(main_window, btn_name):
+            getattr(main_window, btn_name).setEnabled(enabled)
+
+
+def _get_signals(main_window) -> _ArchiveSignals:
+    if getattr(main_window, '_archive_signals', None) is None:
+        main_window._archive_signals = _ArchiveSignals()
+        main_window._archive_signals.export_finished.connect(lambda result: _on_export_finished(main_window, result))
+        main_window._archive_signals.import_finished.connect(lambda result: _on_import_finished(main_window, result))
+    return main_window._archive_signals
+
+
+def handle_export_collection(main_window):
+    """Writes all of the current user's decks to one archive file, on a background thread."""
+    if not main_window.user_deck_db_path:
+        QMessageBox.warning(main_window, "Error", "No user is currently logged in.")
+        return
+    default_name = os.path.basename(main_window.user_deck_db_path).replace(".db", collection_archive.ARCHIVE_EXTENSION)
+    archive_path, _ = QFileDialog.getSaveFileName(
+        main_window, "Export Collection", os.path.join(main_window.APP_DIR, default_name), ARCHIVE_FILE_FILTER)
+    if not archive_path:
+        return
+    signals = _get_signals(main_window)
+    _set_archive_buttons_enabled(main_window, False)
+    threading.Thread(
+        target=lambda: signals.export_finished.emit(
+            collection_archive.export_collection(main_window.user_deck_db_path, archive_path)),
+        name="collection-export", daemon=True).start()
+
+
+def _on_export_finished(main_window, result):
+    _set_archive_buttons_enabled(main_window, True)
+    if result is None:
+        QMessageBox.critical(main_window, "Export Failed", "An error occurred while exporting your collection.")
+        return
+    QMessageBox.information(
+        main_window, "Export Complete",
+        f"Exported {result['decks']} deck(s), {result['cards']} card(s) and {result['media']} media file(s).")
+
+
+def handle_import_collection(main_window):
+    """Adds the decks in a collection archive to the current user, on a background thread."""
+    if not main_window.user_deck_db_path:
+        QMessageBox.warning(main_window, "Error", "No user is currently logged in.")
+        return
+    archive_path, _ = QFileDialog.getOpenFileName(
+        main_window, "Import Collection", main_window.APP_DIR, ARCHIVE_FILE_FILTER)
+    if not archive_path:
+        return
+    signals = _get_signals(main_window)
+    _set_archive_buttons_enabled(main_window, False)
+
+    def run():
+        try:
+            result = collection_archive.import_collection(main_window.user_deck_db_path, archive_path)
+        except (ValueError, OSError, tarfile.TarError) as e:
+            result = str(e)
+        except Exception as e:
+            result = f"Error: {e}"
+        signals.import_finished.emit(result)
+
+    threading.Thread(target=run, name="collection-import", daemon=True).start()
+
+
+def _on_import_finished(main_window, result):
+    _set_archive_buttons_enabled(main_window, True)
+    if not isinstance(result, dict):
+        QMessageBox.critical(main_window, "Import Failed", f"The archive could not be imported. No decks were added.\n{result}")
+        return
+    QMessageBox.information(
+        main_window, "Import Complete",
+        f"Imported {result['decks']} deck(s), {result['cards']} card(s) and {result['reviews']} review(s).")
+    main_window._display_my_decks_list_content()
@@ -1,38 +1,99 @@
 # App/handlers/auth_handler.py
+import threading
+from PyQt6.QtCore import QObject, pyqtSignal # type: ignore
 from PyQt6.QtWidgets import QMessageBox # type: ignore
 from models.user import register_user as model_register_user, authenticate_user as model_authenticate_user
+from models.user import end_session as model_end_session
 import deck_manager
+import maintenance
+from handlers import review_handler
 import os
 
 DATABASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../database")
 
+
+class _AuthSignals(QObject):
+    """Carries worker-thread results back to the GUI thread (queued connection)."""
+    login_finished = pyqtSignal(object)
+    registration_finished = pyqtSignal(object)
+
+
+def _get_signals(main_window) -> _AuthSignals:
+    if getattr(main_window, '_auth_signals', None) is None:
+        main_window._auth_signals = _AuthSignals()
+        main_window._auth_signals.login_finished.connect(lambda result: _on_login_finished(main_window, result))
+        main_window._auth_signals.registration_finished.connect(
+            lambda result: _on_registration_finished(main_window, result))
+    return main_window._auth_signals
+
+
+def _set_auth_buttons_enabled(main_window, enabled: bool):
+    for btn_name in ('login_submit_button', 'register_submit_button'):
+        if hasattr(main_window, btn_name):
+            getattr(main_window, btn_name).setEnabled(enabled)
+
+
 def handle_login(main_window):
-    """Handles the login submission."""
+    """Handles the login submission. Checking the password and opening the deck database run on a background thread."""
     username = main_window.login_username_lineEdit.text().strip()
     password = main_window.login_password_lineEdit.text()
     if not username or not password:
         QMessageBox.warning(main_window, "Input Error", "Enter username and password.")
         return
-    if model_authenticate_user(username, password):
-        # Initialize the user's deck database
-        user_deck_db_path = os.path.join(DATABASE_DIR, f"{username}_decks.db")
-        if not deck_manager.init_user_decks_database(user_deck_db_path):
-            QMessageBox.critical(main_window, "Database Error", f"Could not initialize deck database for user '{username}'.")
-            return
-
-        # Set the user's deck database path in the main window
-        main_window.user_deck_db_path = user_deck_db_path
-
-        QMessageBox.information(main_window, "Success", f"Welcome, {username}!")
-        main_window.login_username_lineEdit.clear()
-        main_window.login_password_lineEdit.clear()
-        main_window.show_dashboard_page()
-    else:
+    signals = _get_signals(main_window)
+    _set_auth_buttons_enabled(main_window, False)
+
+    def run():
+        result = {"username": username, "token": None, "error": None}
+        try:
+            result["token"] = model_authenticate_user(username, password)
+            if result["token"]:
+                # Initialize the user's deck database
+                user_deck_db_path = os.path.join(DATABASE_DIR, f"{username}_decks.db")
+                if not deck_manager.init_user_decks_database(user_deck_db_path):
+                    result["error"] = f"Could not initialize deck database for user '{username}'."
+                else:
+                    # First login of the day works out today's due cards once
+                    deck_manager.refresh_due_snapshot(user_deck_db_path)
+                    result["user_deck_db_path"] = user_deck_db_path
+        except Exception as e:
+            result["error"] = f"Error: {e}"
+        signals.login_finished.emit(result)
+
+    threading.Thread(target=run, name="login", daemon=True).start()
+
+
+def _on_login_finished(main_window, result):
+    _set_auth_buttons_enabled(main_window, True)
+    if result["error"]:
+        model_end_session(result["token"])
+        QMessageBox.critical(main_window, "Database Error", result["error"])
+        return
+    if not result["token"]:
         QMessageBox.warning(main_window, "Login Failed", "Incorrect username or password.")
         main_window.login_password_lineEdit.clear()
+        return
+
+    username = result["username"]
+    user_deck_db_path = result["user_deck_db_path"]
+    # Set the user's deck database path in the main window
+    main_window.user_deck_db_path = user_deck_db_path
+    main_window.current_user = username
+    main_window.session_token = result["token"]
+
+    # Integrity check, statistics, vacuum and checkpoint once a day, while the user is idle
+    if getattr(main_window, 'maintenance_stop', None):
+        main_window.maintenance_stop.set()
+    main_window.maintenance_stop = maintenance.start_idle_maintenance(user_deck_db_path)
+
+    QMessageBox.information(main_window, "Success", f"Welcome, {username}!")
+    main_window.login_username_lineEdit.clear()
+    main_window.login_password_lineEdit.clear()
+    main_window.show_dashboard_page()
+
 
 def handle_registration(main_window):
-    """Handles the registration submission."""
+    """Handles the registration submission. Hashing the password and creating the deck database run on a background thread."""
     username = main_window.register_username_lineEdit.text().strip()
     password = main_window.register_password_lineEdit.text()
     confirm_password = main_window.register_passwordConfirm_lineEdit.text()
@@ -44,13 +105,17 @@ def handle_registration(main_window):
         main_window.register_password_lineEdit.clear()
         main_window.register_passwordConfirm_lineEdit.clear()
         return
-    if model_register_user(username, password):
-        # Initialize the user's deck database
-        user_deck_db_path = os.path.join(DATABASE_DIR, f"{username}_decks.db")
-        if not deck_manager.init_user_decks_database(user_deck_db_path):
-            QMessageBox.critical(main_window, "Database Error", f"Could not initialize deck database for user '{username}'.")
-            return
+    signals = _get_signals(main_window)
+    _set_auth_buttons_enabled(main_window, False)
+    # register_user also initializes the user's deck database
+    threading.Thread(
+        target=lambda: signals.registration_finished.emit(model_register_user(username, password)),
+        name="registration", daemon=True).start()
 
+
+def _on_registration_finished(main_window, registered):
+    _set_auth_buttons_enabled(main_window, True)
+    if registered:
         QMessageBox.information(main_window, "Success", "Account created! Please log in.")
         main_window.register_username_lineEdit.clear()
         main_window.register_password_lineEdit.clear()
@@ -61,13 +126,20 @@ def handle_registration(main_window):
         main_window.register_password_lineEdit.clear()
         main_window.register_passwordConfirm_lineEdit.clear()
 
+
 def handle_logout(main_window):
     """Handles user logout."""
     reply = QMessageBox.question(main_window, "Logout", "Are you sure you want to log out?",
                                  QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
                                  QMessageBox.StandardButton.No)
     if reply == QMessageBox.StandardButton.Yes:
+        review_handler.end_review_session(main_window)
+        model_end_session(getattr(main_window, 'session_token', None))
+        main_window.session_token = None
         main_window.current_user = None
+        if getattr(main_window, 'maintenance_stop', None):
+            main_window.maintenance_stop.set()
+            main_window.maintenance_stop = None
         main_window.user_deck_db_path = None  # Clear the user's deck database path
         main_window.show_login_page()
-        QMessageBox.information(main_window, "Logged Out", "You have been logged out successfully.")
\ No newline at end of file
+        QMessageBox.information(main_window, "Logged Out", "You have been logged out successfully.")
@@ -0,0 +1,77 @@
+# App/handlers/backup_handler.py
+import os
+import threading
+from PyQt6.QtCore import QObject, pyqtSignal # type: ignore
+from PyQt6.QtWidgets import QMessageBox, QFileDialog # type: ignore
+import backup_utils
+
+
+class _BackupSignals(QObject):
+    """Carries worker-thread results back to the GUI thread (queued connection)."""
+    snapshot_finished = pyqtSignal(object)
+    restore_finished = pyqtSignal(bool)
+
+
+def _set_backup_buttons_enabled(main_window, enabled: bool):
+    for btn_name in ('dashboard_backup_button', 'dashboard_restore_button'):
+        if hasattr(main_window, btn_name):
+            getattr(main_window, btn_name).setEnabled(enabled)
+
+
+def _get_signals(main_window) -> _BackupSignals:
+    if getattr(main_window, '_backup_signals', None) is None:
+        main_window._backup_signals = _BackupSignals()
+        main_window._backup_signals.snapshot_finished.connect(lambda path: _on_snapshot_finished(main_window, path))
+        main_window._backup_signals.restore_finished.connect(lambda ok: _on_restore_finished(main_window, ok))
+    return main_window._backup_signals
+
+
+def handle_backup_now(main_window):
+    """Snapshots the current user's deck database on a background thread."""
+    if not main_window.user_deck_db_path:
+        QMessageBox.warning(main_window, "Error", "No user is currently logged in.")
+        return
+    signals = _get_signals(main_window)
+    _set_backup_buttons_enabled(main_window, False)
+    backup_utils.start_background_snapshot(main_window.user_deck_db_path, on_done=signals.snapshot_finished.emit)
+
+
+def _on_snapshot_finished(main_window, snapshot_path):
+    _set_backup_buttons_enabled(main_window, True)
+    if snapshot_path:
+        QMessageBox.information(main_window, "Backup Complete", f"Snapshot saved to:\n{snapshot_path}")
+    else:
+        QMessageBox.critical(main_window, "Backup Failed", "An error occurred while backing up your decks.")
+
+
+def handle_restore_backup(main_window):
+    """Lets the user pick a snapshot and restores it over the current deck database."""
+    if not main_window.user_deck_db_path:
+        QMessageBox.warning(main_window, "Error", "No user is currently logged in.")
+        return
+    snapshots = backup_utils.list_snapshots(main_window.user_deck_db_path)
+    start_dir = os.path.dirname(snapshots[0]) if snapshots else main_window.APP_DIR
+    snapshot_path, _ = QFileDialog.getOpenFileName(
+        main_window, "Restore Backup", start_dir, "Snapshots (*.db *.db.gz);;All Files (*)")
+    if not snapshot_path:
+        return
+    reply = QMessageBox.question(main_window, "Restore Backup",
+                                 "Replace all current decks and progress with this snapshot?",
+                                 QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+                                 QMessageBox.StandardButton.No)
+    if reply != QMessageBox.StandardButton.Yes:
+        return
+    signals = _get_signals(main_window)
+    _set_backup_buttons_enabled(main_window, False)
+    threading.Thread(
+        target=lambda: signals.restore_finished.emit(
+            backup_utils.restore_snapshot(snapshot_path, main_window.user_deck_db_path)),
+        name="deck-restore", daemon=True).start()
+
+
+def _on_restore_finished(main_window, ok: bool):
+    _set_backup_buttons_enabled(main_window, True)
+    if ok:
+        QMessageBox.information(main_window, "Restore Complete", "Your decks were restored from the snapshot.")
+    else:
+        QMessageBox.critical(main_window, "Restore Failed", "The snapshot could not be restored.")
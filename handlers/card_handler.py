@@ -1,7 +1,16 @@
 # App/handlers/card_handler.py
-from PyQt6.QtWidgets import QMessageBox # type: ignore
+from PyQt6.QtWidgets import QMessageBox, QInputDialog # type: ignore
 from main import EditCardDialog  # Assuming EditCardDialog is in main.py
 import deck_manager
+import maintenance
+import media_store
+
+def _attach_dialog_media(main_window, card_id, dialog):
+    """Stores and links the media files picked in an EditCardDialog."""
+    failed = [path for side, path in dialog.get_media_files()
+              if media_store.attach_media_file(main_window.user_deck_db_path, card_id, path, side) is None]
+    if failed:
+        QMessageBox.warning(main_window, "Media Error", "Could not attach:\n" + "\n".join(failed))
 
 def handle_add_new_card(main_window):
     """Handles adding a new card to the current deck."""
@@ -15,7 +24,10 @@ def handle_add_new_card(main_window):
         if front and back:
             try:
                 print(f"Adding card with front: {front}, back: {back} to deck ID: {main_window.current_deck_id}")
-                deck_manager.add_card(main_window.user_deck_db_path, main_window.current_deck_id, front, back)
+                card_id = deck_manager.add_card(main_window.user_deck_db_path, main_window.current_deck_id, front, back)
+                if card_id:
+                    deck_manager.set_card_tags(main_window.user_deck_db_path, card_id, dialog.get_tags())
+                    _attach_dialog_media(main_window, card_id, dialog)
                 main_window._display_deck_cards_content()
             except Exception as e:
                 QMessageBox.critical(main_window, "Database Error", f"Could not add card: {e}")
@@ -26,15 +38,20 @@ def handle_edit_card(main_window, card_id, current_front, current_back):
     """Handles editing an existing card."""
     if card_id is None:
         return
-    dialog = EditCardDialog(current_front, current_back, main_window)
+    current_tags = deck_manager.get_card_tags(main_window.user_deck_db_path, card_id)
+    dialog = EditCardDialog(current_front, current_back, main_window, current_tags)
     if dialog.exec():
         front, back = dialog.get_data()
         if front and back:
             try:
                 if deck_manager.update_card_content(main_window.user_deck_db_path, card_id, front, back):
+                    if dialog.get_tags() != current_tags:
+                        deck_manager.set_card_tags(main_window.user_deck_db_path, card_id, dialog.get_tags())
+                    _attach_dialog_media(main_window, card_id, dialog)
                     main_window._display_deck_cards_content()
                 else:
-                    QMessageBox.warning(main_window, "Update Failed", "Could not update card.")
+                    QMessageBox.warning(main_window, "Update Failed",
+                                        "Could not update card. Cards of a shared deck can't be edited.")
             except Exception as e:
                 QMessageBox.critical(main_window, "Database Error", f"Could not update card: {e}")
         else:
@@ -54,4 +71,126 @@ def handle_delete_card(main_window, card_id):
             else:
                 QMessageBox.warning(main_window, "Delete Failed", "Could not delete card.")
         except Exception as e:
-            QMessageBox.critical(main_window, "Database Error", f"Could not delete card: {e}")
\ No newline at end of file
+            QMessageBox.critical(main_window, "Database Error", f"Could not delete card: {e}")
+
+def handle_card_selected(main_window, card_id, checked):
+    """Tracks the multi-selection in the card list."""
+    if checked:
+        main_window.selected_card_ids.add(card_id)
+    else:
+        main_window.selected_card_ids.discard(card_id)
+    main_window._update_card_selection_label()
+
+def handle_select_all_cards(main_window, checked):
+    """Selects or clears every card in the open deck."""
+    main_window.selected_card_ids = set(main_window.current_deck_card_ids) if checked else set()
+    main_window._display_deck_cards_content()
+
+def _get_selection(main_window):
+    if not main_window.selected_card_ids:
+        QMessageBox.information(main_window, "No Selection", "Select one or more cards first.")
+        return None
+    return sorted(main_window.selected_card_ids)
+
+def _run_bulk_action(main_window, action, done_message):
+    """Runs one bulk deck_manager call, then refreshes the list and clears the selection."""
+    try:
+        affected = action()
+    except Exception as e:
+        QMessageBox.critical(main_window, "Database Error", f"Bulk operation failed, nothing was changed: {e}")
+        return
+    main_window.selected_card_ids.clear()
+    main_window._display_deck_cards_content()
+    QMessageBox.information(main_window, "Done", done_message.format(count=affected))
+
+def handle_bulk_move(main_window):
+    """Moves the selected cards to another deck."""
+    card_ids = _get_selection(main_window)
+    if card_ids is None:
+        return
+    decks = [d for d in deck_manager.get_all_decks(main_window.user_deck_db_path) if d["id"] != main_window.current_deck_id]
+    if not decks:
+        QMessageBox.information(main_window, "Move Cards", "There is no other deck to move cards to.")
+        return
+    deck_name, ok = QInputDialog.getItem(main_window, "Move Cards", f"Move {len(card_ids)} card(s) to:",
+                                         [d["name"] for d in decks], 0, False)
+    if not ok:
+        return
+    target_deck_id = next(d["id"] for d in decks if d["name"] == deck_name)
+    _run_bulk_action(main_window,
+                     lambda: deck_manager.move_cards(main_window.user_deck_db_path, card_ids, target_deck_id),
+                     f"Moved {{count}} card(s) to '{deck_name}'.")
+
+def handle_bulk_delete(main_window):
+    """Deletes the selected cards."""
+    card_ids = _get_selection(main_window)
+    if card_ids is None:
+        return
+    reply = QMessageBox.question(main_window, "Delete Cards", f"Delete {len(card_ids)} selected card(s)?",
+                                 QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+                                 QMessageBox.StandardButton.No)
+    if reply == QMessageBox.StandardButton.Yes:
+        _run_bulk_action(main_window,
+                         lambda: deck_manager.delete_cards(main_window.user_deck_db_path, card_ids),
+                         "Deleted {count} card(s).")
+        media_store.purge_unreferenced_media(main_window.user_deck_db_path)
+        maintenance.start_background_vacuum(main_window.user_deck_db_path)
+
+def handle_bulk_reset(main_window):
+    """Resets the scheduling of the selected cards so they are studied as new."""
+    card_ids = _get_selection(main_window)
+    if card_ids is None:
+        return
+    reply = QMessageBox.question(main_window, "Reset Cards",
+                                 f"Forget the review progress of {len(card_ids)} selected card(s)?",
+                                 QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+                                 QMessageBox.StandardButton.No)
+    if reply == QMessageBox.StandardButton.Yes:
+        _run_bulk_action(main_window,
+                         lambda: deck_manager.reset_cards_scheduling(main_window.user_deck_db_path, card_ids),
+                         "Reset {count} card(s).")
+
+def handle_bulk_shift_due(main_window):
+    """Shifts the due dates of the selected cards by a number of days."""
+    card_ids = _get_selection(main_window)
+    if card_ids is None:
+        return
+    days, ok = QInputDialog.getInt(main_window, "Shift Due Dates",
+                                   "Days to shift (negative = earlier):", 1, -3650, 3650)
+    if ok and days:
+        _run_bulk_action(main_window,
+                         lambda: deck_manager.shift_due_dates(main_window.user_deck_db_path, card_ids, days),
+                         f"Shifted {{count}} card(s) by {days} day(s).")
+
+def handle_bulk_tag(main_window):
+    """Adds (or, with a leading '-', removes) tags on the selected cards."""
+    card_ids = _get_selection(main_window)
+    if card_ids is None:
+        return
+    text, ok = QInputDialog.getText(main_window, "Tag Cards",
+                                    "Tags to add (prefix with - to remove), e.g. verbs -draft:")
+    if not ok or not text.strip():
+        return
+    terms = text.split()
+    to_add = [t for t in terms if not t.startswith("-")]
+    to_remove = [t[1:] for t in terms if t.startswith("-")]
+
+    def apply_tags():
+        changed = deck_manager.add_tags_to_cards(main_window.user_deck_db_path, card_ids, to_add)
+        return changed + deck_manager.remove_tags_from_cards(main_window.user_deck_db_path, card_ids, to_remove)
+
+    _run_bulk_action(main_window, apply_tags, "Changed {count} tag assignment(s).")
+
+def handle_bulk_find_replace(main_window):
+    """Finds and replaces text in the front and back of the selected cards."""
+    card_ids = _get_selection(main_window)
+    if card_ids is None:
+        return
+    find, ok = QInputDialog.getText(main_window, "Find/Replace", "Find (case-sensitive):")
+    if not ok or not find:
+        return
+    replace, ok = QInputDialog.getText(main_window, "Find/Replace", f"Replace '{find}' with:")
+    if ok:
+        _run_bulk_action(main_window,
+                         lambda: deck_manager.find_replace_in_cards(main_window.user_deck_db_path, card_ids, find, replace),
+                         "Updated {count} card(s).")
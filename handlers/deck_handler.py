@@ -1,9 +1,12 @@
 # App/handlers/deck_handler.py
+import csv
 import sqlite3
 import json
 import os
 from PyQt6.QtWidgets import QInputDialog, QMessageBox, QFileDialog # type: ignore # type: ignore
 import deck_manager
+import maintenance
+import media_store
 import import_utils, export_utils
 
 def handle_create_new_deck(main_window):
@@ -22,22 +25,34 @@ def handle_create_new_deck(main_window):
     elif ok:
         QMessageBox.warning(main_window, "Input Error", "Deck name cannot be empty.")
 
+IMPORT_FILE_FILTER = ("Deck Files (*.json *.csv *.tsv *.tab *.txt *.apkg);;JSON Files (*.json);;"
+                      "CSV/TSV Files (*.csv *.tsv *.tab *.txt);;Anki Packages (*.apkg);;All Files (*)")
+
 def handle_import_deck(main_window):
-    """Handles importing a deck from a file."""
-    file_path, _ = QFileDialog.getOpenFileName(main_window, "Import Deck File", main_window.APP_DIR, "JSON Files (*.json);;All Files (*)")
+    """Handles importing a deck from a JSON, CSV/TSV or Anki (.apkg) file."""
+    file_path, _ = QFileDialog.getOpenFileName(main_window, "Import Deck File", main_window.APP_DIR, IMPORT_FILE_FILTER)
     if not file_path:
         return
+    options = {}
+    if file_path.lower().endswith(import_utils.DELIMITED_EXTENSIONS):
+        spec, ok = QInputDialog.getText(main_window, "Import Columns",
+                                        "Front, back and (optional) tags columns, by number or header name:",
+                                        text="1,2")
+        if not ok:
+            return
+        try:
+            options = import_utils.parse_column_spec(spec)
+        except ValueError as e:
+            QMessageBox.warning(main_window, "Import Columns", str(e))
+            return
     deck_name_for_error = "from file"
     try:
-        if file_path.endswith('.json'):
-            deck_name, cards_data = import_utils.parse_json_deck_file(file_path)
+        with import_utils.open_deck_file(file_path, **options) as (deck_name, cards_data):
             deck_name_for_error = deck_name
-            deck_manager.import_deck_and_cards(main_window.user_deck_db_path, deck_name, cards_data)
-            QMessageBox.information(main_window, "Success", f"Deck '{deck_name}' imported.")
-            main_window._display_my_decks_list_content()
-        else:
-            QMessageBox.warning(main_window, "Unsupported Format", "Only JSON currently supported.")
-    except (FileNotFoundError, json.JSONDecodeError, ValueError) as e:
+            imported = deck_manager.import_deck_and_cards(main_window.user_deck_db_path, deck_name, cards_data)
+        QMessageBox.information(main_window, "Success", f"Deck '{deck_name}' imported ({imported} cards).")
+        main_window._display_my_decks_list_content()
+    except (FileNotFoundError, json.JSONDecodeError, ValueError, csv.Error) as e:
         QMessageBox.critical(main_window, "Import Error", str(e))
     except sqlite3.IntegrityError:
         QMessageBox.warning(main_window, "Import Error", f"Deck '{deck_name_for_error}' already exists.")
@@ -52,9 +67,19 @@ def handle_export_deck(main_window):
         QMessageBox.warning(main_window, "Error", "No deck is currently open to export.")
         return
 
-    # 1. Get the deck's data from the database manager
+    # 1. Decide how to carry attached media, then get the deck's data
+    media_mode = "none"
+    if deck_manager.deck_has_media(main_window.user_deck_db_path, main_window.current_deck_id):
+        reply = QMessageBox.question(
+            main_window, "Export Media",
+            "This deck has images or audio. Bundle the files into the export?\n"
+            "Choose No to only reference them by hash.",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+            QMessageBox.StandardButton.Yes)
+        media_mode = "bundle" if reply == QMessageBox.StandardButton.Yes else "reference"
+
     deck_data = deck_manager.get_deck_for_export(
-        main_window.user_deck_db_path, main_window.current_deck_id
+        main_window.user_deck_db_path, main_window.current_deck_id, media=media_mode
     )
     
     if not deck_data:
@@ -80,4 +105,31 @@ def handle_export_deck(main_window):
     if export_utils.export_deck_to_json(deck_data, file_path):
         QMessageBox.information(main_window, "Success", f"Deck '{deck_name}' was successfully exported.")
     else:
-        QMessageBox.critical(main_window, "Export Failed", "An error occurred while exporting the deck.")
\ No newline at end of file
+        QMessageBox.critical(main_window, "Export Failed", "An error occurred while exporting the deck.")
+
+def handle_delete_deck(main_window):
+    """
+    Deletes the currently open deck with all of its cards, then releases
+    the freed space in the background.
+    """
+    if main_window.current_deck_id is None or not main_window.user_deck_db_path:
+        QMessageBox.warning(main_window, "Error", "No deck is currently open to delete.")
+        return
+    deck_name = main_window.current_deck_name
+    reply = QMessageBox.question(main_window, "Delete Deck",
+                                 f"Delete '{deck_name}' and all of its cards? This cannot be undone.",
+                                 QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+                                 QMessageBox.StandardButton.No)
+    if reply != QMessageBox.StandardButton.Yes:
+        return
+    try:
+        num_cards = deck_manager.delete_deck(main_window.user_deck_db_path, main_window.current_deck_id)
+    except Exception as e:
+        QMessageBox.critical(main_window, "Database Error", f"Could not delete deck: {e}")
+        return
+    media_store.purge_unreferenced_media(main_window.user_deck_db_path)
+    maintenance.start_background_vacuum(main_window.user_deck_db_path)
+    main_window.current_deck_id = None
+    QMessageBox.information(main_window, "Deck Deleted", f"Deleted '{deck_name}' and {num_cards} card(s).")
+    main_window.handle_go_back_to_my_decks()
+
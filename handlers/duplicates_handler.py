@@ -0,0 +1,59 @@
+# App/handlers/duplicates_handler.py
+import sqlite3
+import threading
+from PyQt6.QtCore import QObject, pyqtSignal # type: ignore
+from PyQt6.QtWidgets import QMessageBox, QInputDialog, QDialog # type: ignore
+import deck_manager
+from utils import near_duplicates
+
+
+class _DuplicatesSignals(QObject):
+    """Carries the worker-thread result back to the GUI thread (queued connection)."""
+    search_finished = pyqtSignal(object)
+
+
+def handle_find_duplicates(main_window):
+    """Looks for near-duplicate cards across all decks on a background thread, then offers to merge them."""
+    if not main_window.user_deck_db_path:
+        QMessageBox.warning(main_window, "Error", "No user is currently logged in.")
+        return
+    threshold, ok = QInputDialog.getDouble(
+        main_window, "Find Duplicates", "How similar must two cards be (0.5 = loosely, 1.0 = identical text)?",
+        near_duplicates.DEFAULT_THRESHOLD, 0.5, 1.0, 2)
+    if not ok:
+        return
+    if getattr(main_window, '_duplicates_signals', None) is None:
+        main_window._duplicates_signals = _DuplicatesSignals()
+        main_window._duplicates_signals.search_finished.connect(lambda clusters: _on_search_finished(main_window, clusters))
+    if hasattr(main_window, 'myDecks_list_duplicates_button'):
+        main_window.myDecks_list_duplicates_button.setEnabled(False)
+    signals = main_window._duplicates_signals
+    threading.Thread(
+        target=lambda: signals.search_finished.emit(
+            near_duplicates.find_near_duplicates(main_window.user_deck_db_path, threshold)),
+        name="find-duplicates", daemon=True).start()
+
+
+def _on_search_finished(main_window, clusters):
+    if hasattr(main_window, 'myDecks_list_duplicates_button'):
+        main_window.myDecks_list_duplicates_button.setEnabled(True)
+    if clusters is None:
+        QMessageBox.critical(main_window, "Find Duplicates", "The cards could not be compared (is NumPy installed?).")
+        return
+    if not clusters:
+        QMessageBox.information(main_window, "Find Duplicates", "No near-duplicate cards found.")
+        return
+    from main import DuplicateCardsDialog  # main imports this module
+    dialog = DuplicateCardsDialog(clusters, main_window)
+    if dialog.exec() != QDialog.DialogCode.Accepted:
+        return
+    merges = dialog.get_merges()
+    if not merges:
+        return
+    try:
+        removed = deck_manager.merge_duplicate_cards(main_window.user_deck_db_path, merges)
+    except sqlite3.Error as e:
+        QMessageBox.critical(main_window, "Database Error", f"Could not merge the duplicates: {e}")
+        return
+    QMessageBox.information(main_window, "Find Duplicates", f"Merged {len(merges)} group(s); {removed} card(s) removed.")
+    main_window._display_my_decks_list_content()
@@ -1,20 +1,36 @@
 # App/handlers/review_handler.py
+import time
 from datetime import datetime, timedelta
 from PyQt6.QtWidgets import QMessageBox, QInputDialog # type: ignore
+from PyQt6.QtGui import QPixmap, QDesktopServices # type: ignore
+from PyQt6.QtCore import Qt, QUrl, QTimer # type: ignore
 import deck_manager
-from utils import srs_logic
+import media_store
+import review_telemetry
+from utils import srs_logic, card_render
+from models.card import CardQueue, RelearningQueue
+from utils.tag_query import parse_tag_query
+
+TAG_FILTER_ITEM = "All decks (filter by tags)..."
+PRERENDER_AHEAD = 3  # upcoming cards rendered while the current one is on screen
 
 def start_review_session(main_window):
     """Initiates a review session."""
+    tag_filter = None
     if main_window.current_review_deck_id is None:
         decks = deck_manager.get_all_decks(main_window.user_deck_db_path)
         if not decks:
             QMessageBox.information(main_window, "Review", "No decks available to review.")
             main_window.show_dashboard_page()
             return
-        deck_names = [d["name"] for d in decks]
+        deck_names = [d["name"] for d in decks] + [TAG_FILTER_ITEM]
         deck_name, ok = QInputDialog.getItem(main_window, "Select Deck", "Choose a deck to review:", deck_names, 0, False)
-        if ok and deck_name:
+        if ok and deck_name == TAG_FILTER_ITEM:
+            tag_filter = _ask_tag_filter(main_window)
+            if tag_filter is None:
+                main_window.show_dashboard_page()
+                return
+        elif ok and deck_name:
             selected_deck_data = next((d for d in decks if d["name"] == deck_name), None)
             if selected_deck_data:
                 main_window.current_review_deck_id = selected_deck_data["id"]
@@ -22,37 +38,69 @@ def start_review_session(main_window):
             main_window.show_dashboard_page()
             return
 
+    end_review_session(main_window)
     today_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    main_window.review_cards_list = deck_manager.get_due_cards(main_window.user_deck_db_path, main_window.current_review_deck_id, today_str)
+    main_window.review_cards_list = deck_manager.get_due_cards(main_window.user_deck_db_path, main_window.current_review_deck_id, today_str, tag_filter)
     
     if not main_window.review_cards_list:
-        QMessageBox.information(main_window, "Review Complete", "No cards due for review in this deck right now!")
+        message = "No cards match this tag filter right now!" if tag_filter else "No cards due for review in this deck right now!"
+        QMessageBox.information(main_window, "Review Complete", message)
         main_window.show_dashboard_page()
         return
 
+    main_window.review_srs_params = deck_manager.get_srs_parameters(main_window.user_deck_db_path, main_window.current_review_deck_id)
     main_window.current_review_card_index = 0
     main_window.showing_answer = False
+    main_window.review_timer = review_telemetry.SessionTimer(main_window.current_review_deck_id)
+    main_window.relearning_queue = RelearningQueue(srs_logic.RELEARNING_STEPS_MINUTES)
     load_review_card(main_window)
     main_window._navigate_to_page(main_window.review_page)
 
+def _ask_tag_filter(main_window):
+    """Prompts for a tag query. Returns a non-empty TagFilter, or None if cancelled."""
+    query, ok = QInputDialog.getText(main_window, "Filter by Tags",
+                                     "Tags (e.g. spanish verbs|nouns -irregular):")
+    if not ok:
+        return None
+    try:
+        tag_filter = parse_tag_query(query)
+    except ValueError as e:
+        QMessageBox.warning(main_window, "Filter by Tags", str(e))
+        return None
+    if tag_filter.is_empty():
+        QMessageBox.warning(main_window, "Filter by Tags", "Enter at least one tag.")
+        return None
+    return tag_filter
+
 def load_review_card(main_window):
-    """Loads the current card onto the review page UI."""
-    if main_window.current_review_card_index < 0 or main_window.current_review_card_index >= len(main_window.review_cards_list):
-        QMessageBox.information(main_window, "Review Complete", "You've reviewed all due cards in this session!")
+    """Loads the current card onto the review page UI, picking the next card when its front is to be shown."""
+    if not main_window.showing_answer and not _pick_next_card(main_window):
+        summary = end_review_session(main_window)
+        message = "You've reviewed all due cards in this session!"
+        if summary and summary["cards"]:
+            message += (f"\n\n{summary['cards']} cards in {summary['active_seconds'] / 60:.1f} minutes "
+                        f"({summary['cards_per_minute']:.1f} cards/min, {summary['mean_think_seconds']:.1f} s "
+                        f"on average before showing the answer).")
+        QMessageBox.information(main_window, "Review Complete", message)
         main_window.current_review_deck_id = None
-        main_window.review_cards_list = []
+        main_window.review_cards_list = CardQueue()
         main_window.current_review_card_index = -1
         main_window.show_dashboard_page()
         return
 
-    main_window.current_review_card_data = main_window.review_cards_list[main_window.current_review_card_index]
-    
     if hasattr(main_window, 'review_cardDisplay_label'):
-        if main_window.showing_answer:
-            display_text = f"<b>Front:</b> {main_window.current_review_card_data['front']}\n\n<b>Back:</b> {main_window.current_review_card_data['back']}"
-        else:
-            display_text = f"<b>Front:</b> {main_window.current_review_card_data['front']}"
+        card = main_window.current_review_card_data
+        display_text = card_render.render_card(card['front'], card['back'] if main_window.showing_answer else None)
+        main_window.review_cardDisplay_label.setTextFormat(Qt.TextFormat.RichText)
         main_window.review_cardDisplay_label.setText(display_text)
+        # Render the answer and the next cards once this card is painted
+        QTimer.singleShot(0, lambda: _prerender_upcoming(main_window))
+
+    timer = getattr(main_window, 'review_timer', None)
+    if timer and not main_window.showing_answer:
+        timer.card_shown()
+
+    _show_review_media(main_window)
     
     if hasattr(main_window, 'review_showAnswer_button'):
         main_window.review_showAnswer_button.setVisible(not main_window.showing_answer)
@@ -63,11 +111,54 @@ def load_review_card(main_window):
     if hasattr(main_window, 'review_hard_button'): main_window.review_hard_button.setVisible(difficulty_buttons_visible)
     
     if hasattr(main_window, 'review_title_label'):
-        main_window.review_title_label.setText(f"Reviewing Deck (Card {main_window.current_review_card_index + 1}/{len(main_window.review_cards_list)})")
+        relearning = getattr(main_window, 'relearning_queue', None)
+        waiting = relearning.waiting() if relearning else 0
+        if getattr(main_window, 'current_card_relearning', False):
+            title = f"Relearning ({waiting + 1} failed card(s) to go)"
+        else:
+            title = f"Reviewing Deck (Card {main_window.current_review_card_index + 1}/{len(main_window.review_cards_list)})"
+            if waiting:
+                title += f" - {waiting} relearning"
+        main_window.review_title_label.setText(title)
+
+def _pick_next_card(main_window) -> bool:
+    """
+    Makes the next card current: a relearning card whose step is up, else
+    the next due card, else, once those have run out, the relearning card
+    due soonest (shown early rather than waiting).
+
+    Returns:
+        False if no cards are left in the session.
+    """
+    queue = main_window.review_cards_list
+    index = main_window.current_review_card_index
+    has_next = 0 <= index < len(queue)
+    relearning = getattr(main_window, 'relearning_queue', None)
+    card = relearning.pop(time.monotonic(), ahead=not has_next) if relearning else None
+    main_window.current_card_relearning = card is not None
+    if card is None and has_next:
+        card = queue[index]
+    main_window.current_review_card_data = card
+    return card is not None
+
+def _prerender_upcoming(main_window):
+    """Fills the render cache with the current card's back and the next PRERENDER_AHEAD cards."""
+    card = main_window.current_review_card_data
+    if not card:
+        return
+    queue = main_window.review_cards_list
+    # A relearning card doesn't use up the current due card, which is then still to come
+    upcoming = max(main_window.current_review_card_index + (0 if main_window.current_card_relearning else 1), 0)
+    texts = [card['back']]
+    for card in queue[upcoming:upcoming + PRERENDER_AHEAD]:
+        texts += (card['front'], card['back'])
+    card_render.prerender(texts)
 
 def handle_show_answer(main_window):
     """Shows the answer for the current review card."""
     main_window.showing_answer = True
+    if getattr(main_window, 'review_timer', None):
+        main_window.review_timer.answer_shown()
     load_review_card(main_window)
 
 def handle_difficulty_selected(main_window, quality: int):
@@ -76,20 +167,110 @@ def handle_difficulty_selected(main_window, quality: int):
         return
 
     card = main_window.current_review_card_data
-    reps = card.get('repetitions', 0)
-    ef = card.get('ease_factor', 2.5)
-    interval = card.get('interval', 1)
+    params = main_window.review_srs_params or srs_logic.DEFAULT_SRS_PARAMETERS
+    timer = getattr(main_window, 'review_timer', None)
+    if timer and timer.card_graded(card['id'], quality):
+        # Buffer full: write it out once the next card is on screen
+        QTimer.singleShot(0, lambda: review_telemetry.save_session(main_window.user_deck_db_path, timer))
 
-    new_reps, new_ef, new_interval_days = srs_logic.calculate_srs_update(quality, reps, ef, interval)
-    
-    new_due_date = datetime.now() + timedelta(days=new_interval_days)
-    new_due_date_str = new_due_date.strftime("%Y-%m-%d %H:%M:%S")
+    relearning = getattr(main_window, 'relearning_queue', None)
+    if getattr(main_window, 'current_card_relearning', False):
+        # Only moves the card through its steps; its failing grade is saved once it graduates
+        if relearning.regrade(card, quality >= srs_logic.PASSING_QUALITY, time.monotonic()):
+            QTimer.singleShot(0, lambda: _save_relearned_cards(main_window, relearning.take_graduated()))
+    elif relearning is not None and quality < srs_logic.PASSING_QUALITY:
+        relearning.lapse(card, quality, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), time.monotonic())
+        main_window.current_review_card_index += 1
+    else:
+        try:
+            # Scheduled from the stored card, in case another window graded it meanwhile
+            new_srs = deck_manager.grade_card(main_window.user_deck_db_path, card['id'], quality, params,
+                                              balance=lambda interval_days: _balance_interval(main_window, interval_days))
+            if new_srs is not None:
+                main_window.review_cards_list.update_srs(main_window.current_review_card_index, *new_srs)
+        except Exception as e:
+            QMessageBox.critical(main_window, "Database Error", f"Could not update card SRS details: {e}")
+        main_window.current_review_card_index += 1
+
+    main_window.showing_answer = False
+    load_review_card(main_window)
 
+def _save_relearned_cards(main_window, grades: list) -> bool:
+    """Writes the failing grades of relearned cards in one transaction."""
+    if not grades or not main_window.user_deck_db_path:
+        return True
+    params = main_window.review_srs_params or srs_logic.DEFAULT_SRS_PARAMETERS
     try:
-        deck_manager.update_card_srs_details(main_window.user_deck_db_path, card['id'], new_due_date_str, new_interval_days, new_ef, new_reps)
+        deck_manager.grade_cards(main_window.user_deck_db_path, grades, params,
+                                 balance=lambda interval_days: _balance_interval(main_window, interval_days))
     except Exception as e:
         QMessageBox.critical(main_window, "Database Error", f"Could not update card SRS details: {e}")
-        
-    main_window.current_review_card_index += 1
-    main_window.showing_answer = False
-    load_review_card(main_window)
\ No newline at end of file
+        return False
+    return True
+
+def end_review_session(main_window):
+    """
+    Saves the cards still being relearned and the session's telemetry, if a
+    session is running.
+
+    Returns:
+        The session's summary (see review_telemetry.SessionTimer.summary), or None.
+    """
+    relearning = getattr(main_window, 'relearning_queue', None)
+    if relearning is not None:
+        main_window.relearning_queue = None
+        main_window.current_card_relearning = False
+        _save_relearned_cards(main_window, relearning.take_all())
+    timer = getattr(main_window, 'review_timer', None)
+    if timer is None:
+        return None
+    main_window.review_timer = None
+    if main_window.user_deck_db_path:
+        review_telemetry.save_session(main_window.user_deck_db_path, timer)
+    return timer.summary()
+
+def _balance_interval(main_window, interval_days: int) -> int:
+    """Moves a due date within its fuzz window to the day with the fewest cards already due."""
+    earliest, latest = srs_logic.fuzz_range(interval_days)
+    if earliest == latest:
+        return interval_days
+    first_day_str = (datetime.now() + timedelta(days=earliest)).strftime("%Y-%m-%d")
+    loads = deck_manager.get_due_load(main_window.user_deck_db_path, first_day_str, latest - earliest + 1)
+    return srs_logic.pick_least_loaded_interval(interval_days, earliest, loads)
+
+def _show_review_media(main_window):
+    """
+    Shows the current card's image and enables audio playback, if it has any.
+    Media is only looked up for the displayed card; images are decoded
+    straight from a memory-mapped view of the stored file.
+    """
+    sides = ("front", "back") if main_window.showing_answer else ("front",)
+    media = [m for m in media_store.get_card_media(main_window.user_deck_db_path, main_window.current_review_card_data['id'])
+             if m["side"] in sides]
+    images = sorted((m for m in media if m["kind"] == "image"), key=lambda m: sides.index(m["side"]))
+    main_window.current_review_audio = [m["path"] for m in media if m["kind"] == "audio"]
+
+    if hasattr(main_window, 'review_media_label'):
+        pixmap = QPixmap()
+        if images:
+            # Prefer the answer-side image once the answer is shown
+            with media_store.open_media(main_window.user_deck_db_path, images[-1]["sha256"]) as handle:
+                try:
+                    pixmap.loadFromData(handle.data)
+                except OSError as e:
+                    print(f"Media Error: Could not load image {images[-1]['filename']}: {e}")
+        if pixmap.isNull():
+            main_window.review_media_label.clear()
+            main_window.review_media_label.setVisible(False)
+        else:
+            main_window.review_media_label.setPixmap(
+                pixmap.scaled(400, 300, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation))
+            main_window.review_media_label.setVisible(True)
+
+    if hasattr(main_window, 'review_playAudio_button'):
+        main_window.review_playAudio_button.setVisible(bool(main_window.current_review_audio))
+
+def handle_play_audio(main_window):
+    """Plays the audio attached to the current review card with the system player."""
+    for audio_path in main_window.current_review_audio:
+        QDesktopServices.openUrl(QUrl.fromLocalFile(audio_path))
@@ -0,0 +1,51 @@
+# App/handlers/sync_handler.py
+import os
+import threading
+from PyQt6.QtCore import QObject, pyqtSignal # type: ignore
+from PyQt6.QtWidgets import QMessageBox, QFileDialog # type: ignore
+import sync_manager
+
+
+class _SyncSignals(QObject):
+    """Carries the worker-thread result back to the GUI thread (queued connection)."""
+    sync_finished = pyqtSignal(object)
+
+
+def handle_sync_with_file(main_window):
+    """Syncs the current user's decks with another copy of their deck database."""
+    if not main_window.user_deck_db_path:
+        QMessageBox.warning(main_window, "Error", "No user is currently logged in.")
+        return
+    other_db_path, _ = QFileDialog.getOpenFileName(
+        main_window, "Sync With Deck Database", main_window.APP_DIR, "Deck Databases (*.db);;All Files (*)")
+    if not other_db_path:
+        return
+    if os.path.abspath(other_db_path) == os.path.abspath(main_window.user_deck_db_path):
+        QMessageBox.warning(main_window, "Sync", "Choose a different copy of your deck database.")
+        return
+
+    if getattr(main_window, '_sync_signals', None) is None:
+        main_window._sync_signals = _SyncSignals()
+        main_window._sync_signals.sync_finished.connect(lambda result: _on_sync_finished(main_window, result))
+    if hasattr(main_window, 'dashboard_sync_button'):
+        main_window.dashboard_sync_button.setEnabled(False)
+    signals = main_window._sync_signals
+    threading.Thread(
+        target=lambda: signals.sync_finished.emit(
+            sync_manager.sync_databases(main_window.user_deck_db_path, other_db_path)),
+        name="deck-sync", daemon=True).start()
+
+
+def _on_sync_finished(main_window, result):
+    if hasattr(main_window, 'dashboard_sync_button'):
+        main_window.dashboard_sync_button.setEnabled(True)
+    if result is None:
+        QMessageBox.critical(main_window, "Sync Failed", "An error occurred while syncing. No changes were kept.")
+        return
+    local, remote = result["applied_local"], result["applied_remote"]
+    QMessageBox.information(
+        main_window, "Sync Complete",
+        f"Received {local['decks']} deck(s), {local['cards']} card(s), {local['reviews']} review(s), "
+        f"{local['deletions']} deletion(s).\n"
+        f"Sent {remote['decks']} deck(s), {remote['cards']} card(s), {remote['reviews']} review(s), "
+        f"{remote['deletions']} deletion(s).")
@@ -1,5 +1,17 @@
 # App/import_utils.py
+import base64
+import contextlib
+import csv
+import html
 import json
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import urllib.parse
+import zipfile
+from datetime import datetime, timedelta
 
 def parse_json_deck_file(file_path: str):
     """
@@ -42,4 +54,326 @@ def parse_json_deck_file(file_path: str):
     # Filter out potentially invalid cards before returning if you want to be lenient
     # valid_cards_data = [card for card in cards_data if isinstance(card, dict) and "front" in card and "back" in card]
 
-    return deck_name.strip(), cards_data # Or valid_cards_data
\ No newline at end of file
+    return deck_name.strip(), cards_data # Or valid_cards_data
+
+# --- Delimited text (CSV/TSV) -------------------------------------------------
+
+DELIMITER_BY_EXTENSION = {".csv": ",", ".tsv": "\t", ".tab": "\t"}
+SNIFF_BYTES = 64 * 1024
+# Header names carried over as scheduling state when present
+SCHEDULING_COLUMNS = {"due_date": str, "interval": int, "ease_factor": float, "repetitions": int}
+ANKI_TEXT_DIRECTIVES = {"separator", "html", "tags column", "columns", "deck", "deck column",
+                        "notetype", "notetype column", "guid column"}
+
+
+def parse_column_spec(spec: str) -> dict:
+    """
+    Parses a column spec like "1,2", "2,1,3" or "Question,Answer,Tags" into
+    {"front", "back", "tags"} entries: 0-based indexes for numbers, header
+    names otherwise. The tags column is optional.
+
+    Raises:
+        ValueError: If fewer than two or more than three columns are given.
+    """
+    parts = [part.strip() for part in spec.split(",") if part.strip()]
+    if not 2 <= len(parts) <= 3:
+        raise ValueError("Import Error: Give the front and back columns, and optionally a tags column (e.g. 1,2,3).")
+    columns = {}
+    for key, part in zip(("front", "back", "tags"), parts):
+        if part.isdigit():
+            if int(part) < 1:
+                raise ValueError("Import Error: Column numbers start at 1.")
+            columns[key] = int(part) - 1
+        else:
+            columns[key] = part
+    return columns
+
+
+def _read_directives(f) -> dict:
+    """Reads the '#key:value' lines Anki puts at the top of text exports, leaving f after them."""
+    directives = {}
+    while True:
+        position = f.tell()
+        line = f.readline()
+        if not line.startswith("#") or ":" not in line:
+            f.seek(position)
+            return directives
+        key, value = line[1:].split(":", 1)
+        if key.strip().lower() not in ANKI_TEXT_DIRECTIVES:
+            f.seek(position)
+            return directives
+        directives[key.strip().lower()] = value.strip()
+
+
+def _sniff_delimiter(f) -> str:
+    position = f.tell()
+    sample = f.read(SNIFF_BYTES)
+    f.seek(position)
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=",\t;|").delimiter
+    except csv.Error:
+        return "\t" if "\t" in sample else ","
+
+
+def iter_delimited_cards(file_path: str, front=0, back=1, tags=None, delimiter: str | None = None,
+                         has_header: bool | None = None, encoding: str = "utf-8-sig"):
+    """
+    Yields card dicts from a CSV/TSV file one row at a time.
+
+    Args:
+        front, back, tags: The column of each field, as a 0-based index or a
+            header name. tags is optional.
+        delimiter: Field separator; guessed from the extension or the content if None.
+        has_header: Whether the first row holds column names. Defaults to
+            True when any column is given by name.
+        encoding: Text encoding of the file.
+
+    With a header row, columns named due_date, interval, ease_factor or
+    repetitions are carried over as the card's scheduling state.
+
+    Raises:
+        ValueError: If a named column isn't in the header.
+    """
+    skipped = 0
+    with open(file_path, "r", encoding=encoding, newline="") as f:
+        directives = _read_directives(f)
+        if delimiter is None:
+            separator = directives.get("separator", "").lower()
+            delimiter = ({"tab": "\t", "comma": ",", "semicolon": ";", "pipe": "|", "space": " "}.get(separator)
+                         or DELIMITER_BY_EXTENSION.get(os.path.splitext(file_path)[1].lower())
+                         or _sniff_delimiter(f))
+        if tags is None and directives.get("tags column", "").isdigit():
+            tags = int(directives["tags column"]) - 1
+        columns = {"front": front, "back": back, "tags": tags}
+        if has_header is None:
+            has_header = any(isinstance(column, str) for column in columns.values())
+
+        reader = csv.reader(f, delimiter=delimiter)
+        scheduling = {}
+        if has_header:
+            header = [name.strip() for name in next(reader, [])]
+            lowered = [name.lower() for name in header]
+            for key, column in columns.items():
+                if isinstance(column, str):
+                    if column.lower() not in lowered:
+                        raise ValueError(f"Import Error: Column '{column}' not found in the header of {file_path}.")
+                    columns[key] = lowered.index(column.lower())
+            scheduling = {name: lowered.index(name) for name in SCHEDULING_COLUMNS if name in lowered}
+
+        front_index, back_index, tags_index = columns["front"], columns["back"], columns["tags"]
+        for row in reader:
+            if len(row) <= max(front_index, back_index) or not row[front_index].strip():
+                skipped += 1
+                continue
+            card = {"front": row[front_index], "back": row[back_index]}
+            if tags_index is not None and tags_index < len(row) and row[tags_index].strip():
+                card["tags"] = row[tags_index]
+            for name, index in scheduling.items():
+                if index < len(row) and row[index].strip():
+                    try:
+                        card[name] = SCHEDULING_COLUMNS[name](row[index].strip())
+                    except ValueError:
+                        pass
+            yield card
+    if skipped:
+        print(f"Warning: Skipped {skipped} row(s) without a front and back in {file_path}.")
+
+
+# --- Anki packages (.apkg) ----------------------------------------------------
+
+ANKI_COLLECTION_NAMES = ("collection.anki21", "collection.anki2")  # collection.anki21b (zstd) is not supported
+ANKI_FIELD_SEPARATOR = "\x1f"
+ANKI_CARD_TYPE_REVIEW = 2
+ANKI_EPOCH_THRESHOLD = 1_000_000_000  # learning cards are due at a timestamp, review cards on a day number
+ANKI_CLOZE_RE = re.compile(r"\{\{c(\d+)::(.*?)(?:::(.*?))?\}\}", re.DOTALL)
+ANKI_IMAGE_RE = re.compile(r"""<img[^>]*\bsrc=["']?([^"'>\s]+)["']?[^>]*>""", re.IGNORECASE)
+ANKI_SOUND_RE = re.compile(r"\[sound:(.+?)\]")
+HTML_BREAK_RE = re.compile(r"<br\s*/?>|</(?:div|p|li)>", re.IGNORECASE)
+HTML_TAG_RE = re.compile(r"<[^>]+>")
+
+
+def _anki_field_to_text(field: str) -> tuple:
+    """Returns (plain text, referenced media filenames) for one note field."""
+    media = ANKI_IMAGE_RE.findall(field) + ANKI_SOUND_RE.findall(field)
+    text = ANKI_SOUND_RE.sub("", ANKI_IMAGE_RE.sub("", field))
+    text = HTML_TAG_RE.sub("", HTML_BREAK_RE.sub("\n", text))
+    return html.unescape(text).strip(), [urllib.parse.unquote(name) for name in media]
+
+
+def _anki_cloze(text: str, number: int, hide: bool) -> str:
+    def replace(match):
+        if hide and int(match.group(1)) == number:
+            return f"[{match.group(3)}]" if match.group(3) else "[...]"
+        return match.group(2)
+    return ANKI_CLOZE_RE.sub(replace, text)
+
+
+def _anki_sides(fields: list, ord_: int) -> tuple:
+    """
+    Works out a card's front and back from its note's fields without the
+    card templates: cloze notes hide deletion ord+1, a second card of a
+    two-field note is the reversed card, anything else is field 1 -> field 2.
+    """
+    first = fields[0] if fields else ""
+    rest = fields[1] if len(fields) > 1 else ""
+    if ANKI_CLOZE_RE.search(first):
+        back = _anki_cloze(first, ord_ + 1, hide=False)
+        return _anki_cloze(first, ord_ + 1, hide=True), f"{back}\n{rest}" if rest else back
+    if ord_ == 1:
+        return rest, first
+    return first, rest
+
+
+def _anki_scheduling(card_type: int, due: int, interval: int, factor: int, reps: int, lapses: int,
+                     collection_created: datetime) -> dict:
+    """
+    Maps an Anki card's scheduling onto SM-2 fields. New cards start fresh;
+    learning cards keep their due time and ease; review cards also keep
+    their interval, with repetitions taken as reviews minus lapses.
+    """
+    if card_type == 0:
+        return {}
+    if due > ANKI_EPOCH_THRESHOLD:
+        due_date = datetime.fromtimestamp(due)
+    else:
+        due_date = collection_created + timedelta(days=due)
+    state = {"due_date": due_date.strftime("%Y-%m-%d %H:%M:%S"), "ease_factor": factor / 1000 if factor else 2.5}
+    if card_type == ANKI_CARD_TYPE_REVIEW:
+        state["interval"] = max(interval, 1)
+        state["repetitions"] = max(reps - lapses, 1)
+    else:
+        state["interval"], state["repetitions"] = 1, 0
+    return state
+
+
+def _anki_deck_names(conn: sqlite3.Connection) -> dict:
+    """Anki 2.1.28+ keeps decks in a table; older collections in col.decks JSON."""
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    if "decks" in tables:
+        return dict(conn.execute("SELECT id, name FROM decks").fetchall())
+    decks_json = conn.execute("SELECT decks FROM col").fetchone()[0] or "{}"
+    return {int(deck_id): deck["name"] for deck_id, deck in json.loads(decks_json).items()}
+
+
+@contextlib.contextmanager
+def open_apkg(file_path: str):
+    """
+    Opens an Anki package for streaming.
+
+    The collection is copied out of the zip to a temporary file (SQLite
+    can't read it in place) and queried with sqlite3; cards are read one
+    at a time, and media files are pulled from the zip only for the cards
+    that show them.
+
+    Yields:
+        (deck_name, cards): the package's deck name (the file name if it
+        holds several decks) and a generator of card dicts.
+
+    Raises:
+        ValueError: If the file isn't a package this app can read.
+    """
+    try:
+        package = zipfile.ZipFile(file_path)
+    except zipfile.BadZipFile:
+        raise ValueError(f"Import Error: {os.path.basename(file_path)} is not an Anki package.") from None
+    tmp_dir = tempfile.mkdtemp(prefix="apkg-")
+    conn = None
+    try:
+        try:
+            names = set(package.namelist())
+            collection_name = next((name for name in ANKI_COLLECTION_NAMES if name in names), None)
+            if collection_name is None or ("collection.anki21b" in names and collection_name == "collection.anki2"):
+                raise ValueError("Import Error: This package uses the newest Anki format. In Anki, export it again "
+                                 "with 'Support older Anki versions' checked.")
+            collection_path = os.path.join(tmp_dir, "collection.db")
+            with package.open(collection_name) as source, open(collection_path, "wb") as target:
+                shutil.copyfileobj(source, target, 1024 * 1024)
+            media_members = {}
+            if "media" in names:
+                media_members = {filename: member for member, filename in json.loads(package.read("media") or b"{}").items()}
+
+            conn = sqlite3.connect(collection_path)
+            created = datetime.fromtimestamp(conn.execute("SELECT crt FROM col").fetchone()[0])
+            deck_names = _anki_deck_names(conn)
+            used_decks = [row[0] for row in conn.execute("SELECT DISTINCT did FROM cards LIMIT 2")]
+            if len(used_decks) == 1 and used_decks[0] in deck_names:
+                deck_name = deck_names[used_decks[0]].replace("\x1f", "::")
+            else:
+                deck_name = os.path.splitext(os.path.basename(file_path))[0]
+        except sqlite3.Error as e:
+            raise ValueError(f"Import Error: Could not read the Anki collection in {os.path.basename(file_path)}: {e}") from None
+
+        def media_items(filenames: list, side: str) -> list:
+            items = []
+            for filename in filenames:
+                member = media_members.get(filename)
+                if member is None or member not in names:
+                    continue
+                data = base64.b64encode(package.read(member)).decode("ascii")
+                items.append({"filename": filename, "side": side, "data": data})
+            return items
+
+        def cards():
+            rows = conn.execute("""
+                SELECT c.ord, c.type, c.due, c.ivl, c.factor, c.reps, c.lapses, n.flds, n.tags
+                FROM cards c JOIN notes n ON n.id = c.nid ORDER BY c.id""")
+            for ord_, card_type, due, interval, factor, reps, lapses, fields, tags in rows:
+                front, back = _anki_sides(fields.split(ANKI_FIELD_SEPARATOR), ord_)
+                front, front_media = _anki_field_to_text(front)
+                back, back_media = _anki_field_to_text(back)
+                if not front and not front_media:
+                    continue
+                card = {"front": front, "back": back,
+                        **_anki_scheduling(card_type, due, interval, factor, reps, lapses, created)}
+                if tags.strip():
+                    card["tags"] = tags
+                media = media_items(front_media, "front") + media_items(back_media, "back")
+                if media:
+                    card["media"] = media
+                yield card
+
+        yield deck_name, cards()
+    finally:
+        if conn is not None:
+            conn.close()
+        package.close()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+
+# --- Any supported file -------------------------------------------------------
+
+SUPPORTED_EXTENSIONS = (".json", ".csv", ".tsv", ".tab", ".txt", ".apkg")
+DELIMITED_EXTENSIONS = (".csv", ".tsv", ".tab", ".txt")
+
+
+@contextlib.contextmanager
+def open_deck_file(file_path: str, **delimited_options):
+    """
+    Opens any supported deck file for import.
+
+    Args:
+        delimited_options: Passed to iter_delimited_cards for CSV/TSV files
+            (front, back, tags, delimiter, has_header, encoding).
+
+    Yields:
+        (deck_name, cards), where cards is an iterable of card dicts for
+        deck_manager.import_deck_and_cards. JSON files are loaded whole;
+        the other formats are streamed.
+
+    Raises:
+        ValueError: If the file type isn't supported or the file is invalid.
+    """
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension == ".json":
+        yield parse_json_deck_file(file_path)
+    elif extension == ".apkg":
+        with open_apkg(file_path) as deck:
+            yield deck
+    elif extension in DELIMITED_EXTENSIONS:
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(file_path)
+        yield os.path.splitext(os.path.basename(file_path))[0], iter_delimited_cards(file_path, **delimited_options)
+    else:
+        raise ValueError(f"Import Error: Unsupported file type '{extension}'. "
+                         f"Supported: {', '.join(SUPPORTED_EXTENSIONS)}.")
@@ -1,29 +1,29 @@
 # App/main.py
 import sys
 import os
-import sqlite3
 from PyQt6.QtWidgets import (QApplication, QWidget, QMessageBox, QVBoxLayout, # type: ignore
-                             QPushButton, QLabel, QFormLayout, QTextEdit, QDialogButtonBox, QDialog)
+                             QPushButton, QLabel, QFormLayout, QTextEdit, QDialogButtonBox, QDialog,
+                             QHBoxLayout, QFileDialog, QLineEdit, QTreeWidget, QTreeWidgetItem)
+from PyQt6.QtCore import Qt # type: ignore
 from PyQt6.uic import loadUi # type: ignore
 
 # Modular imports
 import deck_manager
+import read_cache
+import review_telemetry
+from models.card import CardQueue
+from models import user as user_model
+from utils.tag_query import split_tags
 from page_handlers import my_decks_ui, card_display_ui
-from handlers import auth_handler, deck_handler, card_handler, review_handler
+from handlers import auth_handler, deck_handler, card_handler, review_handler, backup_handler, sync_handler, archive_handler
+from handlers import duplicates_handler
 
 APP_DIR = os.path.dirname(os.path.abspath(__file__))
 DATABASE_DIR = os.path.join(APP_DIR, "database")
 UI_FILE_PATH = os.path.join(APP_DIR, "main.ui")
 
-SQL_CREATE_USERS_TABLE = """
-CREATE TABLE IF NOT EXISTS users (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    username TEXT UNIQUE NOT NULL,
-    password_hash TEXT NOT NULL
-)"""
-
 class EditCardDialog(QDialog):
-    def __init__(self, current_front, current_back, parent=None):
+    def __init__(self, current_front, current_back, parent=None, current_tags=()):
         super().__init__(parent)
         self.setWindowTitle("Edit Card")
         self.setMinimumWidth(300)
@@ -32,14 +32,116 @@ class EditCardDialog(QDialog):
         self.back_text_edit = QTextEdit(current_back)
         self.layout.addRow("Front:", self.front_text_edit)
         self.layout.addRow("Back:", self.back_text_edit)
+        self.tags_line_edit = QLineEdit(" ".join(current_tags))
+        self.tags_line_edit.setPlaceholderText("space-separated, e.g. spanish verbs")
+        self.layout.addRow("Tags:", self.tags_line_edit)
+        self.media_files = []  # (side, path) pairs picked in this dialog
+        media_buttons_layout = QHBoxLayout()
+        self.front_media_button = QPushButton("Add Front Media...")
+        self.back_media_button = QPushButton("Add Back Media...")
+        self.front_media_button.clicked.connect(lambda: self._pick_media("front"))
+        self.back_media_button.clicked.connect(lambda: self._pick_media("back"))
+        media_buttons_layout.addWidget(self.front_media_button)
+        media_buttons_layout.addWidget(self.back_media_button)
+        self.layout.addRow("Media:", media_buttons_layout)
+        self.media_label = QLabel("No new media")
+        self.layout.addRow("", self.media_label)
         self.button_box = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
         self.button_box.accepted.connect(self.accept)
         self.button_box.rejected.connect(self.reject)
         self.layout.addWidget(self.button_box)
 
+    def _pick_media(self, side):
+        file_paths, _ = QFileDialog.getOpenFileNames(
+            self, f"Attach {side.title()} Media", APP_DIR,
+            "Media Files (*.png *.jpg *.jpeg *.gif *.bmp *.webp *.svg *.mp3 *.wav *.ogg *.m4a *.flac *.opus);;All Files (*)")
+        self.media_files.extend((side, path) for path in file_paths)
+        if self.media_files:
+            self.media_label.setText(", ".join(f"{side}: {os.path.basename(path)}" for side, path in self.media_files))
+
     def get_data(self):
         return self.front_text_edit.toPlainText().strip(), self.back_text_edit.toPlainText().strip()
 
+    def get_tags(self):
+        return split_tags(self.tags_line_edit.text())
+
+    def get_media_files(self):
+        return list(self.media_files)
+
+class DuplicateCardsDialog(QDialog):
+    """
+    Lists near-duplicate clusters. Nothing is selected at first: checked
+    cards are merged into the card marked Keep in their group.
+    """
+    KEEP_COLUMN = 4
+
+    def __init__(self, clusters, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Near-Duplicate Cards")
+        self.resize(760, 450)
+        self.layout = QVBoxLayout(self)
+        self.layout.addWidget(QLabel(f"{len(clusters)} group(s) of similar cards. Check the cards to merge into the "
+                                     "group's Keep card, which gains their tags, media and review history; "
+                                     "the checked cards are then deleted."))
+        self.tree = QTreeWidget()
+        self.tree.setHeaderLabels(["Card", "Deck", "Reviews", "Similar", "Keep"])
+        self.tree.setColumnWidth(0, 430)
+        for cluster in clusters:
+            group_item = QTreeWidgetItem([f"{len(cluster['cards'])} cards, at least {cluster['similarity']:.0%} "
+                                          "similar to the kept card", "", "", "", ""])
+            group_item.setCheckState(0, Qt.CheckState.Unchecked)
+            for index, card in enumerate(cluster["cards"]):
+                card_item = QTreeWidgetItem([f"{card['front']}  |  {card['back']}".replace("\n", " "),
+                                             card["deck_name"], str(card["repetitions"]),
+                                             f"{card['similarity']:.0%}" if index else "", ""])
+                card_item.setData(0, Qt.ItemDataRole.UserRole, card["id"])
+                card_item.setCheckState(0, Qt.CheckState.Unchecked)
+                card_item.setCheckState(self.KEEP_COLUMN, Qt.CheckState.Checked if index == 0 else Qt.CheckState.Unchecked)
+                group_item.addChild(card_item)
+            self.tree.addTopLevelItem(group_item)
+        self.tree.expandAll()
+        self.tree.itemChanged.connect(self._on_item_changed)
+        self.layout.addWidget(self.tree)
+        self.button_box = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
+        self.button_box.button(QDialogButtonBox.StandardButton.Ok).setText("Merge Checked")
+        self.button_box.accepted.connect(self.accept)
+        self.button_box.rejected.connect(self.reject)
+        self.layout.addWidget(self.button_box)
+
+    def _on_item_changed(self, item, column):
+        group_item = item.parent()
+        self.tree.blockSignals(True)
+        if group_item is None and column == 0:
+            # (Un)checking a group (un)checks all of its cards
+            if item.checkState(0) != Qt.CheckState.PartiallyChecked:
+                for index in range(item.childCount()):
+                    item.child(index).setCheckState(0, item.checkState(0))
+        elif group_item is not None and column == 0:
+            states = {group_item.child(index).checkState(0) for index in range(group_item.childCount())}
+            group_item.setCheckState(0, states.pop() if len(states) == 1 else Qt.CheckState.PartiallyChecked)
+        elif group_item is not None and column == self.KEEP_COLUMN and item.checkState(column) == Qt.CheckState.Checked:
+            # One card to keep per group
+            for index in range(group_item.childCount()):
+                sibling = group_item.child(index)
+                if sibling is not item:
+                    sibling.setCheckState(column, Qt.CheckState.Unchecked)
+        self.tree.blockSignals(False)
+
+    def get_merges(self):
+        """(keep_card_id, duplicate_card_ids) for each group with a Keep card and other cards checked."""
+        merges = []
+        for group_index in range(self.tree.topLevelItemCount()):
+            group_item = self.tree.topLevelItem(group_index)
+            card_items = [group_item.child(index) for index in range(group_item.childCount())]
+            keep = [item for item in card_items if item.checkState(self.KEEP_COLUMN) == Qt.CheckState.Checked]
+            if not keep:
+                continue
+            duplicates = [item.data(0, Qt.ItemDataRole.UserRole) for item in card_items
+                          if item is not keep[0] and item.checkState(0) == Qt.CheckState.Checked]
+            if duplicates:
+                merges.append((keep[0].data(0, Qt.ItemDataRole.UserRole), duplicates))
+        return merges
+
 class MainWindow(QWidget):
     def __init__(self):
         super().__init__()
@@ -56,11 +158,21 @@ class MainWindow(QWidget):
         self._navigating_back = False
         self.current_deck_id = None
         self.current_deck_name = None
+        self.current_deck_card_ids = []
+        self.selected_card_ids = set()
         self.current_review_deck_id = None
-        self.review_cards_list = []
+        self.review_cards_list = CardQueue()
+        self.review_srs_params = None  # scheduler parameters for the current session
         self.current_review_card_index = -1
         self.current_review_card_data = None
+        self.current_review_audio = []
         self.showing_answer = False
+        self.relearning_queue = None  # cards failed this session, shown again shortly (see models.card.RelearningQueue)
+        self.current_card_relearning = False
+        self.current_user = None
+        self.session_token = None  # from models.user.authenticate_user
+        self.review_timer = None  # answer timings of the current review session (see review_telemetry)
+        self.maintenance_stop = None  # set to stop the idle maintenance thread (see maintenance.start_idle_maintenance)
 
         self._connect_signals()
         self._init_user_database()
@@ -76,6 +188,7 @@ class MainWindow(QWidget):
 
         # Navigation
         if hasattr(self, 'register_goBackButton'): self.register_goBackButton.clicked.connect(self.handle_go_back)
+        if hasattr(self, 'review_goBackButton'): self.review_goBackButton.clicked.connect(lambda: review_handler.end_review_session(self))
         if hasattr(self, 'review_goBackButton'): self.review_goBackButton.clicked.connect(self.handle_go_back)
         if hasattr(self, 'myDecks_goBackButton'): self.myDecks_goBackButton.clicked.connect(self.handle_go_back)
         if hasattr(self, 'card_list_goBackButton'): self.card_list_goBackButton.clicked.connect(self.handle_go_back_to_my_decks)
@@ -86,34 +199,43 @@ class MainWindow(QWidget):
         self.dashboard_goToReview_button.clicked.connect(lambda: review_handler.start_review_session(self))
         self.dashboard_goToStatistics_button.clicked.connect(self.show_statistics_page)
         self.dashboard_logout_button.clicked.connect(self.show_login_page) 
+        if hasattr(self, 'dashboard_backup_button'): self.dashboard_backup_button.clicked.connect(lambda: backup_handler.handle_backup_now(self))
+        if hasattr(self, 'dashboard_restore_button'): self.dashboard_restore_button.clicked.connect(lambda: backup_handler.handle_restore_backup(self))
+        if hasattr(self, 'dashboard_sync_button'): self.dashboard_sync_button.clicked.connect(lambda: sync_handler.handle_sync_with_file(self))
+        if hasattr(self, 'dashboard_exportCollection_button'): self.dashboard_exportCollection_button.clicked.connect(lambda: archive_handler.handle_export_collection(self))
+        if hasattr(self, 'dashboard_importCollection_button'): self.dashboard_importCollection_button.clicked.connect(lambda: archive_handler.handle_import_collection(self))
 
         # Deck Management
         if hasattr(self, 'myDecks_noDecks_create_button'): self.myDecks_noDecks_create_button.clicked.connect(lambda: deck_handler.handle_create_new_deck(self))
         if hasattr(self, 'myDecks_noDecks_import_button'): self.myDecks_noDecks_import_button.clicked.connect(lambda: deck_handler.handle_import_deck(self))
         if hasattr(self, 'myDecks_list_create_button'): self.myDecks_list_create_button.clicked.connect(lambda: deck_handler.handle_create_new_deck(self))
         if hasattr(self, 'myDecks_list_import_button'): self.myDecks_list_import_button.clicked.connect(lambda: deck_handler.handle_import_deck(self))
+        if hasattr(self, 'myDecks_list_duplicates_button'): self.myDecks_list_duplicates_button.clicked.connect(lambda: duplicates_handler.handle_find_duplicates(self))
 
         # Card Management
         if hasattr(self, 'card_list_add_card_button'): self.card_list_add_card_button.clicked.connect(lambda: card_handler.handle_add_new_card(self))
         if hasattr(self, 'card_list_export_deck_button'): self.card_list_export_deck_button.clicked.connect(lambda: deck_handler.handle_export_deck(self))
+        if hasattr(self, 'card_list_delete_deck_button'): self.card_list_delete_deck_button.clicked.connect(lambda: deck_handler.handle_delete_deck(self))
+        if hasattr(self, 'card_list_selectAll_checkBox'): self.card_list_selectAll_checkBox.clicked.connect(lambda checked: card_handler.handle_select_all_cards(self, checked))
+        if hasattr(self, 'card_list_bulk_move_button'): self.card_list_bulk_move_button.clicked.connect(lambda: card_handler.handle_bulk_move(self))
+        if hasattr(self, 'card_list_bulk_delete_button'): self.card_list_bulk_delete_button.clicked.connect(lambda: card_handler.handle_bulk_delete(self))
+        if hasattr(self, 'card_list_bulk_reset_button'): self.card_list_bulk_reset_button.clicked.connect(lambda: card_handler.handle_bulk_reset(self))
+        if hasattr(self, 'card_list_bulk_shift_button'): self.card_list_bulk_shift_button.clicked.connect(lambda: card_handler.handle_bulk_shift_due(self))
+        if hasattr(self, 'card_list_bulk_tag_button'): self.card_list_bulk_tag_button.clicked.connect(lambda: card_handler.handle_bulk_tag(self))
+        if hasattr(self, 'card_list_bulk_replace_button'): self.card_list_bulk_replace_button.clicked.connect(lambda: card_handler.handle_bulk_find_replace(self))
 
         # Review
         if hasattr(self, 'review_showAnswer_button'): self.review_showAnswer_button.clicked.connect(lambda: review_handler.handle_show_answer(self))
         if hasattr(self, 'review_easy_button'): self.review_easy_button.clicked.connect(lambda: review_handler.handle_difficulty_selected(self, 5))
         if hasattr(self, 'review_medium_button'): self.review_medium_button.clicked.connect(lambda: review_handler.handle_difficulty_selected(self, 4))
         if hasattr(self, 'review_hard_button'): self.review_hard_button.clicked.connect(lambda: review_handler.handle_difficulty_selected(self, 3))
+        if hasattr(self, 'review_playAudio_button'): self.review_playAudio_button.clicked.connect(lambda: review_handler.handle_play_audio(self))
 
     def _init_user_database(self):
-        user_db_path_for_init = os.path.join(DATABASE_DIR, "user.db")
-        try:
-            with sqlite3.connect(user_db_path_for_init) as conn:
-                cursor = conn.cursor()
-                cursor.execute(SQL_CREATE_USERS_TABLE)
-                conn.commit()
-            print("User database initialized successfully.")
-        except sqlite3.Error as e:
-            QMessageBox.critical(self, "Database Error", f"Could not initialize user database: {e}")
+        if not user_model.init_user_database(DATABASE_DIR):
+            QMessageBox.critical(self, "Database Error", "Could not initialize user database.")
             sys.exit(1)
+        print("User database initialized successfully.")
 
     def _navigate_to_page(self, target_page_widget):
         current_active_widget = self.main_stackedWidget.currentWidget()
@@ -184,19 +306,31 @@ class MainWindow(QWidget):
         self.current_deck_id = deck_id
         self.current_deck_name = deck_name
         self.current_review_deck_id = deck_id
+        self.selected_card_ids.clear()
         self.show_card_list_page()
 
     def _display_deck_cards_content(self):
         if self.current_deck_id is None: return
         if not hasattr(self, 'card_list_verticalLayout'):
              QMessageBox.warning(self, "UI Error", "Card list UI elements not loaded."); return
-        card_display_ui.populate_card_list(
+        self.current_deck_card_ids = card_display_ui.populate_card_list(
             card_list_layout=self.card_list_verticalLayout,
             deck_id=self.current_deck_id,
             edit_card_callback=lambda id, f, b: card_handler.handle_edit_card(self, id, f, b),
             delete_card_callback=lambda id: card_handler.handle_delete_card(self, id),
-            user_deck_db_path=self.user_deck_db_path # Pass the user's deck database path
+            user_deck_db_path=self.user_deck_db_path, # Pass the user's deck database path
+            select_card_callback=lambda id, checked: card_handler.handle_card_selected(self, id, checked),
+            selected_card_ids=self.selected_card_ids
         )
+        self.selected_card_ids.intersection_update(self.current_deck_card_ids)
+        self._update_card_selection_label()
+
+    def _update_card_selection_label(self):
+        if hasattr(self, 'card_list_selection_label'):
+            self.card_list_selection_label.setText(f"{len(self.selected_card_ids)} selected")
+        if hasattr(self, 'card_list_selectAll_checkBox'):
+            self.card_list_selectAll_checkBox.setChecked(
+                bool(self.current_deck_card_ids) and len(self.selected_card_ids) == len(self.current_deck_card_ids))
         
     def get_statistics(self):
         """
@@ -208,7 +342,7 @@ class MainWindow(QWidget):
 
         # Fetch the statistics from the deck manager
         stats = deck_manager.get_global_statistics(self.user_deck_db_path)
-        print(f"Fetched statistics: {stats}")
+        print(f"Fetched statistics: {stats} (read cache: {read_cache.cache_stats()})")
 
         # Update the labels on the statistics page with the new data
         if hasattr(self, 'stats_totalDecks_label'):
@@ -223,7 +357,27 @@ class MainWindow(QWidget):
         if hasattr(self, 'stats_dueToday_label'):
             self.stats_dueToday_label.setText(f"Cards Due Today: {stats['due_today']}")
 
+        if hasattr(self, 'stats_lastSession_label'):
+            sessions = review_telemetry.get_session_summaries(self.user_deck_db_path, limit=1)
+            if sessions:
+                last = sessions[0]
+                self.stats_lastSession_label.setText(
+                    f"Last Session: {last['cards']} cards in {last['active_seconds'] / 60:.1f} min "
+                    f"({last['cards_per_minute']:.1f} cards/min, median {last['median_think_seconds']:.1f} s to answer)")
+            else:
+                self.stats_lastSession_label.setText("Last Session: none yet")
+
+        if hasattr(self, 'stats_throughput_label'):
+            throughput = review_telemetry.get_throughput(self.user_deck_db_path)
+            self.stats_throughput_label.setText(
+                f"Last {review_telemetry.THROUGHPUT_WINDOW_DAYS} Days: {throughput['cards']} cards in "
+                f"{throughput['sessions']} sessions, {throughput['cards_per_minute']:.1f} cards/min, "
+                f"{throughput['mean_think_seconds']:.1f} s average to answer")
+
     def closeEvent(self, event):
+        review_handler.end_review_session(self)
+        if self.maintenance_stop:
+            self.maintenance_stop.set()
         event.accept()
 
 if __name__ == "__main__":
@@ -0,0 +1,366 @@
+# App/maintenance.py
+"""
+Housekeeping for deck databases: reclaiming free pages after deletions,
+and the periodic maintenance run (integrity check, planner statistics,
+incremental vacuum, WAL checkpoint) the app starts when the user is idle.
+
+Every task takes only short locks, so it can run next to reviews; each
+run is recorded in maintenance_log (see run_maintenance).
+"""
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+import db_connection
+
+VACUUM_PAGES_PER_STEP = 256   # pages released per transaction (1 MiB with 4 KiB pages)
+VACUUM_STEP_SLEEP = 0.01      # seconds to yield between steps so reviews can write
+VACUUM_MIN_FREE_PAGES = 256   # don't bother for less free space than this
+AUTO_VACUUM_INCREMENTAL = 2   # PRAGMA auto_vacuum value
+CONVERT_TIMEOUT = 30          # seconds the one-time VACUUM may wait for other writers
+
+MAINTENANCE_TASKS = ("integrity", "optimize", "vacuum", "checkpoint")
+MAINTENANCE_INTERVAL_HOURS = 24
+IDLE_SECONDS = 120            # no writes to the database for this long counts as idle
+IDLE_CHECK_SECONDS = 60       # how often the scheduler looks
+STALE_STATS_RATIO = 0.25      # re-ANALYZE a table once its row count moved this much since the last one
+QUICK_CHECK_MAX_ERRORS = 10
+CHECKPOINT_TIMEOUT = 0.5      # seconds a truncating checkpoint may wait for readers (writers wait meanwhile)
+MAINTENANCE_LOG_KEEP = 500    # maintenance_log rows kept
+
+
+def get_free_pages(user_deck_db_path: str) -> tuple:
+    """
+    Returns (free_pages, page_size) for a deck database; free pages are
+    the ones an incremental vacuum can give back to the file system.
+    """
+    with db_connection.connect(user_deck_db_path) as conn:
+        free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    return free_pages, page_size
+
+
+def incremental_vacuum(user_deck_db_path: str, max_pages: int | None = None,
+                       pages_per_step: int = VACUUM_PAGES_PER_STEP) -> int:
+    """
+    Shrinks the database file by releasing free pages, a few at a time.
+
+    Each step is its own short write transaction, so a review can still
+    save between steps; unlike VACUUM the database is never rebuilt.
+    Needs auto_vacuum = INCREMENTAL (set on new databases by
+    init_user_decks_database, on older ones by enable_incremental_vacuum).
+
+    Args:
+        max_pages: Stop after releasing this many pages (default: all free pages).
+
+    Returns:
+        The number of pages released, or -1 on error.
+    """
+    released = 0
+    try:
+        conn = db_connection.connect(user_deck_db_path, timeout=30)
+        try:
+            while max_pages is None or released < max_pages:
+                free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+                if free_pages == 0:
+                    break
+                step = min(pages_per_step, free_pages)
+                if max_pages is not None:
+                    step = min(step, max_pages - released)
+                # sqlite3_exec steps the pragma to completion; through execute() each
+                # call would release a single page whatever the argument
+                conn.executescript(f"BEGIN IMMEDIATE; PRAGMA incremental_vacuum({step}); COMMIT;")
+                after = conn.execute("PRAGMA freelist_count").fetchone()[0]
+                if after >= free_pages:
+                    break  # not in incremental mode; nothing can be released
+                released += free_pages - after
+                time.sleep(VACUUM_STEP_SLEEP)
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        print(f"Maintenance Error: Incremental vacuum of {user_deck_db_path} failed: {e}")
+        return -1
+    return released
+
+
+def enable_incremental_vacuum(user_deck_db_path: str) -> bool:
+    """
+    Switches a database created before auto_vacuum to INCREMENTAL mode.
+
+    Changing the mode of an existing database needs one full VACUUM, which
+    rebuilds the file and holds the write lock until it is done, so this
+    only runs from maintenance (the idle thread or cli.py maintain), never
+    at login.
+
+    Returns:
+        True if the database was converted, False if it already was.
+
+    Raises:
+        sqlite3.Error: If the VACUUM failed; the database is left as it was.
+    """
+    conn = db_connection.connect(user_deck_db_path, timeout=CONVERT_TIMEOUT)
+    try:
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == AUTO_VACUUM_INCREMENTAL:
+            return False
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+    return True
+
+
+def start_background_vacuum(user_deck_db_path: str, on_done=None,
+                            min_free_pages: int = VACUUM_MIN_FREE_PAGES) -> threading.Thread | None:
+    """
+    Runs incremental_vacuum on a daemon thread if enough space is free.
+
+    Args:
+        on_done: Optional callable(pages_released), invoked on the worker thread.
+
+    Returns:
+        The started thread, or None if there was too little to reclaim.
+    """
+    try:
+        free_pages, _ = get_free_pages(user_deck_db_path)
+    except sqlite3.Error as e:
+        print(f"Maintenance Error: Could not read free pages of {user_deck_db_path}: {e}")
+        return None
+    if free_pages < min_free_pages:
+        return None
+
+    def run():
+        released = incremental_vacuum(user_deck_db_path)
+        if on_done:
+            on_done(released)
+
+    thread = threading.Thread(target=run, name="incremental-vacuum", daemon=True)
+    thread.start()
+    return thread
+
+
+def _stale_tables(conn: sqlite3.Connection) -> list:
+    """
+    Tables whose planner statistics are missing or off by more than
+    STALE_STATS_RATIO, e.g. after a large import or deletion.
+    """
+    indexed = [row[0] for row in conn.execute("""
+        SELECT DISTINCT tbl_name FROM sqlite_master
+        WHERE type = 'index' AND tbl_name NOT LIKE 'sqlite_%' ORDER BY tbl_name""")]
+    has_stats = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone()
+    analyzed = {}
+    if has_stats:
+        # The first number is the rows in the index; partial indexes have fewer than the table
+        for table, stat in conn.execute("SELECT tbl, stat FROM sqlite_stat1"):
+            analyzed[table] = max(analyzed.get(table, 0), int((stat or "0").split()[0]))
+    stale = []
+    for table in indexed:
+        rows = conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+        if table not in analyzed:
+            if rows:
+                stale.append(table)
+        elif abs(rows - analyzed[table]) > STALE_STATS_RATIO * max(analyzed[table], 1):
+            stale.append(table)
+    return stale
+
+
+def _task_integrity(user_deck_db_path: str) -> tuple:
+    conn = db_connection.connect_read_only(user_deck_db_path)
+    try:
+        problems = [row[0] for row in conn.execute(f"PRAGMA quick_check({QUICK_CHECK_MAX_ERRORS})")]
+    finally:
+        conn.close()
+    if problems == ["ok"]:
+        return True, "ok"
+    return False, "; ".join(problems)
+
+
+def _task_optimize(user_deck_db_path: str) -> tuple:
+    conn = db_connection.connect(user_deck_db_path)
+    try:
+        stale = _stale_tables(conn)
+        for table in stale:
+            # One table per transaction, so reviews only wait for one table's scan
+            db_connection.begin_write(conn)
+            conn.execute(f'ANALYZE "{table}"')
+            conn.commit()
+        conn.execute("PRAGMA optimize")
+    finally:
+        conn.close()
+    return True, f"analyzed {', '.join(stale)}" if stale else "statistics current"
+
+
+def _task_vacuum(user_deck_db_path: str) -> tuple:
+    if enable_incremental_vacuum(user_deck_db_path):
+        return True, "converted to incremental auto_vacuum (full VACUUM, once)"
+    free_pages, page_size = get_free_pages(user_deck_db_path)
+    if free_pages < VACUUM_MIN_FREE_PAGES:
+        return True, f"{free_pages} free page(s), skipped"
+    released = incremental_vacuum(user_deck_db_path)
+    if released < 0:
+        return False, "incremental vacuum failed"
+    return True, f"released {released} page(s), {released * page_size / 2**20:.1f} MiB"
+
+
+def _task_checkpoint(user_deck_db_path: str) -> tuple:
+    try:
+        wal_bytes = os.path.getsize(user_deck_db_path + "-wal")
+    except OSError:
+        wal_bytes = 0
+    conn = db_connection.connect(user_deck_db_path, timeout=CHECKPOINT_TIMEOUT)
+    try:
+        busy, wal_frames, checkpointed = conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+        truncated = not busy
+        if busy:
+            # Readers still need the WAL: copy what can be copied without waiting for them
+            busy, wal_frames, checkpointed = conn.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchone()
+    finally:
+        conn.close()
+    if wal_frames < 0:
+        return True, "not in WAL mode"
+    if truncated:
+        return True, f"WAL checkpointed and truncated ({wal_bytes / 1024:.0f} KiB)"
+    return True, f"checkpointed {checkpointed} of {wal_frames} frame(s), readers active"
+
+
+_TASK_FUNCTIONS = {
+    "integrity": _task_integrity,
+    "optimize": _task_optimize,
+    "vacuum": _task_vacuum,
+    "checkpoint": _task_checkpoint,
+}
+
+
+def _record_run(user_deck_db_path: str, results: list):
+    try:
+        with db_connection.connect_for_write(user_deck_db_path) as conn:
+            conn.executemany(
+                "INSERT INTO maintenance_log (ran_at, task, ok, seconds, detail) VALUES (?, ?, ?, ?, ?)",
+                [(r["ran_at"], r["task"], int(r["ok"]), r["seconds"], r["detail"]) for r in results])
+            conn.execute("DELETE FROM maintenance_log WHERE id <= (SELECT MAX(id) FROM maintenance_log) - ?",
+                         (MAINTENANCE_LOG_KEEP,))
+        conn.close()
+    except sqlite3.Error as e:
+        print(f"Maintenance Error: Could not record the maintenance run on {user_deck_db_path}: {e}")
+
+
+def run_maintenance(user_deck_db_path: str, tasks=MAINTENANCE_TASKS, should_stop=None) -> list:
+    """
+    Runs maintenance tasks on a deck database, in MAINTENANCE_TASKS order,
+    prints what each did and how long it took, and records the run in
+    maintenance_log.
+
+    - integrity: PRAGMA quick_check. If it finds problems the remaining
+      tasks, which all write, are skipped.
+    - optimize: ANALYZE for each table whose statistics are missing or
+      stale, then PRAGMA optimize.
+    - vacuum: incremental_vacuum, if at least VACUUM_MIN_FREE_PAGES are free.
+      A database still without auto_vacuum = INCREMENTAL is first converted
+      with one full VACUUM (enable_incremental_vacuum), which frees every
+      free page anyway.
+    - checkpoint: copies the WAL into the database and truncates it.
+
+    Args:
+        tasks: Names from MAINTENANCE_TASKS to run.
+        should_stop: Optional callable; when it returns True the remaining
+            tasks are skipped (e.g. the user logged out).
+
+    Returns:
+        One dict per task with 'task', 'ok', 'seconds', 'detail' and 'ran_at'.
+    """
+    unknown = set(tasks) - set(MAINTENANCE_TASKS)
+    if unknown:
+        raise ValueError(f"Unknown maintenance task(s): {', '.join(sorted(unknown))}")
+    results = []
+    for task in (t for t in MAINTENANCE_TASKS if t in tasks):
+        if should_stop and should_stop():
+            break
+        ran_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        start = time.perf_counter()
+        if results and not results[0]["ok"] and results[0]["task"] == "integrity":
+            ok, detail = False, "skipped: integrity check failed"
+        else:
+            try:
+                ok, detail = _TASK_FUNCTIONS[task](user_deck_db_path)
+            except (OSError, sqlite3.Error) as e:
+                ok, detail = False, f"error: {e}"
+        seconds = time.perf_counter() - start
+        print(f"Maintenance: {task} on {user_deck_db_path}: {detail} ({seconds:.3f}s)")
+        results.append({"task": task, "ok": ok, "seconds": seconds, "detail": detail, "ran_at": ran_at})
+    if results:
+        _record_run(user_deck_db_path, results)
+    return results
+
+
+def get_maintenance_log(user_deck_db_path: str, limit: int = 20) -> list:
+    """
+    The newest maintenance_log entries, newest first, as dicts like the
+    ones run_maintenance returns.
+    """
+    try:
+        conn = db_connection.connect_read_only(user_deck_db_path)
+        try:
+            return [{"ran_at": ran_at, "task": task, "ok": bool(ok), "seconds": seconds, "detail": detail}
+                    for ran_at, task, ok, seconds, detail in conn.execute("""
+                        SELECT ran_at, task, ok, seconds, detail FROM maintenance_log ORDER BY id DESC LIMIT ?
+                    """, (limit,))]
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        print(f"Database Error: Could not read the maintenance log of {user_deck_db_path}: {e}")
+        return []
+
+
+def maintenance_due(user_deck_db_path: str, interval_hours: float = MAINTENANCE_INTERVAL_HOURS) -> bool:
+    """True if the database has no maintenance run in the last interval_hours."""
+    last_run = get_maintenance_log(user_deck_db_path, limit=1)
+    if not last_run:
+        return True
+    last = datetime.strptime(last_run[0]["ran_at"], "%Y-%m-%d %H:%M:%S")
+    return datetime.now() - last >= timedelta(hours=interval_hours)
+
+
+def seconds_since_last_write(user_deck_db_path: str) -> float:
+    """
+    Time since the database or its WAL was last modified, by any process
+    (the app, cli.py, a sync).
+    """
+    latest = 0.0
+    for path in (user_deck_db_path, user_deck_db_path + "-wal"):
+        try:
+            latest = max(latest, os.stat(path).st_mtime)
+        except OSError:
+            pass
+    return time.time() - latest
+
+
+def start_idle_maintenance(user_deck_db_path: str, on_done=None, idle_seconds: float = IDLE_SECONDS,
+                           interval_hours: float = MAINTENANCE_INTERVAL_HOURS,
+                           check_seconds: float = IDLE_CHECK_SECONDS) -> threading.Event:
+    """
+    Starts a daemon thread that runs run_maintenance once maintenance is
+    due and nothing has written to the database for idle_seconds.
+
+    Args:
+        on_done: Optional callable(results), invoked on the worker thread
+            after each run.
+
+    Returns:
+        An Event; set it to stop the scheduler (a run in progress stops
+        after its current task).
+    """
+    stop = threading.Event()
+
+    def run():
+        while not stop.wait(check_seconds):
+            if seconds_since_last_write(user_deck_db_path) < idle_seconds:
+                continue
+            if not maintenance_due(user_deck_db_path, interval_hours):
+                continue
+            results = run_maintenance(user_deck_db_path, should_stop=stop.is_set)
+            if on_done:
+                on_done(results)
+
+    threading.Thread(target=run, name="idle-maintenance", daemon=True).start()
+    return stop
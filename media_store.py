@@ -0,0 +1,276 @@
+# App/media_store.py
+import hashlib
+import mmap
+import os
+import sqlite3
+import tempfile
+
+import db_connection
+
+CHUNK_SIZE = 1024 * 1024
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".bmp", ".webp", ".svg"}
+AUDIO_EXTENSIONS = {".mp3", ".wav", ".ogg", ".m4a", ".flac", ".opus"}
+
+
+def get_media_dir(user_deck_db_path: str) -> str:
+    """
+    Returns the media directory that belongs to a user's deck database.
+
+    The directory sits next to the database file, e.g.
+    database/alice_decks.db -> database/alice_decks_media/
+    """
+    return os.path.splitext(user_deck_db_path)[0] + "_media"
+
+
+def get_media_path(user_deck_db_path: str, sha256: str) -> str:
+    """Returns the on-disk path of a media file, sharded by the first two hex digits."""
+    return os.path.join(get_media_dir(user_deck_db_path), sha256[:2], sha256)
+
+
+def media_kind(filename: str) -> str:
+    """Classifies a media file as 'image', 'audio' or 'other' from its extension."""
+    ext = os.path.splitext(filename)[1].lower()
+    if ext in IMAGE_EXTENSIONS:
+        return "image"
+    if ext in AUDIO_EXTENSIONS:
+        return "audio"
+    return "other"
+
+
+def _commit_blob(user_deck_db_path: str, sha256: str, tmp_path: str):
+    """Moves a fully written temp file into the store, or drops it if the hash is already there."""
+    target = get_media_path(user_deck_db_path, sha256)
+    if os.path.exists(target):
+        os.remove(tmp_path)
+        return
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    os.replace(tmp_path, target)
+
+
+def write_media_bytes(user_deck_db_path: str, data: bytes) -> tuple:
+    """
+    Writes a blob into the content-addressed store.
+
+    Returns:
+        A tuple (sha256, size). Identical content is stored only once.
+    """
+    sha256 = hashlib.sha256(data).hexdigest()
+    if not os.path.exists(get_media_path(user_deck_db_path, sha256)):
+        media_dir = get_media_dir(user_deck_db_path)
+        os.makedirs(media_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=media_dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        _commit_blob(user_deck_db_path, sha256, tmp_path)
+    return sha256, len(data)
+
+
+def write_media_file(user_deck_db_path: str, source_path: str) -> tuple:
+    """
+    Copies a file into the content-addressed store, hashing it while streaming.
+
+    Returns:
+        A tuple (sha256, size).
+
+    Raises:
+        OSError: If the source file cannot be read or the store cannot be written.
+    """
+    with open(source_path, "rb") as src:
+        return write_media_stream(user_deck_db_path, src)
+
+
+def write_media_stream(user_deck_db_path: str, src) -> tuple:
+    """
+    Copies a readable binary file object into the content-addressed store,
+    hashing it while streaming.
+
+    Returns:
+        A tuple (sha256, size).
+
+    Raises:
+        OSError: If the source cannot be read or the store cannot be written.
+    """
+    media_dir = get_media_dir(user_deck_db_path)
+    os.makedirs(media_dir, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=media_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as dst:
+            while chunk := src.read(CHUNK_SIZE):
+                digest.update(chunk)
+                dst.write(chunk)
+                size += len(chunk)
+    except OSError:
+        os.remove(tmp_path)
+        raise
+    sha256 = digest.hexdigest()
+    _commit_blob(user_deck_db_path, sha256, tmp_path)
+    return sha256, size
+
+
+def register_media(cursor: sqlite3.Cursor, sha256: str, filename: str, size: int):
+    """Records a stored blob in the 'media' table (no-op if it is already known)."""
+    cursor.execute(
+        "INSERT OR IGNORE INTO media (sha256, filename, size) VALUES (?, ?, ?)",
+        (sha256, os.path.basename(filename), size))
+
+
+def link_media(cursor: sqlite3.Cursor, card_id: int, sha256: str, side: str = "front"):
+    """Links a registered blob to a card side. Reference counts are kept by triggers."""
+    cursor.execute(
+        "INSERT OR IGNORE INTO card_media (card_id, side, sha256) VALUES (?, ?, ?)",
+        (card_id, side, sha256))
+
+
+def attach_media_file(user_deck_db_path: str, card_id: int, source_path: str, side: str = "front") -> str | None:
+    """
+    Stores a file and attaches it to a card.
+
+    Args:
+        user_deck_db_path: Path to the user's deck database.
+        card_id: ID of the card.
+        source_path: Path of the image or audio file to attach.
+        side: 'front' or 'back'.
+
+    Returns:
+        The SHA-256 of the stored file, or None if an error occurred.
+    """
+    try:
+        sha256, size = write_media_file(user_deck_db_path, source_path)
+        with db_connection.connect_for_write(user_deck_db_path) as conn:
+            cursor = conn.cursor()
+            register_media(cursor, sha256, source_path, size)
+            link_media(cursor, card_id, sha256, side)
+            conn.commit()
+        return sha256
+    except (OSError, sqlite3.Error) as e:
+        print(f"Media Error: Could not attach '{source_path}' to card_id {card_id}: {e}")
+        return None
+
+
+def detach_media(user_deck_db_path: str, card_id: int, sha256: str) -> bool:
+    """Removes a media link from a card. The blob stays until purge_unreferenced_media runs."""
+    try:
+        with db_connection.connect_for_write(user_deck_db_path) as conn:
+            conn.execute("DELETE FROM card_media WHERE card_id = ? AND sha256 = ?", (card_id, sha256))
+            conn.commit()
+        return True
+    except sqlite3.Error as e:
+        print(f"Media Error: Could not detach media from card_id {card_id}: {e}")
+        return False
+
+
+def get_card_media(user_deck_db_path: str, card_id: int, side: str | None = None) -> list:
+    """
+    Lists the media attached to a card, without loading any file contents.
+
+    Returns:
+        A list of dicts with 'sha256', 'filename', 'size', 'side', 'kind' and 'path'.
+    """
+    query = """
+        SELECT m.sha256, m.filename, m.size, cm.side
+        FROM card_media cm JOIN media m ON m.sha256 = cm.sha256
+        WHERE cm.card_id = ?"""
+    params = [card_id]
+    if side is not None:
+        query += " AND cm.side = ?"
+        params.append(side)
+    try:
+        with db_connection.connect(user_deck_db_path) as conn:
+            rows = conn.execute(query, params).fetchall()
+    except sqlite3.Error as e:
+        print(f"Media Error: Could not load media for card_id {card_id}: {e}")
+        return []
+    return [
+        {"sha256": sha256, "filename": filename, "size": size, "side": card_side,
+         "kind": media_kind(filename), "path": get_media_path(user_deck_db_path, sha256)}
+        for sha256, filename, size, card_side in rows
+    ]
+
+
+def purge_unreferenced_media(user_deck_db_path: str) -> int:
+    """
+    Deletes blobs whose reference count has dropped to zero.
+
+    A blob whose file could not be removed keeps its row, so a later purge
+    tries again.
+
+    Returns:
+        The number of blobs removed.
+    """
+    removed = []
+    try:
+        with db_connection.connect_for_write(user_deck_db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT sha256 FROM media WHERE ref_count <= 0")
+            orphans = [row[0] for row in cursor.fetchall()]
+            for sha256 in orphans:
+                media_path = get_media_path(user_deck_db_path, sha256)
+                try:
+                    os.remove(media_path)
+                except FileNotFoundError:
+                    pass  # already gone; just drop the row
+                except OSError as e:
+                    print(f"Media Error: Could not remove {media_path}: {e}")
+                    continue
+                removed.append(sha256)
+                try:
+                    os.rmdir(os.path.dirname(media_path))  # only succeeds once the shard is empty
+                except OSError:
+                    pass
+            cursor.executemany("DELETE FROM media WHERE sha256 = ? AND ref_count <= 0",
+                               [(sha256,) for sha256 in removed])
+            conn.commit()
+    except (OSError, sqlite3.Error) as e:
+        print(f"Media Error: Could not purge unreferenced media: {e}")
+    return len(removed)
+
+
+class MediaHandle:
+    """
+    Lazily memory-maps a stored media file.
+
+    Nothing is read until .data is first accessed; the returned memoryview is
+    backed by the page cache, so large images are not copied into Python memory.
+    """
+    __slots__ = ("path", "_file", "_map", "_view")
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+        self._map = None
+        self._view = None
+
+    @property
+    def data(self) -> memoryview:
+        if self._view is None:
+            self._file = open(self.path, "rb")
+            if os.fstat(self._file.fileno()).st_size == 0:
+                self._view = memoryview(b"")
+            else:
+                self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+                self._view = memoryview(self._map)
+        return self._view
+
+    def close(self):
+        if self._view is not None:
+            self._view.release()
+            self._view = None
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def open_media(user_deck_db_path: str, sha256: str) -> MediaHandle:
+    """Returns a lazy, memory-mapped handle for a stored media file."""
+    return MediaHandle(get_media_path(user_deck_db_path, sha256))
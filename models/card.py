@@ -0,0 +1,267 @@
+# App/models/card.py
+import heapq
+import itertools
+from array import array
+
+CARD_FIELDS = ("id", "front", "back", "repetitions", "ease_factor", "interval", "due_date")
+
+
+class Card:
+    """
+    Compact in-memory record for a single card row.
+
+    Uses __slots__ instead of a per-instance dict. Fields that were not
+    selected by the query are simply left unset, so dict-style access
+    (card['front'], card.get('repetitions', 0), 'id' in card) behaves the
+    same way it did when rows were returned as plain dicts.
+    """
+    __slots__ = CARD_FIELDS
+
+    def __init__(self, **fields):
+        for key, value in fields.items():
+            setattr(self, key, value)
+
+    @classmethod
+    def from_row(cls, row) -> "Card":
+        """Builds a Card from a sqlite3.Row (or any mapping with keys())."""
+        card = cls.__new__(cls)
+        for key in row.keys():
+            setattr(card, key, row[key])
+        return card
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except (AttributeError, TypeError):
+            raise KeyError(key) from None
+
+    def __setitem__(self, key, value):
+        if key not in CARD_FIELDS:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key) -> bool:
+        return key in CARD_FIELDS and hasattr(self, key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self) -> list:
+        return [key for key in CARD_FIELDS if hasattr(self, key)]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self) -> int:
+        return len(self.keys())
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (Card, dict)):
+            return dict(self) == dict(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"Card({', '.join(f'{k}={self[k]!r}' for k in self.keys())})"
+
+
+class CardQueue:
+    """
+    Columnar, array-backed container for a review queue.
+
+    Scheduling fields are packed into typed arrays (8 + 4 + 8 + 4 bytes per
+    card) and the text columns are kept as plain lists of str. Indexing
+    returns a Card built on demand, so callers can keep treating the queue
+    as a list of dict-like cards.
+    """
+    __slots__ = ("ids", "fronts", "backs", "repetitions", "ease_factors", "intervals")
+
+    def __init__(self):
+        self.ids = array("q")
+        self.fronts = []
+        self.backs = []
+        self.repetitions = array("i")
+        self.ease_factors = array("d")
+        self.intervals = array("i")
+
+    @classmethod
+    def from_rows(cls, rows) -> "CardQueue":
+        """Builds a queue from (id, front, back, repetitions, ease_factor, interval) rows."""
+        queue = cls()
+        for row in rows:
+            queue.append(*row)
+        return queue
+
+    def append(self, card_id: int, front: str, back: str,
+               repetitions: int = 0, ease_factor: float = 2.5, interval: int = 1):
+        self.ids.append(card_id)
+        self.fronts.append(front)
+        self.backs.append(back)
+        self.repetitions.append(0 if repetitions is None else repetitions)
+        self.ease_factors.append(2.5 if ease_factor is None else ease_factor)
+        self.intervals.append(1 if interval is None else interval)
+
+    def update_srs(self, index: int, repetitions: int, ease_factor: float, interval: int):
+        """Overwrites the scheduling fields of the card at index in place."""
+        self.repetitions[index] = repetitions
+        self.ease_factors[index] = ease_factor
+        self.intervals[index] = interval
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __bool__(self) -> bool:
+        return len(self.ids) > 0
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return Card(
+            id=self.ids[index],
+            front=self.fronts[index],
+            back=self.backs[index],
+            repetitions=self.repetitions[index],
+            ease_factor=self.ease_factors[index],
+            interval=self.intervals[index],
+        )
+
+    def __iter__(self):
+        for i in range(len(self.ids)):
+            yield self[i]
+
+
+class LazyCardQueue(CardQueue):
+    """
+    A CardQueue that starts out as just the ordered card ids and loads the
+    cards themselves PAGE_SIZE at a time, as they are indexed.
+
+    Used for review sessions (see deck_manager.get_due_cards), so starting
+    a session only reads ids.
+    """
+    __slots__ = ("_load_page", "_loaded")
+
+    PAGE_SIZE = 64
+
+    def __init__(self, card_ids, load_page):
+        """
+        Args:
+            card_ids: The card ids, in review order.
+            load_page: Callable(list of ids) returning (id, front, back,
+                repetitions, ease_factor, interval) rows, in any order.
+        """
+        super().__init__()
+        self.ids = array("q", card_ids)
+        count = len(self.ids)
+        self.fronts = [""] * count
+        self.backs = [""] * count
+        self.repetitions = array("i", [0]) * count
+        self.ease_factors = array("d", [2.5]) * count
+        self.intervals = array("i", [1]) * count
+        self._load_page = load_page
+        self._loaded = bytearray(count)
+
+    def _ensure_loaded(self, index: int) -> int:
+        """Loads the page starting at index if that card isn't loaded yet; returns the index made non-negative."""
+        if index < 0:
+            index += len(self.ids)
+        if not 0 <= index < len(self.ids):
+            raise IndexError("card queue index out of range")
+        if self._loaded[index]:
+            return index
+        page = [i for i in range(index, min(index + self.PAGE_SIZE, len(self.ids))) if not self._loaded[i]]
+        rows = {row[0]: row for row in self._load_page([self.ids[i] for i in page])}
+        for i in page:
+            row = rows.get(self.ids[i])
+            if row is not None:  # a card deleted since the session started keeps its blank placeholder
+                _, self.fronts[i], self.backs[i], repetitions, ease_factor, interval = row
+                self.repetitions[i] = 0 if repetitions is None else repetitions
+                self.ease_factors[i] = 2.5 if ease_factor is None else ease_factor
+                self.intervals[i] = 1 if interval is None else interval
+            self._loaded[i] = 1
+        return index
+
+    def append(self, card_id: int, front: str, back: str,
+               repetitions: int = 0, ease_factor: float = 2.5, interval: int = 1):
+        super().append(card_id, front, back, repetitions, ease_factor, interval)
+        self._loaded.append(1)
+
+    def update_srs(self, index: int, repetitions: int, ease_factor: float, interval: int):
+        super().update_srs(self._ensure_loaded(index), repetitions, ease_factor, interval)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return super().__getitem__(index)
+        return super().__getitem__(self._ensure_loaded(index))
+
+
+class RelearningQueue:
+    """
+    The cards failed during a review session, waiting to be shown again
+    after each of the relearning steps, as a min-heap on due time.
+
+    Nothing here touches the database. A card's first failing grade is
+    what gets saved, once, by take_graduated() or take_all(); the grades
+    given while it is being relearned only move it through the steps.
+    Times are time.monotonic() seconds.
+    """
+    __slots__ = ("_steps", "_heap", "_counter", "_pending")
+
+    def __init__(self, steps_minutes):
+        self._steps = tuple(minutes * 60 for minutes in steps_minutes)
+        self._heap = []       # (due, seq, card_id, card); seq breaks ties in failure order
+        self._counter = itertools.count()
+        self._pending = {}    # card_id -> [quality, reviewed_at, step, graduated]
+
+    def lapse(self, card, quality: int, reviewed_at: str, now: float):
+        """Starts relearning a card that failed its scheduled review."""
+        self._pending[card['id']] = [quality, reviewed_at, 0, False]
+        self._push(card, now + self._steps[0])
+
+    def regrade(self, card, passed: bool, now: float) -> bool:
+        """
+        Moves a relearning card to its next step (or back to the first one
+        if it failed again).
+
+        Returns:
+            True if it passed its last step and has graduated.
+        """
+        entry = self._pending[card['id']]
+        entry[2] = entry[2] + 1 if passed else 0
+        if entry[2] >= len(self._steps):
+            entry[3] = True
+            return True
+        self._push(card, now + self._steps[entry[2]])
+        return False
+
+    def _push(self, card, due: float):
+        heapq.heappush(self._heap, (due, next(self._counter), card['id'], card))
+
+    def pop(self, now: float, ahead: bool = False):
+        """The card due earliest if it is due by now (or any card, with ahead=True), else None."""
+        if self._heap and (ahead or self._heap[0][0] <= now):
+            return heapq.heappop(self._heap)[3]
+        return None
+
+    def waiting(self) -> int:
+        """Cards still to be shown again."""
+        return len(self._heap)
+
+    def __contains__(self, card_id) -> bool:
+        return card_id in self._pending
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def take_graduated(self) -> list:
+        """Removes the graduated cards and returns their (card_id, quality, reviewed_at) grades to save."""
+        graduated = [card_id for card_id, entry in self._pending.items() if entry[3]]
+        return [(card_id,) + tuple(self._pending.pop(card_id)[:2]) for card_id in graduated]
+
+    def take_all(self) -> list:
+        """Empties the queue, returning every card's grade to save, graduated or not."""
+        grades = [(card_id, entry[0], entry[1]) for card_id, entry in self._pending.items()]
+        self._pending.clear()
+        self._heap.clear()
+        return grades
@@ -1,53 +1,182 @@
 # App/models/user.py
-import sqlite3
+"""
+User accounts: the users table in database/user.db and each user's deck
+database next to it.
+
+Passwords are stored as salted PBKDF2-HMAC-SHA256 hashes
+("pbkdf2_sha256$<iterations>$<salt>$<hash>"), so the cost can be raised
+later: hashes made with fewer than HASH_ITERATIONS rounds, and the
+unsalted SHA-256 hex digests of older versions, still verify and are
+rehashed on the next successful login. Hashing is deliberately slow
+(~0.2 s), so callers should run authenticate_user and register_user off
+the GUI thread.
+
+A user who has logged in once this run is verified again from an
+in-memory cache (an HMAC of the password under a per-process key), not
+by re-hashing, for CREDENTIAL_CACHE_SECONDS or until the stored hash
+changes. Each login returns a session token; get_session_user() resolves
+it until end_session() or SESSION_TTL_SECONDS.
+
+All queries go through one shared connection per user.db.
+"""
 import hashlib
+import hmac
+import multiprocessing
 import os
+import secrets
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from functools import partial
+
+import db_connection
 import deck_manager
 
-# Determine the base directory of the 'App' folder 
+# Determine the base directory of the 'App' folder
 # Assumes 'user.py' is in 'App/models/', so 'App/' is its parent directory.
 APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATABASE_DIR = os.path.join(APP_DIR, "database")
 USER_DB_PATH = os.path.join(DATABASE_DIR, "user.db")
 
-def hash_password(password: str) -> str:
-    """Hashes a password using SHA256."""
-    return hashlib.sha256(password.encode()).hexdigest()
+HASH_SCHEME = "pbkdf2_sha256"
+HASH_ITERATIONS = 600_000      # PBKDF2-SHA256 rounds for new hashes
+SALT_BYTES = 16
+SESSION_TTL_SECONDS = 12 * 3600
+CREDENTIAL_CACHE_SECONDS = 3600
+PROVISION_CHUNK_USERS = 64     # users hashed per worker task in register_users
+
+SQL_CREATE_USERS_TABLE = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT UNIQUE NOT NULL,
+    password_hash TEXT NOT NULL
+)"""
+
+_pool = {}                     # user.db path -> shared sqlite3.Connection
+_pool_lock = threading.RLock()
+_cache_key = secrets.token_bytes(32)
+_credentials = {}              # username -> (password_hash, password HMAC, expires)
+_sessions = {}                 # token -> (username, expires)
+
+
+def user_db_path(database_dir: str = DATABASE_DIR) -> str:
+    return os.path.join(database_dir, "user.db")
+
+
+def deck_db_path(username: str, database_dir: str = DATABASE_DIR) -> str:
+    return os.path.join(database_dir, f"{username}_decks.db")
+
+
+def hash_password(password: str, iterations: int = HASH_ITERATIONS, salt: bytes | None = None) -> str:
+    """Hashes a password with PBKDF2-HMAC-SHA256 and a random salt, in the stored format."""
+    salt = salt or os.urandom(SALT_BYTES)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations)
+    return f"{HASH_SCHEME}${iterations}${salt.hex()}${digest.hex()}"
+
+
+def verify_password(password: str, password_hash: str) -> bool:
+    """Checks a password against a stored hash, in constant time."""
+    scheme, _, rest = password_hash.partition("$")
+    if scheme != HASH_SCHEME:
+        # Unsalted SHA-256 from before salted hashes
+        attempt = hashlib.sha256(password.encode()).hexdigest()
+        return hmac.compare_digest(attempt, password_hash)
+    try:
+        iterations, salt, digest = rest.split("$")
+        attempt = hashlib.pbkdf2_hmac("sha256", password.encode(), bytes.fromhex(salt), int(iterations))
+        return hmac.compare_digest(attempt.hex(), digest)
+    except ValueError:
+        return False
+
+
+def needs_rehash(password_hash: str, iterations: int = HASH_ITERATIONS) -> bool:
+    """True for unsalted hashes and ones made with fewer than `iterations` rounds."""
+    scheme, _, rest = password_hash.partition("$")
+    if scheme != HASH_SCHEME:
+        return True
+    try:
+        return int(rest.split("$")[0]) < iterations
+    except ValueError:
+        return True
+
+
+def _connection(database_dir: str) -> sqlite3.Connection:
+    """The shared connection to user.db; use it while holding _pool_lock."""
+    path = user_db_path(database_dir)
+    conn = _pool.get(path)
+    if conn is None:
+        os.makedirs(database_dir, exist_ok=True)
+        conn = sqlite3.connect(path, timeout=db_connection.BUSY_TIMEOUT_SECONDS, check_same_thread=False)
+        db_connection.enable_wal(conn)
+        conn.execute(SQL_CREATE_USERS_TABLE)
+        conn.commit()
+        _pool[path] = conn
+    return conn
+
+
+def close_connections():
+    """Closes the shared user.db connections (they are reopened on next use)."""
+    with _pool_lock:
+        for conn in _pool.values():
+            conn.close()
+        _pool.clear()
+
+
+def init_user_database(database_dir: str = DATABASE_DIR) -> bool:
+    """Creates user.db and the users table if needed."""
+    try:
+        with _pool_lock:
+            _connection(database_dir)
+        return True
+    except sqlite3.Error as e:
+        print(f"Database error initializing the user database: {e}")
+        return False
+
+
+def _get_password_hash(username: str, database_dir: str) -> str | None:
+    with _pool_lock:
+        row = _connection(database_dir).execute(
+            "SELECT password_hash FROM users WHERE username = ?", (username,)).fetchone()
+    return row[0] if row else None
+
+
+def _password_mac(password: str) -> bytes:
+    return hmac.new(_cache_key, password.encode(), hashlib.sha256).digest()
+
 
-def _ensure_user_table_exists():
-    """Ensures the users table exists with the correct schema."""
-    # This function can be called by register_user or authenticate_user
-    # if table creation isn't strictly handled by main.py's _init_user_database
-    # For now, main.py's _init_user_database handles table creation.
-    # If this module were to be fully independent, it would create its table.
-    pass # Assuming main.py handles initial table creation via _init_user_database
+def _start_session(username: str) -> str:
+    token = secrets.token_urlsafe(32)
+    _sessions[token] = (username, time.monotonic() + SESSION_TTL_SECONDS)
+    return token
 
-def register_user(username: str, password: str) -> bool:
+
+def register_user(username: str, password: str, database_dir: str = DATABASE_DIR,
+                  iterations: int = HASH_ITERATIONS) -> bool:
     """
     Registers a new user with a hashed password and initializes a unique deck database for the user.
 
     Args:
         username: The username to register.
         password: The plain text password.
+        iterations: PBKDF2 rounds for the password hash.
 
     Returns:
         True if registration is successful, False otherwise (e.g., username exists).
     """
-    os.makedirs(DATABASE_DIR, exist_ok=True) 
-    hashed_pw = hash_password(password)
+    hashed_pw = hash_password(password, iterations)
     try:
-        with sqlite3.connect(USER_DB_PATH) as conn:
-            cursor = conn.cursor()
-            cursor.execute("INSERT INTO users (username, password_hash) VALUES (?, ?)",
-                           (username, hashed_pw))
-            conn.commit()
-        
+        with _pool_lock:
+            conn = _connection(database_dir)
+            with conn:
+                conn.execute("INSERT INTO users (username, password_hash) VALUES (?, ?)", (username, hashed_pw))
+
         # Initialize the user's deck database using deck_manager
-        user_deck_db_path = os.path.join(DATABASE_DIR, f"{username}_decks.db")
-        if not deck_manager.init_user_decks_database(user_deck_db_path):
+        if not deck_manager.init_user_decks_database(deck_db_path(username, database_dir)):
             print(f"Error: Could not initialize deck database for user '{username}'.")
             return False
-        
+
         return True
     except sqlite3.IntegrityError:
         print(f"Error: Username '{username}' already exists.")
@@ -56,7 +185,83 @@ def register_user(username: str, password: str) -> bool:
         print(f"Database error during registration: {e}")
         return False
 
-def authenticate_user(username: str, password: str) -> bool:
+
+def _hash_chunk(chunk: list, iterations: int) -> list:
+    """Hashes (username, password) pairs. Runs in a worker process."""
+    return [(username, hash_password(password, iterations)) for username, password in chunk]
+
+
+def register_users(users, database_dir: str = DATABASE_DIR, iterations: int = HASH_ITERATIONS,
+                   workers: int | None = None, progress=None) -> dict:
+    """
+    Registers many users at once, e.g. to provision a class.
+
+    Passwords are hashed in a process pool, all accounts are inserted in one
+    transaction, and every deck database is a copy of one freshly
+    initialized template instead of being built schema step by schema step.
+
+    Args:
+        users: (username, password) pairs.
+        workers: Hashing processes (default: one per core; 1 hashes inline).
+        progress: Optional callable(users_hashed).
+
+    Returns:
+        A dict with 'registered' and 'skipped' (usernames that already
+        existed or were repeated) counts.
+
+    Raises:
+        sqlite3.Error: If the accounts could not be saved; none are saved then.
+    """
+    users = list(users)
+    with _pool_lock:
+        existing = {row[0] for row in _connection(database_dir).execute("SELECT username FROM users")}
+    new_users, seen = [], set(existing)
+    for username, password in users:
+        if username not in seen:
+            seen.add(username)
+            new_users.append((username, password))
+
+    if not new_users:
+        return {"registered": 0, "skipped": len(users)}
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        template = os.path.join(tmp_dir, "template_decks.db")
+        if not deck_manager.init_user_decks_database(template):
+            raise sqlite3.DatabaseError("Could not initialize the template deck database.")
+        with sqlite3.connect(template) as conn:
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+        chunks = [new_users[i:i + PROVISION_CHUNK_USERS] for i in range(0, len(new_users), PROVISION_CHUNK_USERS)]
+        workers = max(1, min(workers or os.cpu_count() or 1, len(chunks)))
+        hash_chunk = partial(_hash_chunk, iterations=iterations)
+        hashed = []
+        pool = multiprocessing.get_context("spawn").Pool(workers) if workers > 1 else None
+        try:
+            for chunk in (pool.imap(hash_chunk, chunks) if pool else map(hash_chunk, chunks)):
+                hashed += chunk
+                if progress:
+                    progress(len(hashed))
+        finally:
+            if pool:
+                pool.terminate()
+
+        try:
+            with _pool_lock:
+                conn = _connection(database_dir)
+                with conn:
+                    conn.executemany("INSERT INTO users (username, password_hash) VALUES (?, ?)", hashed)
+        except sqlite3.Error as e:
+            print(f"Database error during bulk registration: {e}")
+            raise
+
+        for username, _ in hashed:
+            path = deck_db_path(username, database_dir)
+            if not os.path.exists(path):
+                shutil.copyfile(template, path)
+    return {"registered": len(hashed), "skipped": len(users) - len(hashed)}
+
+
+def authenticate_user(username: str, password: str, database_dir: str = DATABASE_DIR) -> str | None:
     """
     Authenticates a user by comparing the hashed provided password
     with the stored hashed password.
@@ -66,24 +271,45 @@ def authenticate_user(username: str, password: str) -> bool:
         password: The plain text password.
 
     Returns:
-        True if authentication is successful, False otherwise.
+        A session token (see get_session_user) if authentication is
+        successful, None otherwise.
     """
-    os.makedirs(DATABASE_DIR, exist_ok=True)
-    hashed_pw_attempt = hash_password(password)
     try:
-        with sqlite3.connect(USER_DB_PATH) as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT password_hash FROM users WHERE username = ?", (username,))
-            row = cursor.fetchone()
-        
-        if row and row[0] == hashed_pw_attempt:
-            # Ensure the user's deck database exists
-            user_deck_db_path = os.path.join(DATABASE_DIR, f"{username}_decks.db")
-            if not os.path.exists(user_deck_db_path):
-                print(f"Error: Deck database for user '{username}' not found.")
-                return False
-            return True
-        return False
+        stored_hash = _get_password_hash(username, database_dir)
+        if stored_hash is None:
+            return None
+
+        cached = _credentials.get(username)
+        if (cached and cached[0] == stored_hash and cached[2] > time.monotonic()
+                and hmac.compare_digest(cached[1], _password_mac(password))):
+            return _start_session(username)
+
+        if not verify_password(password, stored_hash):
+            return None
+        if needs_rehash(stored_hash):
+            stored_hash = hash_password(password)
+            with _pool_lock:
+                conn = _connection(database_dir)
+                with conn:
+                    conn.execute("UPDATE users SET password_hash = ? WHERE username = ?", (stored_hash, username))
+        _credentials[username] = (stored_hash, _password_mac(password), time.monotonic() + CREDENTIAL_CACHE_SECONDS)
+        return _start_session(username)
     except sqlite3.Error as e:
         print(f"Database error during authentication: {e}")
-        return False
\ No newline at end of file
+        return None
+
+
+def get_session_user(token: str | None) -> str | None:
+    """The username a session token was issued to, or None if it is unknown or expired."""
+    session = _sessions.get(token)
+    if session is None:
+        return None
+    if session[1] <= time.monotonic():
+        _sessions.pop(token, None)
+        return None
+    return session[0]
+
+
+def end_session(token: str | None):
+    """Forgets a session token (the user's cached credentials stay, for a quick login back)."""
+    _sessions.pop(token, None)
@@ -1,24 +1,36 @@
 # App/page_handlers/card_display_ui.py
-from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QFrame # type: ignore
+import html
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QFrame, QCheckBox # type: ignore
+from PyQt6.QtCore import Qt # type: ignore
 import deck_manager
+from utils import card_render
 
-def create_card_widget(card_data: dict, edit_callback, delete_callback) -> QWidget:
+def create_card_widget(card_data: dict, edit_callback, delete_callback,
+                       select_callback=None, selected: bool = False, tags=()) -> QWidget:
     """
     Creates a widget to display a single card with Edit and Delete buttons.
     card_data is a dict like {"id": ..., "front": ..., "back": ...}
+    If select_callback is given, a checkbox is added; it is called as
+    select_callback(card_id, checked) when toggled.
     """
     card_widget = QFrame()
     card_widget.setFrameShape(QFrame.Shape.StyledPanel)
 
     main_layout = QVBoxLayout(card_widget)
 
-    front_label = QLabel(f"<b>Front:</b> {card_data.get('front', 'N/A')}")
+    front_label = QLabel(f"<b>Front:</b>{card_render.render(card_data.get('front') or 'N/A')}")
+    front_label.setTextFormat(Qt.TextFormat.RichText)
     front_label.setWordWrap(True)
-    back_label = QLabel(f"<b>Back:</b> {card_data.get('back', 'N/A')}")
+    back_label = QLabel(f"<b>Back:</b>{card_render.render(card_data.get('back') or 'N/A')}")
+    back_label.setTextFormat(Qt.TextFormat.RichText)
     back_label.setWordWrap(True)
 
     main_layout.addWidget(front_label)
     main_layout.addWidget(back_label)
+    if tags:
+        tags_label = QLabel(f"<i>Tags:</i> {html.escape(' '.join(tags))}")
+        tags_label.setWordWrap(True)
+        main_layout.addWidget(tags_label)
 
     # Buttons layout
     buttons_layout = QHBoxLayout()
@@ -29,6 +41,11 @@ def create_card_widget(card_data: dict, edit_callback, delete_callback) -> QWidg
     edit_button.clicked.connect(lambda checked=False, c_id=card_id, c_front=card_data.get('front'), c_back=card_data.get('back'): edit_callback(c_id, c_front, c_back))
     delete_button.clicked.connect(lambda checked=False, c_id=card_id: delete_callback(c_id))
 
+    if select_callback is not None:
+        select_checkbox = QCheckBox("Select")
+        select_checkbox.setChecked(selected)
+        select_checkbox.toggled.connect(lambda checked, c_id=card_id: select_callback(c_id, checked))
+        buttons_layout.addWidget(select_checkbox)
     buttons_layout.addStretch()
     buttons_layout.addWidget(edit_button)
     buttons_layout.addWidget(delete_button)
@@ -42,10 +59,13 @@ def populate_card_list(
     deck_id: int,
     edit_card_callback,
     delete_card_callback,
-    user_deck_db_path: str  # Pass the user's deck database path
+    user_deck_db_path: str,  # Pass the user's deck database path
+    select_card_callback=None,
+    selected_card_ids=None
 ):
     """
     Clears and populates the card list layout for the given deck_id.
+    Returns the ids of the cards shown.
     """
     while card_list_layout.count():
         child = card_list_layout.takeAt(0)
@@ -54,10 +74,14 @@ def populate_card_list(
             
     cards = deck_manager.get_cards_for_deck(user_deck_db_path, deck_id)  # Fetch cards from the user's database
     if cards:
+        tags_by_card = deck_manager.get_tags_for_deck(user_deck_db_path, deck_id)
         for card_data in cards:
-            widget = create_card_widget(card_data, edit_card_callback, delete_card_callback)
+            widget = create_card_widget(card_data, edit_card_callback, delete_card_callback,
+                                        select_card_callback, card_data["id"] in (selected_card_ids or ()),
+                                        tags_by_card.get(card_data["id"], ()))
             card_list_layout.addWidget(widget)
     else:
         no_cards_label = QLabel("This deck has no cards yet. Click 'Add New Card' to create some!")
         no_cards_label.setStyleSheet("font-style: italic;")
-        card_list_layout.addWidget(no_cards_label)
\ No newline at end of file
+        card_list_layout.addWidget(no_cards_label)
+    return [card_data["id"] for card_data in cards]
\ No newline at end of file
@@ -2,7 +2,7 @@
 from PyQt6.QtWidgets import QWidget, QVBoxLayout, QLabel, QPushButton, QStackedWidget, QProgressBar # type: ignore
 import deck_manager
 
-def create_deck_widget(deck_id: int, deck_name: str, stats: dict, open_deck_callback) -> QWidget:
+def create_deck_widget(deck_id: int, deck_name: str, stats: dict, open_deck_callback, due_today: int = 0) -> QWidget:
     """
     Creates a widget to display a single deck with an open button.
     """
@@ -15,7 +15,7 @@ def create_deck_widget(deck_id: int, deck_name: str, stats: dict, open_deck_call
     total_cards = stats.get('total_cards', 0)
     finished_cards = stats.get('finished_cards', 0)
 
-    stats_label = QLabel(f"Progress: {finished_cards} / {total_cards} cards learned")
+    stats_label = QLabel(f"Progress: {finished_cards} / {total_cards} cards learned · {due_today} due today")
     stats_label.setStyleSheet("font-size: 12px;")
 
     progress_bar = QProgressBar()
@@ -55,13 +55,15 @@ def populate_decks_list(
         if list_stacked_widget and list_page_widget:
             list_stacked_widget.setCurrentWidget(list_page_widget)
         
+        due_counts = deck_manager.get_due_counts(user_deck_db_path)
         for deck_item in decks_data:
             deck_id = deck_item["id"]
             deck_name = deck_item["name"]
             
             deck_stats = deck_manager.get_deck_statistics(user_deck_db_path, deck_id)
             
-            deck_widget_item = create_deck_widget(deck_id, deck_name, deck_stats, open_deck_callback)
+            deck_widget_item = create_deck_widget(deck_id, deck_name, deck_stats, open_deck_callback,
+                                                   due_counts.get(deck_id, 0))
             deck_list_layout.addWidget(deck_widget_item)
     else:
         if list_stacked_widget and no_decks_page_widget:
@@ -0,0 +1,128 @@
+# App/read_cache.py
+"""
+Read-through cache for deck_manager queries that the UI repeats on every
+page visit (deck lists, deck and global statistics, tag lists).
+
+Entries are keyed by (function, database path, arguments, keyword
+arguments) and validated
+against two things:
+
+- a per-database write generation, bumped by every deck_manager write
+  function (see `invalidates`), so a write in this process makes every
+  cached read of that database stale at once;
+- the database file's size and modification time (and its -wal file's),
+  which catches writes made by other processes, e.g. `cli.py sync`.
+
+The cache is an LRU bounded to MAX_ENTRIES. Cached values are shared:
+callers must not modify what they get back.
+"""
+import functools
+import os
+import threading
+import time
+from collections import OrderedDict
+
+MAX_ENTRIES = 256
+
+_lock = threading.Lock()
+_entries = OrderedDict()  # key -> (generation, file_stamp, expires_at, value)
+_generations = {}         # database path -> write generation
+_stats = {"hits": 0, "misses": 0, "stale": 0, "evictions": 0}
+
+
+def _db_key(user_deck_db_path: str) -> str:
+    return os.path.abspath(user_deck_db_path)
+
+
+def _file_stamp(db_key: str) -> tuple:
+    stamp = []
+    for path in (db_key, db_key + "-wal"):
+        try:
+            st = os.stat(path)
+            stamp.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            stamp.append(None)
+    return tuple(stamp)
+
+
+def get_generation(user_deck_db_path: str) -> int:
+    with _lock:
+        return _generations.get(_db_key(user_deck_db_path), 0)
+
+
+def bump_generation(user_deck_db_path: str) -> None:
+    """Marks every cached read of this database as stale."""
+    db_key = _db_key(user_deck_db_path)
+    with _lock:
+        _generations[db_key] = _generations.get(db_key, 0) + 1
+
+
+def cached(ttl: float | None = None):
+    """
+    Decorator for read functions whose first argument is the user's deck database path.
+
+    Args:
+        ttl: Optional lifetime in seconds, for results that also depend on the
+            clock (e.g. counts of cards due "now").
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(user_deck_db_path, *args, **kwargs):
+            db_key = _db_key(user_deck_db_path)
+            key = (func.__name__, db_key, args, tuple(sorted(kwargs.items())))
+            stamp = _file_stamp(db_key)
+            now = time.monotonic()
+            with _lock:
+                generation = _generations.get(db_key, 0)
+                entry = _entries.get(key)
+                if entry is not None:
+                    if entry[0] == generation and entry[1] == stamp and (entry[2] is None or now < entry[2]):
+                        _entries.move_to_end(key)
+                        _stats["hits"] += 1
+                        return entry[3]
+                    del _entries[key]
+                    _stats["stale"] += 1
+                _stats["misses"] += 1
+
+            value = func(user_deck_db_path, *args, **kwargs)
+
+            with _lock:
+                # Only store it if no write happened while we were reading
+                if _generations.get(db_key, 0) == generation and _file_stamp(db_key) == stamp:
+                    _entries[key] = (generation, stamp, now + ttl if ttl is not None else None, value)
+                    _entries.move_to_end(key)
+                    while len(_entries) > MAX_ENTRIES:
+                        _entries.popitem(last=False)
+                        _stats["evictions"] += 1
+            return value
+        return wrapper
+    return decorator
+
+
+def invalidates(func):
+    """Decorator for write functions whose first argument is the user's deck database path."""
+    @functools.wraps(func)
+    def wrapper(user_deck_db_path, *args, **kwargs):
+        try:
+            return func(user_deck_db_path, *args, **kwargs)
+        finally:
+            bump_generation(user_deck_db_path)
+    return wrapper
+
+
+def cache_stats() -> dict:
+    """Returns hit/miss/stale/eviction counters plus the current entry count, for diagnostics."""
+    with _lock:
+        stats = dict(_stats)
+        stats["entries"] = len(_entries)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+    return stats
+
+
+def clear_cache() -> None:
+    """Drops every entry and resets the counters."""
+    with _lock:
+        _entries.clear()
+        for name in _stats:
+            _stats[name] = 0
@@ -0,0 +1,138 @@
+# App/reports.py
+"""
+Statistics across every learner: one row per user listed in user.db plus
+totals, for admins.
+
+Each deck database is opened read-only (mode=ro URI) by a worker in a
+process pool, so the report never takes a write lock on a learner's data
+and the per-file work (opening, scanning cards and review_log) spreads
+over all cores.
+"""
+import multiprocessing
+import os
+import sqlite3
+from datetime import datetime, timedelta
+
+import db_connection
+from utils.srs_logic import PASSING_QUALITY
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+DATABASE_DIR = os.path.join(APP_DIR, "database")
+FINISHED_INTERVAL_THRESHOLD = 21   # same definition of "learned" as deck_manager
+RETENTION_WINDOW_DAYS = 30
+CHUNKS_PER_WORKER = 8              # files are handed out in chunks to keep the pool busy without much IPC
+
+STAT_FIELDS = ("decks", "cards", "learned", "due_today", "reviews", "passed")
+
+
+def list_user_databases(database_dir: str = DATABASE_DIR) -> list:
+    """
+    Lists (username, deck_db_path) for every user in user.db whose deck
+    database exists.
+
+    Raises:
+        sqlite3.Error: If user.db can't be read.
+    """
+    conn = db_connection.connect_read_only(os.path.join(database_dir, "user.db"))
+    try:
+        usernames = [row[0] for row in conn.execute("SELECT username FROM users ORDER BY username")]
+    finally:
+        conn.close()
+    users = []
+    for username in usernames:
+        db_path = os.path.join(database_dir, f"{username}_decks.db")
+        if os.path.exists(db_path):
+            users.append((username, db_path))
+    return users
+
+
+def collect_user_stats(username: str, user_deck_db_path: str, due_before: str, reviewed_since: str) -> dict:
+    """
+    Reads one user's numbers. Runs in a worker process.
+
+    Args:
+        due_before: Cards due before this time (or never reviewed) count as due.
+        reviewed_since: Reviews from this time on count towards retention.
+
+    Returns:
+        A dict with 'user' and the STAT_FIELDS counts, or with 'user' and
+        'error' if the database couldn't be read.
+    """
+    stats = {"user": username}
+    try:
+        conn = db_connection.connect_read_only(user_deck_db_path)
+        try:
+            cursor = conn.cursor()
+            stats["decks"] = cursor.execute("SELECT COUNT(*) FROM decks").fetchone()[0]
+            cards, learned, due = cursor.execute("""
+                SELECT COUNT(*), COALESCE(SUM(interval >= ?), 0),
+                       COALESCE(SUM(due_date IS NULL OR due_date < ?), 0)
+                FROM cards
+            """, (FINISHED_INTERVAL_THRESHOLD, due_before)).fetchone()
+            stats.update(cards=cards, learned=learned, due_today=due, reviews=0, passed=0)
+            has_review_log = cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'review_log'").fetchone()
+            if has_review_log:
+                reviews, passed = cursor.execute("""
+                    SELECT COUNT(*), COALESCE(SUM(quality >= ?), 0) FROM review_log WHERE reviewed_at >= ?
+                """, (PASSING_QUALITY, reviewed_since)).fetchone()
+                stats.update(reviews=reviews, passed=passed)
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        return {"user": username, "error": str(e)}
+    return stats
+
+
+def _collect(args: tuple) -> dict:
+    return collect_user_stats(*args)
+
+
+def retention(stats: dict) -> float | None:
+    """Share of recent reviews that passed, or None without reviews."""
+    return stats["passed"] / stats["reviews"] if stats.get("reviews") else None
+
+
+def build_report(database_dir: str = DATABASE_DIR, workers: int | None = None,
+                 retention_days: int = RETENTION_WINDOW_DAYS, users: list | None = None) -> dict:
+    """
+    Collects every user's statistics in parallel and totals them.
+
+    Args:
+        workers: Worker processes (default: one per core). 1 runs in this process.
+        retention_days: How far back reviews count towards retention.
+        users: (username, db_path) pairs; defaults to list_user_databases(database_dir).
+
+    Returns:
+        A dict with 'users' (per-user stats, by username), 'totals' (the
+        STAT_FIELDS summed over readable databases, plus 'users'),
+        'errors' (per-user dicts with 'error'), and 'seconds'.
+
+    Raises:
+        sqlite3.Error: If user.db can't be read.
+    """
+    start = datetime.now()
+    if users is None:
+        users = list_user_databases(database_dir)
+    due_before = (start + timedelta(days=1)).strftime("%Y-%m-%d")
+    reviewed_since = (start - timedelta(days=retention_days)).strftime("%Y-%m-%d %H:%M:%S")
+    jobs = [(username, db_path, due_before, reviewed_since) for username, db_path in users]
+
+    workers = workers or os.cpu_count() or 1
+    workers = max(1, min(workers, len(jobs)))
+    if workers == 1:
+        results = [_collect(job) for job in jobs]
+    else:
+        chunksize = max(1, len(jobs) // (workers * CHUNKS_PER_WORKER))
+        with multiprocessing.Pool(workers) as pool:
+            results = list(pool.imap_unordered(_collect, jobs, chunksize))
+
+    per_user = sorted((r for r in results if "error" not in r), key=lambda r: r["user"])
+    totals = {field: sum(r[field] for r in per_user) for field in STAT_FIELDS}
+    totals["users"] = len(per_user)
+    return {
+        "users": per_user,
+        "totals": totals,
+        "errors": sorted((r for r in results if "error" in r), key=lambda r: r["user"]),
+        "seconds": (datetime.now() - start).total_seconds(),
+    }
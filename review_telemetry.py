@@ -0,0 +1,225 @@
+# App/review_telemetry.py
+"""
+Review session telemetry: how long each card stayed on screen before
+"Show Answer" (think time) and after it (answer time), and what that adds
+up to per session.
+
+While a session runs, SessionTimer writes each graded card into
+preallocated arrays used as a ring buffer, timed with the monotonic
+clock; nothing is allocated or written to the database per card. The
+buffer is flushed to review_sessions/review_timings in one transaction
+when the session ends, or earlier if it fills up.
+"""
+import sqlite3
+import time
+from array import array
+from datetime import datetime, timedelta
+
+import db_connection
+
+BUFFER_CAPACITY = 512          # cards held between flushes
+MAX_CARD_MS = 120_000          # longer than this on one card counts as a break, not study time
+THROUGHPUT_WINDOW_DAYS = 7
+
+
+class SessionTimer:
+    """
+    Times the cards of one review session.
+
+    Call card_shown() when a card's front is displayed, answer_shown() when
+    its back is, and card_graded() when it is graded. Each of them only
+    reads the clock and stores a few integers.
+    """
+    __slots__ = ("deck_id", "session_id", "started_at", "cards", "think_ms", "answer_ms", "active_ms", "dropped",
+                 "_capacity", "_head", "_pending", "_start_ns", "_shown_ns", "_answer_ns",
+                 "_card_ids", "_qualities", "_shown_ms", "_think_ms", "_answer_ms")
+
+    def __init__(self, deck_id: int | None, capacity: int = BUFFER_CAPACITY):
+        self.deck_id = deck_id
+        self.session_id = None   # set by the first save_session
+        self.started_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        # Running totals over the whole session, flushed or not
+        self.cards = self.think_ms = self.answer_ms = self.active_ms = 0
+        self.dropped = 0         # timings overwritten before they were flushed
+        self._capacity = capacity
+        self._head = 0           # next slot to write
+        self._pending = 0        # slots written since the last flush
+        self._start_ns = time.monotonic_ns()
+        self._shown_ns = self._answer_ns = None
+        self._card_ids = array("q", bytes(8 * capacity))
+        self._qualities = array("b", bytes(capacity))
+        self._shown_ms = array("q", bytes(8 * capacity))
+        self._think_ms = array("q", bytes(8 * capacity))
+        self._answer_ms = array("q", bytes(8 * capacity))
+
+    def card_shown(self):
+        self._shown_ns = time.monotonic_ns()
+        self._answer_ns = None
+
+    def answer_shown(self):
+        if self._shown_ns is not None and self._answer_ns is None:
+            self._answer_ns = time.monotonic_ns()
+
+    def card_graded(self, card_id: int, quality: int) -> bool:
+        """
+        Records the current card.
+
+        Returns:
+            True once the buffer is full; flush it (save_session) before the
+            next card or the oldest timings are overwritten.
+        """
+        now = time.monotonic_ns()
+        shown = self._shown_ns
+        if shown is None:
+            return False
+        answer = self._answer_ns or now
+        think_ms = (answer - shown) // 1_000_000
+        answer_ms = (now - answer) // 1_000_000
+        i = self._head
+        self._card_ids[i] = card_id
+        self._qualities[i] = quality
+        self._shown_ms[i] = (shown - self._start_ns) // 1_000_000
+        self._think_ms[i] = think_ms
+        self._answer_ms[i] = answer_ms
+        self._head = i + 1 if i + 1 < self._capacity else 0
+        if self._pending < self._capacity:
+            self._pending += 1
+        else:
+            self.dropped += 1
+        self.cards += 1
+        self.think_ms += think_ms
+        self.answer_ms += answer_ms
+        self.active_ms += min(think_ms + answer_ms, MAX_CARD_MS)
+        self._shown_ns = self._answer_ns = None
+        return self._pending == self._capacity
+
+    def pending(self) -> list:
+        """The unflushed timings, oldest first, as (card_id, quality, shown_ms, think_ms, answer_ms) tuples."""
+        start = self._head - self._pending
+        slots = [(start + n) % self._capacity for n in range(self._pending)]
+        return [(self._card_ids[i], self._qualities[i], self._shown_ms[i], self._think_ms[i], self._answer_ms[i])
+                for i in slots]
+
+    def mark_flushed(self, count: int):
+        self._pending -= min(count, self._pending)
+
+    def summary(self) -> dict:
+        """Totals so far: cards, elapsed and active seconds, cards per active minute, mean think seconds."""
+        elapsed = (time.monotonic_ns() - self._start_ns) / 1e9
+        return {
+            "cards": self.cards,
+            "elapsed_seconds": elapsed,
+            "active_seconds": self.active_ms / 1000,
+            "cards_per_minute": self.cards * 60_000 / self.active_ms if self.active_ms else 0.0,
+            "mean_think_seconds": self.think_ms / self.cards / 1000 if self.cards else 0.0,
+        }
+
+
+def save_session(user_deck_db_path: str, timer: SessionTimer) -> bool:
+    """
+    Writes a session's totals and its unflushed timings in one transaction.
+    Can be called repeatedly for the same session; each call appends the
+    timings recorded since the previous one.
+
+    Returns:
+        True if saved (or there was nothing to save), False on a database error.
+    """
+    if not timer.cards:
+        return True
+    rows = timer.pending()
+    ended_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    totals = (ended_at, timer.cards, timer.think_ms, timer.answer_ms, timer.active_ms)
+    try:
+        with db_connection.connect_for_write(user_deck_db_path) as conn:
+            cursor = conn.cursor()
+            if timer.session_id is None:
+                cursor.execute("""
+                    INSERT INTO review_sessions (deck_id, started_at, ended_at, cards, think_ms, answer_ms, active_ms)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, (timer.deck_id, timer.started_at) + totals)
+                session_id = cursor.lastrowid
+            else:
+                session_id = timer.session_id
+                cursor.execute("""
+                    UPDATE review_sessions SET ended_at = ?, cards = ?, think_ms = ?, answer_ms = ?, active_ms = ?
+                    WHERE id = ?
+                """, totals + (session_id,))
+            cursor.executemany("""
+                INSERT INTO review_timings (session_id, card_id, quality, shown_ms, think_ms, answer_ms)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, ((session_id,) + row for row in rows))
+            conn.commit()
+    except sqlite3.Error as e:
+        print(f"Database Error: Could not save review session telemetry: {e}")
+        return False
+    timer.session_id = session_id
+    timer.mark_flushed(len(rows))
+    return True
+
+
+def get_session_summaries(user_deck_db_path: str, limit: int = 10) -> list:
+    """
+    The most recent sessions, newest first.
+
+    Returns:
+        A list of dicts with 'id', 'deck_name' (None for sessions over
+        several decks or a deleted deck), 'started_at', 'ended_at', 'cards',
+        'active_seconds', 'cards_per_minute' and 'median_think_seconds'.
+    """
+    sessions = []
+    try:
+        with db_connection.connect(user_deck_db_path) as conn:
+            for row in conn.execute("""
+                WITH recent AS (
+                    SELECT * FROM review_sessions ORDER BY started_at DESC, id DESC LIMIT ?
+                ), ranked AS (
+                    SELECT session_id, think_ms,
+                           ROW_NUMBER() OVER (PARTITION BY session_id ORDER BY think_ms) AS n,
+                           COUNT(*) OVER (PARTITION BY session_id) AS total
+                    FROM review_timings WHERE session_id IN (SELECT id FROM recent)
+                )
+                SELECT s.id, d.name, s.started_at, s.ended_at, s.cards, s.active_ms,
+                       (SELECT think_ms FROM ranked WHERE ranked.session_id = s.id AND n = total / 2 + 1)
+                FROM recent s LEFT JOIN decks d ON d.id = s.deck_id
+                ORDER BY s.started_at DESC, s.id DESC
+            """, (limit,)):
+                session_id, deck_name, started_at, ended_at, cards, active_ms, median_think_ms = row
+                sessions.append({
+                    "id": session_id, "deck_name": deck_name, "started_at": started_at, "ended_at": ended_at,
+                    "cards": cards, "active_seconds": active_ms / 1000,
+                    "cards_per_minute": cards * 60_000 / active_ms if active_ms else 0.0,
+                    "median_think_seconds": (median_think_ms or 0) / 1000,
+                })
+    except sqlite3.Error as e:
+        print(f"Database Error: Could not get review sessions: {e}")
+    return sessions
+
+
+def get_throughput(user_deck_db_path: str, days: int = THROUGHPUT_WINDOW_DAYS) -> dict:
+    """
+    Rolling totals over the sessions started in the last `days` days.
+
+    Returns:
+        A dict with 'sessions', 'cards', 'active_minutes', 'cards_per_minute',
+        'mean_think_seconds' and 'mean_answer_seconds' (zeros without sessions).
+    """
+    since = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+    throughput = {"sessions": 0, "cards": 0, "active_minutes": 0.0, "cards_per_minute": 0.0,
+                  "mean_think_seconds": 0.0, "mean_answer_seconds": 0.0}
+    try:
+        with db_connection.connect(user_deck_db_path) as conn:
+            sessions, cards, active_ms, think_ms, answer_ms = conn.execute("""
+                SELECT COUNT(*), COALESCE(SUM(cards), 0), COALESCE(SUM(active_ms), 0),
+                       COALESCE(SUM(think_ms), 0), COALESCE(SUM(answer_ms), 0)
+                FROM review_sessions WHERE started_at >= ?
+            """, (since,)).fetchone()
+    except sqlite3.Error as e:
+        print(f"Database Error: Could not get review throughput: {e}")
+        return throughput
+    throughput.update(sessions=sessions, cards=cards, active_minutes=active_ms / 60_000)
+    if active_ms:
+        throughput["cards_per_minute"] = cards * 60_000 / active_ms
+    if cards:
+        throughput["mean_think_seconds"] = think_ms / cards / 1000
+        throughput["mean_answer_seconds"] = answer_ms / cards / 1000
+    return throughput
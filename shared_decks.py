@@ -0,0 +1,148 @@
+# App/shared_decks.py
+"""
+The shared deck library: card content published once for every user.
+
+When many users study the same course, each importing it would store
+every front/back string once per user. Instead the course is published
+into the library (database/shared_decks.db), and a user who adds it gets
+a local deck whose cards carry only their scheduling state plus the id
+of the shared card (see deck_manager.add_shared_deck). Connections that
+read card text ATTACH the library read-only as `shared` and look each
+card up by the shared card's primary key.
+
+The library stays in rollback-journal mode, so read-only connections
+never need to write a -shm file next to it.
+"""
+import os
+import sqlite3
+
+import db_connection
+
+LIBRARY_FILENAME = "shared_decks.db"
+SCHEMA_NAME = "shared"
+PUBLISH_BATCH_SIZE = 1000
+
+SQL_CREATE_SHARED_TABLES = (
+    """CREATE TABLE IF NOT EXISTS shared_decks (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL UNIQUE
+    )""",
+    """CREATE TABLE IF NOT EXISTS shared_cards (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        deck_id INTEGER NOT NULL REFERENCES shared_decks(id),
+        front TEXT NOT NULL,
+        back TEXT NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_shared_cards_deck ON shared_cards(deck_id, id)",
+)
+
+
+def get_library_path(user_deck_db_path: str) -> str:
+    """The library next to a user's deck database (database/shared_decks.db)."""
+    return os.path.join(os.path.dirname(os.path.abspath(user_deck_db_path)), LIBRARY_FILENAME)
+
+
+def attach_library(conn: sqlite3.Connection, library_path: str) -> bool:
+    """
+    Attaches the library read-only to conn as `shared`.
+
+    conn must have been opened with uri=True. Without a library file an
+    empty in-memory one is attached instead, so queries joining
+    shared.shared_cards still run and simply find no shared content.
+
+    Returns:
+        True if the library file was attached.
+    """
+    if os.path.exists(library_path):
+        conn.execute(f"ATTACH DATABASE ? AS {SCHEMA_NAME}", (db_connection.read_only_uri(library_path),))
+        return True
+    conn.execute(f"ATTACH DATABASE ':memory:' AS {SCHEMA_NAME}")
+    for sql in SQL_CREATE_SHARED_TABLES:
+        conn.execute(sql.replace("IF NOT EXISTS ", f"IF NOT EXISTS {SCHEMA_NAME}.", 1))
+    return False
+
+
+def connect(user_deck_db_path: str, **kwargs) -> sqlite3.Connection:
+    """Opens a user's deck database with the library attached as `shared`."""
+    conn = db_connection.connect(user_deck_db_path, uri=True, **kwargs)
+    try:
+        attach_library(conn, get_library_path(user_deck_db_path))
+    except sqlite3.Error:
+        conn.close()
+        raise
+    return conn
+
+
+def publish_deck(library_path: str, deck_name: str, cards_data, progress=None) -> tuple:
+    """
+    Adds cards to a shared deck, creating the library and the deck if needed.
+
+    Publishing to an existing deck appends; users who already added the
+    deck pick the new cards up the next time they add it.
+
+    Args:
+        cards_data: An iterable of card dictionaries with 'front' and
+            'back' (e.g. from import_utils.open_deck_file). Scheduling,
+            tags and media are per user and are not published.
+        progress: Optional callable(cards_published), called after each batch.
+
+    Returns:
+        (shared_deck_id, cards_published).
+
+    Raises:
+        sqlite3.Error: If the library can't be written; nothing is published.
+    """
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(library_path)), exist_ok=True)
+        with db_connection.connect_for_write(library_path) as conn:
+            cursor = conn.cursor()
+            for sql in SQL_CREATE_SHARED_TABLES:
+                cursor.execute(sql)
+            row = cursor.execute("SELECT id FROM shared_decks WHERE name = ?", (deck_name,)).fetchone()
+            if row:
+                deck_id = row[0]
+            else:
+                cursor.execute("INSERT INTO shared_decks (name) VALUES (?)", (deck_name,))
+                deck_id = cursor.lastrowid
+
+            batch, published = [], 0
+            for card_item in cards_data:
+                if not (isinstance(card_item, dict) and "front" in card_item and "back" in card_item):
+                    print(f"Skipping invalid card data while publishing: {card_item}")
+                    continue
+                batch.append((deck_id, card_item["front"], card_item["back"]))
+                if len(batch) >= PUBLISH_BATCH_SIZE:
+                    cursor.executemany("INSERT INTO shared_cards (deck_id, front, back) VALUES (?, ?, ?)", batch)
+                    published += len(batch)
+                    batch.clear()
+                    if progress:
+                        progress(published)
+            if batch:
+                cursor.executemany("INSERT INTO shared_cards (deck_id, front, back) VALUES (?, ?, ?)", batch)
+                published += len(batch)
+            conn.commit()
+        return deck_id, published
+    except sqlite3.Error as e:
+        print(f"Database Error: Could not publish '{deck_name}' to {library_path}: {e}")
+        raise
+
+
+def list_shared_decks(library_path: str) -> list:
+    """
+    Lists the library's decks as {"id", "name", "card_count"} dicts, by name.
+    Returns an empty list if there is no library yet.
+    """
+    if not os.path.exists(library_path):
+        return []
+    try:
+        conn = db_connection.connect_read_only(library_path)
+        try:
+            return [{"id": deck_id, "name": name, "card_count": count} for deck_id, name, count in conn.execute("""
+                SELECT d.id, d.name, (SELECT COUNT(*) FROM shared_cards c WHERE c.deck_id = d.id)
+                FROM shared_decks d ORDER BY d.name
+            """)]
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        print(f"Database Error: Could not list the shared decks in {library_path}: {e}")
+        return []
@@ -0,0 +1,355 @@
+# App/sync_manager.py
+"""
+Incremental sync between two copies of a user's deck database.
+
+Each database numbers its own changes with a monotonically increasing
+change_seq (maintained by triggers, see deck_manager). For every peer it
+remembers the last change_seq it has already exchanged, so a sync only
+reads and ships rows changed since then: decks, cards (with their tags and
+media links), review_log rows and tombstones. Media files a card links to
+are copied into the other database's media store.
+
+Conflicts are resolved by last writer wins on updated_at. Ties are broken
+by comparing the row contents, so both sides always pick the same winner.
+A deletion wins over an edit that is not newer than it. A card's tags and
+media links travel with it, so the winning card brings its own set. Review
+history is merged: each side adds the reviews it doesn't have yet.
+
+Not synced: daily limits, fitted scheduler parameters, review session
+telemetry and the maintenance log, which stay per machine.
+"""
+import json
+import os
+import sqlite3
+from datetime import datetime
+from functools import partial
+
+import db_connection
+import deck_manager
+import media_store
+import read_cache
+
+DECK_FIELDS = ("name",)
+# shared_card_id refers to the shared library (see shared_decks), which is
+# expected to be the same on both machines. tags is a sorted list of names,
+# media a sorted list of [side, sha256, filename].
+CARD_FIELDS = ("deck_uuid", "front", "back", "due_date", "interval", "ease_factor", "repetitions", "shared_card_id",
+               "tags", "media")
+REVIEW_FIELDS = ("reviewed_at", "quality", "repetitions", "ease_factor", "interval", "was_new")
+
+
+def _device_id(cursor: sqlite3.Cursor) -> str:
+    return cursor.execute("SELECT value FROM sync_meta WHERE key = 'device_id'").fetchone()[0]
+
+
+def _current_seq(cursor: sqlite3.Cursor) -> int:
+    return cursor.execute("SELECT value FROM sync_meta WHERE key = 'change_seq'").fetchone()[0]
+
+
+def _sent_seq(cursor: sqlite3.Cursor, peer_device_id: str) -> int:
+    row = cursor.execute("SELECT sent_seq FROM sync_peers WHERE peer_device_id = ?", (peer_device_id,)).fetchone()
+    return row[0] if row else 0
+
+
+def _version_key(updated_at: int, fields: tuple) -> tuple:
+    """Total order used for conflict resolution: newest wins, contents break ties."""
+    return (updated_at, json.dumps(fields, default=str))
+
+
+def _card_tags(cursor: sqlite3.Cursor, card_id: int) -> list:
+    return [row[0] for row in cursor.execute("""
+        SELECT t.name FROM card_tags ct JOIN tags t ON t.id = ct.tag_id
+        WHERE ct.card_id = ? ORDER BY t.name COLLATE NOCASE""", (card_id,))]
+
+
+def _card_media(cursor: sqlite3.Cursor, card_id: int) -> list:
+    return [list(row) for row in cursor.execute("""
+        SELECT cm.side, cm.sha256, m.filename FROM card_media cm JOIN media m ON m.sha256 = cm.sha256
+        WHERE cm.card_id = ? ORDER BY cm.side, cm.sha256""", (card_id,))]
+
+
+def collect_changes(cursor: sqlite3.Cursor, since_seq: int) -> dict:
+    """
+    Reads every deck, card, review and tombstone changed after since_seq.
+
+    The change_seq indexes keep this proportional to the number of changes.
+    """
+    decks = [
+        {"uuid": uuid, "updated_at": updated_at, "name": name}
+        for uuid, updated_at, name in cursor.execute(
+            "SELECT uuid, updated_at, name FROM decks WHERE change_seq > ?", (since_seq,))
+    ]
+    cards = []
+    for card_id, *row in cursor.execute("""
+            SELECT c.id, c.uuid, c.updated_at, d.uuid, COALESCE(cc.front, ''), COALESCE(cc.back, ''), c.due_date,
+                   c.interval, c.ease_factor, c.repetitions, c.shared_card_id
+            FROM cards c JOIN decks d ON d.id = c.deck_id LEFT JOIN card_content cc ON cc.card_id = c.id
+            WHERE c.change_seq > ?""", (since_seq,)).fetchall():
+        card = dict(zip(("uuid", "updated_at") + CARD_FIELDS, row))
+        card["tags"] = _card_tags(cursor, card_id)
+        card["media"] = _card_media(cursor, card_id)
+        cards.append(card)
+    reviews = [
+        dict(zip(("card_uuid",) + REVIEW_FIELDS, row))
+        for row in cursor.execute("""
+            SELECT c.uuid, r.reviewed_at, r.quality, r.repetitions, r.ease_factor, r.interval, r.was_new
+            FROM review_log r JOIN cards c ON c.id = r.card_id
+            WHERE r.change_seq > ? ORDER BY r.id""", (since_seq,))
+    ]
+    tombstones = [
+        {"uuid": uuid, "kind": kind, "deleted_at": deleted_at}
+        for uuid, kind, deleted_at in cursor.execute(
+            "SELECT uuid, kind, deleted_at FROM tombstones WHERE change_seq > ?", (since_seq,))
+    ]
+    return {"decks": decks, "cards": cards, "reviews": reviews, "tombstones": tombstones}
+
+
+def _tombstone_time(cursor: sqlite3.Cursor, uuid: str) -> int | None:
+    row = cursor.execute("SELECT deleted_at FROM tombstones WHERE uuid = ?", (uuid,)).fetchone()
+    return row[0] if row else None
+
+
+def _suffixed_name(name: str, uuid: str) -> str:
+    return f"{name} ({uuid[:6]})"
+
+
+def _apply_deck(cursor: sqlite3.Cursor, deck: dict, stats: dict):
+    local = cursor.execute("SELECT id, updated_at, name FROM decks WHERE uuid = ?", (deck["uuid"],)).fetchone()
+    if local is None:
+        deleted_at = _tombstone_time(cursor, deck["uuid"])
+        if deleted_at is not None and deleted_at >= deck["updated_at"]:
+            return
+    elif _version_key(local[1], (local[2],)) >= _version_key(deck["updated_at"], (deck["name"],)):
+        return
+
+    name = deck["name"]
+    clash = cursor.execute("SELECT id, uuid FROM decks WHERE name = ? AND uuid <> ?", (name, deck["uuid"])).fetchone()
+    if clash:
+        # Two different decks with one name: the larger uuid takes a suffix, on both sides
+        if deck["uuid"] > clash[1]:
+            name = _suffixed_name(name, deck["uuid"])
+        else:
+            cursor.execute("UPDATE decks SET name = ? WHERE id = ?", (_suffixed_name(name, clash[1]), clash[0]))
+
+    if local is None:
+        cursor.execute("DELETE FROM tombstones WHERE uuid = ?", (deck["uuid"],))
+        cursor.execute("INSERT INTO decks (name, uuid, updated_at) VALUES (?, ?, ?)",
+                       (name, deck["uuid"], deck["updated_at"]))
+    else:
+        cursor.execute("UPDATE decks SET name = ?, updated_at = ? WHERE id = ?", (name, deck["updated_at"], local[0]))
+    stats["decks"] += 1
+
+
+def _replace_card_tags(cursor: sqlite3.Cursor, card_id: int, tag_names: list):
+    if _card_tags(cursor, card_id) == tag_names:
+        return
+    cursor.execute("DELETE FROM card_tags WHERE card_id = ?", (card_id,))
+    cursor.executemany("INSERT OR IGNORE INTO card_tags (tag_id, card_id) VALUES (?, ?)",
+                       ((tag_id, card_id) for tag_id in deck_manager._get_or_create_tag_ids(cursor, tag_names)))
+
+
+def _replace_card_media(cursor: sqlite3.Cursor, card_id: int, media: list, fetch_media):
+    """
+    Makes the card's media links match the incoming ones. A blob that is
+    neither known here nor obtainable through fetch_media is left unlinked.
+    """
+    local = _card_media(cursor, card_id)
+    if local == media:
+        return
+    wanted = {(side, sha256) for side, sha256, _ in media}
+    for side, sha256, _ in local:
+        if (side, sha256) not in wanted:
+            cursor.execute("DELETE FROM card_media WHERE card_id = ? AND side = ? AND sha256 = ?",
+                           (card_id, side, sha256))
+    for side, sha256, filename in media:
+        if not cursor.execute("SELECT 1 FROM media WHERE sha256 = ?", (sha256,)).fetchone():
+            size = fetch_media(sha256) if fetch_media else None
+            if size is None:
+                print(f"Sync Warning: Media '{filename}' ({sha256[:12]}) is not available; left unlinked.")
+                continue
+            media_store.register_media(cursor, sha256, filename, size)
+        media_store.link_media(cursor, card_id, sha256, side)
+
+
+def _apply_card(cursor: sqlite3.Cursor, card: dict, stats: dict, fetch_media=None):
+    deck_row = cursor.execute("SELECT id FROM decks WHERE uuid = ?", (card["deck_uuid"],)).fetchone()
+    if deck_row is None:
+        return  # the deck was deleted on this side and the deletion won
+    local = cursor.execute("""
+        SELECT c.id, c.updated_at, d.uuid, COALESCE(cc.front, ''), COALESCE(cc.back, ''), c.due_date, c.interval,
+               c.ease_factor, c.repetitions, c.shared_card_id
+        FROM cards c JOIN decks d ON d.id = c.deck_id LEFT JOIN card_content cc ON cc.card_id = c.id
+        WHERE c.uuid = ?""", (card["uuid"],)).fetchone()
+    incoming_fields = tuple(card[field] for field in CARD_FIELDS)
+    if local is None:
+        deleted_at = _tombstone_time(cursor, card["uuid"])
+        if deleted_at is not None and deleted_at >= card["updated_at"]:
+            return
+    else:
+        local_links = (_card_tags(cursor, local[0]), _card_media(cursor, local[0]))
+        if local[1] == card["updated_at"] and tuple(local[2:]) == incoming_fields[:-2] and \
+                local_links != (card["tags"], card["media"]):
+            # Same version of the card, tagged or given media on each side before
+            # links were synced (schema version 13): keep both sides' links
+            _replace_card_tags(cursor, local[0], local_links[0] + card["tags"])
+            _replace_card_media(cursor, local[0], local_links[1] + [m for m in card["media"] if m not in local_links[1]],
+                                fetch_media)
+            cursor.execute("UPDATE cards SET updated_at = ? WHERE id = ?", (card["updated_at"], local[0]))
+            stats["cards"] += 1
+            return
+        if _version_key(local[1], tuple(local[2:]) + local_links) >= _version_key(card["updated_at"], incoming_fields):
+            return
+
+    values = (deck_row[0], card["due_date"], card["interval"], card["ease_factor"], card["repetitions"],
+              card["shared_card_id"], card["updated_at"])
+    if local is None:
+        cursor.execute("DELETE FROM tombstones WHERE uuid = ?", (card["uuid"],))
+        cursor.execute("""
+            INSERT INTO cards (deck_id, due_date, interval, ease_factor, repetitions, shared_card_id, updated_at, uuid)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)""", values + (card["uuid"],))
+        card_id = cursor.lastrowid
+    else:
+        card_id = local[0]
+    # Text, tags and media first: their triggers stamp the card with the local
+    # time, which the UPDATEs below then replace with the incoming updated_at
+    if card["shared_card_id"] is None:
+        cursor.execute("""
+            INSERT INTO card_content (card_id, front, back) VALUES (?, ?, ?)
+            ON CONFLICT(card_id) DO UPDATE SET front = excluded.front, back = excluded.back
+            WHERE front IS NOT excluded.front OR back IS NOT excluded.back""", (card_id, card["front"], card["back"]))
+    _replace_card_tags(cursor, card_id, card["tags"])
+    _replace_card_media(cursor, card_id, card["media"], fetch_media)
+    if local is not None:
+        cursor.execute("""
+            UPDATE cards SET deck_id = ?, due_date = ?, interval = ?, ease_factor = ?, repetitions = ?,
+                             shared_card_id = ?, updated_at = ?
+            WHERE id = ?""", values + (card_id,))
+    else:
+        cursor.execute("UPDATE cards SET updated_at = ? WHERE id = ?", (card["updated_at"], card_id))
+    stats["cards"] += 1
+
+
+def _apply_review(cursor: sqlite3.Cursor, review: dict, stats: dict):
+    card = cursor.execute("SELECT id, deck_id FROM cards WHERE uuid = ?", (review["card_uuid"],)).fetchone()
+    if card is None:
+        return  # the card was deleted on this side
+    if cursor.execute("SELECT 1 FROM review_log WHERE card_id = ? AND reviewed_at = ? AND quality = ?",
+                      (card[0], review["reviewed_at"], review["quality"])).fetchone():
+        return  # already here, e.g. sent back after an earlier sync
+    cursor.execute("""
+        INSERT INTO review_log (card_id, deck_id, reviewed_at, quality, repetitions, ease_factor, interval, was_new)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)""", card + tuple(review[field] for field in REVIEW_FIELDS))
+    stats["reviews"] += 1
+
+
+def _apply_tombstone(cursor: sqlite3.Cursor, tombstone: dict, stats: dict):
+    table = "decks" if tombstone["kind"] == "deck" else "cards"
+    local = cursor.execute(f"SELECT id, updated_at FROM {table} WHERE uuid = ?", (tombstone["uuid"],)).fetchone()
+    if local is None or local[1] > tombstone["deleted_at"]:
+        return  # already gone, or edited here after the deletion
+    if table == "decks":
+        cursor.execute("DELETE FROM cards WHERE deck_id = ?", (local[0],))
+    cursor.execute(f"DELETE FROM {table} WHERE id = ?", (local[0],))
+    stats["deletions"] += 1
+
+
+def apply_changes(cursor: sqlite3.Cursor, changes: dict, fetch_media=None) -> dict:
+    """
+    Applies changes collected from the other database.
+
+    Args:
+        fetch_media: Optional callable(sha256) that copies a media file
+            from the other database into this one's store and returns its
+            size, or None if it has no such file.
+
+    Returns:
+        Counts of decks, cards, reviews and deletions actually applied.
+    """
+    stats = {"decks": 0, "cards": 0, "reviews": 0, "deletions": 0}
+    for deck in sorted(changes["decks"], key=lambda d: d["uuid"]):
+        _apply_deck(cursor, deck, stats)
+    for card in changes["cards"]:
+        _apply_card(cursor, card, stats, fetch_media)
+    for review in changes["reviews"]:
+        _apply_review(cursor, review, stats)
+    # Cards before decks, so a deleted deck's cards are removed explicitly
+    for tombstone in sorted(changes["tombstones"], key=lambda t: t["kind"] != "card"):
+        _apply_tombstone(cursor, tombstone, stats)
+    return stats
+
+
+def _copy_media(source_db_path: str, target_db_path: str, sha256: str) -> int | None:
+    """Copies one media file between the two databases' stores; returns its size, or None if the source lacks it."""
+    source = media_store.get_media_path(source_db_path, sha256)
+    if not os.path.exists(source):
+        return None
+    try:
+        return media_store.write_media_file(target_db_path, source)[1]
+    except OSError as e:
+        print(f"Sync Error: Could not copy media {sha256[:12]}: {e}")
+        return None
+
+
+def sync_databases(db_path_a: str, db_path_b: str) -> dict | None:
+    """
+    Exchanges the changes made since the last sync between two deck databases.
+
+    Both files are migrated to the current schema first. Both sides are
+    write-locked for the duration and the result is committed only if both
+    sides applied their changes.
+
+    Returns:
+        A dict with 'sent' and 'received' change counts (from db_path_a's
+        point of view) and what was applied on each side, or None on error.
+    """
+    for db_path in (db_path_a, db_path_b):
+        if not deck_manager.init_user_decks_database(db_path):
+            return None
+
+    conn_a = db_connection.connect(db_path_a, isolation_level=None)
+    conn_b = db_connection.connect(db_path_b, isolation_level=None)
+    try:
+        cur_a, cur_b = conn_a.cursor(), conn_b.cursor()
+        db_connection.begin_write(conn_a)
+        db_connection.begin_write(conn_b)
+        try:
+            device_a, device_b = _device_id(cur_a), _device_id(cur_b)
+            if device_a == device_b:
+                # A copied file still carries the original's identity; give the copy its own
+                cur_b.execute("UPDATE sync_meta SET value = lower(hex(randomblob(16))) WHERE key = 'device_id'")
+                device_b = _device_id(cur_b)
+
+            changes_a = collect_changes(cur_a, _sent_seq(cur_a, device_b))
+            changes_b = collect_changes(cur_b, _sent_seq(cur_b, device_a))
+            applied_to_b = apply_changes(cur_b, changes_a, partial(_copy_media, db_path_a, db_path_b))
+            applied_to_a = apply_changes(cur_a, changes_b, partial(_copy_media, db_path_b, db_path_a))
+
+            # Everything either side holds now is known to the other one
+            now_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            for cursor, peer in ((cur_a, device_b), (cur_b, device_a)):
+                cursor.execute("""
+                    INSERT INTO sync_peers (peer_device_id, sent_seq, last_sync) VALUES (?, ?, ?)
+                    ON CONFLICT(peer_device_id) DO UPDATE SET sent_seq = excluded.sent_seq, last_sync = excluded.last_sync
+                """, (peer, _current_seq(cursor), now_str))
+            cur_a.execute("COMMIT")
+            cur_b.execute("COMMIT")
+        except Exception:
+            if conn_a.in_transaction:
+                cur_a.execute("ROLLBACK")
+            if conn_b.in_transaction:
+                cur_b.execute("ROLLBACK")
+            raise
+    except sqlite3.Error as e:
+        print(f"Sync Error: Could not sync {db_path_a} with {db_path_b}: {e}")
+        return None
+    finally:
+        conn_a.close()
+        conn_b.close()
+        read_cache.bump_generation(db_path_a)
+        read_cache.bump_generation(db_path_b)
+
+    def count(changes):
+        return sum(len(rows) for rows in changes.values())
+
+    return {"sent": count(changes_a), "received": count(changes_b),
+            "applied_remote": applied_to_b, "applied_local": applied_to_a}
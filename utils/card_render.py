@@ -0,0 +1,319 @@
+# App/utils/card_render.py
+"""
+Turns card text into the rich text the review page and card list show.
+
+Card text may use:
+- a Markdown subset: **bold**, *italic*, ~~strike~~, `code`, ```fenced
+  code```, [links](https://...), # headings, - bullet and 1. numbered
+  lists, blank lines between paragraphs;
+- a whitelist of plain HTML tags without attributes (ALLOWED_TAGS);
+- LaTeX-lite math between $...$ (inline) or $$...$$ (centred): ^ and _
+  scripts, \\frac, \\sqrt, \\text and the symbols in MATH_SYMBOLS.
+
+Everything else is escaped, so card text can't inject other markup
+(images, links to local files, styles) into the UI.
+
+Rendered text is kept in an LRU keyed by the SHA-1 of the source,
+bounded to MAX_ENTRIES, so showing a card again, or one that was
+pre-rendered while the previous card was on screen, costs one hash.
+"""
+import hashlib
+import html
+import re
+import threading
+from collections import OrderedDict
+
+MAX_ENTRIES = 512
+
+ALLOWED_TAGS = ("b", "i", "u", "s", "em", "strong", "sub", "sup", "small", "big",
+                "code", "pre", "br", "hr", "p", "ul", "ol", "li")
+LINK_SCHEMES = ("http://", "https://", "mailto:")
+
+MATH_SYMBOLS = {
+    "alpha": "α", "beta": "β", "gamma": "γ", "delta": "δ", "epsilon": "ε", "varepsilon": "ε", "zeta": "ζ",
+    "eta": "η", "theta": "θ", "iota": "ι", "kappa": "κ", "lambda": "λ", "mu": "μ", "nu": "ν", "xi": "ξ",
+    "pi": "π", "rho": "ρ", "sigma": "σ", "tau": "τ", "upsilon": "υ", "phi": "φ", "varphi": "φ", "chi": "χ",
+    "psi": "ψ", "omega": "ω", "Gamma": "Γ", "Delta": "Δ", "Theta": "Θ", "Lambda": "Λ", "Xi": "Ξ", "Pi": "Π",
+    "Sigma": "Σ", "Phi": "Φ", "Psi": "Ψ", "Omega": "Ω",
+    "times": "×", "cdot": "·", "div": "÷", "pm": "±", "mp": "∓", "le": "≤", "leq": "≤", "ge": "≥",
+    "geq": "≥", "neq": "≠", "ne": "≠", "approx": "≈", "equiv": "≡", "sim": "∼", "propto": "∝",
+    "infty": "∞", "to": "→", "rightarrow": "→", "leftarrow": "←", "Rightarrow": "⇒", "Leftarrow": "⇐",
+    "leftrightarrow": "↔", "iff": "⇔", "sum": "∑", "prod": "∏", "int": "∫", "oint": "∮", "partial": "∂",
+    "nabla": "∇", "in": "∈", "notin": "∉", "subset": "⊂", "subseteq": "⊆", "cup": "∪", "cap": "∩",
+    "emptyset": "∅", "forall": "∀", "exists": "∃", "neg": "¬", "land": "∧", "lor": "∨", "circ": "∘",
+    "degree": "°", "ldots": "…", "cdots": "⋯", "angle": "∠", "perp": "⊥", "parallel": "∥",
+    "{": "{", "}": "}", "$": "$", "%": "%", "#": "#", "&": "&amp;", "_": "_", "\\": "<br>",
+    ",": "&#8201;", ";": "&#8197;", " ": "&nbsp;", "quad": "&emsp;", "qquad": "&emsp;&emsp;",
+    "left": "", "right": "",
+}
+
+_FENCE_RE = re.compile(r"```[^\n]*\n?(.*?)```", re.DOTALL)
+_MATH_RE = re.compile(r"\$\$(.+?)\$\$|(?<![\\$])\$(?!\s)([^$\n]+?)(?<![\s\\])\$", re.DOTALL)
+_CODE_RE = re.compile(r"`([^`\n]+)`")
+_PLACEHOLDER_RE = re.compile("[\x00\x01](\\d+)[\x00\x01]")
+_BLOCK_PLACEHOLDER_RE = re.compile("\x01\\d+\x01")
+_LINK_PLACEHOLDER_RE = re.compile("\x02(\\d+)\x02")
+_ALLOWED_TAG_RE = re.compile(r"&lt;(/?)(" + "|".join(ALLOWED_TAGS) + r")\s*/?&gt;", re.IGNORECASE)
+_LINK_RE = re.compile(r"\[([^\]\n]+)\]\(([^)\s]+)\)")
+_INLINE_RULES = (
+    (re.compile(r"\*\*(?=\S)(.+?)(?<=\S)\*\*"), r"<b>\1</b>"),
+    (re.compile(r"(?<![*\w])\*(?=\S)(.+?)(?<=\S)\*(?![*\w])"), r"<i>\1</i>"),
+    (re.compile(r"~~(?=\S)(.+?)(?<=\S)~~"), r"<s>\1</s>"),
+)
+_HEADING_RE = re.compile(r"(#{1,3})\s+(.*)")
+_BULLET_RE = re.compile(r"[-*+]\s+(.*)")
+_NUMBERED_RE = re.compile(r"\d+[.)]\s+(.*)")
+_COMMAND_RE = re.compile(r"\\([A-Za-z]+|.)")
+
+_lock = threading.Lock()
+_entries = OrderedDict()  # SHA-1 of the source text -> rendered rich text
+_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+
+def _math_atom(src: str, i: int) -> tuple:
+    """Renders the atom at src[i]: a {group}, a \\command with its arguments, or one character."""
+    if src[i] == "{":
+        return _math_sequence(src, i + 1, "}")
+    if src[i] == "\\":
+        match = _COMMAND_RE.match(src, i)
+        if match is None:
+            return "\\", i + 1
+        name, i = match.group(1), match.end()
+        if name in MATH_SYMBOLS:
+            return MATH_SYMBOLS[name], i
+        if name in ("frac", "dfrac", "tfrac"):
+            numerator, i = _math_argument(src, i)
+            denominator, i = _math_argument(src, i)
+            return f"<sup>{numerator}</sup>&frasl;<sub>{denominator}</sub>", i
+        if name == "sqrt":
+            radicand, i = _math_argument(src, i)
+            return f'&radic;<span style="text-decoration: overline">{radicand}</span>', i
+        if name in ("text", "mathrm", "operatorname"):
+            text, i = _math_argument(src, i)
+            return f'<span style="font-style: normal">{text}</span>', i
+        if name in ("mathbf", "boldsymbol"):
+            text, i = _math_argument(src, i)
+            return f"<b>{text}</b>", i
+        if name in ("sin", "cos", "tan", "log", "ln", "exp", "lim", "max", "min", "det"):
+            return f'<span style="font-style: normal">{name}</span>', i
+        return html.escape("\\" + name), i
+    return html.escape(src[i]), i + 1
+
+
+def _math_argument(src: str, i: int) -> tuple:
+    """The argument of a command or script: the next atom, skipping spaces; empty at the end."""
+    while i < len(src) and src[i].isspace():
+        i += 1
+    if i >= len(src):
+        return "", i
+    return _math_atom(src, i)
+
+
+def _math_sequence(src: str, i: int, closing: str | None = None) -> tuple:
+    """Renders atoms from src[i] up to the closing brace (or the end); returns (html, index after it)."""
+    parts = []
+    while i < len(src) and src[i] != closing:
+        char = src[i]
+        if char in "^_":
+            script, i = _math_argument(src, i + 1)
+            tag = "sup" if char == "^" else "sub"
+            parts.append(f"<{tag}>{script}</{tag}>")
+        elif char.isspace():
+            if parts and parts[-1] != " ":
+                parts.append(" ")
+            i += 1
+        elif char == "}":  # unbalanced closing brace
+            parts.append("}")
+            i += 1
+        else:
+            atom, i = _math_atom(src, i)
+            parts.append(atom)
+    return "".join(parts).strip(), i + 1
+
+
+def render_math(src: str) -> str:
+    """Renders a LaTeX-lite formula (without the $ delimiters) as italic rich text."""
+    try:
+        body = _math_sequence(src, 0)[0]
+    except RecursionError:  # absurdly deep nesting: show the source
+        body = html.escape(src)
+    return f'<span style="font-family: serif; font-style: italic">{body}</span>'
+
+
+def _render_inline(text: str) -> str:
+    """Escapes text, re-allows the whitelisted tags and applies the inline Markdown rules."""
+    text = _ALLOWED_TAG_RE.sub(lambda m: f"<{m.group(1)}{m.group(2).lower()}>", html.escape(text, quote=True))
+
+    links = []
+
+    def link(match):
+        url = html.unescape(match.group(2))
+        if not url.lower().startswith(LINK_SCHEMES):
+            return match.group(0)
+        # Swapped for a placeholder so the inline rules only ever see the label, never the href
+        links.append(f'<a href="{html.escape(url, quote=True)}">{_apply_inline_rules(match.group(1))}</a>')
+        return f"\x02{len(links) - 1}\x02"
+
+    text = _apply_inline_rules(_LINK_RE.sub(link, text))
+    return _LINK_PLACEHOLDER_RE.sub(lambda m: links[int(m.group(1))], text) if links else text
+
+
+def _apply_inline_rules(text: str) -> str:
+    for pattern, replacement in _INLINE_RULES:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+def _render_blocks(text: str) -> str:
+    """Groups lines into headings, lists and paragraphs; single newlines become <br>."""
+    blocks, paragraph, list_tag, items = [], [], None, []
+
+    def close_paragraph():
+        if paragraph:
+            blocks.append("<p>" + "<br>".join(paragraph) + "</p>")
+            paragraph.clear()
+
+    def close_list():
+        nonlocal list_tag
+        if list_tag:
+            blocks.append(f"<{list_tag}>" + "".join(f"<li>{item}</li>" for item in items) + f"</{list_tag}>")
+            list_tag = None
+            items.clear()
+
+    for line in text.split("\n"):
+        stripped = line.strip()
+        heading = _HEADING_RE.fullmatch(stripped)
+        item = _BULLET_RE.fullmatch(stripped)
+        item_tag = "ul"
+        if item is None:
+            item, item_tag = _NUMBERED_RE.fullmatch(stripped), "ol"
+        if not stripped:
+            close_paragraph()
+            close_list()
+        elif _BLOCK_PLACEHOLDER_RE.fullmatch(stripped):
+            close_paragraph()
+            close_list()
+            blocks.append(stripped)
+        elif heading:
+            close_paragraph()
+            close_list()
+            level = len(heading.group(1)) + 2  # h3-h5 keep headings in proportion to card text
+            blocks.append(f"<h{level}>{_render_inline(heading.group(2))}</h{level}>")
+        elif item:
+            close_paragraph()
+            if list_tag != item_tag:
+                close_list()
+                list_tag = item_tag
+            items.append(_render_inline(item.group(1)))
+        else:
+            close_list()
+            paragraph.append(_render_inline(stripped))
+    close_paragraph()
+    close_list()
+    return "".join(blocks)
+
+
+def render_markup(text: str) -> str:
+    """
+    Renders card text as sanitized Qt rich text, without the cache.
+
+    Code and math are cut out first and swapped for placeholders, so
+    neither is touched by the Markdown and HTML handling. Block
+    placeholders (fenced code, $$ math) sit on a line of their own and
+    are emitted outside any paragraph.
+    """
+    protected = []
+
+    def protect(rendered: str, block: bool = False) -> str:
+        protected.append(rendered)
+        if block:
+            return f"\n\x01{len(protected) - 1}\x01\n"
+        return f"\x00{len(protected) - 1}\x00"
+
+    text = text.replace("\r\n", "\n").replace("\x00", "").replace("\x01", "").replace("\x02", "")
+    text = _FENCE_RE.sub(lambda m: protect(f"<pre>{html.escape(m.group(1).strip(chr(10)))}</pre>", True), text)
+
+    def math(match):
+        if match.group(1) is not None:
+            return protect(f'<p align="center">{render_math(match.group(1))}</p>', True)
+        return protect(render_math(match.group(2)))
+
+    text = _MATH_RE.sub(math, text)
+    text = _CODE_RE.sub(lambda m: protect(f"<code>{html.escape(m.group(1))}</code>"), text)
+    rendered = _render_blocks(text)
+    return _PLACEHOLDER_RE.sub(lambda m: protected[int(m.group(1))], rendered)
+
+
+def _key(text: str) -> bytes:
+    return hashlib.sha1(text.encode("utf-8", "surrogatepass")).digest()
+
+
+def render(text: str) -> str:
+    """Renders card text (see render_markup), through the LRU cache."""
+    if not text:
+        return ""
+    key = _key(text)
+    with _lock:
+        rendered = _entries.get(key)
+        if rendered is not None:
+            _entries.move_to_end(key)
+            _stats["hits"] += 1
+            return rendered
+        _stats["misses"] += 1
+    rendered = render_markup(text)
+    _store(key, rendered)
+    return rendered
+
+
+def _store(key: bytes, rendered: str):
+    with _lock:
+        _entries[key] = rendered
+        _entries.move_to_end(key)
+        while len(_entries) > MAX_ENTRIES:
+            _entries.popitem(last=False)
+            _stats["evictions"] += 1
+
+
+def prerender(texts) -> int:
+    """
+    Renders the texts that aren't cached yet, without counting them as
+    hits or misses.
+
+    Returns:
+        How many were rendered.
+    """
+    rendered = 0
+    for text in texts:
+        if not text:
+            continue
+        key = _key(text)
+        with _lock:
+            if key in _entries:
+                continue
+        _store(key, render_markup(text))
+        rendered += 1
+    return rendered
+
+
+def render_card(front: str, back: str | None = None) -> str:
+    """The review page's text for a card: the front, and the back once it is shown."""
+    text = f"<b>Front:</b>{render(front)}"
+    if back is not None:
+        text += f"<hr><b>Back:</b>{render(back)}"
+    return text
+
+
+def cache_stats() -> dict:
+    with _lock:
+        stats = dict(_stats)
+        stats["entries"] = len(_entries)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+    return stats
+
+
+def clear_cache():
+    with _lock:
+        _entries.clear()
+        for key in _stats:
+            _stats[key] = 0
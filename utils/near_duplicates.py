@@ -0,0 +1,292 @@
+# App/utils/near_duplicates.py
+"""
+Finds cards that are near-duplicates of each other (the same question with
+different punctuation, casing or a few words changed), across all decks.
+
+Each card's front and back are normalized (case-folded, markup and
+punctuation dropped) and cut into overlapping SHINGLE_SIZE-byte shingles.
+Two cards' similarity is the Jaccard similarity of their shingle sets,
+estimated from MinHash signatures of NUM_PERMUTATIONS hash functions.
+Locality-sensitive hashing splits each signature into BANDS bands; cards
+sharing a band land in the same bucket and become candidate pairs, and
+candidates whose estimated similarity reaches the threshold are joined
+into connected groups. Each group is then split around kept cards so that
+every card in a cluster is itself similar enough to the card kept, answer
+included. With BANDS x ROWS_PER_BAND = 16 x 4, a pair with Jaccard
+0.7 becomes a candidate with probability ~0.99, one with 0.3 with ~0.12.
+
+Signatures are computed with NumPy a batch of cards at a time, and
+candidates come from sorting each band's keys, so the work grows as
+n log n rather than n^2: a million cards take a few hundred MB and well
+under a minute. NumPy is only needed here; the app itself runs without it.
+"""
+import re
+import sqlite3
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+import deck_manager
+import shared_decks
+
+SHINGLE_SIZE = 5
+NUM_PERMUTATIONS = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+DEFAULT_THRESHOLD = 0.7
+BATCH_CARDS = 10_000          # cards hashed per NumPy batch
+VERIFY_BATCH_PAIRS = 1_000_000
+SEED = 20240611               # fixed, so the same collection always gives the same clusters
+
+_MARKUP = re.compile(r"<[^>]*>|&\w+;|[$*_`~#\[\]()\\]")
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def normalize_text(text: str) -> str:
+    """Case-folded words of a card side, without markup or punctuation, single-spaced."""
+    return _NON_WORD.sub(" ", _MARKUP.sub(" ", text or "").casefold()).strip()
+
+
+class _Hasher:
+    """The random hash functions, drawn once from SEED."""
+
+    def __init__(self):
+        rng = np.random.default_rng(SEED)
+        # Multiply-shift hashing: ((a * x + b) mod 2^64) >> 32 with a odd
+        self.a = rng.integers(1, 2 ** 63, NUM_PERMUTATIONS, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self.b = rng.integers(0, 2 ** 63, NUM_PERMUTATIONS, dtype=np.uint64)
+        self.band_multipliers = rng.integers(1, 2 ** 31, ROWS_PER_BAND, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+
+    def shingles(self, texts: list) -> tuple:
+        """
+        FNV-1a hashes of every SHINGLE_SIZE-byte window of each text, as one
+        flat uint32 array, with the offset where each text's shingles start.
+        Texts shorter than a shingle are padded, so every text has one.
+        """
+        encoded = [text.encode("utf-8").ljust(SHINGLE_SIZE, b"\0") for text in texts]
+        lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+        buffer = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        windows = lengths - SHINGLE_SIZE + 1
+        offsets = np.cumsum(windows) - windows
+        text_starts = np.cumsum(lengths) - lengths
+        positions = np.arange(windows.sum(), dtype=np.int64) + np.repeat(text_starts - offsets, windows)
+        hashes = np.full(positions.shape, 2166136261, dtype=np.uint32)
+        for j in range(SHINGLE_SIZE):
+            hashes ^= buffer[positions + j]
+            hashes *= np.uint32(16777619)
+        return hashes, offsets
+
+    def signatures(self, texts: list) -> np.ndarray:
+        """MinHash signatures, one row of NUM_PERMUTATIONS uint32 values per text."""
+        hashes, offsets = self.shingles(texts)
+        hashes = hashes.astype(np.uint64)
+        signatures = np.empty((len(texts), NUM_PERMUTATIONS), dtype=np.uint32)
+        for k in range(NUM_PERMUTATIONS):
+            permuted = ((hashes * self.a[k] + self.b[k]) >> np.uint64(32)).astype(np.uint32)
+            signatures[:, k] = np.minimum.reduceat(permuted, offsets)
+        return signatures
+
+    def band_keys(self, signatures: np.ndarray) -> np.ndarray:
+        """One uint32 bucket key per card and band."""
+        rows = signatures.astype(np.uint64).reshape(len(signatures), BANDS, ROWS_PER_BAND)
+        return ((rows * self.band_multipliers).sum(axis=2) >> np.uint64(32)).astype(np.uint32)
+
+
+def _candidate_pairs(band_keys: np.ndarray) -> np.ndarray:
+    """
+    Pairs (i, j) of cards sharing a bucket in some band. Within a bucket only
+    neighbours in sorted order are paired, which keeps a bucket of m cards
+    to m - 1 pairs and still connects all of them.
+    """
+    pairs = []
+    for band in range(band_keys.shape[1]):
+        keys = band_keys[:, band]
+        order = np.argsort(keys, kind="stable")
+        same = keys[order[1:]] == keys[order[:-1]]
+        pairs.append(np.stack((order[:-1][same], order[1:][same]), axis=1))
+    pairs = np.concatenate(pairs) if pairs else np.empty((0, 2), dtype=np.int64)
+    pairs.sort(axis=1)
+    return np.unique(pairs, axis=0)
+
+
+def _similar_pairs(signatures: np.ndarray, pairs: np.ndarray, threshold: float) -> tuple:
+    """The candidate pairs whose estimated Jaccard similarity is at least threshold, with the estimates."""
+    kept, similarities = [], []
+    for start in range(0, len(pairs), VERIFY_BATCH_PAIRS):
+        batch = pairs[start:start + VERIFY_BATCH_PAIRS]
+        estimate = (signatures[batch[:, 0]] == signatures[batch[:, 1]]).mean(axis=1)
+        keep = estimate >= threshold
+        kept.append(batch[keep])
+        similarities.append(estimate[keep])
+    if not kept:
+        return np.empty((0, 2), dtype=np.int64), np.empty(0)
+    return np.concatenate(kept), np.concatenate(similarities)
+
+
+def _clusters(pairs: np.ndarray) -> list:
+    """Connected components (lists of row indexes, 2+ members) of the pair graph."""
+    parent = {i: i for i in np.unique(pairs).tolist()}
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, j in pairs.tolist():
+        root_i, root_j = find(i), find(j)
+        if root_i != root_j:
+            parent[max(root_i, root_j)] = min(root_i, root_j)
+    members = {}
+    for i in parent:
+        members.setdefault(find(i), []).append(i)
+    return list(members.values())
+
+
+def _shingle_set(text: str) -> set:
+    """
+    The SHINGLE_SIZE-byte shingles of an already normalized text, padded
+    with a space at both ends so that the last word counts as a whole
+    ("city 11" and "city 110" then differ in two shingles, not one).
+    """
+    encoded = f" {text} ".encode("utf-8").ljust(SHINGLE_SIZE, b"\0")
+    return {encoded[i:i + SHINGLE_SIZE] for i in range(len(encoded) - SHINGLE_SIZE + 1)}
+
+
+def _jaccard(a: set, b: set) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+def _split_around_keepers(signatures: np.ndarray, rows: list, backs: dict, threshold: float) -> list:
+    """
+    Splits a connected component into groups that each hold a keeper and
+    only the cards at least threshold-similar to that keeper.
+
+    A component joins cards through chains of similar pairs (a~b, b~c, ...),
+    so its two ends can be quite different. Here every card is compared
+    with the keeper itself: rows come in keeper-preference order, the first
+    remaining row keeps the cards close enough to it, and the rest are
+    split again. Close also means the answers match (their own shingles
+    reach the threshold): cards asking near-identical questions with
+    different answers, such as a question template filled in with
+    different values, are different facts.
+
+    Args:
+        backs: Shingle set of each row's normalized back.
+
+    Returns:
+        (keeper_row, member_rows, similarities) tuples, each with 1+ members.
+    """
+    groups = []
+    remaining = np.asarray(rows, dtype=np.int64)
+    while len(remaining) >= 2:
+        keeper, rest = remaining[0], remaining[1:]
+        similarity = (signatures[rest] == signatures[keeper]).mean(axis=1)
+        close = similarity >= threshold
+        for n in np.flatnonzero(close).tolist():
+            close[n] = _jaccard(backs[int(rest[n])], backs[int(keeper)]) >= threshold
+        if close.any():
+            groups.append((int(keeper), rest[close].tolist(), similarity[close].tolist()))
+        remaining = rest[~close]
+    return groups
+
+
+def find_near_duplicates(user_deck_db_path: str, threshold: float = DEFAULT_THRESHOLD, deck_id: int | None = None,
+                         progress=None) -> list | None:
+    """
+    Groups a user's cards into clusters of near-duplicates.
+
+    Args:
+        threshold: Minimum estimated Jaccard similarity (0-1) of each card's
+            shingles to its cluster's kept card; their backs alone must
+            reach it too.
+        deck_id: Only look within this deck (default: across all decks).
+        progress: Optional callable(cards_hashed), called after each batch.
+
+    Returns:
+        A list of clusters, largest first, each a dict with 'similarity'
+        (the lowest estimated similarity of a card to the kept card) and
+        'cards': card dicts ('id', 'deck_id', 'deck_name', 'front', 'back',
+        'repetitions', 'interval', 'similarity' to the kept card) with the
+        suggested card to keep (the most reviewed, then the oldest) first.
+        None if NumPy is missing or the database can't be read.
+    """
+    if np is None:
+        print("Near-Duplicate Error: NumPy is required (pip install numpy).")
+        return None
+    hasher = _Hasher()
+    deck_clause, params = ("WHERE c.deck_id = ?", (deck_id,)) if deck_id is not None else ("", ())
+    try:
+        with shared_decks.connect(user_deck_db_path) as conn:
+            # Sized up front so the per-card arrays are filled in place, never copied
+            total = conn.execute(f"SELECT COUNT(*) FROM cards c {deck_clause}", params).fetchone()[0]
+            card_ids = np.zeros(total, dtype=np.int64)
+            band_keys = np.zeros((total, BANDS), dtype=np.uint32)
+            # The low 16 bits of each value are enough to compare signatures (b-bit MinHash)
+            signatures = np.zeros((total, NUM_PERMUTATIONS), dtype=np.uint16)
+            cursor = conn.execute(f"""
+                SELECT c.id, {deck_manager.SQL_CARD_FRONT}, {deck_manager.SQL_CARD_BACK}
+                FROM cards c {deck_manager.SQL_JOIN_CARD_CONTENT} {deck_clause} ORDER BY c.id
+            """, params)
+            filled = 0
+            while filled < total and (rows := cursor.fetchmany(min(BATCH_CARDS, total - filled))):
+                batch = slice(filled, filled + len(rows))
+                card_ids[batch] = [row[0] for row in rows]
+                batch_signatures = hasher.signatures([normalize_text(front) + " \x1f " + normalize_text(back)
+                                                      for _, front, back in rows])
+                band_keys[batch] = hasher.band_keys(batch_signatures)
+                signatures[batch] = batch_signatures
+                filled += len(rows)
+                if progress:
+                    progress(filled)
+    except sqlite3.Error as e:
+        print(f"Database Error: Could not read cards for duplicate detection: {e}")
+        return None
+    if filled < 2:
+        return []
+
+    card_ids, band_keys, signatures = card_ids[:filled], band_keys[:filled], signatures[:filled]
+    pairs, _ = _similar_pairs(signatures, _candidate_pairs(band_keys), threshold)
+    del band_keys
+    components = _clusters(pairs)
+    cards = _load_cards(user_deck_db_path, card_ids[[row for rows in components for row in rows]].tolist())
+    if cards is None:
+        return None
+
+    def keeper_order(row):
+        card = cards[card_ids[row]]
+        return -card["repetitions"], -card["interval"], card["id"]
+
+    clusters = []
+    for rows in components:
+        rows = sorted((row for row in rows if card_ids[row] in cards), key=keeper_order)
+        backs = {row: _shingle_set(normalize_text(cards[card_ids[row]]["back"])) for row in rows}
+        for keeper, members, similarities in _split_around_keepers(signatures, rows, backs, threshold):
+            group = [dict(cards[card_ids[keeper]], similarity=1.0)]
+            group += [dict(cards[card_ids[row]], similarity=similarity)
+                      for row, similarity in zip(members, similarities)]
+            clusters.append({"similarity": min(similarities), "cards": group})
+    clusters.sort(key=lambda cluster: (-len(cluster["cards"]), cluster["cards"][0]["id"]))
+    return clusters
+
+
+def _load_cards(user_deck_db_path: str, card_ids: list) -> dict | None:
+    """Fetches the given cards as dicts, by id."""
+    cards = {}
+    try:
+        with shared_decks.connect(user_deck_db_path) as conn:
+            deck_manager._stage_card_ids(conn.cursor(), card_ids)
+            for row in conn.execute(f"""
+                SELECT c.id, c.deck_id, d.name, {deck_manager.SQL_CARD_FRONT}, {deck_manager.SQL_CARD_BACK},
+                       COALESCE(c.repetitions, 0), COALESCE(c.interval, 1)
+                FROM cards c JOIN decks d ON d.id = c.deck_id {deck_manager.SQL_JOIN_CARD_CONTENT}
+                WHERE c.id IN (SELECT id FROM temp.bulk_card_ids)
+            """):
+                cards[row[0]] = dict(zip(("id", "deck_id", "deck_name", "front", "back", "repetitions", "interval"),
+                                         row))
+    except sqlite3.Error as e:
+        print(f"Database Error: Could not load duplicate cards: {e}")
+        return None
+    return cards
@@ -1,8 +1,33 @@
 # App/srs_logic.py
 import math
 from datetime import datetime, timedelta
+from typing import NamedTuple
 
-def calculate_srs_update(quality: int, repetitions: int, ease_factor: float, interval: int):
+PASSING_QUALITY = 4  # grades below this count as a lapse
+FUZZ_FACTOR = 0.1    # a card may be moved up to this fraction of its interval...
+MAX_FUZZ_DAYS = 7    # ...but never by more than a week
+MIN_FUZZ_INTERVAL = 3
+RELEARNING_STEPS_MINUTES = (1, 10)  # a failed card is shown again this long after each in-session review
+
+
+class SrsParameters(NamedTuple):
+    """
+    Tunable SM-2 constants. The defaults are the classic SM-2 values;
+    utils.srs_optimizer fits them to a user's review history.
+    """
+    min_ease: float = 1.3
+    first_interval: float = 1.0
+    second_interval: float = 6.0
+    ease_bonus: float = 0.1
+    ease_penalty_linear: float = 0.08
+    ease_penalty_quadratic: float = 0.02
+
+
+DEFAULT_SRS_PARAMETERS = SrsParameters()
+
+
+def calculate_srs_update(quality: int, repetitions: int, ease_factor: float, interval: int,
+                         params: SrsParameters = DEFAULT_SRS_PARAMETERS):
     """
     Calculates new SRS parameters based on SM-2 algorithm principles.
 
@@ -11,29 +36,59 @@ def calculate_srs_update(quality: int, repetitions: int, ease_factor: float, int
         repetitions (int): Number of times the card has been successfully recalled in a row.
         ease_factor (float): The current ease factor for the card.
         interval (int): The current interval in days before the card is due again.
+        params (SrsParameters): Scheduling constants, e.g. fitted ones from the database.
 
     Returns:
         tuple: (new_repetitions, new_ease_factor, new_interval_days)
     """
-    if quality < 4:  # If recall quality is poor (e.g., < 3 on a 0-5 scale)
+    if quality < PASSING_QUALITY:  # If recall quality is poor (e.g., < 3 on a 0-5 scale)
         new_repetitions = 0  # Reset repetitions
         new_interval_days = 1  # Show again tomorrow
     else:
         new_repetitions = repetitions + 1
         if new_repetitions == 1:
-            new_interval_days = 1
+            new_interval_days = max(1, round(params.first_interval))
         elif new_repetitions == 2:
-            new_interval_days = 6
+            new_interval_days = max(1, round(params.second_interval))
         else:
             # For interval > 2, interval = previous_interval * ease_factor
             new_interval_days = math.ceil(interval * ease_factor)
     
     # Update ease_factor
-    new_ease_factor = ease_factor + (0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
-    if new_ease_factor < 1.3:
-        new_ease_factor = 1.3  # Minimum ease factor
+    new_ease_factor = ease_factor + (params.ease_bonus - (5 - quality) * (params.ease_penalty_linear + (5 - quality) * params.ease_penalty_quadratic))
+    if new_ease_factor < params.min_ease:
+        new_ease_factor = params.min_ease  # Minimum ease factor
 
     # Cap interval for practical purposes if desired, e.g., 365 days
     # new_interval_days = min(new_interval_days, 365)
 
-    return new_repetitions, new_ease_factor, new_interval_days
\ No newline at end of file
+    return new_repetitions, new_ease_factor, new_interval_days
+
+
+def fuzz_range(interval_days: int) -> tuple:
+    """
+    Returns (earliest, latest) intervals a card scheduled for interval_days
+    may be moved to for load balancing. Short intervals are not moved.
+    """
+    if interval_days < MIN_FUZZ_INTERVAL:
+        return interval_days, interval_days
+    fuzz = min(MAX_FUZZ_DAYS, max(1, round(interval_days * FUZZ_FACTOR)))
+    return interval_days - fuzz, interval_days + fuzz
+
+
+def pick_least_loaded_interval(interval_days: int, earliest: int, loads) -> int:
+    """
+    Picks the interval whose day has the fewest cards due.
+
+    Args:
+        interval_days (int): The interval the algorithm asked for.
+        earliest (int): The interval loads[0] refers to; loads[i] is the number
+            of cards due (earliest + i) days from now.
+
+    Returns:
+        int: The chosen interval. Ties go to the day closest to interval_days,
+        and then to the earlier day.
+    """
+    best = min(range(len(loads)), key=lambda i: (loads[i], abs(earliest + i - interval_days), i))
+    return earliest + best
+
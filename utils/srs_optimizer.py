@@ -0,0 +1,324 @@
+# App/utils/srs_optimizer.py
+"""
+Fits the SM-2 constants in SrsParameters to a user's review history.
+
+Model: a card scheduled for I days is expected to be recalled with
+probability TARGET_RETENTION when it comes due, and forgetting is
+exponential in between, so after t days
+
+    p(recall) = TARGET_RETENTION ** (t / I)
+
+For a candidate parameter set the scheduler is replayed over every card's
+logged reviews to get the interval I it would have chosen before each
+review; the loss is the log loss of those predictions against what the
+user actually answered (quality >= PASSING_QUALITY counts as recalled).
+Parameters that schedule too long predict recalls that were lapses, too
+short ones predict lapses that were recalls.
+
+The replay is vectorized across cards: reviews are laid out step by step
+(every card's 1st review, then every card's 2nd, ...) with cards sorted
+by review count, so step k touches a contiguous prefix of the state
+arrays. One loss evaluation is a few dozen NumPy operations over the
+whole history, which keeps the Nelder-Mead search to seconds for
+millions of reviews.
+
+NumPy is only needed here; the app itself runs without it.
+"""
+import itertools
+import sqlite3
+from typing import NamedTuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+import db_connection
+import deck_manager
+from utils.srs_logic import SrsParameters, DEFAULT_SRS_PARAMETERS, PASSING_QUALITY
+
+TARGET_RETENTION = 0.9
+MIN_REVIEWS = 200  # fewer reviews than this are too noisy to fit
+MIN_ELAPSED_DAYS = 1 / 1440  # reviews closer than a minute are treated as a minute apart
+COARSE_FIT_REVIEWS = 200_000  # larger histories are first fitted on a sample of about this size
+REFINE_EVALUATIONS = 60
+REGULARIZATION = 1e-3  # pulls poorly determined parameters towards the SM-2 defaults
+
+# Search bounds per SrsParameters field, in field order
+PARAMETER_BOUNDS = (
+    (1.1, 2.5),   # min_ease
+    (0.5, 5.0),   # first_interval
+    (1.0, 20.0),  # second_interval
+    (0.0, 0.3),   # ease_bonus
+    (0.0, 0.3),   # ease_penalty_linear
+    (0.0, 0.1),   # ease_penalty_quadratic
+)
+
+
+class ReviewHistory(NamedTuple):
+    """Review log laid out for the vectorized replay (see module docstring)."""
+    num_reviews: int
+    step_offsets: object   # step k covers rows step_offsets[k]:step_offsets[k + 1]
+    passed: object         # per row, in step order: was the card recalled
+    quality: object        # per row: the grade, as an index into the ease-delta table
+    interval_kind: object  # per row: which SM-2 branch sets the next interval (INTERVAL_* below)
+    log_retention: object  # per row: log(TARGET_RETENTION) * days since the card's previous review
+    ease_factor: object    # per card: ease before its first logged review
+    interval: object       # per card: interval before its first logged review
+
+
+# The repetition count after a review doesn't depend on the parameters, only
+# on pass/fail, so which branch of calculate_srs_update applies is fixed.
+INTERVAL_LAPSE, INTERVAL_FIRST, INTERVAL_SECOND, INTERVAL_GROWN = range(4)
+
+
+class FitResult(NamedTuple):
+    params: SrsParameters
+    loss: float
+    default_loss: float
+    num_reviews: int
+    evaluations: int
+
+
+def build_review_history(card_ids, reviewed_days, quality,
+                         initial_repetitions, initial_ease, initial_interval) -> ReviewHistory:
+    """
+    Lays out raw review rows for the replay.
+
+    Args:
+        card_ids, reviewed_days, quality: One entry per review, sorted by card and then time.
+            reviewed_days is a timestamp in days (e.g. a julian day number).
+        initial_repetitions, initial_ease, initial_interval: One entry per card, in the
+            same card order: its state before its first logged review.
+    """
+    card_ids = np.asarray(card_ids, dtype=np.int64)
+    reviewed_days = np.asarray(reviewed_days, dtype=np.float64)
+    quality = np.asarray(quality, dtype=np.int64)
+    num_reviews = len(card_ids)
+    if num_reviews == 0:
+        empty = np.zeros(0)
+        return ReviewHistory(0, np.zeros(1, dtype=np.int64), empty.astype(bool), empty.astype(np.int64),
+                             empty.astype(np.int64), empty, empty, empty)
+
+    # Position of every review within its card's history
+    starts = np.flatnonzero(np.r_[True, card_ids[1:] != card_ids[:-1]])
+    counts = np.diff(np.r_[starts, num_reviews])
+    card_index = np.repeat(np.arange(len(starts)), counts)
+    position = np.arange(num_reviews) - starts[card_index]
+
+    elapsed = np.empty(num_reviews)
+    elapsed[0] = 0.0
+    elapsed[1:] = reviewed_days[1:] - reviewed_days[:-1]
+    elapsed = np.maximum(elapsed, MIN_ELAPSED_DAYS)
+
+    # Repetitions after each review: the run of passes since the last lapse,
+    # on top of the count the card had before its first logged review
+    passed = quality >= PASSING_QUALITY
+    run_start = np.maximum.accumulate(np.where(~passed | (position == 0), np.arange(num_reviews), 0))
+    passes_in_run = np.arange(num_reviews) - run_start + passed[run_start]
+    repetitions = np.asarray(initial_repetitions, dtype=np.int64)[card_index]
+    new_reps = np.where(passed, passes_in_run + np.where(passed[run_start] & (position[run_start] == 0),
+                                                          repetitions, 0), 0)
+    interval_kind = np.where(~passed, INTERVAL_LAPSE,
+                             np.minimum(new_reps, INTERVAL_GROWN))
+
+    # Cards with the most reviews first, so each step is a prefix of the card arrays
+    card_rank = np.empty(len(starts), dtype=np.int64)
+    card_rank[np.argsort(-counts, kind="stable")] = np.arange(len(starts))
+    order = np.lexsort((card_rank[card_index], position))
+    step_offsets = np.r_[0, np.cumsum(np.bincount(position))]
+
+    by_rank = np.argsort(card_rank)
+    return ReviewHistory(
+        num_reviews=num_reviews,
+        step_offsets=step_offsets,
+        passed=passed[order],
+        quality=np.clip(quality[order], 0, 5),
+        interval_kind=interval_kind[order],
+        log_retention=np.log(TARGET_RETENTION) * elapsed[order],
+        ease_factor=np.asarray(initial_ease, dtype=np.float64)[by_rank],
+        interval=np.asarray(initial_interval, dtype=np.float64)[by_rank],
+    )
+
+
+def load_review_history(user_deck_db_path: str, deck_id: int | None = None) -> ReviewHistory | None:
+    """
+    Reads review_log for one deck (or all decks) into a ReviewHistory.
+
+    Returns:
+        The history, or None if NumPy is missing or the database can't be read.
+    """
+    if np is None:
+        print("SRS Optimizer Error: NumPy is required (pip install numpy).")
+        return None
+    where, params = ("WHERE deck_id = ?", (deck_id,)) if deck_id is not None else ("", ())
+    try:
+        with db_connection.connect(user_deck_db_path) as conn:
+            num_reviews = conn.execute(f"SELECT COUNT(*) FROM review_log {where}", params).fetchone()[0]
+            # Straight from the cursor into flat arrays, without lists of row tuples
+            cursor = conn.execute(f"""
+                SELECT card_id, julianday(reviewed_at), quality
+                FROM review_log {where} ORDER BY card_id, reviewed_at, id""", params)
+            reviews = np.fromiter(itertools.chain.from_iterable(cursor), dtype=np.float64, count=3 * num_reviews)
+            # Each card's state before its first logged review (SQLite takes the
+            # bare columns from the row that has the MIN)
+            cursor = conn.execute(f"""
+                SELECT MIN(reviewed_at), repetitions, ease_factor, interval
+                FROM review_log {where} GROUP BY card_id ORDER BY card_id""", params)
+            initial = np.array([row[1:] for row in cursor], dtype=np.float64).reshape(-1, 3)
+    except (sqlite3.Error, ValueError) as e:
+        print(f"Database Error: Could not read review history from {user_deck_db_path}: {e}")
+        return None
+    return build_review_history(*reviews.reshape(-1, 3).T, *initial.T)
+
+
+def _to_params(x) -> SrsParameters:
+    return SrsParameters(*(lo + float(v) * (hi - lo) for v, (lo, hi) in zip(x, PARAMETER_BOUNDS)))
+
+
+def _to_unit(params: SrsParameters):
+    return np.array([(v - lo) / (hi - lo) for v, (lo, hi) in zip(params, PARAMETER_BOUNDS)])
+
+
+def replay_loss(history: ReviewHistory, params: SrsParameters) -> float:
+    """Mean log loss of the recall predictions made by replaying params over the history."""
+    grades = np.arange(6)
+    ease_delta = params.ease_bonus - (5 - grades) * (params.ease_penalty_linear + (5 - grades) * params.ease_penalty_quadratic)
+    fixed_interval = np.array([1.0, params.first_interval, params.second_interval, 0.0])
+    ease = history.ease_factor.copy()
+    interval = history.interval.copy()
+    max_log_p = np.log1p(-1e-6)
+    total = 0.0
+    offsets = history.step_offsets
+
+    for k in range(len(offsets) - 1):
+        lo, hi = offsets[k], offsets[k + 1]
+        n = hi - lo
+        if k > 0:
+            # log p(recall) = log(TARGET_RETENTION) * t / I
+            log_p = np.minimum(history.log_retention[lo:hi] / interval[:n], max_log_p)
+            total -= np.where(history.passed[lo:hi], log_p, np.log(-np.expm1(log_p))).sum()
+
+        # calculate_srs_update, vectorized (without rounding, to keep the loss smooth).
+        # Cards without a further review don't need their state updated.
+        m = offsets[k + 2] - offsets[k + 1] if k + 2 < len(offsets) else 0
+        kind = history.interval_kind[lo:lo + m]
+        interval[:m] = np.where(kind == INTERVAL_GROWN, interval[:m] * ease[:m], fixed_interval[kind])
+        ease[:m] = np.maximum(ease[:m] + ease_delta[history.quality[lo:lo + m]], params.min_ease)
+    count = history.num_reviews - (offsets[1] - offsets[0])
+    return total / count if count else 0.0
+
+
+def _objective(history: ReviewHistory, x, x_default) -> float:
+    x = np.clip(x, 0.0, 1.0)
+    return replay_loss(history, _to_params(x)) + REGULARIZATION * float(((x - x_default) ** 2).sum())
+
+
+def _nelder_mead(f, x0, step=0.1, max_evaluations=400, tolerance=1e-7):
+    """Minimal Nelder-Mead minimizer. Returns (best_x, best_value, evaluations)."""
+    dim = len(x0)
+    simplex = np.vstack([x0] + [x0 + step * np.eye(dim)[i] for i in range(dim)])
+    values = np.array([f(x) for x in simplex])
+    evaluations = dim + 1
+    while evaluations < max_evaluations:
+        order = np.argsort(values)
+        simplex, values = simplex[order], values[order]
+        if values[-1] - values[0] < tolerance:
+            break
+        centroid = simplex[:-1].mean(axis=0)
+        reflected = centroid + (centroid - simplex[-1])
+        f_reflected = f(reflected)
+        evaluations += 1
+        if f_reflected < values[0]:
+            expanded = centroid + 2 * (centroid - simplex[-1])
+            f_expanded = f(expanded)
+            evaluations += 1
+            if f_expanded < f_reflected:
+                simplex[-1], values[-1] = expanded, f_expanded
+            else:
+                simplex[-1], values[-1] = reflected, f_reflected
+        elif f_reflected < values[-2]:
+            simplex[-1], values[-1] = reflected, f_reflected
+        else:
+            contracted = centroid + 0.5 * (simplex[-1] - centroid)
+            f_contracted = f(contracted)
+            evaluations += 1
+            if f_contracted < values[-1]:
+                simplex[-1], values[-1] = contracted, f_contracted
+            else:
+                # Shrink towards the best point
+                simplex[1:] = simplex[0] + 0.5 * (simplex[1:] - simplex[0])
+                values[1:] = [f(x) for x in simplex[1:]]
+                evaluations += dim
+    best = int(np.argmin(values))
+    return simplex[best], float(values[best]), evaluations
+
+
+def thin_history(history: ReviewHistory, stride: int) -> ReviewHistory:
+    """Keeps every stride-th card (and all of its reviews); cards stay sorted by review count."""
+    if stride <= 1:
+        return history
+    offsets = history.step_offsets
+    rows = np.concatenate([np.arange(offsets[k], offsets[k + 1], stride) for k in range(len(offsets) - 1)])
+    step_offsets = np.r_[0, np.cumsum([len(range(offsets[k], offsets[k + 1], stride))
+                                       for k in range(len(offsets) - 1)])]
+    return ReviewHistory(len(rows), step_offsets, history.passed[rows], history.quality[rows],
+                         history.interval_kind[rows], history.log_retention[rows],
+                         history.ease_factor[::stride], history.interval[::stride])
+
+
+def fit_srs_parameters(history: ReviewHistory, initial: SrsParameters = DEFAULT_SRS_PARAMETERS,
+                       max_evaluations: int = 400) -> FitResult:
+    """
+    Searches the PARAMETER_BOUNDS box for the parameters with the lowest replay loss.
+
+    Large histories are fitted coarse-to-fine: first on a sample of about
+    COARSE_FIT_REVIEWS reviews, then refined on the whole history from there.
+
+    Returns:
+        A FitResult; its params are never worse than the defaults on this history.
+    """
+    x_default = _to_unit(DEFAULT_SRS_PARAMETERS)
+    x_start = np.clip(_to_unit(initial), 0.0, 1.0)
+    evaluations = 0
+    stride = history.num_reviews // COARSE_FIT_REVIEWS
+    if stride > 1:
+        sample = thin_history(history, stride)
+        x_start, _, evaluations = _nelder_mead(lambda x: _objective(sample, x, x_default), x_start,
+                                               max_evaluations=max_evaluations)
+        x_start = np.clip(x_start, 0.0, 1.0)
+        x_best, _, refine_evaluations = _nelder_mead(lambda x: _objective(history, x, x_default), x_start,
+                                                     step=0.02, max_evaluations=REFINE_EVALUATIONS)
+        evaluations += refine_evaluations
+    else:
+        x_best, _, evaluations = _nelder_mead(lambda x: _objective(history, x, x_default), x_start,
+                                              max_evaluations=max_evaluations)
+
+    default_loss = replay_loss(history, DEFAULT_SRS_PARAMETERS)
+    params = _to_params(np.clip(x_best, 0.0, 1.0))
+    loss = replay_loss(history, params)
+    if loss >= default_loss:
+        params, loss = DEFAULT_SRS_PARAMETERS, default_loss
+    return FitResult(params, loss, default_loss, history.num_reviews, evaluations)
+
+
+def optimize_user_parameters(user_deck_db_path: str, deck_id: int | None = None,
+                             min_reviews: int = MIN_REVIEWS, save: bool = True) -> FitResult | None:
+    """
+    Fits scheduler parameters to one deck's review history (or all decks') and stores them.
+
+    Returns:
+        The FitResult, or None if NumPy is missing, the history can't be read
+        or it has fewer than min_reviews reviews.
+    """
+    history = load_review_history(user_deck_db_path, deck_id)
+    if history is None:
+        return None
+    if history.num_reviews < min_reviews:
+        print(f"SRS Optimizer: {history.num_reviews} review(s) logged, at least {min_reviews} are needed.")
+        return None
+    result = fit_srs_parameters(history)
+    if save and not deck_manager.save_srs_parameters(user_deck_db_path, deck_id, result.params,
+                                                     result.num_reviews, result.loss):
+        return None
+    return result
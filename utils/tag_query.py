@@ -0,0 +1,60 @@
+# App/utils/tag_query.py
+import re
+from typing import NamedTuple
+
+
+class TagFilter(NamedTuple):
+    """
+    Tag filter for due-card queries.
+
+    all_of:  every tag must be on the card (AND)
+    any_of:  at least one of these tags must be on the card (OR)
+    none_of: none of these tags may be on the card (NOT)
+    """
+    all_of: tuple = ()
+    any_of: tuple = ()
+    none_of: tuple = ()
+
+    def is_empty(self) -> bool:
+        return not (self.all_of or self.any_of or self.none_of)
+
+
+def normalize_tag_name(name: str) -> str:
+    """Tags are single words: surrounding whitespace is dropped and inner whitespace becomes '_'."""
+    return re.sub(r"\s+", "_", name.strip())
+
+
+def split_tags(text: str) -> list:
+    """Splits a space- or comma-separated tag list into normalized, de-duplicated names."""
+    seen = set()
+    tags = []
+    for raw in re.split(r"[\s,]+", text):
+        name = normalize_tag_name(raw)
+        if name and name.lower() not in seen:
+            seen.add(name.lower())
+            tags.append(name)
+    return tags
+
+
+def parse_tag_query(text: str) -> TagFilter:
+    """
+    Parses a tag query into a TagFilter.
+
+    Syntax: space-separated terms. 'a b' requires both tags, 'a|b' requires
+    either (one OR group per query), '-a' excludes the tag.
+    Example: "spanish verbs|nouns -irregular"
+
+    Raises:
+        ValueError: If the query has more than one OR group.
+    """
+    all_of, any_of, none_of = [], [], []
+    for term in text.split():
+        if term.startswith("-"):
+            none_of.extend(split_tags(term[1:]))
+        elif "|" in term:
+            if any_of:
+                raise ValueError("Only one OR group (a|b|c) is supported per tag query.")
+            any_of.extend(name for name in (normalize_tag_name(t) for t in term.split("|")) if name)
+        else:
+            all_of.extend(split_tags(term))
+    return TagFilter(tuple(all_of), tuple(any_of), tuple(none_of))